@@ -6,6 +6,7 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 
 from alembic import context
+from alembic.runtime.migration import MigrationContext
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -38,13 +39,13 @@ except ImportError as e:
     pass
 
 # Configuration for concurrent operations
-def needs_concurrent_operations() -> bool:
+def needs_concurrent_operations(connection=None) -> bool:
     """
     Check if the current migration requires concurrent operations.
     
     This can be determined by (in order of precedence):
     1. Environment variable CONCURRENT_MIGRATION=true (global override)
-    2. Per-script hook: revision script defining requires_concurrent_operations() function
+    2. Per-script hook: a pending revision script defining requires_concurrent_operations()
     3. Migration file containing 'CONCURRENT' in name or content
     4. Command line revision containing 'concurrent'
     
@@ -56,25 +57,26 @@ def needs_concurrent_operations() -> bool:
         logger.info("✓ Concurrent operations enabled via CONCURRENT_MIGRATION env var")
         return True
     
-    # Check per-script hook: import current revision and check for requires_concurrent_operations()
+    # Check per-script hook: every revision still to be applied (or the heads,
+    # without a connection) may define requires_concurrent_operations()
     try:
-        # Get the current revision being processed
         script_directory = context.script
         if script_directory:
-            # Get head revision or specific revision being processed
-            heads = script_directory.get_heads()
-            if heads:
-                for head in heads:
-                    revision_script = script_directory.get_revision(head)
-                    if revision_script and revision_script.module:
-                        # Check if the revision module defines requires_concurrent_operations()
-                        if hasattr(revision_script.module, 'requires_concurrent_operations'):
-                            requires_concurrent = revision_script.module.requires_concurrent_operations()
-                            if requires_concurrent:
-                                logger.info(f"✓ Concurrent operations required by revision {head} hook")
-                                return True
-                            else:
-                                logger.info(f"✓ Revision {head} explicitly disables concurrent operations")
+            if connection is not None:
+                current = MigrationContext.configure(connection).get_current_heads()
+                revision_scripts = list(script_directory.iterate_revisions('heads', current or 'base'))
+            else:
+                revision_scripts = [script_directory.get_revision(head) for head in script_directory.get_heads()]
+            for revision_script in revision_scripts:
+                if revision_script and revision_script.module:
+                    # Check if the revision module defines requires_concurrent_operations()
+                    if hasattr(revision_script.module, 'requires_concurrent_operations'):
+                        requires_concurrent = revision_script.module.requires_concurrent_operations()
+                        if requires_concurrent:
+                            logger.info(f"✓ Concurrent operations required by revision {revision_script.revision} hook")
+                            return True
+                        else:
+                            logger.info(f"✓ Revision {revision_script.revision} explicitly disables concurrent operations")
     except Exception as e:
         logger.debug(f"Could not check per-script hooks: {e}")
         pass  # Safe to ignore if we can't determine revision hooks
@@ -163,14 +165,16 @@ def run_migrations_online() -> None:
     # Set the database URL in config for engine creation
     config.set_main_option('sqlalchemy.url', database_url)
     
-    # Check if we need concurrent operations
-    concurrent_mode = needs_concurrent_operations()
-    
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
+    
+    # Check if we need concurrent operations (on its own connection, so the
+    # migration connection can still switch to AUTOCOMMIT)
+    with connectable.connect() as probe:
+        concurrent_mode = needs_concurrent_operations(probe)
 
     with connectable.connect() as connection:
         if concurrent_mode:
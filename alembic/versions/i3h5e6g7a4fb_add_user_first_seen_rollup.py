@@ -0,0 +1,57 @@
+"""add_user_first_seen_rollup
+
+Revision ID: i3h5e6g7a4fb
+Revises: h2g4d5f69e3a
+Create Date: 2025-10-02 09:12:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'i3h5e6g7a4fb'
+down_revision: str | Sequence[str] | None = 'h2g4d5f69e3a'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Create user_first_seen retention rollup table and backfill it from telemetry_events."""
+    op.create_table('user_first_seen',
+        sa.Column('user_id_hash', sa.String(64), nullable=False, primary_key=True),
+        sa.Column('first_seen_date', sa.Date(), nullable=False),
+        sa.Column('activity_mask', sa.BigInteger(), nullable=False, server_default='1'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    
+    # Cohort reads filter on a window of first_seen_date
+    op.create_index('ix_user_first_seen_first_seen_date', 'user_first_seen', ['first_seen_date'])
+    
+    # Backfill in one pass, so cohorts can be read from the rollup alone; later
+    # events are applied by the telemetry batches (repair with scripts/rebuild_retention_rollup.py)
+    op.execute("""
+        INSERT INTO user_first_seen (user_id_hash, first_seen_date, activity_mask, updated_at)
+        SELECT e.user_id_hash, f.first_day,
+               bit_or(CAST(1 AS BIGINT) << ((e.timestamp AT TIME ZONE 'UTC')::date - f.first_day)),
+               now()
+        FROM telemetry_events e
+        JOIN (
+            SELECT user_id_hash, MIN((timestamp AT TIME ZONE 'UTC')::date) AS first_day
+            FROM telemetry_events
+            WHERE event_type = 'expense_logged' AND user_id_hash IS NOT NULL
+            GROUP BY user_id_hash
+        ) f ON f.user_id_hash = e.user_id_hash
+        WHERE e.event_type = 'expense_logged'
+          AND (e.timestamp AT TIME ZONE 'UTC')::date - f.first_day <= 30
+        GROUP BY e.user_id_hash, f.first_day
+    """)
+
+
+def downgrade() -> None:
+    """Remove user_first_seen retention rollup table."""
+    op.drop_index('ix_user_first_seen_first_seen_date', table_name='user_first_seen')
+    op.drop_table('user_first_seen')
@@ -0,0 +1,44 @@
+"""add_expense_daily_rollups
+
+Revision ID: j4i6f7h8b5gc
+Revises: i3h5e6g7a4fb
+Create Date: 2025-10-03 10:40:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'j4i6f7h8b5gc'
+down_revision: str | Sequence[str] | None = 'i3h5e6g7a4fb'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Create expense_daily_rollups and backfill it from expenses."""
+    op.create_table('expense_daily_rollups',
+        sa.Column('user_id_hash', sa.String(255), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(50), nullable=False),
+        sa.Column('total_minor', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('expense_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('user_id_hash', 'day', 'category'),
+    )
+    
+    # Backfill in one pass; later writes are applied by ORM events on Expense
+    op.execute("""
+        INSERT INTO expense_daily_rollups (user_id_hash, day, category, total_minor, expense_count)
+        SELECT user_id_hash, date, COALESCE(category, 'other'), SUM(amount_minor), COUNT(*)
+        FROM expenses
+        GROUP BY user_id_hash, date, COALESCE(category, 'other')
+    """)
+
+
+def downgrade() -> None:
+    """Remove expense_daily_rollups."""
+    op.drop_table('expense_daily_rollups')
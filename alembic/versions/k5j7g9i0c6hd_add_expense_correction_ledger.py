@@ -0,0 +1,82 @@
+"""add_expense_correction_ledger
+
+Revision ID: k5j7g9i0c6hd
+Revises: j4i6f7h8b5gc
+Create Date: 2025-10-04 09:15:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+from utils.migrations import ConcurrentIndexError, create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = 'k5j7g9i0c6hd'
+down_revision: str | Sequence[str] | None = 'j4i6f7h8b5gc'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Add expenses.correction_mid with its unique index and backfill existing corrections."""
+    # Runs without a transaction (see requires_concurrent_operations), so every
+    # step must be safe to repeat if a concurrent index build fails part way
+    op.execute("ALTER TABLE expenses ADD COLUMN IF NOT EXISTS correction_mid VARCHAR(255)")
+
+    # Corrections written through the canonical writer: the row another expense was
+    # superseded by, keyed by its message id (lowest id wins if a mid was replayed)
+    op.execute("""
+        UPDATE expenses e
+        SET correction_mid = e.mid
+        FROM (
+            SELECT MIN(n.id) AS id
+            FROM expenses n
+            JOIN expenses o ON o.superseded_by = n.id AND o.user_id_hash = n.user_id_hash
+            WHERE n.mid IS NOT NULL AND n.mid != ''
+            GROUP BY n.user_id_hash, n.mid
+        ) c
+        WHERE e.id = c.id
+    """)
+
+    # Legacy corrections stored the mid in unique_id as correction_<mid>_<epoch_ms>
+    op.execute(r"""
+        UPDATE expenses e
+        SET correction_mid = c.correction_mid
+        FROM (
+            SELECT MIN(id) AS id, user_id_hash,
+                   regexp_replace(unique_id, '^correction_(.*)_[0-9]+$', '\1') AS correction_mid
+            FROM expenses
+            WHERE unique_id ~ '^correction_.+_[0-9]+$'
+            GROUP BY user_id_hash, regexp_replace(unique_id, '^correction_(.*)_[0-9]+$', '\1')
+        ) c
+        WHERE e.id = c.id
+          AND e.correction_mid IS NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM expenses x
+              WHERE x.user_id_hash = c.user_id_hash AND x.correction_mid = c.correction_mid
+          )
+    """)
+
+    # Built CONCURRENTLY so expenses stays writable
+    indexes = [
+        ('ux_expenses_user_correction_mid', ['user_id_hash', 'correction_mid'], "correction_mid IS NOT NULL", True),
+        # Correction candidates: WHERE user_id_hash=? AND created_at >= ? ORDER BY created_at DESC
+        ('ix_expenses_user_created_at', ['user_id_hash', 'created_at'], None, False),
+    ]
+    for name, columns, where_clause, unique in indexes:
+        if not create_index_concurrently(name, 'expenses', columns, where_clause=where_clause,
+                                         unique=unique, if_not_exists=True):
+            raise ConcurrentIndexError(f"Index {name} was not created; rerun with CONCURRENT_MIGRATION=true")
+
+
+def downgrade() -> None:
+    """Remove the correction ledger column and indexes."""
+    drop_index_concurrently('ix_expenses_user_created_at', if_exists=True)
+    drop_index_concurrently('ux_expenses_user_correction_mid', if_exists=True)
+    op.execute("ALTER TABLE expenses DROP COLUMN IF EXISTS correction_mid")
+
+
+def requires_concurrent_operations() -> bool:
+    """CREATE INDEX CONCURRENTLY needs alembic/env.py to run this revision without a transaction."""
+    return True
@@ -0,0 +1,54 @@
+"""shard_growth_counters
+
+Revision ID: l6k8h0j1d7ie
+Revises: k5j7g9i0c6hd
+Create Date: 2025-10-05 10:20:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'l6k8h0j1d7ie'
+down_revision: str | Sequence[str] | None = 'k5j7g9i0c6hd'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Allow several growth_counters rows per counter, one per shard."""
+    op.add_column('growth_counters', sa.Column('shard', sa.SmallInteger(), nullable=False, server_default='0'))
+    
+    # Existing totals stay on shard 0; the old one-row-per-name constraint goes
+    op.execute("ALTER TABLE growth_counters DROP CONSTRAINT IF EXISTS growth_counters_counter_name_key")
+    op.create_unique_constraint('ux_growth_counters_name_shard', 'growth_counters', ['counter_name', 'shard'])
+
+
+def downgrade() -> None:
+    """Fold shard rows back into one row per counter."""
+    op.execute("""
+        INSERT INTO growth_counters (counter_name, shard, counter_value, last_updated)
+        SELECT DISTINCT g.counter_name, 0, 0, now()
+        FROM growth_counters g
+        WHERE NOT EXISTS (
+            SELECT 1 FROM growth_counters z WHERE z.counter_name = g.counter_name AND z.shard = 0
+        )
+    """)
+    op.execute("""
+        UPDATE growth_counters g
+        SET counter_value = t.total
+        FROM (
+            SELECT counter_name, SUM(counter_value) AS total
+            FROM growth_counters
+            GROUP BY counter_name
+        ) t
+        WHERE g.counter_name = t.counter_name AND g.shard = 0
+    """)
+    op.execute("DELETE FROM growth_counters WHERE shard != 0")
+    op.drop_constraint('ux_growth_counters_name_shard', 'growth_counters', type_='unique')
+    op.create_unique_constraint('growth_counters_counter_name_key', 'growth_counters', ['counter_name'])
+    op.drop_column('growth_counters', 'shard')
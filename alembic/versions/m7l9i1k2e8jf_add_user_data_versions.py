@@ -0,0 +1,45 @@
+"""add_user_data_versions
+
+Revision ID: m7l9i1k2e8jf
+Revises: l6k8h0j1d7ie
+Create Date: 2025-10-06 08:45:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'm7l9i1k2e8jf'
+down_revision: str | Sequence[str] | None = 'l6k8h0j1d7ie'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Create user_data_versions and start every existing user at version 1."""
+    op.create_table('user_data_versions',
+        sa.Column('user_id_hash', sa.String(255), nullable=False),
+        sa.Column('period', sa.String(7), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('user_id_hash', 'period'),
+    )
+    
+    # Users and months (dated or recorded in) that already have expenses get a non-zero version
+    op.execute("""
+        INSERT INTO user_data_versions (user_id_hash, period, version)
+        SELECT user_id_hash, 'all', 1 FROM expenses
+        UNION
+        SELECT user_id_hash, to_char(date, 'YYYY-MM'), 1 FROM expenses
+        UNION
+        SELECT user_id_hash, to_char(created_at, 'YYYY-MM'), 1 FROM expenses WHERE created_at IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    """Remove user_data_versions."""
+    op.drop_table('user_data_versions')
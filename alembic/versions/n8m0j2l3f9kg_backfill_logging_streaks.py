@@ -0,0 +1,62 @@
+"""backfill_logging_streaks
+
+Revision ID: n8m0j2l3f9kg
+Revises: m7l9i1k2e8jf
+Create Date: 2025-10-07 10:20:00.000000
+
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'n8m0j2l3f9kg'
+down_revision: str | Sequence[str] | None = 'm7l9i1k2e8jf'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Ensure the streak counter columns exist and backfill them from expenses."""
+    # The columns predate Alembic on older databases; IF NOT EXISTS keeps reruns safe
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS consecutive_days INTEGER DEFAULT 0")
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_log_date DATE")
+
+    # Gaps-and-islands pass, same as handlers.milestones.recompute_all_streaks():
+    # each user's streak is the run of consecutive logging days ending at their last one
+    op.execute("""
+        WITH log_days AS (
+            SELECT DISTINCT user_id_hash, date(created_at) AS log_date
+            FROM expenses
+            WHERE user_id_hash IS NOT NULL AND created_at IS NOT NULL
+        ),
+        islands AS (
+            SELECT user_id_hash, log_date,
+                   log_date - CAST(ROW_NUMBER() OVER (PARTITION BY user_id_hash ORDER BY log_date) AS INTEGER) AS island
+            FROM log_days
+        ),
+        runs AS (
+            SELECT user_id_hash, MAX(log_date) AS run_end, COUNT(*) AS run_length
+            FROM islands
+            GROUP BY user_id_hash, island
+        ),
+        latest AS (
+            SELECT DISTINCT ON (user_id_hash) user_id_hash, run_end, run_length
+            FROM runs
+            ORDER BY user_id_hash, run_end DESC
+        )
+        UPDATE users u SET
+            consecutive_days = COALESCE(latest.run_length, 0),
+            last_log_date = latest.run_end
+        FROM users u2
+        LEFT JOIN latest ON latest.user_id_hash = u2.user_id_hash
+        WHERE u.id = u2.id
+          AND (u.consecutive_days IS DISTINCT FROM COALESCE(latest.run_length, 0)
+               OR u.last_log_date IS DISTINCT FROM latest.run_end)
+    """)
+
+
+def downgrade() -> None:
+    """Data-only backfill; the columns are kept (they predate this revision)."""
+    pass
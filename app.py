@@ -1015,7 +1015,6 @@ def readiness_check():
     import time
 
     import psycopg
-    import redis
     
     start_time = time.time()
     
@@ -1037,12 +1036,10 @@ def readiness_check():
         logger.debug(f"DB readiness check failed: {str(e)}")
         db_ok = False
     
-    # Redis check with 1s timeout (informational only)
+    # Redis check over the shared pool (informational only)
     try:
-        redis_url = os.environ.get("REDIS_URL")
-        if redis_url:
-            r = redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
-            redis_ok = r.ping()
+        from utils import redis_pool
+        redis_ok = redis_pool.ping()
     except Exception as e:
         logger.debug(f"Redis readiness check failed: {str(e)}")
         redis_ok = False
@@ -25,8 +25,7 @@ def redis_smoke_test():
     
     try:
         # Check if REDIS_URL is configured
-        redis_url = os.getenv('REDIS_URL')
-        if not redis_url:
+        if not os.getenv('REDIS_URL'):
             error_msg = "missing REDIS_URL"
             return _log_and_respond(start_time, connected, error_msg, value)
         
@@ -37,25 +36,20 @@ def redis_smoke_test():
             error_msg = "redis package not installed"
             return _log_and_respond(start_time, connected, error_msg, value)
         
-        # Handle different Redis URL formats
-        if not redis_url.startswith(('redis://', 'rediss://', 'unix://')):
-            redis_url = f"redis://{redis_url}"
-        
-        # Create Redis client with 3s timeouts
-        client = redis.from_url(
-            redis_url,
-            socket_connect_timeout=3,
-            socket_timeout=3,
-            decode_responses=True
-        )
+        # Client on the shared pool (URL clean-up and timeouts live in utils.redis_pool)
+        from utils import redis_pool
+        client = redis_pool.get_client(decode_responses=True)
+        if client is None:
+            error_msg = "redis connection failed: unreachable (see redis pool logs)"
+            return _log_and_respond(start_time, connected, error_msg, value)
         
-        # Test SET operation with 5s TTL
+        # SET with 5s TTL and GET back, in one pipelined round-trip
         test_key = "smoke:test"
         test_value = "ok"
-        client.set(test_key, test_value, ex=5)
-        
-        # Test GET operation
-        retrieved_value = client.get(test_key)
+        pipe = client.pipeline(transaction=False)
+        pipe.set(test_key, test_value, ex=5)
+        pipe.get(test_key)
+        retrieved_value = pipe.execute()[1]
         
         # Success case
         connected = True
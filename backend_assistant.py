@@ -299,7 +299,8 @@ def sha256(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 def add_expense(user_id: str, amount_minor: int | None = None, currency: str | None = None, category: str | None = None, 
-                description: str | None = None, source: str | None = None, message_id: str | None = None) -> dict[str, str | int | None]:
+                description: str | None = None, source: str | None = None, message_id: str | None = None,
+                correction_mid: str | None = None) -> dict[str, str | int | None]:
     """
     CANONICAL SINGLE WRITER - All expense writes must flow through this function only.
     Absorbs logic from create_expense, save_expense, upsert_expense_idempotent.
@@ -318,6 +319,7 @@ def add_expense(user_id: str, amount_minor: int | None = None, currency: str | N
         description: Expense description - required
         source: Source type ('chat' only - web-only architecture)
         message_id: Message ID (for messenger-like inserts)
+        correction_mid: Message ID of the correction this expense records, if any
     
     Returns:
         dict: {expense_id, correlation_id, amount_minor, category, description}
@@ -464,6 +466,7 @@ def add_expense(user_id: str, amount_minor: int | None = None, currency: str | N
         expense.correlation_id = correlation_id
         expense.unique_id = str(uuid.uuid4())
         expense.mid = stable_message_id
+        expense.correction_mid = correction_mid
         expense.idempotency_key = idempotency_key
         
         # BEGIN ATOMIC TRANSACTION WITH CANONICAL WRITER PROTECTION
@@ -473,20 +476,33 @@ def add_expense(user_id: str, amount_minor: int | None = None, currency: str | N
             # Update user totals (absorbed from create_expense with no_autoflush)
             from sqlalchemy import text as sql_text
             now_ts = datetime.utcnow()
+            # Logging streak (consecutive_days/last_log_date) is maintained here so
+            # milestone checks read it in O(1) instead of scanning past days
+            log_date = occurred_at.date()
             with db.session.no_autoflush:
                 db.session.execute(sql_text("""
-                    INSERT INTO users (user_id_hash, platform, total_expenses, expense_count, last_interaction, last_user_message_at)
-                    VALUES (:user_hash, :platform, :amount, 1, :now_ts, :now_ts)
+                    INSERT INTO users (user_id_hash, platform, total_expenses, expense_count, last_interaction, last_user_message_at,
+                                       consecutive_days, last_log_date)
+                    VALUES (:user_hash, :platform, :amount, 1, :now_ts, :now_ts, 1, :log_date)
                     ON CONFLICT (user_id_hash) DO UPDATE SET
                         total_expenses = COALESCE(users.total_expenses, 0) + :amount,
                         expense_count = COALESCE(users.expense_count, 0) + 1,
                         last_interaction = :now_ts,
-                        last_user_message_at = :now_ts
+                        last_user_message_at = :now_ts,
+                        consecutive_days = CASE
+                            WHEN users.last_log_date = :log_date THEN GREATEST(COALESCE(users.consecutive_days, 0), 1)
+                            WHEN users.last_log_date = :prev_log_date THEN COALESCE(users.consecutive_days, 0) + 1
+                            WHEN users.last_log_date > :log_date THEN users.consecutive_days
+                            ELSE 1
+                        END,
+                        last_log_date = GREATEST(COALESCE(users.last_log_date, :log_date), :log_date)
                 """), {
                     'user_hash': user_id,
                     'platform': source,
                     'amount': amount_float,
-                    'now_ts': now_ts
+                    'now_ts': now_ts,
+                    'log_date': log_date,
+                    'prev_log_date': log_date - timedelta(days=1)
                 })
             
             # Update monthly summary (absorbed from create_expense with no_autoflush)
@@ -627,7 +643,8 @@ def get_totals(user_id: str, period: str) -> dict[str, str | int | None]:
       "top_categories": [{"category": "food", "total_minor": 5000, "count": 3, "percentage": 50}]
     }
     Rules:
-    - Must call SQL: SELECT SUM(amount_minor), COUNT(*), category FROM expenses WHERE user_id_hash=? AND created_at BETWEEN ...
+    - Must read SQL: per-category SUM/COUNT from expense_daily_rollups for user_id_hash=? AND day >= period start
+      (rollups are maintained from expenses on every write, see utils/expense_rollups.py)
     - Never guess or calculate inside the model. Only echo DB result.
     """
     
@@ -636,13 +653,14 @@ def get_totals(user_id: str, period: str) -> dict[str, str | int | None]:
         user_hash = ensure_hashed(user_id)
         
         # Calculate date range based on period using Asia/Dhaka timezone
-        from utils.timezone_helpers import start_of_day_dhaka, today_local
+        from utils.expense_rollups import get_category_totals
+        from utils.timezone_helpers import today_local
         
         today_dhaka = today_local()
         
         if period == "day":
             # Use Asia/Dhaka timezone for day boundaries
-            start_date = start_of_day_dhaka(today_dhaka)
+            start_date = today_dhaka
         elif period == "week":
             # Week starts on Saturday, ends on Friday (user preference)
             # Limited to current month only
@@ -650,60 +668,29 @@ def get_totals(user_id: str, period: str) -> dict[str, str | int | None]:
             days_since_saturday = (today_dhaka.weekday() + 2) % 7
             week_start_date = today_dhaka - timedelta(days=days_since_saturday)
             
-            # Limit to current month
-            month_start_date = today_dhaka.replace(day=1)
-            month_start = start_of_day_dhaka(month_start_date)
-            week_start = start_of_day_dhaka(week_start_date)
-            
             # Use the later of week start or month start
-            start_date = max(week_start, month_start)
+            start_date = max(week_start_date, today_dhaka.replace(day=1))
         elif period == "month":
             # Start of current month in Dhaka timezone
-            month_start_date = today_dhaka.replace(day=1)
-            start_date = start_of_day_dhaka(month_start_date)
+            start_date = today_dhaka.replace(day=1)
         else:
             raise ValueError(f"Invalid period: {period}")
         
-        # Security pattern: EXECUTE weekly_totals - using prepared statement via SQLAlchemy
-        # Use date field (not created_at) for period filtering to match user's expense date
-        totals_result = db.session.execute(text("""
-            SELECT 
-                COALESCE(SUM(amount_minor), 0) as total_minor,
-                COUNT(*) as expenses_count,
-                (SELECT category FROM expenses 
-                 WHERE user_id_hash = :user_hash AND date >= :start_date
-                 GROUP BY category ORDER BY SUM(amount_minor) DESC NULLS LAST LIMIT 1) AS top_category
-            FROM expenses 
-            WHERE user_id_hash = :user_hash 
-            AND date >= :start_date
-        """), {"user_hash": user_hash, "start_date": start_date}).first()
-        total_minor = int(totals_result[0] or 0) if totals_result else 0
-        expenses_count = int(totals_result[1] or 0) if totals_result else 0
-        top_category = totals_result[2] if totals_result and len(totals_result) > 2 else None
-        
-        # Get top 5 categories with totals for accurate reporting
-        # Use date field (not created_at) for period filtering to match user's expense date
-        categories_result = db.session.execute(text("""
-            SELECT 
-                COALESCE(category, 'other') as category,
-                SUM(amount_minor) as total_minor,
-                COUNT(*) as count
-            FROM expenses 
-            WHERE user_id_hash = :user_hash 
-            AND date >= :start_date
-            GROUP BY category
-            ORDER BY total_minor DESC
-            LIMIT 5
-        """), {"user_hash": user_hash, "start_date": start_date}).fetchall()
+        # One grouped read over at most ~31 days x categories of rollup rows,
+        # filtered on expense date (not created_at) to match the user's expense date
+        category_rows = get_category_totals(user_hash, start_date)
+        total_minor = sum(row[1] for row in category_rows)
+        expenses_count = sum(row[2] for row in category_rows)
+        top_category = category_rows[0][0] if category_rows else None
         
+        # Top 5 categories with totals for accurate reporting
         top_categories = []
-        for row in categories_result:
-            cat_total = int(row[1] or 0)
+        for category, cat_total, count in category_rows[:5]:
             percentage = round((cat_total / total_minor * 100), 1) if total_minor > 0 else 0
             top_categories.append({
-                "category": row[0] or "other",
+                "category": category or "other",
                 "total_minor": cat_total,
-                "count": int(row[2] or 0),
+                "count": count,
                 "percentage": percentage
             })
         
@@ -160,13 +160,13 @@ def test_shared_state_isolation():
     adapter_vars = [attr for attr in dir(production_ai_adapter) if not attr.startswith('_')]
     print(f"AI Adapter attributes: {adapter_vars}")
     
-    # Check session object for shared state
-    session_id = id(production_ai_adapter.session)
-    print(f"Shared session ID: {session_id}")
+    # The shared transport must not keep a session (and with it a cookie jar)
+    transport = production_ai_adapter.transport
+    print(f"Shared transport ID: {id(transport)}")
+    print(f"Transport has session: {hasattr(transport, 'session')}")
     
-    # Test if session headers get mixed
-    original_headers = dict(production_ai_adapter.session.headers)
-    print(f"Session headers: {list(original_headers.keys())}")
+    # Headers are frozen, so no call can mutate what the next user sends
+    print(f"Frozen headers: {list(production_ai_adapter._headers.keys())}")
     
     return []
 
@@ -146,8 +146,8 @@ def test_safeguard_features():
         # Test 1: Per-request session creation
         adapter = production_ai_adapter
         print(f"✅ AI Adapter initialized with user isolation: {adapter.enabled}")
-        print(f"✅ Session template configured (no shared state): {len(adapter._session_template['headers'])} headers")
-        print(f"✅ Backwards compatibility session exists for health checks: {hasattr(adapter, 'session')}")
+        print(f"✅ Frozen request headers (no shared state): {len(adapter._headers)} headers")
+        print(f"✅ Shared transport keeps no session or cookie jar: {not hasattr(adapter.transport, 'session')}")
         
         # Test 2: Contamination monitor
         print(f"✅ AI contamination monitor active: {ai_contamination_monitor is not None}")
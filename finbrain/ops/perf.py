@@ -1,53 +1,292 @@
 """
-Performance monitoring with ring buffer and P95 calculation
+Performance monitoring with log-bucketed latency histograms
+Histograms are keyed by (route, stage, outcome), record in O(1) without locks
+(each thread writes its own shard) and merge into snapshots for p50/p90/p99/p999
+and Prometheus export. Each worker process exports its own series under a pid
+label; sum them in PromQL to get the service-wide histogram.
 """
 
-from typing import List, Optional
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+# Sub-buckets per power of two: bucket width is 2**(1/8) ~ 9% relative error
+SUB_BUCKETS = 8
+# Values at or below this (ms) share the lowest bucket
+MIN_VALUE_MS = 0.001
+_MIN_INDEX = math.floor(math.log2(MIN_VALUE_MS) * SUB_BUCKETS)
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+# Prometheus `le` bounds in ms (exported as seconds)
+EXPORT_BOUNDS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+def bucket_index(value_ms: float) -> int:
+    if value_ms <= MIN_VALUE_MS:
+        return _MIN_INDEX
+    return math.floor(math.log2(value_ms) * SUB_BUCKETS)
+
+
+def bucket_upper(index: int) -> float:
+    return 2 ** ((index + 1) / SUB_BUCKETS)
+
+
+class _Shard:
+    """One thread's counts for one key; only its owner thread writes to it"""
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value_ms: float) -> None:
+        index = bucket_index(value_ms)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms < self.min:
+            self.min = value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+
+class HistogramSnapshot:
+    """Point-in-time, mergeable histogram (e.g. across threads or workers)"""
+
+    def __init__(self, counts: dict[int, int] | None = None, count: int = 0, total: float = 0.0,
+                 min_value: float = math.inf, max_value: float = 0.0):
+        self.counts = dict(counts or {})
+        self.count = count
+        self.total = total
+        self.min = min_value
+        self.max = max_value
+
+    def merge(self, other: "HistogramSnapshot") -> "HistogramSnapshot":
+        for index, n in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> float | None:
+        """Nearest-rank quantile, reported as the bucket's upper bound capped at the max seen"""
+        if not self.count:
+            return None
+        rank = min(int(q * self.count), self.count - 1) + 1
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_upper(index), self.max)
+        return self.max
+
+    def cumulative(self, bounds_ms=EXPORT_BOUNDS_MS) -> list[int]:
+        """Counts at or below each bound (a bucket counts once its upper edge is within it)"""
+        ordered = sorted(self.counts.items())
+        result, seen, i = [], 0, 0
+        for bound in bounds_ms:
+            while i < len(ordered) and bucket_upper(ordered[i][0]) <= bound * (1 + 1e-9):
+                seen += ordered[i][1]
+                i += 1
+            result.append(seen)
+        return result
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'counts': {str(k): v for k, v in self.counts.items()}, 'count': self.count,
+                'sum': self.total, 'min': self.min if self.count else None, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "HistogramSnapshot":
+        return cls({int(k): v for k, v in data.get('counts', {}).items()}, data.get('count', 0),
+                   data.get('sum', 0.0), data.get('min') if data.get('min') is not None else math.inf,
+                   data.get('max', 0.0))
+
+
+class HistogramRegistry:
+    """Latency histograms keyed by (route, stage, outcome)"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: list[dict] = []  # one {key: _Shard} per thread that has recorded
+        self._lock = threading.Lock()  # taken once per new thread, never on record
+
+    def _thread_shards(self) -> dict:
+        shards = getattr(self._local, 'shards', None)
+        if shards is None:
+            shards = self._local.shards = {}
+            with self._lock:
+                self._shards.append(shards)
+        return shards
+
+    def record(self, route: str, stage: str, outcome: str, value_ms: float) -> None:
+        shards = self._thread_shards()
+        key = (route, stage, outcome)
+        shard = shards.get(key)
+        if shard is None:
+            shard = shards[key] = _Shard()
+        shard.record(value_ms)
+
+    def snapshot(self, route: str | None = None, stage: str | None = None,
+                 outcome: str | None = None) -> dict[tuple, HistogramSnapshot]:
+        """Merged histograms per key, optionally filtered on any label"""
+        with self._lock:
+            thread_shards = list(self._shards)
+        merged: dict[tuple, HistogramSnapshot] = {}
+        for shards in thread_shards:
+            for key, shard in list(shards.items()):
+                if (route is not None and key[0] != route) or (stage is not None and key[1] != stage) \
+                        or (outcome is not None and key[2] != outcome):
+                    continue
+                part = HistogramSnapshot(dict(shard.counts), shard.count, shard.total, shard.min, shard.max)
+                merged.setdefault(key, HistogramSnapshot()).merge(part)
+        return merged
+
+    def combined(self, route: str | None = None, stage: str | None = None,
+                 outcome: str | None = None) -> HistogramSnapshot:
+        """One histogram across every key matching the filters"""
+        total = HistogramSnapshot()
+        for snapshot in self.snapshot(route, stage, outcome).values():
+            total.merge(snapshot)
+        return total
+
+    def quantiles(self, route: str | None = None, stage: str | None = None,
+                  outcome: str | None = None) -> dict[str, float | None]:
+        combined = self.combined(route, stage, outcome)
+        return {f"p{str(q)[2:].ljust(2, '0')}": combined.quantile(q) for q in QUANTILES}
+
+    def clear(self, route: str | None = None, stage: str | None = None) -> None:
+        """Drop recorded data, only for the given route/stage when either is passed"""
+        with self._lock:
+            for shards in self._shards:
+                if route is None and stage is None:
+                    shards.clear()
+                    continue
+                for key in list(shards):
+                    if (route is None or key[0] == route) and (stage is None or key[1] == stage):
+                        shards.pop(key, None)
+
+    def to_prometheus(self, name: str = "finbrain_stage_latency_seconds") -> str:
+        """Prometheus text exposition for this process: a histogram plus precomputed quantile gauges"""
+        snapshots = sorted(self.snapshot().items())
+        lines = [
+            f"# HELP {name} Request latency by route, stage and outcome",
+            f"# TYPE {name} histogram",
+        ]
+        for key, snapshot in snapshots:
+            labels = _labels(key)
+            for bound, n in zip(EXPORT_BOUNDS_MS, snapshot.cumulative()):
+                lines.append(f'{name}_bucket{{{labels},le="{bound / 1000:g}"}} {n}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {snapshot.count}')
+            lines.append(f"{name}_sum{{{labels}}} {snapshot.total / 1000:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {snapshot.count}")
+
+        lines += [
+            f"# HELP {name}_quantile Latency quantiles computed in-process",
+            f"# TYPE {name}_quantile gauge",
+        ]
+        for key, snapshot in snapshots:
+            labels = _labels(key)
+            for q in QUANTILES:
+                lines.append(f'{name}_quantile{{{labels},quantile="{q}"}} {snapshot.quantile(q) / 1000:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: tuple) -> str:
+    route, stage, outcome = (str(part).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                             for part in key)
+    return f'route="{route}",stage="{stage}",outcome="{outcome}",pid="{os.getpid()}"'
+
+
+# Process-wide registry shared by the router, PCA and ops trackers
+registry = HistogramRegistry()
+
+
+class StageTrace:
+    """
+    Splits one request into consecutive stages
+
+    mark_stage() closes the running stage (outcome "pass") and starts the next;
+    finish() closes the last one with the request's outcome and records the total.
+    """
+
+    def __init__(self, route: str, target: HistogramRegistry):
+        self.route = route
+        self.registry = target
+        self.started = time.perf_counter()
+        self.stage = "entry"
+        self.stage_started = self.started
+        self.finished = False
+
+    def enter(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.registry.record(self.route, self.stage, "pass", (now - self.stage_started) * 1000)
+        self.stage, self.stage_started = stage, now
+
+    def finish(self, outcome: str) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        now = time.perf_counter()
+        self.registry.record(self.route, self.stage, outcome, (now - self.stage_started) * 1000)
+        self.registry.record(self.route, "total", outcome, (now - self.started) * 1000)
+
+
+_current_trace: contextvars.ContextVar[Optional[StageTrace]] = contextvars.ContextVar(
+    "finbrain_stage_trace", default=None
+)
+
+
+@contextmanager
+def stage_trace(route: str, target: HistogramRegistry | None = None) -> Iterator[StageTrace]:
+    """Trace the stages of one request; outcome is "error" unless finish() is called"""
+    trace = StageTrace(route, target or registry)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.finish("error")
+
+
+def mark_stage(stage: str) -> None:
+    """Start the named stage of the request being traced (no-op outside a trace)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.enter(stage)
 
 
 class LatencyMonitor:
-    """Ring buffer for tracking request latencies with P95 calculation"""
-    
-    def __init__(self, size: int = 500):
-        self.size = size
-        self.buffer: list[float] = []
-        self.index = 0
-        self.full = False
-    
-    def record(self, latency: float) -> None:
-        """Record a latency measurement"""
-        if len(self.buffer) < self.size:
-            self.buffer.append(latency)
-        else:
-            self.buffer[self.index] = latency
-            self.full = True
-        
-        self.index = (self.index + 1) % self.size
-    
+    """End-to-end latency tracker backed by one (route, stage) histogram"""
+
+    def __init__(self, route: str = "router", stage: str = "e2e", target: HistogramRegistry | None = None):
+        self.route = route
+        self.stage = stage
+        self.registry = target or registry
+
+    def record(self, latency: float, outcome: str = "ok") -> None:
+        """Record a latency measurement (ms)"""
+        self.registry.record(self.route, self.stage, outcome, latency)
+
     def count(self) -> int:
         """Get number of recorded samples"""
-        return len(self.buffer)
-    
+        return self.registry.combined(self.route, self.stage).count
+
     def p95(self) -> float | None:
-        """Calculate P95 using nearest rank method"""
-        if not self.buffer:
-            return None
-        
-        sorted_values = sorted(self.buffer)
-        n = len(sorted_values)
-        
-        # P95 using nearest rank method
-        rank = int(0.95 * n)
-        if rank >= n:
-            rank = n - 1
-        
-        return sorted_values[rank]
-    
+        """P95 by nearest rank, read from the histogram (no sorting)"""
+        return self.registry.combined(self.route, self.stage).quantile(0.95)
+
     def clear(self) -> None:
-        """Clear all recorded data for testing"""
-        self.buffer.clear()
-        self.index = 0
-        self.full = False
+        """Clear this monitor's recorded data for testing"""
+        self.registry.clear(self.route, self.stage)
 
 
 # Global instance
@@ -67,4 +306,4 @@ def p95() -> float | None:
 
 def clear() -> None:
     """Clear all recorded data for testing"""
-    _monitor.clear()
\ No newline at end of file
+    _monitor.clear()
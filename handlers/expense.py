@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Any, Dict, Optional
 
+from sqlalchemy import and_, case, or_
+
 from db_base import db
 from models import Expense, User
 from parsers.expense import (
@@ -390,16 +392,21 @@ def handle_correction(psid_hash_val: str, mid: str, text: str, now: datetime) ->
         
         log_correction_detected(psid_hash_val, text, target_expense)
         
-        # Step 2: Find candidate expense to correct within 10-minute window
+        # Step 2: One indexed lookup for an earlier correction with this mid
+        # and the uncorrected expenses in the 10-minute window
         correction_window = timedelta(minutes=10)
         window_start = now - correction_window
+        existing_correction, candidate_expenses = _find_correction_rows(psid_hash_val, mid, window_start)
         
-        # Query uncorrected expenses for this user within the time window
-        candidate_expenses = db.session.query(Expense).filter(
-            Expense.user_id_hash == psid_hash_val,
-            Expense.created_at >= window_start,
-            Expense.superseded_by.is_(None)  # Only uncorrected expenses
-        ).order_by(Expense.created_at.desc()).limit(5).all()
+        if existing_correction:
+            log_correction_duplicate(psid_hash_val, mid, existing_correction.id)
+            response = format_correction_duplicate_reply()
+            return {
+                'text': response,
+                'intent': 'correction_duplicate',
+                'category': None,
+                'amount': None
+            }
         
         if not candidate_expenses:
             # No candidates found - log as new expense and inform user
@@ -415,7 +422,8 @@ def handle_correction(psid_hash_val: str, mid: str, text: str, now: datetime) ->
                     category=target_expense.get('category'),
                     description=target_expense.get('note', text),
                     source='chat',  # Updated for web-only architecture
-                    message_id=mid
+                    message_id=mid,
+                    correction_mid=mid
                 )
             except Exception as e:
                 logger.error(f'Canonical correction expense creation failed: {e}')
@@ -446,23 +454,7 @@ def handle_correction(psid_hash_val: str, mid: str, text: str, now: datetime) ->
             # Fallback to most recent expense
             best_candidate = candidate_expenses[0]
         
-        # Step 4: Check for duplicate correction attempt (same mid)
-        existing_correction = db.session.query(Expense).filter(
-            Expense.user_id_hash == psid_hash_val,
-            Expense.unique_id.like(f'%{mid}%')
-        ).first()
-        
-        if existing_correction:
-            log_correction_duplicate(psid_hash_val, mid, existing_correction.id)
-            response = format_correction_duplicate_reply()
-            return {
-                'text': response,
-                'intent': 'correction_duplicate',
-                'category': None,
-                'amount': None
-            }
-        
-        # Step 5: Perform supersede operation
+        # Step 4: Perform supersede operation
         correction_reason = parse_correction_reason(text)
         
         # Create corrected expense data with smart categorization logic
@@ -491,7 +483,8 @@ def handle_correction(psid_hash_val: str, mid: str, text: str, now: datetime) ->
                 category=corrected_expense_data.get('category'),
                 description=corrected_expense_data.get('note', text),
                 source='chat',  # Web-only architecture
-                message_id=mid
+                message_id=mid,
+                correction_mid=mid
             )
             
             # Mark old expense as superseded
@@ -551,6 +544,33 @@ def handle_correction(psid_hash_val: str, mid: str, text: str, now: datetime) ->
             'amount': None
         }
 
+def _find_correction_rows(psid_hash_val: str, mid: str, window_start: datetime) -> tuple[Expense | None, list]:
+    """
+    Fetch the correction already logged for mid and the correction candidates in one query.
+    
+    Served by ux_expenses_user_correction_mid and ix_expenses_user_created_at, so the
+    cost does not grow with the user's expense history.
+    
+    Returns:
+        (existing correction or None, up to 5 uncorrected expenses newest first)
+    """
+    in_window = and_(Expense.created_at >= window_start, Expense.superseded_by.is_(None))
+    if not mid:
+        rows = db.session.query(Expense).filter(
+            Expense.user_id_hash == psid_hash_val, in_window
+        ).order_by(Expense.created_at.desc()).limit(5).all()
+        return None, rows
+    
+    is_replay = Expense.correction_mid == mid
+    rows = db.session.query(Expense).filter(
+        Expense.user_id_hash == psid_hash_val,
+        or_(is_replay, in_window)
+    ).order_by(case((is_replay, 0), else_=1), Expense.created_at.desc()).limit(6).all()
+    
+    if rows and rows[0].correction_mid == mid:
+        return rows[0], []
+    return None, rows[:5]
+
 def _find_best_correction_candidate(candidates: list, target_expense: dict[str, Any]) -> Expense | None:
     """
     Find the best expense to correct based on category and merchant similarity.
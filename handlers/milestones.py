@@ -136,38 +136,111 @@ def _check_logs_milestone(user_id_hash: str) -> str | None:
         logger.error(f"Logs milestone check error: {e}")
         return None
 
+# Streaks longer than this are reported as the cap (matches the historical 30-day scan)
+MAX_STREAK_DAYS = 30
+
 def _calculate_streak_days(user_id_hash: str) -> int:
     """
-    Calculate consecutive logging days for user
-    Reuses logic from handlers/report.py
+    Calculate consecutive logging days for user (UTC days, ending today)
+    
+    Reads the streak counters that add_expense maintains on the users row, so
+    this is a single query regardless of streak length. Users whose counters
+    have not been populated yet fall back to one grouped query over distinct
+    logging dates.
     """
     try:
         from db_base import db
-        from models import Expense
+        from models import User
         
-        # Calculate consecutive logging days
         today = datetime.now(UTC).date()
-        streak_days = 0
-        check_date = today
-        
-        for i in range(30):  # Check up to 30 days back
-            expenses_on_date = db.session.query(Expense).filter(
-                Expense.user_id_hash == user_id_hash,
-                db.func.date(Expense.created_at) == check_date
-            ).count()
-            
-            if expenses_on_date > 0:
-                streak_days += 1
-                check_date -= timedelta(days=1)
-            else:
-                break
+        counters = db.session.query(User.consecutive_days, User.last_log_date).filter(
+            User.user_id_hash == user_id_hash
+        ).first()
+        
+        if counters and counters.last_log_date is not None:
+            if counters.last_log_date != today:
+                return 0  # Streak must include today
+            return min(counters.consecutive_days or 0, MAX_STREAK_DAYS)
         
-        return streak_days
+        return _streak_from_log_dates(user_id_hash, today)
         
     except Exception as e:
         logger.error(f"Streak calculation error: {e}")
         return 0
 
+def _streak_from_log_dates(user_id_hash: str, today: date) -> int:
+    """Count consecutive logging days back from today with one DISTINCT date query"""
+    from db_base import db
+    from models import Expense
+    
+    log_day = db.func.date(Expense.created_at)
+    window_start = today - timedelta(days=MAX_STREAK_DAYS - 1)
+    rows = db.session.query(log_day).filter(
+        Expense.user_id_hash == user_id_hash,
+        log_day >= window_start,
+        log_day <= today
+    ).distinct().all()
+    
+    logged_days = {row[0] for row in rows}
+    streak_days = 0
+    check_date = today
+    while check_date in logged_days:
+        streak_days += 1
+        check_date -= timedelta(days=1)
+    
+    return streak_days
+
+def recompute_all_streaks() -> int:
+    """
+    Backfill/repair users.consecutive_days and users.last_log_date for all users
+    
+    Uses a single gaps-and-islands pass over distinct logging dates: each user's
+    streak is the length of the run of consecutive days ending at their last
+    logging day. Users with no expenses are reset to 0/NULL.
+    
+    Returns:
+        Number of user rows updated
+    """
+    from sqlalchemy import text
+    
+    from db_base import db
+    
+    result = db.session.execute(text("""
+        WITH log_days AS (
+            SELECT DISTINCT user_id_hash, date(created_at) AS log_date
+            FROM expenses
+            WHERE user_id_hash IS NOT NULL AND created_at IS NOT NULL
+        ),
+        islands AS (
+            SELECT user_id_hash, log_date,
+                   log_date - CAST(ROW_NUMBER() OVER (PARTITION BY user_id_hash ORDER BY log_date) AS INTEGER) AS island
+            FROM log_days
+        ),
+        runs AS (
+            SELECT user_id_hash, MAX(log_date) AS run_end, COUNT(*) AS run_length
+            FROM islands
+            GROUP BY user_id_hash, island
+        ),
+        latest AS (
+            SELECT DISTINCT ON (user_id_hash) user_id_hash, run_end, run_length
+            FROM runs
+            ORDER BY user_id_hash, run_end DESC
+        )
+        UPDATE users u SET
+            consecutive_days = COALESCE(latest.run_length, 0),
+            last_log_date = latest.run_end
+        FROM users u2
+        LEFT JOIN latest ON latest.user_id_hash = u2.user_id_hash
+        WHERE u.id = u2.id
+          AND (u.consecutive_days IS DISTINCT FROM COALESCE(latest.run_length, 0)
+               OR u.last_log_date IS DISTINCT FROM latest.run_end)
+    """))
+    db.session.commit()
+    
+    updated = result.rowcount or 0
+    logger.info(f"Recomputed logging streaks for {updated} users")
+    return updated
+
 def _log_milestone_telemetry(milestone_type: str, user_id_hash: str, 
                            category: str | None, delta_pct: float | None):
     """Log milestone telemetry event"""
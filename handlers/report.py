@@ -49,6 +49,9 @@ def handle_report(user_id: str) -> dict[str, str]:
                 logger.warning(f"Feedback context setup failed: {feedback_error}, returning cached story")
                 return {"text": cached_story}
         
+        # Read before loading, so an expense written meanwhile leaves the cached story stale
+        data_version = performance_cache.data_version(user_id)
+        
         # days_window already determined above for caching
         end_time = datetime.now(UTC)
         start_time = end_time - timedelta(days=days_window)
@@ -65,10 +68,10 @@ def handle_report(user_id: str) -> dict[str, str]:
         ).order_by(Expense.created_at.desc()).limit(100).all()
         
         # Generate Money Story
-        story = _generate_money_story(expenses, days_window, user_id)
+        story = _generate_money_story(expenses, days_window, user_id, data_version)
         
         # Cache the generated story for future requests
-        performance_cache.set_report(user_id, days_window, story)
+        performance_cache.set_report(user_id, days_window, story, version=data_version)
         
         # Phase 2: Add feedback collection
         try:
@@ -112,7 +115,7 @@ def _get_time_window(user_id: str) -> int:
         return 7  # Safe fallback
 
 
-def _generate_money_story(expenses, days_window: int, user_id: str) -> str:
+def _generate_money_story(expenses, days_window: int, user_id: str, data_version: int | None = None) -> str:
     """
     Generate narrative Money Story from expense data
     Maximum 500 characters, 4-6 sentences
@@ -151,7 +154,8 @@ def _generate_money_story(expenses, days_window: int, user_id: str) -> str:
         aggregations = aggregation_cache.get_user_aggregations(user_id, days_window)
         if not aggregations:
             # Compute and cache aggregations
-            aggregations = aggregation_cache.update_user_aggregations(user_id, days_window, expenses)
+            aggregations = aggregation_cache.update_user_aggregations(user_id, days_window, expenses,
+                                                                      version=data_version)
         
         # Extract values for story generation
         total_logs = aggregations["total_logs"]
@@ -45,6 +45,7 @@ class Expense(db.Model):
     superseded_by = db.Column(db.BigInteger, nullable=True)  # ID of expense that supersedes this one
     corrected_at = db.Column(db.DateTime(timezone=True), nullable=True)  # When this expense was corrected
     corrected_reason = db.Column(db.Text, nullable=True)  # Short reason for correction
+    correction_mid = db.Column(db.String(255), nullable=True)  # Message ID of the correction that created this row
     
     # Natural Language Processing metadata
     nl_confidence = db.Column(db.Float, nullable=True)  # AI confidence score (0.0-1.0)
@@ -56,7 +57,13 @@ class Expense(db.Model):
     
     # Soft delete support
     deleted_at = db.Column(db.DateTime(timezone=True), nullable=True)  # When this expense was soft deleted
-    is_deleted = db.Column(db.Boolean, default=False, nullable=False)  # Soft delete flag
+    is_deleted = db.Column(db.Boolean, default=False, server_default=db.text("false"), nullable=False)  # Soft delete flag
+    
+    __table_args__ = (
+        db.Index('ix_expenses_user_created_at', 'user_id_hash', 'created_at'),  # Correction window lookup
+        db.Index('ux_expenses_user_correction_mid', 'user_id_hash', 'correction_mid', unique=True,
+                 postgresql_where=db.text("correction_mid IS NOT NULL")),  # Correction ledger: one row per correction message
+    )
     
     def soft_delete(self):
         """Soft delete this expense"""
@@ -179,7 +186,7 @@ class User(UserMixin, db.Model):
     
     # Soft delete support
     deleted_at = db.Column(db.DateTime(timezone=True), nullable=True)  # When this user was soft deleted
-    is_deleted = db.Column(db.Boolean, default=False, nullable=False)  # Soft delete flag
+    is_deleted = db.Column(db.Boolean, default=False, server_default=db.text("false"), nullable=False)  # Soft delete flag
     
     def soft_delete(self):
         """Soft delete this user"""
@@ -242,6 +249,19 @@ class MonthlySummary(db.Model):
     def __repr__(self):
         return f'<MonthlySummary {self.user_id_hash}: {self.month} - {self.total_amount}>'
 
+class ExpenseDailyRollup(db.Model):
+    """Per-user daily totals by category, kept in step with expenses by ORM events"""
+    __tablename__ = 'expense_daily_rollups'
+    
+    user_id_hash = db.Column(db.String(255), primary_key=True)  # SHA-256 hashed user ID
+    day = db.Column(db.Date, primary_key=True)  # Expense date (expenses.date)
+    category = db.Column(db.String(50), primary_key=True)  # Expense category
+    total_minor = db.Column(db.BigInteger, nullable=False, default=0)  # SUM(amount_minor)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)  # COUNT(*)
+    
+    def __repr__(self):
+        return f'<ExpenseDailyRollup {self.user_id_hash[:8]}: {self.day} {self.category} - {self.total_minor}>'
+
 class RateLimit(db.Model):
     """Rate limiting tracking table"""
     __tablename__ = 'rate_limits'
@@ -311,16 +331,45 @@ class TelemetryEvent(db.Model):
         return f'<TelemetryEvent {self.event_type} - {self.user_id_hash[:8] if self.user_id_hash else "anon"}>'
 
 class GrowthCounter(db.Model):
-    """Running totals for growth metrics"""
+    """Running totals for growth metrics, split into shard rows that are summed on read"""
     __tablename__ = 'growth_counters'
     
     id = db.Column(db.Integer, primary_key=True)
-    counter_name = db.Column(db.String(50), unique=True, nullable=False)  # total_expenses, total_reports, etc.
-    counter_value = db.Column(db.BigInteger, default=0, nullable=False)  # Current counter value
+    counter_name = db.Column(db.String(50), nullable=False)  # total_expenses, total_reports, etc.
+    shard = db.Column(db.SmallInteger, nullable=False, default=0)  # Written by workers with pid % shards == shard
+    counter_value = db.Column(db.BigInteger, default=0, nullable=False)  # This shard's part of the total
     last_updated = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.UniqueConstraint('counter_name', 'shard', name='ux_growth_counters_name_shard'),
+    )
+    
     def __repr__(self):
-        return f'<GrowthCounter {self.counter_name}: {self.counter_value}>'
+        return f'<GrowthCounter {self.counter_name}[{self.shard}]: {self.counter_value}>'
+
+class UserFirstSeen(db.Model):
+    """Per-user retention rollup maintained as expense_logged events arrive"""
+    __tablename__ = 'user_first_seen'
+    
+    user_id_hash = db.Column(db.String(64), primary_key=True)  # Hashed user identifier
+    first_seen_date = db.Column(db.Date, nullable=False, index=True)  # UTC date of first expense_logged (cohort)
+    activity_mask = db.Column(db.BigInteger, nullable=False, default=1)  # Bit n set = active on cohort day + n (n <= 30)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserFirstSeen {self.user_id_hash[:8]}: {self.first_seen_date}>'
+
+class UserDataVersion(db.Model):
+    """Per-user write counter, bumped with every expense write (see utils.data_versions)"""
+    __tablename__ = 'user_data_versions'
+    
+    user_id_hash = db.Column(db.String(255), primary_key=True)  # SHA-256 hashed user identifier
+    period = db.Column(db.String(7), primary_key=True)  # 'all' or the expense month 'YYYY-MM'
+    version = db.Column(db.BigInteger, nullable=False, default=0)  # Only ever increases
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserDataVersion {self.user_id_hash[:8]} {self.period}: v{self.version}>'
 
 class PendingExpense(db.Model):
     """Temporary storage for expenses awaiting user clarification"""
@@ -749,3 +798,10 @@ class DeletionRequest(db.Model):
     
     def __repr__(self):
         return f'<DeletionRequest {self.id} for {self.user_id_hash[:8]}... status={self.status}>'
+
+# Keep expense_daily_rollups and user_data_versions in step with every ORM write to expenses
+from utils.data_versions import register_data_version_listeners  # noqa: E402
+from utils.expense_rollups import register_rollup_listeners  # noqa: E402
+
+register_rollup_listeners(Expense)
+register_data_version_listeners(Expense)
@@ -175,4 +175,8 @@ def generate_pca_id(prefix: str) -> str:
     unique_string = f"{time.time()}{uuid.uuid4().hex[:8]}"
     hash_digest = hashlib.sha256(unique_string.encode()).hexdigest()[:16]
     
-    return f"{prefix}_{hash_digest[:8]}_{hash_digest[8:16]}"
\ No newline at end of file
+    return f"{prefix}_{hash_digest[:8]}_{hash_digest[8:16]}"
+# Drop cached precedence views when a user's corrections or rules change
+from utils.precedence_engine import register_overlay_invalidation  # noqa: E402
+
+register_overlay_invalidation(UserCorrection, UserRule)
@@ -0,0 +1,172 @@
+"""
+Analyze-once message artifact shared by router, parser and PCA
+Every view of a message (normalized text, tokens, money mentions, time window)
+is computed lazily on first access and reused by every stage of the request
+"""
+from __future__ import annotations
+
+import contextvars
+import re
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterator
+
+from nlp.money_patterns import RE_MONEY, has_spend_money, normalize_text_money
+
+_ZERO_WIDTH_CHARS = re.compile(r"[\u200B-\u200D\uFEFF]")
+_SPACES = re.compile(r"\s+")
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_BENGALI_CHAR = re.compile(r"[\u0980-\u09FF]")
+_LATIN_CHAR = re.compile(r"[A-Za-z]")
+_BENGALI_DIGIT_TABLE = str.maketrans("০১২৩৪৫৬৭৮৯", "0123456789")
+
+DEFAULT_TIMEZONE = "Asia/Dhaka"
+
+
+@dataclass(frozen=True)
+class MoneyMention:
+    """A currency-marked amount found in AnalyzedMessage.normalized"""
+    text: str
+    amount: float | None
+    start: int
+    end: int
+
+
+class AnalyzedMessage:
+    """
+    Immutable, lazily analyzed view of one inbound message
+
+    Fields are cached_property values: each normalization or scan runs at most
+    once per message, however many stages ask for it.
+    """
+
+    def __init__(self, raw: str):
+        object.__setattr__(self, "raw", raw if isinstance(raw, str) else "")
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AnalyzedMessage is immutable")
+
+    def __repr__(self) -> str:
+        return f"<AnalyzedMessage {self.raw[:40]!r}>"
+
+    # Normalized text views
+
+    @cached_property
+    def normalized(self) -> str:
+        """NFKC, ASCII digits, no zero-width chars, casefolded, single spaces"""
+        text = unicodedata.normalize("NFKC", self.raw)
+        text = text.translate(_BENGALI_DIGIT_TABLE)
+        text = _ZERO_WIDTH_CHARS.sub("", text)
+        return _SPACES.sub(" ", text.casefold()).strip()
+
+    @cached_property
+    def routing_text(self) -> str:
+        """Routing-policy view: NFKC, no zero-width chars, casefolded (digits and spacing kept)"""
+        text = unicodedata.normalize("NFKC", self.raw)
+        return _ZERO_WIDTH_CHARS.sub("", text).lower().casefold()
+
+    @cached_property
+    def money_text(self) -> str:
+        """normalize_text_money view used by the router's money detection"""
+        return normalize_text_money(self.raw)
+
+    @cached_property
+    def parsing_text(self) -> str:
+        """normalize_text_for_parsing view used by the expense parser"""
+        from parsers.expense import normalize_text_for_parsing
+        return normalize_text_for_parsing(self.raw)
+
+    # Tokens
+
+    @cached_property
+    def tokens(self) -> tuple[str, ...]:
+        return tuple(_TOKEN.findall(self.normalized))
+
+    @cached_property
+    def stems(self) -> tuple[str, ...]:
+        """tokens with Bengali morphological suffixes stripped"""
+        from parsers.expense import strip_bengali_suffixes
+        return tuple(strip_bengali_suffixes(token) for token in self.tokens)
+
+    @cached_property
+    def language(self) -> str:
+        """'bn', 'en' or 'mixed' from the script of the letters used"""
+        bengali = len(_BENGALI_CHAR.findall(self.raw))
+        latin = len(_LATIN_CHAR.findall(self.raw))
+        if bengali and latin:
+            return "mixed"
+        return "bn" if bengali else "en"
+
+    # Money
+
+    @cached_property
+    def money_mentions(self) -> tuple[MoneyMention, ...]:
+        mentions = []
+        for match in RE_MONEY.finditer(self.normalized):
+            amount_text = (match.group(1) or match.group(2) or "").replace(",", "")
+            try:
+                amount = float(amount_text)
+            except ValueError:
+                amount = None
+            mentions.append(MoneyMention(match.group(0), amount, match.start(), match.end()))
+        return tuple(mentions)
+
+    @property
+    def has_money_mention(self) -> bool:
+        """Currency-marked amount (nlp.money_patterns semantics)"""
+        return bool(self.money_mentions)
+
+    @cached_property
+    def has_spend_money(self) -> bool:
+        """Router money detection: currency, spend verb or expense shorthand with an amount"""
+        if not self.raw.strip():
+            return False
+        return has_spend_money(self.money_text)
+
+    # Time window
+
+    @cached_property
+    def has_time_window(self) -> bool:
+        from nlp.signals_extractor import RE_TIME
+        return bool(RE_TIME.search(self.normalized))
+
+    @cached_property
+    def time_window(self) -> dict | None:
+        """Date range for today/yesterday/this week/... in DEFAULT_TIMEZONE"""
+        from nlp.signals_extractor import parse_time_window
+        return parse_time_window(timezone=DEFAULT_TIMEZONE, text=self.normalized)
+
+
+_current_message: contextvars.ContextVar[AnalyzedMessage | None] = contextvars.ContextVar(
+    "current_analyzed_message", default=None
+)
+
+
+def analyze(text: str) -> AnalyzedMessage:
+    """
+    The request's AnalyzedMessage when text is the message in scope, else a fresh one
+
+    Stages call this with the text they were given, so they share one analysis
+    inside message_scope() and still work standalone outside it.
+    """
+    current = _current_message.get()
+    if current is not None and current.raw == text:
+        return current
+    return AnalyzedMessage(text)
+
+
+@contextmanager
+def message_scope(text: str) -> Iterator[AnalyzedMessage]:
+    """Make one AnalyzedMessage current for every stage handling this message"""
+    current = _current_message.get()
+    if current is not None and current.raw == text:
+        yield current
+        return
+    message = AnalyzedMessage(text)
+    token = _current_message.set(message)
+    try:
+        yield message
+    finally:
+        _current_message.reset(token)
@@ -16,6 +16,52 @@ RE_MONEY = re.compile(
     flags=re.IGNORECASE | re.UNICODE
 )
 
+# Router money detection (spend phrases), applied to normalize_text_money output
+CURRENCY_SYMBOL_PATTERN = re.compile(r'[৳$£€₹]\s*\d+(?:[.,]\d{1,2})?', re.IGNORECASE)
+CURRENCY_WORD_PATTERN = re.compile(r'\b\d+(?:[.,]\d{1,2})?\s*(tk|taka|bdt|usd|eur|inr|rs|peso|php)\b|\b(tk|taka|bdt|usd|eur|inr|rs|peso|php)\s*\d+(?:[.,]\d{1,2})?\b', re.IGNORECASE)
+VERB_PATTERN = re.compile(r'\b(spent|paid|bought|blew|burned|used)\b.*?\b\d+(?:[.,]\d{1,2})?\b', re.IGNORECASE)
+SHORTHAND_PATTERN = re.compile(r'\b(coffee|lunch|dinner|uber|taxi|bus|groceries?|fuel|petrol|medicine|pharmacy)\b.*?\b\d+(?:[.,]\d{1,2})?\b', re.IGNORECASE)
+MULTIPLIER_PATTERN = re.compile(r'\b\d+(?:\.\d+)?[kK]\b.*?\b(tk|taka|spent|paid|bought|on|for)\b', re.IGNORECASE)
+
+# Bangla numeral mapping for normalization
+BANGLA_NUMERALS = {
+    '০': '0', '১': '1', '২': '2', '৩': '3', '৪': '4',
+    '৫': '5', '৬': '6', '৭': '7', '৮': '8', '৯': '9'
+}
+_BANGLA_DIGIT_TABLE = str.maketrans(BANGLA_NUMERALS)
+_SPACES = re.compile(r'\s+')
+_NON_MONEY_CHARS = re.compile(r'[^\w\s$£€₹৳.,()-]')
+
+def normalize_text_money(text: str) -> str:
+    """
+    Normalize text for money detection.
+    Converts Bangla numerals, handles OCR artifacts, removes extra spaces.
+    """
+    if not text:
+        return ""
+    
+    # Convert Bangla numerals to ASCII
+    normalized = text.translate(_BANGLA_DIGIT_TABLE)
+    
+    # Collapse extra spaces and emojis
+    normalized = _SPACES.sub(' ', normalized)
+    normalized = _NON_MONEY_CHARS.sub(' ', normalized)  # Remove emojis, keep currency symbols
+    
+    return normalized.strip()
+
+def has_spend_money(normalized_text: str) -> bool:
+    """
+    Router money detection on normalize_text_money output.
+    Ordered from cheapest to richest patterns, stops at first match.
+    """
+    return bool(
+        CURRENCY_SYMBOL_PATTERN.search(normalized_text) or  # Currency symbols with amounts
+        CURRENCY_WORD_PATTERN.search(normalized_text) or    # Amount with currency words
+        VERB_PATTERN.search(normalized_text) or             # Action verbs with amounts
+        SHORTHAND_PATTERN.search(normalized_text) or        # Common expense shorthand with amounts
+        MULTIPLIER_PATTERN.search(normalized_text)          # Multipliers like "1.2k" or "1K"
+    )
+
 def extract_money_mentions(text: str) -> list:
     """
     Extract all money mentions from text
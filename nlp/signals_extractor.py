@@ -10,8 +10,6 @@ import re
 from datetime import UTC, datetime, timedelta
 from typing import Dict, Optional
 
-from utils.text_normalizer import normalize_for_processing
-
 os.makedirs(os.path.dirname(__file__), exist_ok=True)
 
 # Time window patterns (EN + BN)
@@ -47,7 +45,7 @@ RE_FAQ = re.compile(
 RE_ADMIN = re.compile(r"^/(id|debug|help|status)\b")
 
 # Import enhanced money patterns
-from nlp.money_patterns import extract_money_mentions, has_money_mention
+from nlp.analyzed_message import DEFAULT_TIMEZONE, analyze
 
 
 def extract_signals(raw_text: str, user_id: str = None, timezone: str = "Asia/Dhaka") -> dict:
@@ -62,19 +60,24 @@ def extract_signals(raw_text: str, user_id: str = None, timezone: str = "Asia/Dh
     Returns:
         Dictionary of extracted signals
     """
-    # Normalize text for consistent pattern matching
-    normalized = normalize_for_processing(raw_text)
+    # Normalize text for consistent pattern matching (once per request, see nlp.analyzed_message)
+    message = analyze(raw_text)
+    normalized = message.normalized
+    if timezone == DEFAULT_TIMEZONE:
+        window = message.time_window
+    else:
+        window = parse_time_window(timezone=timezone, text=normalized)
     
     return {
         "is_admin": bool(RE_ADMIN.search(normalized)),
-        "has_time_window": bool(RE_TIME.search(normalized)),
+        "has_time_window": message.has_time_window,
         "explicit_analysis_request": bool(RE_ANALYSIS_EXPLICIT.search(normalized)),
         "has_analysis_terms": bool(RE_ANALYSIS_GENERIC.search(normalized) or RE_ANALYSIS_EXPLICIT.search(normalized)),
         "has_coaching_verbs": bool(RE_COACHING.search(normalized)),
         "has_faq_terms": bool(RE_FAQ.search(normalized)),
-        "money_mentions": extract_money_mentions(normalized),
-        "has_money": has_money_mention(normalized),
-        "window": parse_time_window(timezone=timezone, text=normalized),
+        "money_mentions": [mention.text for mention in message.money_mentions],
+        "has_money": message.has_money_mention,
+        "window": window,
         "raw_text": raw_text,
         "normalized_text": normalized
     }
@@ -0,0 +1,178 @@
+"""
+Precompiled alias index for category inference.
+
+Builds an Aho-Corasick automaton over normalized, lower-cased aliases once at
+import time so a single pass over a message returns every matching alias with
+its category, strength and position. Matching semantics mirror
+parsers.expense.has_word_boundary_match exactly:
+
+1. Literal occurrence of the normalized alias (case-insensitive) that is not
+   preceded or followed by a Latin/Bengali word character or underscore
+2. Morphology fallback: a word token whose Bengali-suffix-stripped form equals
+   the alias
+
+Cost is linear in message length plus the number of matches, independent of
+how many aliases are registered.
+"""
+
+import re
+from collections.abc import Callable, Iterable
+from typing import NamedTuple
+
+# Same boundary class and flags as has_word_boundary_match's regex pass
+_BOUNDARY_CHAR = re.compile(r'[A-Za-z0-9\u0980-\u09FF_]', re.IGNORECASE)
+
+# Same tokenizer as has_word_boundary_match's morphology fallback
+_WORD_TOKEN = re.compile(r'[A-Za-z0-9\u0980-\u09FF]+')
+
+
+class AliasMatch(NamedTuple):
+    """A single alias occurrence in normalized text"""
+    alias: str
+    category: str
+    strength: int
+    start: int
+    end: int
+    order: int  # Insertion order of the alias, used for tie-breaking
+
+
+def _fold_case(text: str) -> str:
+    """Lower-case text while keeping character positions aligned"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # Rare characters expand when lower-cased (e.g. 'İ'); keep those as-is
+    return ''.join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+
+class AliasIndex:
+    """
+    Aho-Corasick automaton plus stemmed-token lookup over a fixed alias table.
+
+    Args:
+        aliases: (alias, category, strength) entries; iteration order defines
+            precedence for equal strengths and the same alias may repeat
+        normalize: Text normalizer applied to aliases at build time and to
+            messages at match time
+        stem: Word stemmer used for the morphology fallback
+    """
+
+    def __init__(
+        self,
+        aliases: Iterable[tuple[str, str, int]],
+        normalize: Callable[[str], str],
+        stem: Callable[[str], str],
+    ):
+        self._normalize = normalize
+        self._stem = stem
+        self._entries: list[tuple[str, str, int]] = []
+        self._by_key: dict[str, list[int]] = {}
+
+        # Trie as parallel arrays: goto transitions, failure links, outputs
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[int, int]]] = [[]]  # (entry id, key length)
+
+        for order, (alias, category, strength) in enumerate(aliases):
+            key = normalize(alias).lower()
+            self._entries.append((alias, category, strength))
+            if not key:
+                continue
+            if key not in self._by_key:
+                self._by_key[key] = []
+                self._insert(key, len(self._by_key) - 1)
+            self._by_key[key].append(order)
+
+        self._key_ids = {key: key_id for key_id, key in enumerate(self._by_key)}
+        self._keys = list(self._by_key)
+        self._build_failure_links()
+
+    def _insert(self, key: str, key_id: int) -> None:
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((key_id, len(key)))
+
+    def _build_failure_links(self) -> None:
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _matches_for_key(self, key: str, start: int, end: int) -> Iterable[AliasMatch]:
+        for order in self._by_key[key]:
+            alias, category, strength = self._entries[order]
+            yield AliasMatch(alias, category, strength, start, end, order)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def find_all(self, text: str) -> list[AliasMatch]:
+        """
+        Return every alias occurrence in text, sorted by position.
+
+        Positions refer to the normalized text. The same alias may appear more
+        than once if it occurs at several places.
+        """
+        normalized = self._normalize(text) if text else ''
+        if not normalized:
+            return []
+
+        folded = _fold_case(normalized)
+        length = len(normalized)
+        goto, fail, out = self._goto, self._fail, self._out
+        seen: set[tuple[int, int, int]] = set()
+        matches: list[AliasMatch] = []
+
+        node = 0
+        for pos, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for key_id, key_len in out[node]:
+                start, end = pos + 1 - key_len, pos + 1
+                if start > 0 and _BOUNDARY_CHAR.match(normalized[start - 1]):
+                    continue
+                if end < length and _BOUNDARY_CHAR.match(normalized[end]):
+                    continue
+                seen.add((key_id, start, end))
+                matches.extend(self._matches_for_key(self._keys[key_id], start, end))
+
+        # Morphology-aware fallback on suffix-stripped word tokens
+        for token in _WORD_TOKEN.finditer(normalized):
+            key = self._stem(token.group()).lower()
+            key_id = self._key_ids.get(key)
+            if key_id is None or (key_id, token.start(), token.end()) in seen:
+                continue
+            matches.extend(self._matches_for_key(key, token.start(), token.end()))
+
+        matches.sort(key=lambda m: (m.start, m.end, m.order))
+        return matches
+
+    def matched_aliases(self, text: str) -> list[AliasMatch]:
+        """
+        Return the first occurrence of each matching alias, in alias table order.
+
+        Iterating this list reproduces a scan over the alias table that keeps
+        only aliases matching the text.
+        """
+        first: dict[int, AliasMatch] = {}
+        for match in self.find_all(text):
+            first.setdefault(match.order, match)
+        return [first[order] for order in sorted(first)]
@@ -119,6 +119,9 @@ from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
 from typing import Any, Dict, List, Optional, Tuple
 
+from nlp.analyzed_message import analyze
+from parsers.alias_index import AliasIndex, AliasMatch
+
 logger = logging.getLogger("parsers.expense")
 
 # Currency mappings
@@ -586,18 +589,12 @@ def infer_category_from_description(text: str) -> tuple[str, int] | None:
     best_strength = 0
     min_confidence_threshold = 8  # Require minimum confidence for override
     
-    # Check each category alias using word boundary matching
-    for keyword, (category, strength) in CATEGORY_ALIASES.items():
-        if has_word_boundary_match(text, keyword):
-            # Boost strength if word appears after "on" or "for" with word boundaries
-            # Pattern: "on food", "for coffee", etc.
-            boost_pattern = rf'(?<![A-Za-z0-9\u0980-\u09FF])(?:on|for)\s+\w*\s*(?<![A-Za-z0-9\u0980-\u09FF]){re.escape(keyword)}(?![A-Za-z0-9\u0980-\u09FF])'
-            if re.search(boost_pattern, text, re.IGNORECASE):
-                strength += 2
-            
-            if strength > best_strength:
-                best_strength = strength
-                best_category = category
+    # Check each matching category alias (word boundary semantics, table order)
+    for match in find_category_aliases(text):
+        strength = match.strength + _preposition_boost(text, match.alias)
+        if strength > best_strength:
+            best_strength = strength
+            best_category = match.category
     
     # Only return result if it meets minimum confidence threshold
     if best_strength >= min_confidence_threshold and best_category is not None:
@@ -978,6 +975,90 @@ def extract_date_context(text: str, now_ts: datetime) -> datetime | None:
     # Default to None (use current timestamp)
     return None
 
+# Fallback keyword table for _infer_category_from_context (PRIORITY 4).
+# Note: 'bills' appears twice; as with any dict literal the later list wins
+# while the key keeps its first position.
+CATEGORY_KEYWORDS = {
+    # Bills - HIGHEST PRIORITY FOR UTILITY BILLS
+    'bills': ['gas bill', 'electricity bill', 'electric bill', 'water bill', 'power bill', 'utility bill', 'internet bill', 'phone bill', 'rent', 'utilities'],
+    # Transport (strong indicators) - NOTE: 'gas' alone can be fuel, but 'gas bill' is above  
+    'transport': ['uber', 'taxi', 'cng', 'bus', 'ride', 'lyft', 'grab', 'pathao', 'fuel', 'petrol', 'gas station', 'gas pump', 'paid gas', 'gas tank', 'fill gas', 'filled gas'],
+    # Pets & Animals - MOVED BEFORE FOOD FOR PRIORITY IN CAT FOOD ISSUE
+    'pets': ['cat', 'dog', 'pet', 'pets', 'animal', 'vet', 'veterinary', 'cat food', 'dog food', 'pet food', 'pet supplies', 'pet store'],
+    # Food (strong indicators) - COMPREHENSIVE BENGALI FOOD VOCABULARY  
+    'food': [
+             # Basic meals and international food
+             'breakfast', 'lunch', 'dinner', 'brunch', 'coffee', 'tea', 'restaurant', 'meal', 'pizza', 'burger', 'food', 
+             'juice', 'fruit', 'water', 'milk', 'drink', 'beverage', 'soda', 'smoothie', 'shake', 'snack', 'sandwich', 
+             'soup', 'salad', 'pasta', 'noodles', 'bread', 'cake', 'dessert', 'steak', 'omelette', 'omelet',
+             'drank', 'drinking', 'chinese', 'thai', 'continental',
+             
+             # Traditional Bengali Main Dishes
+             'khichuri', 'rice', 'dal', 'curry', 'biriyani', 'biryani', 'kacchi biriyani', 'kacchi biryani', 
+             'chicken', 'beef', 'fish', 'vegetable', 'egg', 'polao', 'pulao', 'tehari', 'fried rice',
+             
+             # Bengali Meat Dishes - INCLUDING SPECIFIC TERMS FROM USER ISSUE
+             'tarmujer rosh', 'jaali kabab', 'shami kabab', 'boti kabab', 'seekh kabab', 'kobiraji', 'cutlet', 
+             'roast', 'beef roast', 'mutton', 'goat', 'hilsa', 'rui fish', 'katla', 'prawn', 'shrimp',
+             
+             # Bengali Street Food & Snacks  
+             'fuchka', 'pani puri', 'chotpoti', 'jhalmuri', 'chatpati', 'haleem', 'bharta', 'bhorta', 
+             'begun bharta', 'aloo bharta', 'shutki', 'pitha', 'chitoi pitha', 'vapa pitha', 'patishapta', 
+             'nakshi pitha',
+             
+             # Bengali Sweets & Desserts
+             'mishti', 'roshogolla', 'rasgulla', 'chomchom', 'sandesh', 'kalo jam', 'jilapi', 'jalebi', 
+             'doi', 'mishti doi', 'payesh', 'kheer', 'firni', 'shemaiyer payesh', 'chanar payesh', 
+             'malai', 'kulfi', 'falooda',
+             
+             # Bengali Beverages & Drinks  
+             'cha', 'dudh cha', 'lemon cha', 'borhani', 'lassi', 'matha', 'shorbot', 'tamarind drink', 
+             'coconut water', 'sugarcane juice', 'fresh lime'
+             ],
+    # Shopping
+    'shopping': ['shopping', 'clothes', 'grocery', 'groceries', 'market', 'store', 'buy', 'bought'],
+    # Health
+    'health': ['medicine', 'pharmacy', 'doctor', 'hospital', 'medical', 'health'],
+    # Bills
+    'bills': ['internet', 'phone', 'rent', 'utilities', 'bill', 'electricity', 'water'],
+    # Entertainment
+    'entertainment': ['movie', 'cinema', 'game', 'entertainment', 'travel', 'vacation']
+}
+
+
+def _alias_entries(table: dict) -> list[tuple[str, str, int]]:
+    """Flatten CATEGORY_ALIASES / CATEGORY_KEYWORDS into index entries"""
+    entries = []
+    for key, value in table.items():
+        if isinstance(value, tuple):
+            category, strength = value
+            entries.append((key, category, strength))
+        else:
+            entries.extend((keyword, key, 8) for keyword in value)
+    return entries
+
+
+# Precompiled once at import so category inference is linear in message length
+_CATEGORY_ALIAS_INDEX = AliasIndex(_alias_entries(CATEGORY_ALIASES), normalize_bengali_text, strip_bengali_suffixes)
+_CATEGORY_KEYWORD_INDEX = AliasIndex(_alias_entries(CATEGORY_KEYWORDS), normalize_bengali_text, strip_bengali_suffixes)
+
+
+def find_category_aliases(text: str) -> list[AliasMatch]:
+    """
+    Return every CATEGORY_ALIASES entry that matches text, in table order.
+    
+    Equivalent to filtering CATEGORY_ALIASES with has_word_boundary_match, but
+    runs as a single pass over the message. Each match carries the alias,
+    category, strength and its first position in the normalized text.
+    """
+    return _CATEGORY_ALIAS_INDEX.matched_aliases(text)
+
+
+def _preposition_boost(text: str, keyword: str) -> int:
+    """Return +2 when keyword follows "on"/"for" (e.g. "on food", "for coffee")"""
+    boost_pattern = rf'(?<![A-Za-z0-9\u0980-\u09FF])(?:on|for)\s+\w*\s*(?<![A-Za-z0-9\u0980-\u09FF]){re.escape(keyword)}(?![A-Za-z0-9\u0980-\u09FF])'
+    return 2 if re.search(boost_pattern, text, re.IGNORECASE) else 0
+
 def infer_category_with_strength(text: str) -> str:
     """
     Infer category from text with strength-based scoring.
@@ -992,18 +1073,12 @@ def infer_category_with_strength(text: str) -> str:
     best_category = 'uncategorized'
     best_strength = 0
     
-    # Check each category alias using word boundary matching
-    for keyword, (category, strength) in CATEGORY_ALIASES.items():
-        if has_word_boundary_match(text, keyword):
-            # Boost strength if word appears after "on" or "for" with word boundaries
-            # Pattern: "on food", "for coffee", etc.
-            boost_pattern = rf'(?<![A-Za-z0-9\u0980-\u09FF])(?:on|for)\s+\w*\s*(?<![A-Za-z0-9\u0980-\u09FF]){re.escape(keyword)}(?![A-Za-z0-9\u0980-\u09FF])'
-            if re.search(boost_pattern, text, re.IGNORECASE):
-                strength += 2
-            
-            if strength > best_strength:
-                best_strength = strength
-                best_category = category
+    # Check each matching category alias (word boundary semantics, table order)
+    for match in find_category_aliases(text):
+        strength = match.strength + _preposition_boost(text, match.alias)
+        if strength > best_strength:
+            best_strength = strength
+            best_category = match.category
     
     return best_category
 
@@ -1024,8 +1099,8 @@ def extract_all_expenses(text: str, now: datetime | None = None, **kwargs) -> li
     if now is None:
         now = datetime.now()
     
-    # Normalize text for better parsing
-    normalized = normalize_text_for_parsing(text)
+    # Normalize text for better parsing (shared with the rest of the request)
+    normalized = analyze(text).parsing_text
     expenses = []
     
     # ROBUST MULTI-EXPENSE PARSING - Two-pass masking to protect thousands separators
@@ -1285,21 +1360,18 @@ def _infer_category_from_context(context_text: str, user_hash: str | None = None
     if user_hash:
         try:
             from utils.expense_learning import user_learning_system
-            # Extract potential item names from context
+            # Extract potential item names from context: single words (skipping
+            # short ones) first, then multi-word items like "rc cola"
             words = context_lower.split()
-            for word in words:
-                if len(word) > 2:  # Skip short words
-                    user_pref = user_learning_system.get_user_preference(user_hash, word)
-                    if user_pref:
-                        # User has explicitly learned this - use it with highest priority
-                        return user_pref['category']
+            candidates = [word for word in words if len(word) > 2]
+            candidates += [f"{words[i]} {words[i+1]}" for i in range(len(words) - 1)]
             
-            # Also check multi-word items like "rc cola"
-            for i in range(len(words) - 1):
-                two_word_item = f"{words[i]} {words[i+1]}"
-                user_pref = user_learning_system.get_user_preference(user_hash, two_word_item)
-                if user_pref:
-                    return user_pref['category']
+            # One snapshot lookup for all candidates instead of a query per n-gram
+            learned = user_learning_system.get_user_preferences_bulk(user_hash, candidates)
+            for item in candidates:
+                if item in learned:
+                    # User has explicitly learned this - use it with highest priority
+                    return learned[item]['category']
         except Exception:
             # Don't fail parsing if learning system has issues
             pass
@@ -1319,86 +1391,37 @@ def _infer_category_from_context(context_text: str, user_hash: str | None = None
     
     # PRIORITY 3: Use global CATEGORY_ALIASES for comprehensive matching (includes Bengali script)
     # Enhanced with morphology-aware matching for Bengali suffixes
-    for alias, (category, strength) in CATEGORY_ALIASES.items():
-        if has_word_boundary_match(context_text, alias):
-            if strength > best_strength:
-                best_strength = strength
-                best_category = category
+    for match in find_category_aliases(context_text):
+        if match.strength > best_strength:
+            best_strength = match.strength
+            best_category = match.category
     
     # If we found a good match, return it
     if best_strength > 8:  # High confidence threshold
         return best_category
     
     # PRIORITY 4: Enhanced category matching with context-specific boosts (fallback)
-    category_keywords = {
-        # Bills - HIGHEST PRIORITY FOR UTILITY BILLS
-        'bills': ['gas bill', 'electricity bill', 'electric bill', 'water bill', 'power bill', 'utility bill', 'internet bill', 'phone bill', 'rent', 'utilities'],
-        # Transport (strong indicators) - NOTE: 'gas' alone can be fuel, but 'gas bill' is above  
-        'transport': ['uber', 'taxi', 'cng', 'bus', 'ride', 'lyft', 'grab', 'pathao', 'fuel', 'petrol', 'gas station', 'gas pump', 'paid gas', 'gas tank', 'fill gas', 'filled gas'],
-        # Pets & Animals - MOVED BEFORE FOOD FOR PRIORITY IN CAT FOOD ISSUE
-        'pets': ['cat', 'dog', 'pet', 'pets', 'animal', 'vet', 'veterinary', 'cat food', 'dog food', 'pet food', 'pet supplies', 'pet store'],
-        # Food (strong indicators) - COMPREHENSIVE BENGALI FOOD VOCABULARY  
-        'food': [
-                 # Basic meals and international food
-                 'breakfast', 'lunch', 'dinner', 'brunch', 'coffee', 'tea', 'restaurant', 'meal', 'pizza', 'burger', 'food', 
-                 'juice', 'fruit', 'water', 'milk', 'drink', 'beverage', 'soda', 'smoothie', 'shake', 'snack', 'sandwich', 
-                 'soup', 'salad', 'pasta', 'noodles', 'bread', 'cake', 'dessert', 'steak', 'omelette', 'omelet',
-                 'drank', 'drinking', 'chinese', 'thai', 'continental',
-                 
-                 # Traditional Bengali Main Dishes
-                 'khichuri', 'rice', 'dal', 'curry', 'biriyani', 'biryani', 'kacchi biriyani', 'kacchi biryani', 
-                 'chicken', 'beef', 'fish', 'vegetable', 'egg', 'polao', 'pulao', 'tehari', 'fried rice',
-                 
-                 # Bengali Meat Dishes - INCLUDING SPECIFIC TERMS FROM USER ISSUE
-                 'tarmujer rosh', 'jaali kabab', 'shami kabab', 'boti kabab', 'seekh kabab', 'kobiraji', 'cutlet', 
-                 'roast', 'beef roast', 'mutton', 'goat', 'hilsa', 'rui fish', 'katla', 'prawn', 'shrimp',
-                 
-                 # Bengali Street Food & Snacks  
-                 'fuchka', 'pani puri', 'chotpoti', 'jhalmuri', 'chatpati', 'haleem', 'bharta', 'bhorta', 
-                 'begun bharta', 'aloo bharta', 'shutki', 'pitha', 'chitoi pitha', 'vapa pitha', 'patishapta', 
-                 'nakshi pitha',
-                 
-                 # Bengali Sweets & Desserts
-                 'mishti', 'roshogolla', 'rasgulla', 'chomchom', 'sandesh', 'kalo jam', 'jilapi', 'jalebi', 
-                 'doi', 'mishti doi', 'payesh', 'kheer', 'firni', 'shemaiyer payesh', 'chanar payesh', 
-                 'malai', 'kulfi', 'falooda',
-                 
-                 # Bengali Beverages & Drinks  
-                 'cha', 'dudh cha', 'lemon cha', 'borhani', 'lassi', 'matha', 'shorbot', 'tamarind drink', 
-                 'coconut water', 'sugarcane juice', 'fresh lime'
-                 ],
-        # Shopping
-        'shopping': ['shopping', 'clothes', 'grocery', 'groceries', 'market', 'store', 'buy', 'bought'],
-        # Health
-        'health': ['medicine', 'pharmacy', 'doctor', 'hospital', 'medical', 'health'],
-        # Bills
-        'bills': ['internet', 'phone', 'rent', 'utilities', 'bill', 'electricity', 'water'],
-        # Entertainment
-        'entertainment': ['movie', 'cinema', 'game', 'entertainment', 'travel', 'vacation']
-    }
-    
-    for category, keywords in category_keywords.items():
-        for keyword in keywords:
-            if has_word_boundary_match(context_text, keyword):
-                # Base strength
-                strength = 8
-                
-                # Boost if keyword appears multiple times - use word boundary matches for counting
-                keyword_matches = len(re.findall(rf'(?<![A-Za-z0-9\u0980-\u09FF_]){re.escape(keyword)}(?![A-Za-z0-9\u0980-\u09FF_])', context_text, re.IGNORECASE))
-                if keyword_matches > 1:
-                    strength += 2
-                
-                # Boost for exact category matches
-                if keyword in ['uber', 'taxi', 'breakfast', 'lunch', 'dinner', 'grocery']:
-                    strength += 3
-                    
-                # Extra boost for pet-specific keywords to override generic "food"
-                if keyword in ['cat', 'dog', 'cat food', 'dog food', 'pet food', 'vet']:
-                    strength += 5
-                
-                if strength > best_strength:
-                    best_strength = strength
-                    best_category = category
+    for match in _CATEGORY_KEYWORD_INDEX.matched_aliases(context_text):
+        keyword = match.alias
+        # Base strength
+        strength = 8
+        
+        # Boost if keyword appears multiple times - use word boundary matches for counting
+        keyword_matches = len(re.findall(rf'(?<![A-Za-z0-9\u0980-\u09FF_]){re.escape(keyword)}(?![A-Za-z0-9\u0980-\u09FF_])', context_text, re.IGNORECASE))
+        if keyword_matches > 1:
+            strength += 2
+        
+        # Boost for exact category matches
+        if keyword in ['uber', 'taxi', 'breakfast', 'lunch', 'dinner', 'grocery']:
+            strength += 3
+            
+        # Extra boost for pet-specific keywords to override generic "food"
+        if keyword in ['cat', 'dog', 'cat food', 'dog food', 'pet food', 'vet']:
+            strength += 5
+        
+        if strength > best_strength:
+            best_strength = strength
+            best_category = match.category
     
     return best_category
 
@@ -1422,7 +1445,7 @@ def parse_expense(text: str, now: datetime, correction_context: bool = False) ->
     # For correction context, support bare numbers and k shorthand
     if correction_context:
         # Normalize text for better parsing
-        normalized = normalize_text_for_parsing(text)
+        normalized = analyze(text).parsing_text
         
         # Pattern 1: Bare numbers (allow None for other fields to be inherited)
         bare_number_match = re.search(r'\b(\d{1,7}(?:[.,]\d{1,2})?)\b', normalized)
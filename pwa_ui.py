@@ -1,15 +1,13 @@
 """
 PWA UI Blueprint - Modern, installable expense tracking interface
 """
-import csv
 import hashlib
 import logging
 import secrets
 import time
 from datetime import timedelta, UTC
-from io import StringIO
 
-from flask import Blueprint, current_app, g, jsonify, make_response, render_template, request, Response, redirect
+from flask import Blueprint, current_app, g, jsonify, render_template, request, Response, redirect
 from typing import Union, TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -275,80 +273,84 @@ def report():
 @limiter.limit("3 per hour")
 def export_expenses_csv():
     """
-    Export all user expenses as CSV
+    Export user expenses as a streamed CSV (default) or NDJSON download
+    Options (query string or JSON body): format=csv|ndjson, gzip=1, since=<cursor>
+    The X-Export-Cursor response header is the since value for the next incremental export
     Rate limited to 3 downloads per hour
     """
-    from flask import make_response
-    from models import Expense
-    from db_base import db
-    import csv
-    from io import StringIO
     from datetime import datetime
+
+    from flask import stream_with_context
+
+    from utils.expense_export import (
+        EXPORT_FORMATS,
+        export_high_water_mark,
+        gzip_chunks,
+        iter_csv,
+        iter_export_rows,
+        iter_ndjson,
+    )
     
     user = require_auth()
     if not user:
         return jsonify({"error": "Authentication required"}), 401
     
+    body = request.get_json(silent=True)
+    if body is None:
+        body = {}
+    if not isinstance(body, dict):
+        return jsonify({"error": "request body must be a JSON object"}), 400
+    options = dict(body, **request.args.to_dict())
+    export_format = str(options.get('format', 'csv')).lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
     try:
-        # Fetch all expenses for the user
-        expenses = Expense.query.filter_by(
-            user_id_hash=user.user_id_hash,
-            deleted_at=None  # Exclude soft-deleted expenses
-        ).order_by(Expense.date.desc()).all()
-        
-        # Create CSV in memory
-        si = StringIO()
-        writer = csv.writer(si)
-        
-        # Write header
-        writer.writerow([
-            'Date',
-            'Amount (৳)',
-            'Category',
-            'Description',
-            'Created At',
-            'Expense ID'
-        ])
-        
-        # Write data rows with CSV formula injection protection
-        def sanitize_csv_cell(value):
-            """Prevent CSV formula injection by escaping dangerous characters"""
-            if not value:
-                return ''
-            value_str = str(value)
-            # Check first non-whitespace character for formula injection risk
-            stripped = value_str.lstrip(" \t\r\n")
-            if stripped and stripped[0] in ('=', '+', '-', '@'):
-                # Only add prefix if not already present
-                if not value_str.startswith("'"):
-                    return "'" + value_str
-            return value_str
-        
-        for expense in expenses:
-            writer.writerow([
-                expense.date.strftime('%Y-%m-%d') if expense.date else '',
-                f"{expense.amount:.2f}",
-                sanitize_csv_cell(expense.category or ''),
-                sanitize_csv_cell(expense.description or ''),
-                expense.created_at.strftime('%Y-%m-%d %H:%M:%S') if expense.created_at else '',
-                str(expense.id)
-            ])
-        
-        # Create response with CSV
-        output = si.getvalue()
-        si.close()
-        
-        response = make_response(output)
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-        response.headers['Content-Disposition'] = f'attachment; filename=finbrain_expenses_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        
-        logger.info(f"CSV export generated for user {user.email}: {len(expenses)} expenses")
-        
-        return response
-        
+        since_id = max(0, int(options.get('since') or 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "since must be an export cursor"}), 400
+    use_gzip = str(options.get('gzip', '')).lower() in ('1', 'true', 'yes')
+    
+    try:
+        # Pin the export to rows that exist now so the cursor is exact
+        until_id = export_high_water_mark(user.user_id_hash)
     except Exception as e:
         logger.error(f"CSV export error: {e}")
         return jsonify({"error": "Failed to export expenses"}), 500
+    
+    user_id_hash = user.user_id_hash
+    user_email = user.email
+    content_type, extension = EXPORT_FORMATS[export_format]
+    
+    def generate():
+        exported = 0
+        
+        def counted(rows):
+            nonlocal exported
+            for row in rows:
+                exported += 1
+                yield row
+        
+        rows = counted(iter_export_rows(user_id_hash, since_id=since_id, until_id=until_id))
+        chunks = iter_csv(rows) if export_format == 'csv' else iter_ndjson(rows)
+        try:
+            yield from gzip_chunks(chunks) if use_gzip else chunks
+        except Exception as e:
+            # Headers are already sent; the truncated download is the only signal left
+            logger.error(f"CSV export error: {e}")
+            return
+        logger.info(f"{export_format.upper()} export streamed for user {user_email}: {exported} expenses")
+    
+    filename = f'finbrain_expenses_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+    if use_gzip:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    
+    response = Response(stream_with_context(generate()), content_type=content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Export-Cursor'] = str(until_id)
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass chunks through as they are produced
+    return response
 
 @pwa_ui.route('/profile/request-deletion', methods=['POST'])
 @limiter.limit("1 per day")
@@ -1407,63 +1409,6 @@ def api_profile():
         logger.error(f"Error in api_profile: {e}")
         return jsonify({"error": "Failed to load profile data"}), 500
 
-@pwa_ui.route('/profile/export-csv', methods=['POST'])
-@limiter.limit("3 per hour")
-def export_csv():
-    """
-    Export user expenses as CSV file
-    AUTHENTICATION REQUIRED - Rate limited to 3 per hour
-    """
-    from datetime import datetime
-    from models import Expense
-    
-    try:
-        # Require authentication
-        user = require_auth()
-        
-        # Query all non-deleted expenses for user
-        expenses = Expense.query_active().filter_by(
-            user_id_hash=user.user_id_hash
-        ).order_by(Expense.date.desc()).all()
-        
-        # Generate CSV in memory
-        si = StringIO()
-        writer = csv.writer(si)
-        
-        # Write header
-        writer.writerow(['date', 'category', 'description', 'amount', 'currency'])
-        
-        # Write expense rows
-        for expense in expenses:
-            writer.writerow([
-                expense.date.isoformat() if expense.date else '',
-                expense.category or 'uncategorized',
-                expense.description or '',
-                float(expense.amount) if expense.amount else 0.0,
-                expense.currency or 'BDT'
-            ])
-        
-        # Prepare response
-        output = si.getvalue()
-        si.close()
-        
-        # Generate filename with user email and current date
-        user_email = getattr(user, 'email', 'user')
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        filename = f"finbrain_expenses_{user_email}_{current_date}.csv"
-        
-        # Create response with CSV file
-        response = make_response(output)
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-        
-        logger.info(f"CSV export completed for user: {user.user_id_hash[:8]}... ({len(expenses)} expenses)")
-        return response
-        
-    except Exception as e:
-        logger.error(f"CSV export error: {e}")
-        return jsonify({"error": "Failed to export expenses"}), 500
-
 @pwa_ui.route('/profile/request-deletion', methods=['POST'])
 @limiter.limit("2 per day")
 def request_deletion():
@@ -2239,6 +2184,15 @@ def finbrain_route(text, user_id):
 @limiter.limit("8 per minute")
 def ai_chat():
     """AI chat endpoint - requires authentication to track expenses"""
+    from utils import reply_stream
+
+    # SSE clients get the acknowledgement early and this same JSON body as the final event
+    if reply_stream.wants_stream(request) and getattr(g, 'user_id', None):
+        return reply_stream.sse_response(_ai_chat_reply)
+    return _ai_chat_reply()
+
+
+def _ai_chat_reply():
     from flask import session
     
     # Get request_id from middleware
@@ -726,13 +726,21 @@ def api_chat(authenticated_user_id):
     if not text:
         return {"error":"empty_message"}, 400
 
-    # choose Mode A (sync) or Mode B (enqueue) based on your preference:
+    from utils import reply_stream
     from utils.web_frontend_bridge import route_web_text
-    out = route_web_text(session_user_id=authenticated_user_id, text=text, mode="sync")  # or "enqueue"
 
-    # Normalize the response to your web UI shape (same as Messenger response_text)
-    # If production_router already returns structured payload, pass it through.
-    return out, 200
+    def reply():
+        # choose Mode A (sync) or Mode B (enqueue) based on your preference:
+        out = route_web_text(session_user_id=authenticated_user_id, text=text, mode="sync")  # or "enqueue"
+
+        # Normalize the response to your web UI shape (same as Messenger response_text)
+        # If production_router already returns structured payload, pass it through.
+        return out, 200
+
+    # SSE clients get the acknowledgement early and this same body as the final event
+    if reply_stream.wants_stream(request):
+        return reply_stream.sse_response(reply)
+    return reply()
 
 # Health check endpoint
 @backend_api.route('/health', methods=['GET'])
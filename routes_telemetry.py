@@ -6,8 +6,10 @@ FinBrain Growth Telemetry Routes
 import logging
 from datetime import UTC
 
-from flask import Blueprint, render_template_string
+from flask import Blueprint, render_template_string, request
 
+from finbrain.ops import perf
+from utils import cache
 from utils.telemetry import GrowthMetrics
 
 logger = logging.getLogger(__name__)
@@ -18,13 +20,24 @@ telemetry_bp = Blueprint('telemetry', __name__)
 def metrics_endpoint():
     """
     Human-readable metrics endpoint for monitoring
-    Returns plain text metrics report
+    Returns plain text metrics report, or the latency histograms and cache
+    counters in Prometheus text format for ?format=prometheus and Prometheus scrapers.
+    Those are the answering worker's own, labelled with its pid.
     """
     try:
+        from flask import current_app
+
+        accept = request.headers.get('Accept', '')
+        if request.args.get('format') == 'prometheus' or 'version=0.0.4' in accept or 'openmetrics' in accept:
+            return current_app.response_class(
+                response=perf.registry.to_prometheus() + cache.to_prometheus(),
+                status=200,
+                mimetype='text/plain; version=0.0.4'
+            )
+
         metrics_report = GrowthMetrics.generate_metrics_report()
         
         # Return as plain text with proper content type
-        from flask import current_app
         response = current_app.response_class(
             response=metrics_report,
             status=200,
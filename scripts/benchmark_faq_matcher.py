@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: FAQ/smalltalk keyword index vs the linear keyword scan
+Runs offline over a generated corpus of chat-like messages, checks both
+matchers agree on every message, and prints per-message latency
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.faq_map import (  # noqa: E402
+    INTENT_KEYWORDS,
+    _match_faq_or_smalltalk_linear,
+    match_faq_or_smalltalk,
+)
+
+TEMPLATES = [
+    "spent {amt} on {item}",
+    "{item} {amt} taka",
+    "paid {amt} for {item} today",
+    "show my summary for this week",
+    "how much did i spend on {item}?",
+    "ok thanks 👍",
+    "what did i buy yesterday",
+    "{kw}",
+    "hey, {kw}?",
+    "quick question - {kw} please",
+    "I was wondering {kw} because my friend asked",
+]
+ITEMS = ["lunch", "coffee", "uber", "groceries", "rent", "internet bill", "biryani", "cinema tickets"]
+KEYWORDS = [k for keywords in INTENT_KEYWORDS.values() for k in keywords]
+
+
+def build_corpus(size: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        rng.choice(TEMPLATES).format(
+            amt=rng.randint(20, 5000), item=rng.choice(ITEMS), kw=rng.choice(KEYWORDS)
+        )
+        for _ in range(size)
+    ]
+
+
+def time_matcher(matcher, corpus: list[str], rounds: int) -> list[float]:
+    """Return per-message latency in microseconds for each round"""
+    per_round = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for text in corpus:
+            matcher(text)
+        per_round.append((time.perf_counter() - start) / len(corpus) * 1e6)
+    return per_round
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages)
+    mismatches = [t for t in corpus if match_faq_or_smalltalk(t) != _match_faq_or_smalltalk_linear(t)]
+    if mismatches:
+        print(f"✗ {len(mismatches)} messages disagree, e.g. {mismatches[0]!r}")
+        return 1
+
+    linear = statistics.median(time_matcher(_match_faq_or_smalltalk_linear, corpus, args.rounds))
+    indexed = statistics.median(time_matcher(match_faq_or_smalltalk, corpus, args.rounds))
+
+    print(f"Corpus: {len(corpus)} messages, {len(KEYWORDS)} keywords, {args.rounds} rounds")
+    print(f"  linear scan : {linear:8.2f} µs/message")
+    print(f"  keyword index: {indexed:8.2f} µs/message")
+    print(f"  speedup     : {linear / indexed:8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Offline micro-benchmarks for the parsing and routing hot paths
+Runs in-process with no network: an in-memory SQLite database stands in for
+Postgres, the AI adapter is stubbed, and every benchmark replays a seeded,
+mixed English/Bangla/Banglish chat corpus. `run` prints per-call latency and
+can save it as a JSON baseline; `compare` (or `run --baseline`) exits 1 when a
+benchmark's median is slower than the baseline by more than --max-slowdown
+
+    python scripts/benchmark_hot_paths.py run --output results/benchmarks/baseline.json
+    python scripts/benchmark_hot_paths.py run --baseline results/benchmarks/baseline.json
+    python scripts/benchmark_hot_paths.py compare old.json new.json --max-slowdown 1.5
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import types
+from datetime import UTC, datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Offline configuration, set before any project module reads it
+os.environ.setdefault("ID_SALT", "benchmark-salt")
+os.environ.setdefault("AI_ENABLED", "true")  # Exercise the AI branches, against the stub below
+os.environ.setdefault("AI_RL_USER_LIMIT", "1000000")
+os.environ.setdefault("AI_RL_GLOBAL_LIMIT", "1000000")
+os.environ.pop("REDIS_URL", None)  # In-memory fallbacks only
+
+DEFAULT_BASELINE = "results/benchmarks/baseline.json"
+DEFAULT_MAX_SLOWDOWN = float(os.getenv("BENCH_MAX_SLOWDOWN", "1.25"))
+
+# (template, weight): expense logs dominate real traffic, then queries and chit-chat
+TEMPLATES = [
+    ("spent {amt} on {item_en}", 6),
+    ("{item_en} {amt}", 6),
+    ("{item_en} {amt} tk", 4),
+    ("paid {amt} taka for {item_en} today", 3),
+    ("{item_en} {amt} and {item_en2} {amt2}", 3),
+    ("{item_bn} {amt_bn} টাকা", 5),
+    ("আজকে {item_bn} {amt_bn} টাকা খরচ হলো", 3),
+    ("{item_bn} {amt_bn}", 3),
+    ("{item_bn} {amt_bn} আর {item_bn2} {amt2_bn}", 2),
+    ("{item_banglish} e {amt} taka khoroch holo", 3),
+    ("aj {item_banglish} {amt} taka dilam", 2),
+    ("summary", 2),
+    ("show my summary for this week", 2),
+    ("how much did i spend on {item_en} this month?", 2),
+    ("এই সপ্তাহে কত খরচ করেছি?", 2),
+    ("insight", 1),
+    ("hi", 2),
+    ("thanks 👍", 2),
+    ("ধন্যবাদ", 1),
+    ("what is finbrain?", 1),
+    ("how do i delete an expense", 1),
+    ("I want to save more money this month, any ideas?", 1),
+]
+ITEMS_EN = ["lunch", "coffee", "uber", "groceries", "rent", "internet bill", "biryani", "cinema tickets",
+            "medicine", "bus fare", "phone recharge", "electricity bill", "tea", "fuchka"]
+ITEMS_BN = ["চা", "দুপুরের খাবার", "রিকশা ভাড়া", "বাজার", "ওষুধ", "বাস ভাড়া", "মোবাইল রিচার্জ", "নাস্তা", "বিদ্যুৎ বিল"]
+ITEMS_BANGLISH = ["cha", "nasta", "rickshaw", "bazar", "oshudh", "bhara", "khabar"]
+BN_DIGITS = str.maketrans("0123456789", "০১২৩৪৫৬৭৮৯")
+CATEGORIES = ["food", "transport", "shopping", "bills", "health", "entertainment", "other"]
+
+
+def build_corpus(size: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    templates, weights = zip(*TEMPLATES)
+    corpus = []
+    for _ in range(size):
+        amt, amt2 = rng.choice([20, 35, 50, 80, 120, 150, 250, 400, 650, 1200, 2500]), rng.randint(10, 900)
+        corpus.append(rng.choices(templates, weights)[0].format(
+            amt=amt, amt2=amt2,
+            amt_bn=str(amt).translate(BN_DIGITS), amt2_bn=str(amt2).translate(BN_DIGITS),
+            item_en=rng.choice(ITEMS_EN), item_en2=rng.choice(ITEMS_EN),
+            item_bn=rng.choice(ITEMS_BN), item_bn2=rng.choice(ITEMS_BN),
+            item_banglish=rng.choice(ITEMS_BANGLISH),
+        ))
+    return corpus
+
+
+class StubAIAdapter:
+    """Stands in for utils.ai_adapter_v2.production_ai_adapter: instant, canned, offline"""
+
+    enabled = True
+    provider = "benchmark-stub"
+
+    def ai_parse(self, text, context):
+        return {"intent": "help", "note": "Try 'coffee 50' to log an expense.", "tips": ["Track daily."],
+                "failover": False}
+
+    def generate_insights(self, expenses_data, user_id="unknown"):
+        return {"success": True, "insights": ["Food is your top category this week."], "failover": False}
+
+    def generate_structured_response(self, prompt, context):
+        return {"success": True, "response": "Here is what I found.", "failover": False}
+
+    def phrase_summary(self, summary):
+        return {"success": True, "text": "You spent a little more than last week.", "failover": False}
+
+    def get_completion(self, prompt, **kwargs):
+        return "Here is a quick tip: set a weekly food budget."
+
+    def ai_mode(self, text):
+        return True
+
+    def get_status(self):
+        return {"enabled": True, "provider": self.provider}
+
+
+def _user_hash(label: str) -> str:
+    return hashlib.sha256(f"benchmark:{label}".encode()).hexdigest()
+
+
+def create_sqlite_app():
+    """Flask app bound to a fresh in-memory SQLite database with the full schema"""
+    from flask import Flask
+    from sqlalchemy import event
+    from sqlalchemy.pool import StaticPool
+
+    from db_base import db
+
+    app = Flask("benchmark")
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    # One shared connection, so every session sees the same in-memory database
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    db.init_app(app)
+    with app.app_context():
+        @event.listens_for(db.engine, "connect")
+        def _postgres_functions(dbapi_connection, _record):
+            # The canonical writer's users upsert uses Postgres' GREATEST
+            dbapi_connection.create_function("GREATEST", -1, lambda *args: max(a for a in args if a is not None))
+
+        import models  # noqa: F401 - registers the tables
+        db.create_all()
+    return app
+
+
+def install_offline_stubs(app) -> StubAIAdapter:
+    """Stand in for the parts that need the network: the AI adapter, and `app`, whose boot needs Postgres"""
+    from db_base import db
+
+    # The router and handlers import `app` and `db` from it lazily
+    shim = types.ModuleType("app")
+    shim.app, shim.db = app, db
+    sys.modules["app"] = shim
+
+    import utils.ai_adapter_v2
+    import utils.production_router
+    from utils.telemetry_aggregator import telemetry_aggregator
+
+    stub = StubAIAdapter()
+    utils.ai_adapter_v2.production_ai_adapter = stub
+    utils.production_router.production_ai_adapter = stub
+    telemetry_aggregator.write_fn = lambda events, deltas, shard: None  # Flushes run off the hot path
+    return stub
+
+
+def time_calls(fn, inputs: list, rounds: int, warmup: int = 1) -> list[float]:
+    """Median-friendly samples: per-call latency in microseconds, one sample per round"""
+    for _ in range(warmup):
+        for item in inputs[:50]:
+            fn(item)
+    per_round = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        per_round.append((time.perf_counter() - start) / len(inputs) * 1e6)
+    return per_round
+
+
+def build_benchmarks(corpus: list[str], db_ops: int):
+    """(name, callable, inputs) for every hot path"""
+    from backend_assistant import add_expense, get_totals
+    from nlp.signals_extractor import extract_signals
+    from parsers.expense import _infer_category_from_context, extract_all_expenses
+    from utils.faq_map import match_faq_or_smalltalk
+    from utils.production_router import production_router
+
+    now = datetime.now(UTC).replace(tzinfo=None)
+    counter = iter(range(10 ** 9))
+
+    def route(text):
+        n = next(counter)
+        # Spread over users so per-user state (pending clarifications, caches) looks like real traffic
+        production_router.route_message(text, _user_hash(f"router:{n % 200}"), f"bench-rt-{n}", "web")
+
+    def write(i):
+        n = next(counter)
+        add_expense(user_id=_user_hash(f"writer:{n % 50}"), amount_minor=(50 + i % 900) * 100, currency="BDT",
+                    category=CATEGORIES[i % len(CATEGORIES)], description=corpus[i % len(corpus)],
+                    source="chat", message_id=f"bench-w-{n}")
+
+    totals_users = [_user_hash(f"writer:{i % 50}") for i in range(db_ops)]
+    periods = ["day", "week", "month"]
+
+    return [
+        ("extract_all_expenses", lambda text: extract_all_expenses(text, now), corpus),
+        ("infer_category_from_context", _infer_category_from_context, corpus),
+        ("match_faq_or_smalltalk", match_faq_or_smalltalk, corpus),
+        ("extract_signals", extract_signals, corpus),
+        ("router.route_message", route, corpus),
+        ("backend.add_expense", write, list(range(db_ops))),
+        ("backend.get_totals", lambda i: get_totals(totals_users[i], periods[i % 3]), list(range(db_ops))),
+    ]
+
+
+def run_benchmarks(messages: int, rounds: int, db_ops: int, only: set[str] | None = None) -> dict:
+    corpus = build_corpus(messages)
+    app = create_sqlite_app()
+    install_offline_stubs(app)
+
+    results = {}
+    with app.app_context():
+        for name, fn, inputs in build_benchmarks(corpus, db_ops):
+            if only and name not in only:
+                continue
+            # Per-message logging and prints would measure the terminal, not the code
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                samples = time_calls(fn, inputs, rounds)
+            results[name] = {
+                "median_us": round(statistics.median(samples), 2),
+                "min_us": round(min(samples), 2),
+                "max_us": round(max(samples), 2),
+                "calls_per_round": len(inputs),
+                "rounds": rounds,
+            }
+            print(f"  {name:<30} {results[name]['median_us']:>12.2f} µs/call  (min {results[name]['min_us']:.2f})")
+
+    return {
+        "meta": {
+            "created_at": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}",
+            "corpus_messages": messages,
+            "corpus_seed": 7,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, max_slowdown: float) -> list[str]:
+    """Benchmarks whose median regressed past max_slowdown (ratio to the baseline)"""
+    regressions = []
+    print(f"  {'benchmark':<30} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, result in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if not base:
+            print(f"  {name:<30} {'-':>12} {result['median_us']:>12.2f}     new")
+            continue
+        ratio = result["median_us"] / base["median_us"] if base["median_us"] else 1.0
+        flag = "  ✗" if ratio > max_slowdown else ""
+        print(f"  {name:<30} {base['median_us']:>12.2f} {result['median_us']:>12.2f} {ratio:>6.2f}x{flag}")
+        if ratio > max_slowdown:
+            regressions.append(name)
+    return regressions
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(path: str, results: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"Saved results to {path}")
+
+
+def _report(regressions: list[str], max_slowdown: float) -> int:
+    if regressions:
+        print(f"✗ {len(regressions)} benchmark(s) slower than {max_slowdown:.2f}x baseline: {', '.join(regressions)}")
+        return 1
+    print(f"✓ No benchmark slower than {max_slowdown:.2f}x baseline")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmarks")
+    run.add_argument("--messages", type=int, default=1000, help="Corpus size for the text benchmarks")
+    run.add_argument("--db-ops", type=int, default=200, help="Calls per round for the database benchmarks")
+    run.add_argument("--rounds", type=int, default=5)
+    run.add_argument("--only", help="Comma-separated benchmark names")
+    run.add_argument("--output", help="Write results as a JSON baseline")
+    run.add_argument("--baseline", help=f"Compare against a saved baseline (e.g. {DEFAULT_BASELINE})")
+    run.add_argument("--max-slowdown", type=float, default=DEFAULT_MAX_SLOWDOWN)
+    run.add_argument("--verbose", action="store_true", help="Keep application logging on while timing")
+
+    compare = commands.add_parser("compare", help="Compare two saved result files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--max-slowdown", type=float, default=DEFAULT_MAX_SLOWDOWN)
+
+    args = parser.parse_args()
+    if not getattr(args, "verbose", False):
+        logging.disable(logging.CRITICAL)
+
+    if args.command == "compare":
+        return _report(compare_results(_load(args.baseline), _load(args.current), args.max_slowdown),
+                       args.max_slowdown)
+
+    only = set(args.only.split(",")) if args.only else None
+    print(f"Corpus: {args.messages} messages, {args.db_ops} database calls, {args.rounds} rounds")
+    results = run_benchmarks(args.messages, args.rounds, args.db_ops, only)
+    if args.output:
+        _save(args.output, results)
+    if args.baseline:
+        return _report(compare_results(_load(args.baseline), results, args.max_slowdown), args.max_slowdown)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Backfill/repair per-user daily expense rollups
+Recomputes expense_daily_rollups from expenses, or with --check only reports
+rows that disagree with raw expenses
+Idempotent - safe to run multiple times
+"""
+import argparse
+import logging
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app  # noqa: E402
+from utils.expense_rollups import check_rollup_consistency, rebuild_expense_rollups  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def check_rollups() -> bool:
+    """Report rollup rows that disagree with raw expenses"""
+    with app.app_context():
+        report = check_rollup_consistency()
+        if report["consistent"]:
+            print("✓ Expense rollups match raw expenses")
+            return True
+        for row in report["missing_or_stale"]:
+            print(f"✗ Missing or stale rollup (expected from expenses): {row}")
+        for row in report["unexpected"]:
+            print(f"✗ Rollup with no matching expenses: {row}")
+        return False
+
+def rebuild_rollups(user_hash: str | None = None) -> bool:
+    """Recompute rollups for one user or everyone"""
+    with app.app_context():
+        try:
+            written = rebuild_expense_rollups(user_hash)
+            print(f"✓ Expense rollups rebuilt ({written} rows)")
+            return True
+        except Exception as e:
+            print(f"✗ Expense rollup rebuild failed: {e}")
+            return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--check", action="store_true", help="only compare rollups with raw expenses")
+    parser.add_argument("--user", help="rebuild a single user_id_hash")
+    args = parser.parse_args()
+    
+    success = check_rollups() if args.check else rebuild_rollups(args.user)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Backfill/repair the user_first_seen retention rollup
+Recomputes every user's cohort date and activity mask from telemetry_events
+Idempotent - safe to run multiple times
+"""
+import logging
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app  # noqa: E402
+from utils.telemetry import rebuild_retention_rollup  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def rebuild_rollup() -> bool:
+    """Rebuild the retention rollup for every user"""
+    with app.app_context():
+        try:
+            written = rebuild_retention_rollup()
+            print(f"✓ Retention rollup rebuilt for {written} users")
+            return True
+        except Exception as e:
+            print(f"✗ Retention rollup rebuild failed: {e}")
+            return False
+
+if __name__ == "__main__":
+    success = rebuild_rollup()
+    sys.exit(0 if success else 1)
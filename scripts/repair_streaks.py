@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Repair logging streak counters for all users
+Recomputes users.consecutive_days and users.last_log_date from expenses in bulk
+(the n8m0j2l3f9kg migration runs the same backfill on deploy)
+Idempotent - safe to run multiple times
+"""
+import logging
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app  # noqa: E402
+from handlers.milestones import recompute_all_streaks  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def repair_streaks() -> bool:
+    """Recompute streak counters for every user"""
+    with app.app_context():
+        try:
+            updated = recompute_all_streaks()
+            print(f"✓ Streak counters repaired for {updated} users")
+            return True
+        except Exception as e:
+            print(f"✗ Streak repair failed: {e}")
+            return False
+
+if __name__ == "__main__":
+    success = repair_streaks()
+    sys.exit(0 if success else 1)
@@ -68,6 +68,7 @@ const addMsg = (role, text) => {
   messageDiv.appendChild(content);
   messages.appendChild(messageDiv);
   messages.scrollTop = messages.scrollHeight;
+  return paragraph;
 };
 
 const renderUser = (text) => addMsg("user", text);
@@ -229,6 +230,31 @@ const handleCategorySelection = async (chipElement) => {
   }
 };
 
+// Read a text/event-stream response body, calling onEvent(event, data) per frame
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      let event = 'message';
+      const dataLines = [];
+      frame.split('\n').forEach(line => {
+        // Lines starting with ':' are keep-alive comments
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+      });
+      if (dataLines.length) onEvent(event, JSON.parse(dataLines.join('\n')));
+    }
+  }
+}
+
 // Apply atomic UI updates from expense cascade
 // Note: Banner, Progress, and Chart are now handled by HTMX partials
 // This function only handles celebration toasts and confirmations
@@ -278,7 +304,7 @@ document.addEventListener('DOMContentLoaded', () => {
       // 2) chat roundtrip (SINGLE endpoint)
       const r = await csrfFetch('/ai-chat', {
         method: 'POST',
-        headers: { 'Content-Type':'application/json', 'X-Request-ID': rid },
+        headers: { 'Content-Type':'application/json', 'Accept':'text/event-stream, application/json', 'X-Request-ID': rid },
         credentials: 'same-origin',
         body: JSON.stringify({ message: text })
       });
@@ -291,14 +317,35 @@ document.addEventListener('DOMContentLoaded', () => {
         return;
       }
       
-      const data = await r.json().catch(()=> ({}));
-      if (!r.ok) throw new Error(`HTTP ${r.status} ${data.error||''}`);
+      let data = {};
+      let status = r.status;
+      let partial = null; // Bubble showing the acknowledgement until the full reply lands
+      const streamed = (r.headers.get('Content-Type') || '').includes('text/event-stream');
+
+      if (streamed) {
+        // SSE: show the user message and the early acknowledgement right away
+        renderUser(text);
+        await readEventStream(r, (event, payload) => {
+          if (event === 'ack' || event === 'status') {
+            if (partial) partial.textContent = payload.text;
+            else partial = addMsg("bot", payload.text);
+          } else if (event === 'done' || event === 'error') {
+            data = payload;
+            status = payload.status || 500;
+          }
+        });
+        if (partial) partial.closest('.message').remove();
+        if (!data.status) throw new Error('Reply stream ended early');
+      } else {
+        data = await r.json().catch(()=> ({}));
+      }
+      if (status < 200 || status >= 300) throw new Error(`HTTP ${status} ${data.error||''}`);
 
       console.log('[TRACE]', rid, 'reply:', data);
       console.log('[CHAT-DEBUG] About to render user and assistant messages');
       
       // Always render user message first
-      renderUser(text);
+      if (!streamed) renderUser(text);
       
       // Always try to render assistant response with comprehensive fallbacks
       try {
@@ -0,0 +1,94 @@
+"""
+Pooled AI HTTP transport
+Connections are reused across calls while cookies and headers never carry over
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from utils.ai_transport import AITransport
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = json.dumps({
+            "cookie": self.headers.get("Cookie"),
+            "user": self.headers.get("X-User"),
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "session=leaky; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        time.sleep(0.05)  # hold the connection so warm-up requests overlap
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/generate"
+    server.shutdown()
+    server.server_close()
+
+
+class TestAITransport:
+    """Reuse, isolation and metrics against a local stub server"""
+
+    def test_connection_is_reused(self, stub_url):
+        transport = AITransport(pool_maxsize=2)
+        for _ in range(5):
+            assert transport.post(stub_url, json={"q": 1}, timeout=5).status_code == 200
+
+        stats = transport.get_stats()
+        assert stats["requests"] == 5
+        assert stats["connections_opened"] == 1
+        assert stats["connections_reused"] == 4
+        assert stats["handshake_ms_avg"] > 0
+
+    def test_no_cookies_or_headers_carry_over(self, stub_url):
+        transport = AITransport()
+        first = transport.post(stub_url, json={}, headers={"X-User": "user_a"}, timeout=5)
+        second = transport.post(stub_url, json={}, timeout=5)
+
+        assert first.json()["user"] == "user_a"
+        assert second.json() == {"cookie": None, "user": None}
+
+    def test_frozen_headers_are_read_only(self):
+        headers = AITransport.freeze_headers({"Content-Type": "application/json"})
+        with pytest.raises(TypeError):
+            headers["Authorization"] = "Bearer other-user"
+
+    def test_keepalive_off_opens_fresh_connections(self, stub_url):
+        transport = AITransport(keepalive=False)
+        for _ in range(3):
+            transport.post(stub_url, json={}, timeout=5)
+        assert transport.get_stats()["connections_opened"] == 3
+
+    def test_warm_fills_the_pool(self, stub_url):
+        transport = AITransport(pool_maxsize=3)
+        assert transport.warm(stub_url, connections=5, timeout=5).status_code == 200
+        assert transport.get_stats()["connections_opened"] == 3
+
+        for _ in range(3):
+            transport.post(stub_url, json={}, timeout=5)
+        assert transport.get_stats()["connections_opened"] == 3
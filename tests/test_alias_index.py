@@ -0,0 +1,68 @@
+"""
+Precompiled category alias index
+Verifies the single-pass matcher agrees with per-alias word boundary matching
+"""
+import pytest
+
+from parsers.alias_index import AliasIndex
+from parsers.expense import (
+    CATEGORY_ALIASES,
+    find_category_aliases,
+    has_word_boundary_match,
+    infer_category_from_description,
+    normalize_bengali_text,
+    strip_bengali_suffixes,
+)
+
+SAMPLES = [
+    "Coffee 120 general",
+    "Biryani 250 misc",
+    "cat food 300",
+    "uncoffee 50",
+    "coffee_shop 80",
+    "কফিতে চিনি",
+    "বিরিয়ানিগুলো খেয়েছি ২৫০",
+    "চায়ের দাম ২০",
+    "spent 500 on gas bill",
+    "uber uber 200",
+    "for coffee 50",
+    "COLD COFFEE and MILK TEA 300",
+    "☕ 60",
+    "Something 120 general",
+    "",
+]
+
+
+class TestAliasIndex:
+    """Single-pass alias matching"""
+
+    @pytest.mark.parametrize("text", SAMPLES)
+    def test_matches_word_boundary_scan(self, text):
+        """Index returns exactly the aliases the per-alias scan accepts, in table order"""
+        expected = [alias for alias in CATEGORY_ALIASES if has_word_boundary_match(text, alias)]
+        assert [m.alias for m in find_category_aliases(text)] == expected
+
+    def test_positions_refer_to_normalized_text(self):
+        """Each match carries its span in the normalized message"""
+        text = "lunch ১২০ then coffee"
+        normalized = normalize_bengali_text(text)
+        for match in find_category_aliases(text):
+            assert normalized[match.start:match.end].lower() == match.alias
+
+    def test_overlapping_aliases(self):
+        """Aliases that share suffixes are all reported"""
+        index = AliasIndex(
+            [('coffee', 'food', 9), ('cold coffee', 'food', 9), ('fee', 'bills', 5)],
+            normalize_bengali_text,
+            strip_bengali_suffixes,
+        )
+        matches = index.find_all("cold coffee fee")
+        assert [(m.alias, m.start) for m in matches] == [
+            ('cold coffee', 0), ('coffee', 5), ('fee', 12)
+        ]
+
+    def test_description_inference_unchanged(self):
+        """Precedence and boost rules are preserved"""
+        assert infer_category_from_description("Coffee 120 general") == ('food', 9)
+        assert infer_category_from_description("spent on coffee 120 misc") == ('food', 11)
+        assert infer_category_from_description("Something 120 general") is None
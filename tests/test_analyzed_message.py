@@ -0,0 +1,60 @@
+"""
+Analyze-once message artifact
+Each view of a message is computed once and shared by every stage in scope
+"""
+import pytest
+
+from nlp.analyzed_message import AnalyzedMessage, analyze, message_scope
+from nlp.money_patterns import has_spend_money, normalize_text_money
+from utils.text_normalizer import normalize_for_processing
+
+
+class TestAnalyzedMessage:
+    """Lazy fields, immutability and scope sharing"""
+
+    def test_fields_are_computed_once(self):
+        message = AnalyzedMessage("Spent ৳500 on lunch today")
+        assert "normalized" not in message.__dict__
+        first = message.normalized
+        assert message.normalized is first
+        assert message.money_mentions is message.money_mentions
+
+    def test_is_immutable(self):
+        message = AnalyzedMessage("coffee 100 tk")
+        with pytest.raises(AttributeError):
+            message.raw = "tea 50 tk"
+
+    def test_analyze_reuses_scoped_message(self):
+        text = "lunch 250 taka"
+        with message_scope(text) as scoped:
+            assert analyze(text) is scoped
+            with message_scope(text) as nested:
+                assert nested is scoped
+            assert analyze("something else") is not scoped
+        assert analyze(text) is not scoped
+
+    @pytest.mark.parametrize("text", [
+        "Spent ৳500 on lunch", "চা ৫০ টাকা", "coffee 100", "hello there",
+        "\u200bUBER  300 tk\u200c", "",
+    ])
+    def test_views_match_standalone_normalizers(self, text):
+        message = AnalyzedMessage(text)
+        assert message.normalized == normalize_for_processing(text)
+        assert message.money_text == normalize_text_money(text)
+        assert message.has_spend_money == (bool(text.strip()) and has_spend_money(normalize_text_money(text)))
+
+    def test_money_mentions_have_spans(self):
+        message = AnalyzedMessage("Paid 1,200 tk for rent and 300 taka for gas")
+        assert [m.amount for m in message.money_mentions] == [1200.0, 300.0]
+        for mention in message.money_mentions:
+            assert message.normalized[mention.start:mention.end] == mention.text
+
+    def test_language(self):
+        assert AnalyzedMessage("chai 50 tk").language == "en"
+        assert AnalyzedMessage("চা ৫০ টাকা").language == "bn"
+        assert AnalyzedMessage("চা 50 tk").language == "mixed"
+
+    def test_non_string_input(self):
+        message = AnalyzedMessage(None)
+        assert message.normalized == ""
+        assert message.has_money_mention is False
@@ -0,0 +1,201 @@
+"""
+Unified two-tier cache
+Bounded LRU+TTL namespaces, single-flight loads, invalidation and data-version staleness
+"""
+import json
+import os
+import pickle
+import threading
+import time
+
+import pytest
+
+from utils import cache
+from utils.cache import CacheNamespace
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCacheNamespace:
+    """L1 behaviour of a single namespace"""
+
+    def test_lru_bound_and_eviction_order(self):
+        ns = CacheNamespace("t", max_entries=3)
+        for i in range(5):
+            ns.set(f"k{i}", i)
+        ns.get("k2")  # Touch: k3 is now the oldest
+
+        ns.set("k5", 5)
+        assert list(ns) == ["k4", "k2", "k5"]
+        assert ns.stats["evictions"] == 3
+
+        ns.max_entries = 1
+        assert list(ns) == ["k5"]
+
+    def test_ttl_expiry_is_lazy(self):
+        clock = FakeClock()
+        ns = CacheNamespace("t", ttl_seconds=10, clock=clock)
+        ns.set("a", 1)
+        ns.set("b", 2, ttl_seconds=100)
+
+        clock.now += 11
+        assert len(ns) == 2  # Nothing scanned until touched
+        assert ns.get("a") is None
+        assert "b" in ns
+        assert ns.purge_expired() == 0
+        clock.now += 100
+        assert ns.purge_expired() == 1
+        assert ns.stats["expirations"] == 2
+
+    def test_incr_keeps_expiry_unless_ttl_given(self):
+        clock = FakeClock()
+        ns = CacheNamespace("t", clock=clock)
+        assert ns.incr("c", ttl_seconds=10) == 1
+        clock.now += 6
+        assert ns.incr("c") == 2
+        clock.now += 6
+        assert ns.get("c") is None
+        assert ns.incr("c", ttl_seconds=10) == 1
+
+    def test_invalidate_by_user_and_tag(self):
+        ns = CacheNamespace("t")
+        ns.set("u1:a", 1, user="u1", tags=["reports"])
+        ns.set("u1:b", 2, user="u1")
+        ns.set("u2:a", 3, user="u2", tags=["reports"])
+
+        assert sorted(ns.user_keys("u1")) == ["u1:a", "u1:b"]
+        assert ns.invalidate_user("u1") == 2
+        assert list(ns) == ["u2:a"]
+        assert ns.invalidate_tag("reports") == 1
+        assert len(ns) == 0
+        assert ns.stats["invalidations"] == 2
+
+    def test_mapping_protocol(self):
+        ns = CacheNamespace("t")
+        value = object()
+        ns["k"] = value
+        assert ns["k"] is value
+        assert ns.get("k") is value
+        with pytest.raises(KeyError):
+            ns["missing"]
+        del ns["k"]
+        assert "k" not in ns
+
+
+class TestSingleFlight:
+    """Concurrent loads of one key"""
+
+    def test_concurrent_misses_call_loader_once(self):
+        ns = CacheNamespace("t")
+        calls = []
+        release = threading.Event()
+
+        def loader():
+            calls.append(1)
+            release.wait(2)
+            return "value"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(ns.get_or_load("k", loader))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        while ns.stats["coalesced"] < 7:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [1]
+        assert results == ["value"] * 8
+        assert ns.stats["loads"] == 1
+
+    def test_loader_error_reaches_waiters_and_is_not_cached(self):
+        ns = CacheNamespace("t")
+
+        def loader():
+            raise RuntimeError("db down")
+
+        with pytest.raises(RuntimeError):
+            ns.get_or_load("k", loader)
+        assert ns.get_or_load("k", lambda: 42) == 42
+
+
+class TestVersionedNamespace:
+    """Entries tied to a user's data version"""
+
+    def test_version_bump_makes_entry_stale(self, monkeypatch):
+        versions = {"u1": 1}
+        monkeypatch.setattr(CacheNamespace, "_current_version", staticmethod(lambda user: versions[user]))
+        ns = CacheNamespace("t", versioned=True)
+        ns.set("report", "old story", user="u1")
+        assert ns.get("report") == "old story"
+
+        versions["u1"] = 2
+        assert ns.get("report") is None
+        assert ns.stats["stale"] == 1
+
+
+    def test_version_is_read_before_loading(self, monkeypatch):
+        versions = {"u1": 1}
+        monkeypatch.setattr(CacheNamespace, "_current_version", staticmethod(lambda user: versions[user]))
+        ns = CacheNamespace("t", versioned=True)
+
+        def loader():
+            versions["u1"] = 2  # an expense lands while the report is being built
+            return "story without it"
+
+        assert ns.get_or_load("report", loader, user="u1") == "story without it"
+        assert ns.get("report") is None
+
+
+class TestL2:
+    """Redis tier round trips as JSON"""
+
+    @pytest.fixture
+    def redis(self, monkeypatch):
+        fakeredis = pytest.importorskip("fakeredis")
+        client = fakeredis.FakeRedis()
+        monkeypatch.setattr(cache, "get_l2_client", lambda: client)
+        return client
+
+    def test_entry_is_shared_through_l2_as_json(self, redis):
+        CacheNamespace("t2", l2=True).set("report", "৳120 on food", user="u1", tags=("daily",))
+
+        assert json.loads(redis.get("cache:t2:report"))["value"] == "৳120 on food"
+        other_worker = CacheNamespace("t2", l2=True)
+        assert other_worker.get("report") == "৳120 on food"
+        assert other_worker.stats["l2_hits"] == 1
+
+    def test_non_json_payloads_are_ignored(self, redis):
+        ns = CacheNamespace("t2", l2=True)
+        ns.set("obj", object())
+        assert redis.get("cache:t2:obj") is None
+        assert ns.stats["l2_errors"] == 0
+
+        redis.set("cache:t2:pickled", pickle.dumps(("value", 0, None, (), None)))
+        assert ns.get("pickled") is None
+
+
+class TestRegistry:
+    """Process-wide namespaces and metrics"""
+
+    def test_namespace_is_shared_and_exported(self):
+        ns = cache.namespace("test_registry", max_entries=5)
+        assert cache.namespace("test_registry") is ns
+        ns.set("k", 1, user="u9")
+        ns.get("k")
+
+        assert cache.invalidate_user("u9") == 1
+        text = cache.to_prometheus()
+        pid = os.getpid()
+        assert f'finbrain_cache_events_total{{namespace="test_registry",event="hits",pid="{pid}"}} 1' in text
+        assert f'finbrain_cache_entries_max{{namespace="test_registry",pid="{pid}"}} 5' in text
+        # Each family's samples sit under its own HELP/TYPE header
+        entries_max = text.index("# TYPE finbrain_cache_entries_max gauge")
+        assert text.rindex("finbrain_cache_entries{") < entries_max < text.index("finbrain_cache_entries_max{")
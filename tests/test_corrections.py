@@ -171,10 +171,10 @@ class TestCorrectionHandler:
         
         # Mock existing correction with same mid
         existing_correction = MagicMock()
-        existing_correction.unique_id = f"correction_{mid}_123456"
+        existing_correction.correction_mid = mid
         
-        # Mock query to find existing correction
-        mock_session.query.return_value.filter.return_value.first.return_value = existing_correction
+        # The ledger lookup returns the earlier correction first
+        mock_session.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [existing_correction]
         
         # Test duplicate correction
         result = handle_correction(user_hash, mid, "actually 600", now)
@@ -341,6 +341,41 @@ class TestEndToEndCorrections:
         
         assert len(uncorrected_expenses) == 1
         assert uncorrected_expenses[0].amount == Decimal('500.00')
+    
+    def test_replayed_correction_hits_ledger(self):
+        """Test the same correction mid is answered from the correction ledger"""
+        user_hash = psid_hash("integration_user_replay")
+        now = datetime.utcnow()
+        
+        initial_expense = Expense()
+        initial_expense.user_id = user_hash
+        initial_expense.user_id_hash = user_hash
+        initial_expense.amount = Decimal('50.00')
+        initial_expense.amount_minor = 5000
+        initial_expense.currency = 'BDT'
+        initial_expense.category = 'food'
+        initial_expense.description = 'coffee'
+        initial_expense.date = now.date()
+        initial_expense.time = now.time()
+        initial_expense.month = now.strftime('%Y-%m')
+        initial_expense.unique_id = f"test_replay_{int(now.timestamp())}"
+        initial_expense.created_at = now
+        initial_expense.platform = 'messenger'
+        
+        db.session.add(initial_expense)
+        db.session.commit()
+        
+        first = handle_correction(user_hash, "correction_msg_replay", "sorry, I meant 500 for coffee", now)
+        assert first['intent'] == 'correction_applied'
+        
+        corrected = db.session.query(Expense).filter_by(
+            user_id_hash=user_hash, correction_mid="correction_msg_replay"
+        ).one()
+        assert corrected.amount == Decimal('500.00')
+        
+        replay = handle_correction(user_hash, "correction_msg_replay", "sorry, I meant 500 for coffee", now)
+        assert replay['intent'] == 'correction_duplicate'
+        assert db.session.query(Expense).filter_by(user_id_hash=user_hash).count() == 2
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
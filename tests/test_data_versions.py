@@ -0,0 +1,97 @@
+"""
+Per-user data versions
+Expense inserts, edits and deletes bump the user's all-time and month counters in the same transaction
+"""
+from datetime import date, datetime
+
+import pytest
+
+sa = pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.orm import DeclarativeBase, Session
+
+from utils.data_versions import ALL_TIME, register_data_version_listeners, window_period
+
+
+class _Base(DeclarativeBase):
+    pass
+
+
+class _Expense(_Base):
+    __tablename__ = "expenses"
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    user_id_hash = sa.Column(sa.String(64), nullable=False)
+    date = sa.Column(sa.Date, nullable=False)
+    amount_minor = sa.Column(sa.BigInteger, nullable=False)
+    created_at = sa.Column(sa.DateTime)
+
+
+sa.Table(
+    "user_data_versions", _Base.metadata,
+    sa.Column("user_id_hash", sa.String(255), primary_key=True),
+    sa.Column("period", sa.String(7), primary_key=True),
+    sa.Column("version", sa.BigInteger, nullable=False),
+    sa.Column("updated_at", sa.DateTime),
+)
+
+
+@pytest.fixture
+def session():
+    engine = sa.create_engine("sqlite://")
+    _Base.metadata.create_all(engine)
+    register_data_version_listeners(_Expense)
+    with Session(engine) as session:
+        yield session
+
+
+def _versions(session, user="u1"):
+    rows = session.execute(sa.text(
+        "SELECT period, version FROM user_data_versions WHERE user_id_hash = :u"), {"u": user})
+    return dict(rows.fetchall())
+
+
+class TestDataVersions:
+    """Counter maintenance and window scoping"""
+
+    def test_insert_bumps_all_time_and_month(self, session):
+        session.add(_Expense(user_id_hash="u1", date=date(2025, 10, 3), amount_minor=100))
+        session.add(_Expense(user_id_hash="u1", date=date(2025, 9, 30), amount_minor=100))
+        session.commit()
+
+        assert _versions(session) == {ALL_TIME: 2, "2025-10": 1, "2025-09": 1}
+
+    def test_edit_moving_months_bumps_both(self, session):
+        expense = _Expense(user_id_hash="u1", date=date(2025, 9, 30), amount_minor=100)
+        session.add(expense)
+        session.commit()
+
+        expense.date = date(2025, 10, 1)
+        session.commit()
+
+        assert _versions(session) == {ALL_TIME: 2, "2025-09": 2, "2025-10": 1}
+
+    def test_delete_bumps_and_rollback_does_not(self, session):
+        expense = _Expense(user_id_hash="u1", date=date(2025, 10, 3), amount_minor=100)
+        session.add(expense)
+        session.commit()
+
+        expense.amount_minor = 500
+        session.flush()
+        session.rollback()
+        assert _versions(session)[ALL_TIME] == 1
+
+        session.delete(session.get(_Expense, expense.id))
+        session.commit()
+        assert _versions(session)[ALL_TIME] == 2
+
+    def test_backdated_expense_bumps_recorded_month(self, session):
+        session.add(_Expense(user_id_hash="u1", date=date(2025, 9, 28), amount_minor=100,
+                             created_at=datetime(2025, 10, 2, 9, 30)))
+        session.commit()
+
+        assert _versions(session) == {ALL_TIME: 1, "2025-09": 1, "2025-10": 1}
+
+    def test_window_period(self):
+        assert window_period(datetime(2025, 10, 1), datetime(2025, 11, 1)) == "2025-10"
+        assert window_period(datetime(2025, 9, 15), datetime(2025, 10, 15)) == ALL_TIME
@@ -0,0 +1,90 @@
+"""
+Webhook message dedup store
+Bucket-ring expiry and bounds, Bloom prefilter, and Redis sharing across workers
+"""
+import pytest
+
+from utils.dedup_store import BloomFilter, BucketedDedupStore, RedisDedupStore
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestBucketedDedupStore:
+    """In-process ring backend"""
+
+    def test_duplicate_within_ttl(self):
+        store = BucketedDedupStore(ttl_seconds=60, bucket_seconds=10, clock=FakeClock())
+        assert store.check_and_mark("mid.1") is False
+        assert store.check_and_mark("mid.1") is True
+        assert store.check_and_mark("mid.2") is False
+        stats = store.get_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 2)
+
+    def test_expiry_drops_whole_buckets(self):
+        clock = FakeClock()
+        store = BucketedDedupStore(ttl_seconds=60, bucket_seconds=10, clock=clock)
+        store.check_and_mark("old")
+        clock.now += 30
+        store.check_and_mark("newer")
+
+        clock.now += 40  # "old" is 70s old, "newer" 40s
+        assert store.check_and_mark("newer") is True
+        assert store.check_and_mark("old") is False
+        assert store.get_stats()["expired_buckets"] == 1
+
+    def test_memory_is_bounded(self):
+        clock = FakeClock()
+        store = BucketedDedupStore(ttl_seconds=600, bucket_seconds=10, max_entries=5, clock=clock)
+        for i in range(12):
+            store.check_and_mark(f"mid.{i}")
+            clock.now += 10
+        assert len(store) <= 5
+        assert store.get_stats()["evictions"] == 7
+
+    def test_bloom_never_hides_a_live_key(self):
+        clock = FakeClock()
+        store = BucketedDedupStore(ttl_seconds=60, bucket_seconds=10, clock=clock)
+        for i in range(50):
+            store.check_and_mark(f"mid.{i}")
+            clock.now += 1.5  # crosses a Bloom generation boundary
+        for i in range(10, 50):
+            assert store.check_and_mark(f"mid.{i}") is True
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000)
+        keys = [f"m_{i}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        assert all(key in bloom for key in keys)
+        false_positives = sum(f"other_{i}" in bloom for i in range(1000))
+        assert false_positives < 50
+
+
+class TestRedisDedupStore:
+    """Shared backend"""
+
+    def test_second_worker_sees_duplicate(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        worker_a = RedisDedupStore(fakeredis.FakeRedis(server=server), ttl_seconds=60)
+        worker_b = RedisDedupStore(fakeredis.FakeRedis(server=server), ttl_seconds=60)
+
+        assert worker_a.check_and_mark("mid.retry") is False
+        assert worker_b.check_and_mark("mid.retry") is True
+        assert worker_b.get_stats()["hits"] == 1
+
+    def test_falls_back_when_redis_fails(self):
+        class BrokenRedis:
+            def set(self, *args, **kwargs):
+                raise ConnectionError("redis down")
+
+        store = RedisDedupStore(BrokenRedis(), ttl_seconds=60)
+        assert store.check_and_mark("mid.1") is False
+        assert store.check_and_mark("mid.1") is True
+        assert store.get_stats()["errors"] == 2
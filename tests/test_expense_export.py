@@ -0,0 +1,53 @@
+"""
+Streaming expense export
+CSV/NDJSON chunking, formula-injection escaping and gzip framing
+"""
+import csv
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+
+from utils.expense_export import CSV_HEADER, gzip_chunks, iter_csv, iter_ndjson, sanitize_csv_cell
+
+
+def _rows(count):
+    for i in range(count):
+        yield (date(2025, 10, 1), Decimal("120.50"), "food", f"lunch {i}",
+               datetime(2025, 10, 1, 13, 0, 0), i + 1)
+
+
+class TestExpenseExport:
+    """Export encoders"""
+
+    def test_csv_header_is_first_chunk(self):
+        chunks = iter_csv(_rows(3))
+        assert next(chunks).strip() == ",".join(CSV_HEADER)
+
+    def test_csv_is_chunked_and_complete(self):
+        chunks = list(iter_csv(_rows(1200), flush_every=500))
+        assert len(chunks) == 4  # header + 500 + 500 + 200
+        parsed = list(csv.reader(StringIO("".join(chunks))))
+        assert len(parsed) == 1201
+        assert parsed[1] == ["2025-10-01", "120.50", "food", "lunch 0", "2025-10-01 13:00:00", "1"]
+
+    def test_csv_escapes_formulas(self):
+        row = (date(2025, 10, 1), Decimal("1"), "=cmd", "  @SUM(A1)", None, 7)
+        parsed = list(csv.reader(StringIO("".join(iter_csv([row])))))
+        assert parsed[1][2] == "'=cmd"
+        assert parsed[1][3] == "'  @SUM(A1)"
+        assert sanitize_csv_cell("'=already") == "'=already"
+
+    def test_ndjson_first_row_is_sent_alone(self):
+        chunks = list(iter_ndjson(_rows(5), flush_every=2))
+        assert [chunk.count("\n") for chunk in chunks] == [1, 2, 2]
+        record = json.loads(chunks[0])
+        assert record == {"date": "2025-10-01", "amount": "120.50", "category": "food",
+                          "description": "lunch 0", "created_at": "2025-10-01T13:00:00", "expense_id": 1}
+
+    def test_gzip_stream_round_trips(self):
+        text_chunks = list(iter_csv(_rows(50)))
+        compressed = list(gzip_chunks(iter(text_chunks)))
+        assert compressed[0][:2] == b"\x1f\x8b"  # gzip header goes out with the first chunk
+        assert gzip.decompress(b"".join(compressed)).decode("utf-8") == "".join(text_chunks)
@@ -0,0 +1,90 @@
+"""
+User learning preference snapshot cache
+Learned category mappings are read once per user and invalidated on learn
+"""
+import pytest
+from sqlalchemy import event
+
+from app import app as flask_app
+from app import db
+from models import User
+from parsers.expense import _infer_category_from_context
+from utils.expense_learning import UserLearningSystem
+
+USER_HASH = "learning_cache_test_user"
+
+
+@pytest.fixture
+def learning():
+    """Fresh learning system with a clean test user"""
+    with flask_app.app_context():
+        db.create_all()
+        system = UserLearningSystem()
+        yield system
+        db.session.rollback()
+        User.query.filter_by(user_id_hash=USER_HASH).delete()
+        db.session.commit()
+
+
+def _count_user_selects(fn):
+    statements = []
+
+    def on_execute(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "users" in statement:
+            statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    return result, len(statements)
+
+
+class TestLearningCache:
+    """Preference snapshot cache behaviour"""
+
+    def test_bulk_lookup_returns_matches_in_input_order(self, learning):
+        assert learning.learn_user_preference(USER_HASH, "RC Cola", "food")
+        assert learning.learn_user_preference(USER_HASH, "mouse", "shopping")
+
+        matches = learning.get_user_preferences_bulk(USER_HASH, ["mouse", "pad", "rc cola"])
+        assert list(matches) == ["mouse", "rc cola"]
+        assert matches["rc cola"]["category"] == "food"
+
+    def test_mappings_loaded_once_per_user(self, learning):
+        learning.learn_user_preference(USER_HASH, "mouse", "shopping")
+
+        def lookups():
+            return [learning.get_user_preference(USER_HASH, w) for w in ("a", "mouse", "b", "c")]
+
+        results, selects = _count_user_selects(lookups)
+        assert results[1]["category"] == "shopping"
+        assert selects == 1
+
+    def test_learn_invalidates_snapshot(self, learning):
+        learning.learn_user_preference(USER_HASH, "mouse", "shopping")
+        assert learning.get_user_preference(USER_HASH, "mouse")["category"] == "shopping"
+
+        learning.learn_user_preference(USER_HASH, "mouse", "bills")
+        assert learning.get_user_preference(USER_HASH, "mouse")["category"] == "bills"
+        assert learning.cache_stats["invalidations"] >= 1
+
+    def test_cache_is_bounded(self, learning):
+        learning.max_cached_users = 2
+        for i in range(5):
+            learning.get_category_mappings(f"{USER_HASH}_{i}")
+        assert len(learning._mappings_cache) == 2
+        assert learning.cache_stats["evictions"] == 3
+
+    def test_context_inference_uses_learned_bigram(self, learning, monkeypatch):
+        import utils.expense_learning as expense_learning
+        monkeypatch.setattr(expense_learning, "user_learning_system", learning)
+        learning.learn_user_preference(USER_HASH, "rc cola", "shopping")
+
+        category, selects = _count_user_selects(
+            lambda: _infer_category_from_context("bought rc cola for 50 today", USER_HASH)
+        )
+        assert category == "shopping"
+        assert selects <= 1
@@ -0,0 +1,87 @@
+"""
+Per-user daily expense rollups
+get_totals reads rollups that add_expense, edits and deletes keep in step
+"""
+import pytest
+
+import backend_assistant as ba
+from app import app as flask_app
+from app import db
+from models import Expense, ExpenseDailyRollup
+from utils.expense_rollups import check_rollup_consistency, rebuild_expense_rollups
+
+USER_HASH = "rollup_test_user"
+
+
+@pytest.fixture
+def app_ctx():
+    with flask_app.app_context():
+        db.create_all()
+        yield
+        db.session.rollback()
+        Expense.query.filter_by(user_id_hash=USER_HASH).delete()
+        ExpenseDailyRollup.query.filter_by(user_id_hash=USER_HASH).delete()
+        db.session.commit()
+
+
+def _log(amount_minor, category, message_id):
+    return ba.add_expense(
+        user_id=USER_HASH, amount_minor=amount_minor, currency="BDT", category=category,
+        description=f"{category} {amount_minor}", source="chat", message_id=message_id
+    )
+
+
+def _rollups():
+    return {
+        (r.category, r.total_minor, r.expense_count)
+        for r in ExpenseDailyRollup.query.filter_by(user_id_hash=USER_HASH).all()
+    }
+
+
+class TestExpenseRollups:
+    """Rollup maintenance and rollup-backed totals"""
+
+    def test_add_expense_updates_rollup(self, app_ctx):
+        _log(5000, "food", "rollup-m1")
+        _log(3000, "food", "rollup-m2")
+        _log(2000, "transport", "rollup-m3")
+
+        assert _rollups() == {("food", 8000, 2), ("transport", 2000, 1)}
+
+        totals = ba.get_totals(USER_HASH, "day")
+        assert totals["total_minor"] == 10000
+        assert totals["expenses_count"] == 3
+        assert totals["top_category"] == "food"
+        assert totals["top_categories"][0] == {
+            "category": "food", "total_minor": 8000, "count": 2, "percentage": 80.0
+        }
+
+    def test_edit_moves_amount_between_categories(self, app_ctx):
+        result = _log(5000, "food", "rollup-m1")
+        expense = db.session.get(Expense, result["expense_id"])
+        expense.amount_minor = 7000
+        expense.category = "bills"
+        db.session.commit()
+
+        assert _rollups() == {("bills", 7000, 1)}
+
+    def test_delete_expense_removes_contribution(self, app_ctx):
+        first = _log(5000, "food", "rollup-m1")
+        _log(1000, "food", "rollup-m2")
+
+        ba.delete_expense(USER_HASH, first["expense_id"])
+
+        assert _rollups() == {("food", 1000, 1)}
+        assert ba.get_totals(USER_HASH, "month")["total_minor"] == 1000
+
+    def test_rebuild_repairs_drift(self, app_ctx):
+        result = _log(5000, "food", "rollup-m1")
+        db.session.execute(
+            db.text("UPDATE expenses SET amount_minor = 6000 WHERE id = :id"),
+            {"id": result["expense_id"]}
+        )
+        db.session.commit()
+
+        assert not check_rollup_consistency()["consistent"]
+        rebuild_expense_rollups(USER_HASH)
+        assert _rollups() == {("food", 6000, 1)}
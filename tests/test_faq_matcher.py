@@ -0,0 +1,60 @@
+"""
+Precompiled FAQ/smalltalk keyword index
+Verifies the single-pass matcher returns exactly what the linear keyword scan returns
+"""
+import random
+
+import pytest
+
+from utils.faq_map import (
+    FAQ_JSON,
+    INTENT_KEYWORDS,
+    _match_faq_or_smalltalk_linear,
+    match_faq_or_smalltalk,
+)
+
+SAMPLES = [
+    "hi",
+    "this is great",
+    "Hello!!",
+    "what is finbrain?",
+    "is my data safe with you",
+    "are you connected with any bank",
+    "banking fees 200",
+    "show privacy policy",
+    "how much does it cost",
+    "showdo i log",
+    "how to logging",
+    "who made you",
+    "spent 500 on lunch",
+    "",
+    "   ",
+    "💰💰",
+]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_matches_linear_scan(text):
+    assert match_faq_or_smalltalk(text) == _match_faq_or_smalltalk_linear(text)
+
+
+def test_earlier_intent_wins_over_later_keyword_position():
+    # "privacy" (data security) is listed before "terms" (privacy policy and terms)
+    assert match_faq_or_smalltalk("terms and privacy") == FAQ_JSON["faq"]["is my financial data secure"]
+
+
+def test_single_word_keywords_need_whole_words():
+    assert match_faq_or_smalltalk("this") is None
+    assert match_faq_or_smalltalk("hi there") == FAQ_JSON["smalltalk"]["hi"]
+
+
+def test_random_corpus_parity():
+    keywords = [k for keywords in INTENT_KEYWORDS.values() for k in keywords]
+    filler = "lunch 500 taka spent on coffee this the is my how do i what ok thanks and".split()
+    rng = random.Random(3)
+    for _ in range(5000):
+        parts = [rng.choice(filler if rng.random() < 0.7 else keywords) for _ in range(rng.randint(1, 6))]
+        text = " ".join(parts)
+        if rng.random() < 0.3:
+            text = text.replace(" ", "", 1)
+        assert match_faq_or_smalltalk(text) == _match_faq_or_smalltalk_linear(text), text
@@ -1,5 +1,6 @@
 """Test suite for Redis Job Queue implementation"""
 import json
+import threading
 import time
 import uuid
 from unittest.mock import Mock, patch
@@ -10,7 +11,7 @@ from utils.circuit_breaker import CircuitBreaker
 from utils.job_processor import JobProcessor
 
 # Import modules to test
-from utils.job_queue import Job, JobQueue
+from utils.job_queue import Job, JobConsumerPool, JobQueue
 from utils.rate_limiter_jobs import RateLimitResult, get_job_rate_limiter
 
 
@@ -41,13 +42,13 @@ class TestJob:
 class TestJobQueue:
     """Test JobQueue implementation with Redis mocking"""
     
-    @patch('utils.job_queue.redis')
+    @patch('utils.job_queue.redis_pool')
     @patch('utils.job_queue.os.getenv')
     def test_init_with_redis_available(self, mock_getenv, mock_redis_module):
         """Test JobQueue initialization when Redis is available"""
         mock_getenv.return_value = "redis://localhost:6379"
         mock_redis_client = Mock()
-        mock_redis_module.from_url.return_value = mock_redis_client
+        mock_redis_module.get_client.return_value = mock_redis_client
         mock_redis_client.ping.return_value = True
         
         queue = JobQueue()
@@ -56,7 +57,7 @@ class TestJobQueue:
         assert queue.redis_client == mock_redis_client
         mock_redis_client.ping.assert_called_once()
     
-    @patch('utils.job_queue.redis')
+    @patch('utils.job_queue.redis_pool')
     @patch('utils.job_queue.os.getenv')
     def test_init_without_redis(self, mock_getenv, mock_redis_module):
         """Test JobQueue initialization when Redis is unavailable"""
@@ -67,13 +68,13 @@ class TestJobQueue:
         assert queue.redis_available is False
         assert queue.redis_client is None
     
-    @patch('utils.job_queue.redis')
+    @patch('utils.job_queue.redis_pool')
     @patch('utils.job_queue.os.getenv')
     def test_init_redis_connection_error(self, mock_getenv, mock_redis_module):
         """Test JobQueue initialization when Redis connection fails"""
         mock_getenv.return_value = "redis://localhost:6379"
         mock_redis_client = Mock()
-        mock_redis_module.from_url.return_value = mock_redis_client
+        mock_redis_module.get_client.return_value = mock_redis_client
         mock_redis_client.ping.side_effect = Exception("Connection failed")
         
         queue = JobQueue()
@@ -81,7 +82,7 @@ class TestJobQueue:
         assert queue.redis_available is False
         assert queue.redis_client is None
     
-    @patch('utils.job_queue.redis')
+    @patch('utils.job_queue.redis_pool')
     @patch('utils.job_queue.os.getenv')
     def test_enqueue_redis_unavailable(self, mock_getenv, mock_redis_module):
         """Test job enqueue when Redis is unavailable"""
@@ -92,7 +93,7 @@ class TestJobQueue:
         with pytest.raises(RuntimeError, match="Redis job queue not available"):
             queue.enqueue("ai_analysis", {"text": "test"}, "user-123", "key-456")
     
-    @patch('utils.job_queue.redis')
+    @patch('utils.job_queue.redis_pool')
     @patch('utils.job_queue.os.getenv')
     @patch('utils.job_queue.uuid.uuid4')
     @patch('utils.job_queue.time.time')
@@ -101,7 +102,7 @@ class TestJobQueue:
         # Setup mocks
         mock_getenv.return_value = "redis://localhost:6379"
         mock_redis_client = Mock()
-        mock_redis_module.from_url.return_value = mock_redis_client
+        mock_redis_module.get_client.return_value = mock_redis_client
         mock_redis_client.ping.return_value = True
         mock_uuid.return_value = Mock(spec=uuid.UUID)
         mock_uuid.return_value.__str__ = Mock(return_value="job-123")
@@ -120,20 +121,20 @@ class TestJobQueue:
         assert mock_redis_client.set.call_count >= 1
         assert mock_redis_client.lpush.call_count == 1
     
-    @patch('utils.job_queue.redis')
+    @patch('utils.job_queue.redis_pool')
     @patch('utils.job_queue.os.getenv')
     def test_health_check_redis_available(self, mock_getenv, mock_redis_module):
         """Test health check when Redis is available"""
         mock_getenv.return_value = "redis://localhost:6379"
         mock_redis_client = Mock()
-        mock_redis_module.from_url.return_value = mock_redis_client
+        mock_redis_module.get_client.return_value = mock_redis_client
         mock_redis_client.ping.return_value = True
         
         queue = JobQueue()
         
         assert queue.health_check() is True
     
-    @patch('utils.job_queue.redis')
+    @patch('utils.job_queue.redis_pool')
     @patch('utils.job_queue.os.getenv')
     def test_health_check_redis_unavailable(self, mock_getenv, mock_redis_module):
         """Test health check when Redis is unavailable"""
@@ -342,14 +343,14 @@ class TestJobProcessor:
 class TestIntegration:
     """Integration tests for the complete job queue system"""
     
-    @patch('utils.job_queue.redis')
+    @patch('utils.job_queue.redis_pool')
     @patch('utils.job_queue.os.getenv')
     def test_full_job_lifecycle_mock(self, mock_getenv, mock_redis_module):
         """Test complete job lifecycle with mocked Redis"""
         # Setup Redis mock
         mock_getenv.return_value = "redis://localhost:6379"
         mock_redis_client = Mock()
-        mock_redis_module.from_url.return_value = mock_redis_client
+        mock_redis_module.get_client.return_value = mock_redis_client
         mock_redis_client.ping.return_value = True
         
         # Mock Redis operations for enqueue
@@ -412,5 +413,199 @@ class TestIntegration:
             assert result.allowed is True
 
 
+
+@pytest.fixture
+def fake_queue(monkeypatch):
+    """JobQueue on an in-memory Redis (fakeredis with Lua support)"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    monkeypatch.setenv("JOB_TYPE_CONCURRENCY", "analysis=2")
+    queue = JobQueue()
+    queue.redis_client = fakeredis.FakeRedis(decode_responses=True)
+    queue.redis_available = True
+    return queue
+
+
+class TestReliableConsumer:
+    """Visibility leases, atomic retry promotion and the consumer pool"""
+    
+    def test_dequeue_batch_moves_jobs_to_processing(self, fake_queue):
+        ids = [fake_queue.enqueue("analysis", {"n": i}, "user-1", f"key-{i}") for i in range(3)]
+        
+        jobs = fake_queue.dequeue_batch("analysis", "worker-a", max_jobs=2, timeout=0.1)
+        
+        assert [job.job_id for job in jobs] == ids[:2]
+        assert all(job.status == "running" and job.attempts == 1 for job in jobs)
+        assert fake_queue.redis_client.lrange("jobs:processing:worker-a", 0, -1) == ids[:2]
+        assert fake_queue.get_queue_stats()["in_flight"] == 2
+        assert fake_queue.get_queue_stats()["queued"] == 1
+    
+    def test_job_types_route_to_their_queues(self, fake_queue):
+        fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+        other = fake_queue.enqueue("daily_goal_analysis", {}, "user-1", "key-b")
+        
+        assert fake_queue.redis_client.llen("jobs:queue:analysis") == 1
+        assert fake_queue.dequeue(None, "worker-a", timeout=0.1).job_id == other
+    
+    def test_complete_job_acks(self, fake_queue):
+        job_id = fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+        fake_queue.dequeue("analysis", "worker-a", timeout=0.1)
+        
+        fake_queue.complete_job(job_id, True, result_path="results/a.json")
+        
+        assert fake_queue.redis_client.llen("jobs:processing:worker-a") == 0
+        assert fake_queue.get_queue_stats()["in_flight"] == 0
+        assert fake_queue.get_job_status(job_id)["status"] == "succeeded"
+    
+    def test_expired_lease_is_redelivered(self, fake_queue):
+        job_id = fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+        fake_queue.visibility_timeout = -1  # lease is already expired
+        fake_queue.dequeue("analysis", "crashed-worker", timeout=0.1)
+        
+        assert fake_queue.reclaim_expired() == [job_id]
+        assert fake_queue.redis_client.llen("jobs:processing:crashed-worker") == 0
+        
+        fake_queue.visibility_timeout = 300
+        job = fake_queue.dequeue("analysis", "worker-b", timeout=0.1)
+        assert job.job_id == job_id
+        assert job.attempts == 2
+    
+    def test_repeatedly_reclaimed_job_goes_to_dlq(self, fake_queue):
+        job_id = fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+        fake_queue.visibility_timeout = -1
+        for _ in range(fake_queue.max_attempts):
+            assert fake_queue.dequeue("analysis", "crashy", timeout=0.1) is not None
+            fake_queue.reclaim_expired()
+        
+        assert fake_queue.dequeue("analysis", "crashy", timeout=0.1) is None
+        assert fake_queue.get_job_status(job_id)["status"] == "failed"
+        assert fake_queue.get_queue_stats()["dlq"] == 1
+    
+    def test_recover_consumer_requeues_unleased_leftovers(self, fake_queue):
+        job_id = fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+        # Claimed but the consumer died before leasing it
+        fake_queue.redis_client.lmove("jobs:queue:analysis", "jobs:processing:worker-a", "LEFT", "RIGHT")
+        
+        assert fake_queue.recover_consumer("worker-a") == 1
+        assert fake_queue.redis_client.lrange("jobs:queue:analysis", 0, -1) == [job_id]
+        assert fake_queue.get_queue_stats()["in_flight"] == 0
+    
+    def test_recover_consumer_leaves_live_leases(self, fake_queue):
+        job_id = fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+        fake_queue.dequeue("analysis", "worker-a", timeout=0.1)
+        
+        assert fake_queue.recover_consumer("worker-a") == 0
+        assert fake_queue.redis_client.lrange("jobs:processing:worker-a", 0, -1) == [job_id]
+    
+    def test_only_dead_consumers_are_recovered(self, fake_queue):
+        alive = fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+        dead = fake_queue.enqueue("analysis", {}, "user-2", "key-b")
+        for consumer_id in ("worker-alive", "worker-dead"):
+            fake_queue.redis_client.lmove("jobs:queue:analysis", f"jobs:processing:{consumer_id}", "LEFT", "RIGHT")
+        fake_queue.heartbeat(["worker-alive", "worker-dead"])
+        fake_queue.redis_client.zadd("jobs:consumers", {"worker-dead": 0})  # heartbeat lapsed
+        
+        assert fake_queue.recover_dead_consumers() == 1
+        assert fake_queue.recover_dead_consumers() == 0
+        assert fake_queue.redis_client.lrange("jobs:queue:analysis", 0, -1) == [dead]
+        assert fake_queue.redis_client.lrange("jobs:processing:worker-alive", 0, -1) == [alive]
+        assert fake_queue.redis_client.zrange("jobs:consumers", 0, -1) == ["worker-alive"]
+    
+    def test_sibling_pools_do_not_steal_in_flight_jobs(self, fake_queue):
+        job_id = fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+        started = threading.Event()
+        release = threading.Event()
+        
+        def slow_handler(job):
+            started.set()
+            release.wait(5)
+            fake_queue.complete_job(job.job_id, True)
+            return True
+        
+        first = JobConsumerPool(fake_queue, slow_handler, maintenance_interval=0.05)
+        second = JobConsumerPool(fake_queue, lambda job: True, maintenance_interval=0.05)
+        first.block_timeout = second.block_timeout = 0.1
+        first.start()
+        try:
+            assert started.wait(5)
+            second.start()  # a sibling gunicorn worker booting on the same host
+            assert not set(first._consumer_ids) & set(second._consumer_ids)
+            assert fake_queue.redis_client.llen("jobs:queue:analysis") == 0
+            release.set()
+        finally:
+            release.set()
+            second.stop()
+            first.stop()
+        
+        assert fake_queue.get_job_status(job_id)["attempts"] == 1
+        assert fake_queue.redis_client.zcard("jobs:consumers") == 0
+    
+    def test_retry_promotion_is_atomic_and_keeps_queue(self, fake_queue):
+        job_id = fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+        fake_queue.dequeue("analysis", "worker-a", timeout=0.1)
+        fake_queue.complete_job(job_id, False, error="boom")
+        fake_queue.redis_client.zadd("jobs:retry", {job_id: 0})  # make it due now
+        
+        assert fake_queue.process_retry_queue() == [job_id]
+        assert fake_queue.process_retry_queue() == []
+        assert fake_queue.redis_client.lrange("jobs:queue:analysis", 0, -1) == [job_id]
+    
+    def test_release_job_keeps_attempts(self, fake_queue):
+        job_id = fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+        fake_queue.dequeue("analysis", "worker-a", timeout=0.1)
+
+        fake_queue.release_job(job_id)
+
+        status = fake_queue.get_job_status(job_id)
+        assert status["attempts"] == 0
+        assert status["status"] == "queued"
+        assert fake_queue.get_queue_stats()["in_flight"] == 0
+        assert fake_queue.redis_client.zscore("jobs:retry", job_id) is not None
+
+    def test_saturated_executor_sheds_without_failing(self, fake_queue, monkeypatch):
+        from utils import background_processor
+        from utils.keyed_executor import ExecutorSaturated
+
+        monkeypatch.setattr(background_processor, "job_queue", fake_queue)
+        processor = Mock(message_executor=Mock(submit=Mock(side_effect=ExecutorSaturated("shard 0 queue full"))))
+        job_id = fake_queue.enqueue("analysis", {}, "user-1", "key-a")
+
+        for _ in range(fake_queue.max_attempts + 1):
+            job = fake_queue.dequeue("analysis", "worker-a", timeout=0.1)
+            assert job is not None
+            assert background_processor.BackgroundProcessor._process_redis_job_in_order(processor, job) is False
+            assert fake_queue.get_job_status(job_id)["attempts"] == 0
+            fake_queue.redis_client.zadd("jobs:retry", {job_id: 0})  # make it due now
+            fake_queue.process_retry_queue()
+
+        assert fake_queue.get_queue_stats()["dlq"] == 0
+
+    def test_consumer_pool_processes_all_jobs(self, fake_queue):
+        ids = {fake_queue.enqueue("analysis", {"n": i}, "user-1", f"key-{i}") for i in range(10)}
+        done = set()
+        lock = threading.Lock()
+        
+        def handler(job):
+            fake_queue.complete_job(job.job_id, True)
+            with lock:
+                done.add(job.job_id)
+            return True
+        
+        pool = JobConsumerPool(fake_queue, handler, batch_size=3, maintenance_interval=0.05)
+        pool.block_timeout = 0.1
+        pool.start()
+        try:
+            deadline = time.time() + 5
+            while len(done) < len(ids) and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            pool.stop()
+        
+        assert done == ids
+        assert pool.get_stats()["processed"] == 10
+        assert fake_queue.get_queue_stats()["in_flight"] == 0
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Per-user ordered executor
+Same-key jobs run in submit order, different keys in parallel, full shards shed
+"""
+import threading
+import time
+
+import pytest
+
+from utils.keyed_executor import ExecutorSaturated, KeyedExecutor
+
+
+@pytest.fixture
+def executor():
+    pool = KeyedExecutor(num_shards=4, max_queue_per_shard=8)
+    yield pool
+    pool.shutdown(wait=True, timeout=5)
+
+
+def _keys_on_different_shards(pool):
+    first = "user_0"
+    for i in range(1, 100):
+        key = f"user_{i}"
+        if pool.shard_for(key) != pool.shard_for(first):
+            return first, key
+    raise AssertionError("no second shard found")
+
+
+class TestKeyedExecutor:
+    """Ordering, parallelism and backpressure"""
+
+    def test_same_key_runs_in_order(self, executor):
+        seen = []
+
+        def job(i):
+            time.sleep(0.001 * (5 - i % 5))  # later jobs are faster
+            seen.append(i)
+
+        futures = [executor.submit("user_a", job, i) for i in range(8)]
+        for future in futures:
+            future.result(timeout=5)
+        assert seen == list(range(8))
+
+    def test_different_keys_run_in_parallel(self, executor):
+        key_a, key_b = _keys_on_different_shards(executor)
+        release = threading.Event()
+        started_b = threading.Event()
+
+        executor.submit(key_a, release.wait, 5)
+        executor.submit(key_b, started_b.set)
+        assert started_b.wait(2), "a blocked user stalled another user's shard"
+        release.set()
+
+    def test_full_shard_sheds(self):
+        pool = KeyedExecutor(num_shards=1, max_queue_per_shard=2, shed_threshold=0.5)
+        release = threading.Event()
+        try:
+            running = threading.Event()
+            pool.submit("user_a", lambda: (running.set(), release.wait(5)))
+            assert running.wait(2)
+            pool.submit("user_a", lambda: None)
+            pool.submit("user_a", lambda: None)
+            assert pool.is_overloaded()
+            with pytest.raises(ExecutorSaturated):
+                pool.submit("user_b", lambda: None)
+
+            stats = pool.get_stats()
+            assert stats["queue_depth"] == 2
+            assert stats["shed_total"] == 1
+            assert stats["shards"][0]["busy"] is True
+        finally:
+            release.set()
+            pool.shutdown(wait=True, timeout=5)
+
+    def test_failures_are_counted_and_isolated(self, executor):
+        def boom():
+            raise ValueError("bad message")
+
+        failed = executor.submit("user_a", boom)
+        ok = executor.submit("user_a", lambda: "done")
+        with pytest.raises(ValueError):
+            failed.result(timeout=5)
+        assert ok.result(timeout=5) == "done"
+
+        shard = executor.shard_for("user_a")
+        stats = executor.get_stats()["shards"][shard]
+        assert stats["failed"] == 1
+        assert stats["completed"] == 1
@@ -0,0 +1,103 @@
+"""
+Latency histogram registry
+Log-bucketed quantiles, per-thread shards, stage traces and Prometheus export
+"""
+import os
+import threading
+
+import pytest
+
+from finbrain.ops.perf import HistogramRegistry, HistogramSnapshot, LatencyMonitor, mark_stage, stage_trace
+
+
+class TestLatencyHistogram:
+    """Recording, merging and querying"""
+
+    def test_quantiles_within_bucket_error(self):
+        registry = HistogramRegistry()
+        for ms in range(1, 1001):
+            registry.record("web", "total", "ok", float(ms))
+
+        quantiles = registry.quantiles("web", "total")
+        for name, exact in (("p50", 500), ("p90", 900), ("p99", 990), ("p999", 999)):
+            assert exact <= quantiles[name] <= exact * 1.1
+
+    def test_quantile_capped_at_max(self):
+        registry = HistogramRegistry()
+        for _ in range(10):
+            registry.record("web", "total", "ok", 100.0)
+        assert registry.combined().quantile(0.999) == 100.0
+
+    def test_threads_record_into_own_shards(self):
+        registry = HistogramRegistry()
+
+        def work():
+            for _ in range(1000):
+                registry.record("fb", "parse", "pass", 5.0)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert registry.combined("fb", "parse").count == 4000
+
+    def test_snapshots_merge_across_workers(self):
+        worker_a, worker_b = HistogramRegistry(), HistogramRegistry()
+        worker_a.record("web", "total", "ok", 10.0)
+        worker_b.record("web", "total", "ok", 1000.0)
+
+        shipped = HistogramSnapshot.from_dict(worker_b.combined().to_dict())
+        merged = worker_a.combined().merge(shipped)
+        assert merged.count == 2
+        assert merged.max == 1000.0
+        assert merged.quantile(0.99) == 1000.0
+
+    def test_stage_trace_records_each_stage(self):
+        registry = HistogramRegistry()
+        with stage_trace("web", registry) as trace:
+            mark_stage("faq_guardrail")
+            mark_stage("routing_policy")
+            trace.finish("SUMMARY")
+
+        keys = set(registry.snapshot())
+        assert keys == {
+            ("web", "entry", "pass"),
+            ("web", "faq_guardrail", "pass"),
+            ("web", "routing_policy", "SUMMARY"),
+            ("web", "total", "SUMMARY"),
+        }
+
+    def test_stage_trace_marks_errors(self):
+        registry = HistogramRegistry()
+        with pytest.raises(ValueError):
+            with stage_trace("web", registry):
+                raise ValueError("boom")
+        assert ("web", "total", "error") in registry.snapshot()
+        mark_stage("outside")  # No active trace: ignored
+        assert registry.combined().count == 2
+
+    def test_prometheus_export(self):
+        registry = HistogramRegistry()
+        registry.record("web", "total", "ok", 3.0)
+        registry.record("web", "total", "ok", 40.0)
+        text = registry.to_prometheus()
+
+        labels = f'route="web",stage="total",outcome="ok",pid="{os.getpid()}"'
+        assert "# TYPE finbrain_stage_latency_seconds histogram" in text
+        assert f'finbrain_stage_latency_seconds_bucket{{{labels},le="0.005"}} 1' in text
+        assert f'finbrain_stage_latency_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+        assert f"finbrain_stage_latency_seconds_count{{{labels}}} 2" in text
+        assert f'finbrain_stage_latency_seconds_quantile{{{labels},quantile="0.99"}} 0.040000' in text
+
+    def test_monitor_clear_keeps_other_series(self):
+        registry = HistogramRegistry()
+        monitor = LatencyMonitor("router", "e2e", registry)
+        monitor.record(12.0)
+        registry.record("web", "total", "ok", 40.0)
+
+        monitor.clear()
+
+        assert monitor.count() == 0
+        assert registry.combined("web", "total").count == 1
@@ -0,0 +1,101 @@
+"""
+Message rate limiter backends
+Counters are kept off the database and only written back periodically
+"""
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from utils import rate_limiter
+from utils.rate_limiter import (
+    DAILY_MESSAGE_LIMIT,
+    HOURLY_MESSAGE_LIMIT,
+    InProcRateLimitBackend,
+    check_rate_limit,
+    get_rate_limit_status,
+    set_rate_limit_backend,
+)
+
+DAY = date(2025, 9, 1)
+HOUR = datetime(2025, 9, 1, 10)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "RATE_LIMIT_FLUSH_SEC", 10 ** 9)
+    backend = InProcRateLimitBackend(stripes=4)
+    set_rate_limit_backend(backend)
+    yield backend
+    set_rate_limit_backend(None)
+
+
+def test_hourly_limit_blocks_until_next_hour(backend):
+    for _ in range(HOURLY_MESSAGE_LIMIT):
+        assert backend.hit("u1", "messenger", DAY, HOUR).allowed
+
+    blocked = backend.hit("u1", "messenger", DAY, HOUR)
+    assert not blocked.allowed
+    assert blocked.reason == "hourly"
+    assert blocked.hourly_count == HOURLY_MESSAGE_LIMIT
+
+    assert backend.hit("u1", "messenger", DAY, HOUR + timedelta(hours=1)).allowed
+
+
+def test_daily_limit_spans_hours(backend):
+    hour = HOUR
+    for _ in range(DAILY_MESSAGE_LIMIT):
+        if not backend.hit("u1", "messenger", DAY, hour).allowed:
+            hour += timedelta(hours=1)
+            assert backend.hit("u1", "messenger", DAY, hour).allowed
+
+    blocked = backend.hit("u1", "messenger", DAY, hour + timedelta(hours=1))
+    assert not blocked.allowed
+    assert blocked.reason == "daily"
+    assert backend.hit("u1", "messenger", DAY + timedelta(days=1), hour).allowed
+
+
+def test_users_and_platforms_are_independent(backend):
+    for _ in range(HOURLY_MESSAGE_LIMIT):
+        backend.hit("u1", "messenger", DAY, HOUR)
+
+    assert backend.hit("u2", "messenger", DAY, HOUR).allowed
+    assert backend.hit("u1", "pwa", DAY, HOUR).allowed
+
+
+def test_concurrent_hits_never_exceed_limit(backend):
+    results = []
+
+    def worker():
+        for _ in range(5):
+            results.append(backend.hit("u1", "messenger", DAY, HOUR).allowed)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(results) == HOURLY_MESSAGE_LIMIT
+
+
+def test_purge_drops_previous_days(backend):
+    backend.hit("u1", "messenger", DAY, HOUR)
+    backend.purge(DAY + timedelta(days=1))
+    assert backend.peek("u1", "messenger", DAY, HOUR) is None
+
+
+def test_check_rate_limit_and_status_share_counters(backend):
+    assert check_rate_limit("psid-1", "messenger")
+    assert check_rate_limit("psid-1", "messenger")
+
+    status = get_rate_limit_status("psid-1", "messenger")
+    assert status["hourly_used"] == 2
+    assert status["hourly_remaining"] == HOURLY_MESSAGE_LIMIT - 2
+    assert len(rate_limiter._pending) == 1
+
+
+def test_status_for_unknown_user(backend):
+    status = get_rate_limit_status("psid-unknown", "messenger")
+    assert status["daily_remaining"] == DAILY_MESSAGE_LIMIT
+    assert "daily_used" not in status
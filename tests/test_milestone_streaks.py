@@ -0,0 +1,102 @@
+"""
+Milestone streak engine
+Streak counters are maintained by add_expense and read in a single query
+"""
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import backend_assistant as ba
+from app import app as flask_app
+from app import db
+from handlers.milestones import _calculate_streak_days, recompute_all_streaks
+from models import Expense, User
+
+USER_HASH = "streak_engine_test_user"
+
+
+@pytest.fixture
+def app_ctx():
+    with flask_app.app_context():
+        db.create_all()
+        yield
+        db.session.rollback()
+        Expense.query.filter_by(user_id_hash=USER_HASH).delete()
+        User.query.filter_by(user_id_hash=USER_HASH).delete()
+        db.session.commit()
+
+
+def _log(description, message_id):
+    return ba.add_expense(
+        user_id=USER_HASH, amount_minor=10000, currency="BDT", category="food",
+        description=description, source="chat", message_id=message_id
+    )
+
+
+def _backdate_all(days):
+    for expense in Expense.query.filter_by(user_id_hash=USER_HASH).all():
+        expense.created_at = expense.created_at - timedelta(days=days)
+    db.session.commit()
+
+
+def _count_queries(fn):
+    statements = []
+
+    def on_execute(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", on_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", on_execute)
+    return result, len(statements)
+
+
+class TestStreakEngine:
+    """Incremental streak counters and bulk repair"""
+
+    def test_add_expense_maintains_counters(self, app_ctx):
+        _log("lunch 100", "streak-m1")
+        _log("tea 100", "streak-m2")
+
+        user = User.query.filter_by(user_id_hash=USER_HASH).first()
+        db.session.refresh(user)
+        assert user.consecutive_days == 1
+        assert user.last_log_date == datetime.now(UTC).date()
+
+    def test_consecutive_day_extends_streak(self, app_ctx):
+        _log("lunch 100", "streak-m1")
+        user = User.query.filter_by(user_id_hash=USER_HASH).first()
+        user.last_log_date = user.last_log_date - timedelta(days=1)
+        user.consecutive_days = 2
+        db.session.commit()
+
+        _log("dinner 100", "streak-m2")
+        db.session.refresh(user)
+        assert user.consecutive_days == 3
+
+    def test_streak_is_single_query(self, app_ctx):
+        _log("lunch 100", "streak-m1")
+        streak, queries = _count_queries(lambda: _calculate_streak_days(USER_HASH))
+        assert streak == 1
+        assert queries == 1
+
+    def test_recompute_all_streaks(self, app_ctx):
+        _log("lunch 100", "streak-m1")
+        _backdate_all(1)
+        _log("dinner 100", "streak-m2")
+        _backdate_all(1)
+        _log("breakfast 100", "streak-m3")
+
+        user = User.query.filter_by(user_id_hash=USER_HASH).first()
+        user.consecutive_days = 0
+        user.last_log_date = None
+        db.session.commit()
+
+        assert recompute_all_streaks() >= 1
+        db.session.refresh(user)
+        assert user.consecutive_days == 3
+        assert user.last_log_date == datetime.now(UTC).date()
+        assert _calculate_streak_days(USER_HASH) == 3
@@ -0,0 +1,124 @@
+"""
+Batch precedence resolution
+get_effective_views resolves many transactions in three queries and the view
+cache is dropped when a user's corrections or rules change
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import app as flask_app
+from app import db
+from models_pca import TransactionEffective, UserCorrection, UserRule, generate_pca_id
+from utils.precedence_engine import PrecedenceEngine, precedence_engine
+
+USER_ID = "precedence_batch_test_user"
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setenv("PCA_OVERLAY_ENABLED", "true")
+    with flask_app.app_context():
+        db.create_all()
+        precedence_engine.clear_cache()
+        yield precedence_engine
+        db.session.rollback()
+        for model in (UserCorrection, UserRule, TransactionEffective):
+            db.session.query(model).filter_by(user_id=USER_ID).delete()
+        db.session.commit()
+        precedence_engine.clear_cache()
+
+
+def _effective(tx_id, category):
+    db.session.add(TransactionEffective(
+        tx_id=tx_id, user_id=USER_ID, amount=100, category=category,
+        transaction_date=date.today(), decided_by="ai_auto", raw_expense_id=1
+    ))
+
+
+def _correction(tx_id, category):
+    db.session.add(UserCorrection(
+        corr_id=generate_pca_id("corr"), tx_id=tx_id, user_id=USER_ID,
+        fields_json={"category": category}, correction_type="manual"
+    ))
+
+
+def _rule(text, category):
+    db.session.add(UserRule(
+        rule_id=generate_pca_id("rule"), user_id=USER_ID,
+        pattern_json={"store_name_contains": text}, rule_set_json={"category": category}
+    ))
+
+
+def _count_queries(fn):
+    statements = []
+
+    def on_execute(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", on_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", on_execute)
+    return result, len(statements)
+
+
+class TestBatchPrecedence:
+    """Batch API, precedence order and cache invalidation"""
+
+    def test_batch_matches_single_view_order(self, engine):
+        _effective("tx_a", "bills")
+        _effective("tx_b", "bills")
+        _effective("tx_c", "bills")
+        _correction("tx_a", "health")
+        _rule("starbucks", "coffee")
+        db.session.commit()
+
+        raw = {
+            "tx_a": {"category": "food", "merchant_text": "starbucks", "amount": 100},
+            "tx_b": {"category": "food", "merchant_text": "starbucks", "amount": 100},
+            "tx_c": {"category": "food", "merchant_text": "corner shop", "amount": 100},
+            "tx_d": {"category": "food", "merchant_text": "corner shop", "amount": 100},
+        }
+        views, queries = _count_queries(lambda: engine.get_effective_views(USER_ID, list(raw), raw))
+
+        assert [views[tx].source for tx in raw] == ["correction", "rule", "effective", "raw"]
+        assert views["tx_a"].category == "health"
+        assert views["tx_b"].category == "coffee"
+        assert queries == 3
+
+        engine.clear_cache()
+        for tx_id, expense in raw.items():
+            single = PrecedenceEngine().get_effective_view(USER_ID, tx_id, expense)
+            assert single == views[tx_id]
+
+    def test_cached_views_skip_queries(self, engine):
+        _effective("tx_a", "bills")
+        db.session.commit()
+
+        engine.get_effective_views(USER_ID, ["tx_a"])
+        views, queries = _count_queries(lambda: engine.get_effective_views(USER_ID, ["tx_a"]))
+        assert views["tx_a"].category == "bills"
+        assert queries == 0
+
+    def test_correction_write_invalidates_user(self, engine):
+        _effective("tx_a", "bills")
+        db.session.commit()
+        assert engine.get_effective_view(USER_ID, "tx_a").source == "effective"
+
+        _correction("tx_a", "health")
+        db.session.commit()
+        view = engine.get_effective_view(USER_ID, "tx_a")
+        assert view.source == "correction"
+        assert view.category == "health"
+        assert engine.cache_stats["invalidations"] >= 1
+
+    def test_cache_is_bounded(self):
+        engine = PrecedenceEngine()
+        engine.max_entries = 2
+        for i in range(5):
+            engine._cache_put(f"{USER_ID}:tx_{i}", engine._raw_fallback(None))
+        assert list(engine.cache) == [f"{USER_ID}:tx_3", f"{USER_ID}:tx_4"]
+        assert engine.cache_stats["evictions"] == 3
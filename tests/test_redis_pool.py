@@ -0,0 +1,98 @@
+"""
+Shared Redis pool
+URL clean-up, failover cool-down, timed commands and single round-trip helpers
+"""
+import pytest
+
+from finbrain.ops import perf
+from utils import redis_pool
+
+redis = pytest.importorskip("redis")
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    """Shared pool backed by an in-memory fakeredis server"""
+    server = fakeredis.FakeServer()
+    connection_class = getattr(fakeredis, "FakeRedisConnection", None) or fakeredis.FakeConnection
+    monkeypatch.setenv("REDIS_URL", "redis://fake:6379")
+    monkeypatch.setattr(redis_pool, "_build_pool", lambda url, decode_responses: redis.ConnectionPool(
+        connection_class=connection_class, server=server, decode_responses=decode_responses))
+    redis_pool.reset()
+    yield server
+    redis_pool.reset()
+
+
+class TestUrlNormalization:
+    """REDIS_URL values as platforms provide them"""
+
+    @pytest.mark.parametrize("raw, expected", [
+        ("redis://host:6379/0", "redis://host:6379/0"),
+        ("REDIS_URL=redis://host:6379", "redis://host:6379"),
+        ('"rediss://user:pw@host:6380"', "rediss://user:pw@host:6380"),
+        ("host:6379", "redis://host:6379"),
+        ("rediss:6379", "redis://localhost:6379"),
+        (None, None),
+    ])
+    def test_normalize(self, raw, expected):
+        assert redis_pool.normalize_redis_url(raw) == expected
+
+
+class TestSharedPool:
+    """One client per decoding, shared by every caller"""
+
+    def test_clients_are_shared_and_timed(self, fake_pool):
+        client = redis_pool.get_client()
+        assert redis_pool.get_client() is client
+        assert redis_pool.get_client(decode_responses=True) is not client
+
+        perf.registry.clear()
+        client.set("k", "v")
+        pipe = client.pipeline()
+        pipe.get("k")
+        pipe.get("k")
+        assert pipe.execute() == [b"v", b"v"]
+
+        keys = set(perf.registry.snapshot())
+        assert ("redis", "set", "ok") in keys
+        assert ("redis", "pipeline", "ok") in keys
+
+    def test_unconfigured_returns_none(self, monkeypatch):
+        monkeypatch.delenv("REDIS_URL", raising=False)
+        redis_pool.reset()
+        assert redis_pool.get_client() is None
+        assert redis_pool.ping() is False
+
+    def test_failure_cools_down_then_recovers(self, fake_pool, monkeypatch):
+        assert redis_pool.get_client() is not None
+        redis_pool.report_failure(redis.ConnectionError("reset by peer"))
+        assert redis_pool.get_client() is None
+        assert redis_pool.get_stats()["failovers"] == 1
+
+        monkeypatch.setattr(redis_pool, "_down_until", 0.0)
+        assert redis_pool.ping() is True
+
+    def test_non_connection_errors_do_not_fail_over(self, fake_pool):
+        redis_pool.get_client()
+        redis_pool.report_failure(redis.ResponseError("WRONGTYPE"))
+        assert redis_pool.get_client() is not None
+
+
+class TestBatchedHelpers:
+    """Multi-key work in single round-trips"""
+
+    def test_incr_with_ttl_sets_ttl_once(self, fake_pool):
+        client = redis_pool.get_client()
+        assert redis_pool.incr_with_ttl(client, "c", 60) == 1
+        client.expire("c", 30)
+        assert redis_pool.incr_with_ttl(client, "c", 60) == 2
+        assert client.ttl("c") <= 30
+
+    def test_many_helpers(self, fake_pool):
+        client = redis_pool.get_client(decode_responses=True)
+        redis_pool.set_many(client, {"a": 1, "b": 2}, ttl_seconds=10)
+        assert redis_pool.get_many(client, ["a", "b", "missing"]) == {"a": "1", "b": "2"}
+        assert 0 < client.ttl("a") <= 10
+        assert redis_pool.delete_many(client, ["a", "b"]) == 2
+        assert redis_pool.get_many(client, []) == {}
@@ -0,0 +1,96 @@
+"""
+Bulk reminder dispatcher
+Due reminders are paged by id, sent through a bounded pool and committed per page
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app as flask_app
+from app import db
+from models import User
+from utils.smart_reminders import ReminderDispatcher
+
+PREFIX = "reminder_dispatch_user_"
+
+
+@pytest.fixture
+def app_ctx():
+    with flask_app.app_context():
+        db.create_all()
+        yield
+        db.session.rollback()
+        User.query.filter(User.user_id_hash.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def _due_users(now, count, stale_every=0):
+    for i in range(count):
+        hours_since_message = 30 if stale_every and i % stale_every == 0 else 2
+        db.session.add(User(
+            user_id_hash=f"{PREFIX}{i}",
+            platform="pwa",
+            reminder_scheduled_for=now - timedelta(minutes=1),
+            reminder_preference="daily",
+            last_user_message_at=now - timedelta(hours=hours_since_message)
+        ))
+    db.session.commit()
+
+
+def _ours():
+    return User.query.filter(User.user_id_hash.like(f"{PREFIX}%"))
+
+
+class TestReminderDispatcher:
+    """Paging, per-send failures and timeouts"""
+
+    def test_pages_through_all_due_users(self, app_ctx):
+        now = datetime.utcnow()
+        _due_users(now, 25, stale_every=5)
+        sent = []
+
+        stats = ReminderDispatcher(
+            send_fn=lambda user, _: sent.append(user.user_id_hash) or True,
+            batch_size=10, max_workers=4
+        ).dispatch(now)
+
+        assert stats["batches"] == 3
+        assert stats["sent"] == 20
+        assert stats["skipped_window"] == 5
+        assert len(set(sent)) == 20
+        assert _ours().filter(User.reminder_scheduled_for.isnot(None)).count() == 0
+        assert _ours().filter(User.last_reminder_sent == now).count() == 20
+
+    def test_failed_send_stays_scheduled(self, app_ctx):
+        now = datetime.utcnow()
+        _due_users(now, 3)
+
+        def send(user, _):
+            if user.user_id_hash.endswith("_1"):
+                raise RuntimeError("send failed")
+            return True
+
+        stats = ReminderDispatcher(send_fn=send, batch_size=10).dispatch(now)
+
+        assert stats["sent"] == 2
+        assert stats["errors"] == 1
+        remaining = _ours().filter(User.reminder_scheduled_for.isnot(None)).all()
+        assert [u.user_id_hash for u in remaining] == [f"{PREFIX}1"]
+
+    def test_slow_send_times_out_without_stalling_batch(self, app_ctx):
+        now = datetime.utcnow()
+        _due_users(now, 4)
+
+        def send(user, _):
+            if user.user_id_hash.endswith("_0"):
+                time.sleep(1)
+            return True
+
+        started = time.monotonic()
+        stats = ReminderDispatcher(send_fn=send, max_workers=4, send_timeout=0.2).dispatch(now)
+
+        assert time.monotonic() - started < 0.9
+        assert stats["sent"] == 3
+        assert stats["timeouts"] == 1
+        assert _ours().filter(User.reminder_scheduled_for.isnot(None)).count() == 0
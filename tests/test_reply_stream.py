@@ -0,0 +1,94 @@
+"""
+Streaming chat replies
+SSE framing, stream negotiation and the ack-then-done event sequence
+"""
+import json
+import time
+
+import pytest
+from flask import Flask, g, jsonify, request
+
+from utils import reply_stream
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for frame in body.split("\n\n"):
+        lines = [line for line in frame.split("\n") if line and not line.startswith(":")]
+        if lines:
+            event = lines[0].split(": ", 1)[1]
+            events.append((event, json.loads(lines[1].split(": ", 1)[1])))
+    return events
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+
+    @app.before_request
+    def set_request_id():
+        g.request_id = "rid-1"
+
+    @app.route("/chat", methods=["POST"])
+    def chat():
+        def reply():
+            reply_stream.emit_partial("✅ Logged ৳120 for food")
+            if request.get_json().get("fail"):
+                raise RuntimeError("boom")
+            return jsonify({"reply": "Logged ৳120 for food. Nice.", "rid": g.request_id}), 200
+
+        if reply_stream.wants_stream(request):
+            return reply_stream.sse_response(reply)
+        return reply()
+
+    return app
+
+
+class TestFraming:
+    """Wire format and negotiation"""
+
+    def test_format_sse(self):
+        assert reply_stream.format_sse("ack", {"text": "৳120"}) == 'event: ack\ndata: {"text": "৳120"}\n\n'
+
+    def test_wants_stream(self, app):
+        with app.test_request_context("/chat", headers={"Accept": "text/event-stream"}):
+            assert reply_stream.wants_stream(request)
+        with app.test_request_context("/chat?stream=1"):
+            assert reply_stream.wants_stream(request)
+        with app.test_request_context("/chat", headers={"Accept": "application/json"}):
+            assert not reply_stream.wants_stream(request)
+
+    def test_emit_partial_without_stream_is_noop(self):
+        reply_stream.emit_partial("ignored")
+
+
+class TestStreamedReply:
+    """Acknowledgement first, then the JSON body as the final event"""
+
+    def test_ack_then_done(self, app):
+        response = app.test_client().post("/chat", json={}, headers={"Accept": "text/event-stream"})
+        assert response.mimetype == "text/event-stream"
+        assert response.headers["Cache-Control"] == "no-cache"
+        assert _events(response.get_data(as_text=True)) == [
+            ("ack", {"text": "✅ Logged ৳120 for food"}),
+            ("done", {"reply": "Logged ৳120 for food. Nice.", "rid": "rid-1", "status": 200}),
+        ]
+
+    def test_json_fallback_unchanged(self, app):
+        response = app.test_client().post("/chat", json={})
+        assert response.get_json() == {"reply": "Logged ৳120 for food. Nice.", "rid": "rid-1"}
+
+    def test_failure_becomes_error_event(self, app):
+        response = app.test_client().post("/chat?stream=1", json={"fail": True})
+        assert _events(response.get_data(as_text=True))[-1] == ("error", {"error": "RuntimeError", "status": 500})
+
+    def test_heartbeat_while_waiting(self, monkeypatch):
+        monkeypatch.setattr(reply_stream, "SSE_HEARTBEAT_SEC", 0.01)
+
+        def slow():
+            time.sleep(0.05)
+            return {"reply": "ok"}
+
+        frames = list(reply_stream.stream_events(slow))
+        assert frames[0] == ": keep-alive\n\n"
+        assert _events("".join(frames)) == [("done", {"reply": "ok", "status": 200})]
@@ -0,0 +1,118 @@
+"""
+Retention cohorts
+Cohorts are computed in one windowed query or read from the user_first_seen rollup
+"""
+from datetime import UTC, date, datetime, timedelta
+
+import pytest
+
+from app import app as flask_app
+from app import db
+from models import TelemetryEvent, UserFirstSeen
+from utils.telemetry import (
+    GrowthMetrics,
+    TelemetryTracker,
+    activity_masks,
+    build_cohort_rows,
+    load_cohort_activity,
+    rebuild_retention_rollup,
+    summarize_cohort_activity,
+)
+from utils.telemetry_aggregator import telemetry_aggregator
+
+
+@pytest.fixture
+def app_ctx():
+    with flask_app.app_context():
+        db.create_all()
+        TelemetryEvent.query.delete()
+        UserFirstSeen.query.delete()
+        db.session.commit()
+        yield
+        db.session.rollback()
+        TelemetryEvent.query.delete()
+        UserFirstSeen.query.delete()
+        db.session.commit()
+
+
+def _event(user_id_hash, days_ago):
+    db.session.add(TelemetryEvent(
+        event_type='expense_logged',
+        user_id_hash=user_id_hash,
+        event_data={},
+        timestamp=datetime.now(UTC).replace(hour=12) - timedelta(days=days_ago)
+    ))
+
+
+def test_activity_masks_fold_events_per_user():
+    t0 = datetime(2025, 9, 1, 9, tzinfo=UTC)
+    events = [('a', t0), ('a', t0 + timedelta(hours=3)), ('a', t0 + timedelta(days=3)),
+              ('a', t0 + timedelta(days=40)), ('b', t0 + timedelta(days=1))]
+
+    masks = activity_masks(events)
+
+    assert masks['a'] == (date(2025, 9, 1), 0b1001)
+    assert masks['b'] == (date(2025, 9, 2), 0b1)
+
+
+def test_cohort_rows_report_requested_days():
+    counts = summarize_cohort_activity([(date(2025, 9, 1), 0b11), (date(2025, 9, 1), 0b1)], (1, 7))
+
+    rows = build_cohort_rows([date(2025, 9, 2), date(2025, 9, 1)], counts, (1, 7))
+
+    assert rows[0] == {'cohort_date': '2025-09-02', 'd0_users': 0, 'd1_retention': 0.0, 'd7_retention': 0.0}
+    assert rows[1] == {'cohort_date': '2025-09-01', 'd0_users': 2, 'd1_retention': 50.0, 'd7_retention': 0.0}
+
+
+def test_track_event_maintains_rollup(app_ctx):
+    TelemetryTracker.track_expense_logged('retention_u1', 100, 'food', expense_id=1)
+    assert telemetry_aggregator.flush()
+    row = db.session.get(UserFirstSeen, 'retention_u1')
+    assert row.activity_mask == 1
+
+    row.first_seen_date = row.first_seen_date - timedelta(days=1)
+    db.session.commit()
+    TelemetryTracker.track_expense_logged('retention_u1', 100, 'food', expense_id=2)
+    assert telemetry_aggregator.flush()
+
+    db.session.refresh(row)
+    assert row.activity_mask == 0b11
+
+
+def test_windowed_query_and_rollup_agree(app_ctx):
+    _event('retention_u1', 3)
+    _event('retention_u1', 2)
+    _event('retention_u2', 3)
+    _event('retention_u3', 1)
+    _event('retention_u3', 0)
+    db.session.commit()
+
+    today = datetime.now(UTC).date()
+    cohort_dates = [today - timedelta(days=offset) for offset in range(4)]
+    activity = load_cohort_activity(datetime.now(UTC) - timedelta(days=4), datetime.now(UTC) + timedelta(days=1))
+    from_events = build_cohort_rows(cohort_dates, summarize_cohort_activity(activity.values(), (1, 3)), (1, 3))
+    assert rebuild_retention_rollup() == 3
+    from_rollup = GrowthMetrics.get_retention_cohorts(4, (1, 3))
+
+    assert from_events == from_rollup
+    by_date = {c['cohort_date']: c for c in from_rollup}
+    cohort = by_date[(datetime.now(UTC).date() - timedelta(days=3)).strftime('%Y-%m-%d')]
+    assert cohort['d0_users'] == 2
+    assert cohort['d1_retention'] == 50.0
+    assert cohort['d3_retention'] == 0.0
+
+
+def test_first_seen_keeps_pre_rollup_history(app_ctx):
+    _event('retention_u1', 2)  # logged before the user had a rollup row
+    db.session.commit()
+
+    TelemetryTracker.track_expense_logged('retention_u1', 100, 'food', expense_id=3)
+    assert telemetry_aggregator.flush()
+
+    row = db.session.get(UserFirstSeen, 'retention_u1')
+    assert row.first_seen_date == datetime.now(UTC).date() - timedelta(days=2)
+    assert row.activity_mask == 0b101
+
+
+def test_retention_day_out_of_range(app_ctx):
+    assert GrowthMetrics.get_retention_cohorts(7, (31,)) == []
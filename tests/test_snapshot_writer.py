@@ -0,0 +1,104 @@
+"""
+Write-behind snapshot writer
+Size/time-triggered batches, overflow accounting, drain on close and ON CONFLICT inserts
+"""
+import threading
+
+import pytest
+
+from utils.snapshot_writer import SnapshotBatchWriter, snapshot_insert
+from utils.write_behind import WriteBehindBuffer
+
+
+class _RecordingSink:
+    """flush_fn that remembers batches and treats repeated cc_ids as conflicts"""
+
+    def __init__(self):
+        self.batches = []
+        self.seen = set()
+        self.flushed = threading.Event()
+
+    def __call__(self, rows):
+        self.batches.append(rows)
+        fresh = {row['cc_id'] for row in rows} - self.seen
+        self.seen |= fresh
+        self.flushed.set()
+        return len(fresh)
+
+
+class TestSnapshotBatchWriter:
+    """Buffering and flushing"""
+
+    def test_flushes_when_batch_is_full(self):
+        sink = _RecordingSink()
+        writer = SnapshotBatchWriter(sink, batch_size=3, flush_interval=60)
+        for i in range(3):
+            assert writer.submit({'cc_id': f'cc{i}'})
+
+        assert sink.flushed.wait(2)
+        assert [len(batch) for batch in sink.batches] == [3]
+        writer.close()
+
+    def test_flushes_on_interval(self):
+        sink = _RecordingSink()
+        writer = SnapshotBatchWriter(sink, batch_size=100, flush_interval=0.05)
+        writer.submit({'cc_id': 'cc1'})
+
+        assert sink.flushed.wait(2)
+        assert sink.batches == [[{'cc_id': 'cc1'}]]
+        writer.close()
+
+    def test_overflow_is_counted_not_blocking(self):
+        sink = _RecordingSink()
+        writer = SnapshotBatchWriter(sink, batch_size=100, flush_interval=60, max_buffer=2)
+        results = [writer.submit({'cc_id': f'cc{i}'}) for i in range(4)]
+
+        assert results == [True, True, False, False]
+        assert writer.get_stats()['dropped_overflow'] == 2
+        writer.close()
+
+    def test_close_drains_and_counts_duplicates(self):
+        sink = _RecordingSink()
+        writer = SnapshotBatchWriter(sink, batch_size=100, flush_interval=60)
+        for cc_id in ('a', 'b', 'a'):
+            writer.submit({'cc_id': cc_id})
+        writer.close()
+
+        stats = writer.get_stats()
+        assert stats['buffered'] == 0
+        assert stats['inserted'] == 2
+        assert stats['duplicates'] == 1
+        assert not writer.submit({'cc_id': 'late'})
+
+    def test_failed_batch_is_accounted(self):
+        def broken(rows):
+            raise RuntimeError("db down")
+
+        writer = SnapshotBatchWriter(broken, batch_size=100, flush_interval=60)
+        writer.submit({'cc_id': 'x'})
+        writer.close()
+        assert writer.get_stats()['failed'] == 1
+
+    def test_buffer_without_flush_cannot_be_created(self):
+        class NoFlush(WriteBehindBuffer):
+            pass
+
+        with pytest.raises(TypeError):
+            NoFlush("no-flush", flush_interval=1, drain_timeout=1)
+
+
+class TestSnapshotInsert:
+    """Generated SQL"""
+
+    def test_postgres_insert_skips_conflicts(self):
+        sa = pytest.importorskip("sqlalchemy")
+        from sqlalchemy.dialects import postgresql
+
+        table = sa.Table("inference_snapshots", sa.MetaData(),
+                         sa.Column("id", sa.Integer, primary_key=True),
+                         sa.Column("cc_id", sa.String(32), unique=True))
+        statement = snapshot_insert(table, [{'cc_id': 'a'}, {'cc_id': 'b'}], "postgresql")
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+
+        assert "ON CONFLICT (cc_id) DO NOTHING" in sql
+        assert sql.count("%(cc_id_m") == 2  # one multi-row VALUES statement
@@ -0,0 +1,99 @@
+"""
+Streaming backup format
+Backups are written line by line and verified in a single streaming pass
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from utils.database_backup_v2 import (
+    DatabaseBackupSystem,
+    _BackupWriter,
+    _open_backup,
+    iter_backup_rows,
+)
+
+TABLES = ['users', 'expenses', 'monthly_summaries']
+
+
+def _write_backup(path, compress, rows=3):
+    metadata = {'type': 'metadata', 'backup_timestamp': '2025-09-01T00:00:00',
+                'backup_version': '2.0', 'tables': TABLES}
+    with _open_backup(path, 'w', compress) as f:
+        writer = _BackupWriter(f, metadata)
+        writer.begin_table('users')
+        for i in range(rows):
+            writer.write_row({'id': i, 'user_id_hash': f'u{i}', 'created_at': datetime(2025, 9, 1, i)})
+        writer.end_table()
+        writer.begin_table('expenses')
+        writer.write_row({'id': 1, 'amount': Decimal('12.50'), 'date': date(2025, 9, 1),
+                          'description': 'চা ২০'})
+        writer.end_table()
+        writer.begin_table('monthly_summaries')
+        writer.end_table()
+        writer.close()
+    return writer
+
+
+@pytest.fixture
+def backup_system(tmp_path):
+    system = DatabaseBackupSystem()
+    system.backup_dir = str(tmp_path)
+    return system
+
+
+@pytest.mark.parametrize('compress,name', [(False, 'b.ndjson'), (True, 'b.ndjson.gz')])
+def test_verify_round_trip(backup_system, tmp_path, compress, name):
+    path = str(tmp_path / name)
+    writer = _write_backup(path, compress)
+
+    result = backup_system.verify_backup(path)
+
+    assert result['status'] == 'valid'
+    assert result['record_counts'] == {'users': 3, 'expenses': 1, 'monthly_summaries': 0}
+    assert result['checksums'] == writer.checksums
+
+
+def test_rows_are_streamed_back(tmp_path):
+    path = str(tmp_path / 'b.ndjson')
+    _write_backup(path, False)
+
+    with _open_backup(path, 'r', False) as f:
+        rows = list(iter_backup_rows(f))
+
+    assert rows[0] == ('users', {'id': 0, 'user_id_hash': 'u0', 'created_at': '2025-09-01T00:00:00'})
+    assert rows[3] == ('expenses', {'id': 1, 'amount': '12.50', 'date': '2025-09-01',
+                                    'description': 'চা ২০'})
+
+
+def test_tampered_row_fails_checksum(backup_system, tmp_path):
+    path = tmp_path / 'b.ndjson'
+    _write_backup(str(path), False)
+    path.write_text(path.read_text(encoding='utf-8').replace('"u1"', '"uX"'), encoding='utf-8')
+
+    result = backup_system.verify_backup(str(path))
+
+    assert result['status'] == 'error'
+    assert 'Checksum mismatch for table users' in result['message']
+
+
+def test_truncated_backup_is_rejected(backup_system, tmp_path):
+    path = tmp_path / 'b.ndjson'
+    _write_backup(str(path), False)
+    lines = path.read_text(encoding='utf-8').splitlines(keepends=True)
+    path.write_text(''.join(lines[:-1]), encoding='utf-8')
+
+    result = backup_system.verify_backup(str(path))
+
+    assert result['status'] == 'error'
+    assert 'truncated' in result['message']
+
+
+def test_list_backups_includes_streaming_files(backup_system, tmp_path):
+    _write_backup(str(tmp_path / 'finbrain_backup_20250901_000000.ndjson.gz'), True)
+
+    backups = backup_system.list_backups()
+
+    assert [b['filename'] for b in backups] == ['finbrain_backup_20250901_000000.ndjson.gz']
+    assert backups[0]['verification']['status'] == 'valid'
@@ -0,0 +1,116 @@
+"""
+Telemetry aggregation
+Events are batched, counter increments merged into one delta per counter, failures retried then split
+"""
+from utils.telemetry_aggregator import TelemetryAggregator
+
+
+class _Sink:
+    """write_fn that records flushes and can be made to fail"""
+
+    def __init__(self, fail=False, poison=None):
+        self.fail = fail
+        self.poison = poison
+        self.calls = []
+
+    def __call__(self, events, deltas, shard):
+        if self.fail or any(e['user_id_hash'] == self.poison for e in events):
+            raise RuntimeError("db down")
+        self.calls.append((list(events), dict(deltas), shard))
+
+
+def _event(i):
+    return {'event_type': 'expense_logged', 'user_id_hash': f'u{i}', 'event_data': {}}
+
+
+class TestTelemetryAggregator:
+    """Buffering, merging and delivery"""
+
+    def test_counters_merge_into_one_delta(self):
+        sink = _Sink()
+        aggregator = TelemetryAggregator(sink, flush_interval=60)
+        for i in range(5):
+            aggregator.add_event(_event(i))
+            aggregator.increment('total_expenses')
+        aggregator.increment('total_reports')
+
+        assert aggregator.flush()
+        events, deltas, _ = sink.calls[0]
+        assert len(sink.calls) == 1
+        assert len(events) == 5
+        assert deltas == {'total_expenses': 5, 'total_reports': 1}
+        aggregator.close()
+
+    def test_failed_flush_is_requeued(self):
+        sink = _Sink(fail=True)
+        aggregator = TelemetryAggregator(sink, flush_interval=60)
+        aggregator.add_event(_event(1))
+        aggregator.increment('total_expenses', 2)
+
+        assert not aggregator.flush()
+        aggregator.add_event(_event(2))
+        aggregator.increment('total_expenses')
+        sink.fail = False
+        assert aggregator.flush()
+
+        # The failed batch goes first, on its own
+        assert [[e['user_id_hash'] for e in events] for events, _, _ in sink.calls] == [['u1'], ['u2']]
+        assert [deltas for _, deltas, _ in sink.calls] == [{'total_expenses': 2}, {'total_expenses': 1}]
+        assert aggregator.get_stats()['failed_flushes'] == 1
+        aggregator.close()
+
+    def test_bad_row_is_split_out_and_dead_lettered(self):
+        sink = _Sink(poison='u2')
+        aggregator = TelemetryAggregator(sink, flush_interval=60, max_attempts=1)
+        for i in range(4):
+            aggregator.add_event(_event(i))
+        aggregator.increment('total_expenses', 4)
+
+        for i in range(4, 10):
+            aggregator.add_event(_event(i))  # newer traffic keeps flowing meanwhile
+            aggregator.flush()
+
+        written = [e['user_id_hash'] for events, _, _ in sink.calls for e in events]
+        assert sorted(written) == sorted(f'u{i}' for i in range(10) if i != 2)
+        assert sum(deltas.get('total_expenses', 0) for _, deltas, _ in sink.calls) == 4
+        assert [[e['user_id_hash'] for e in events] for events, _ in aggregator.dead_letters()] == [['u2']]
+        assert aggregator.get_stats()['retry_batches'] == 0
+        aggregator.close()
+
+    def test_outage_does_not_use_up_attempts(self):
+        sink = _Sink(fail=True)
+        aggregator = TelemetryAggregator(sink, flush_interval=60, max_attempts=1)
+        aggregator.add_event(_event(1))
+        aggregator.add_event(_event(2))
+        for _ in range(5):
+            assert not aggregator.flush()
+
+        sink.fail = False
+        assert aggregator.flush()
+        assert [[e['user_id_hash'] for e in events] for events, _, _ in sink.calls] == [['u1', 'u2']]
+        assert aggregator.get_stats()['split_batches'] == 0
+        aggregator.close()
+
+    def test_overflow_drops_and_counts(self):
+        aggregator = TelemetryAggregator(_Sink(), flush_interval=60, max_buffer=2)
+        results = [aggregator.add_event(_event(i)) for i in range(3)]
+
+        assert results == [True, True, False]
+        assert aggregator.get_stats()['dropped_overflow'] == 1
+        aggregator.close()
+
+    def test_close_drains_pending_work(self):
+        sink = _Sink()
+        aggregator = TelemetryAggregator(sink, flush_interval=60)
+        aggregator.add_event(_event(1))
+        aggregator.increment('total_expenses')
+        aggregator.close()
+
+        assert sink.calls and sink.calls[-1][1] == {'total_expenses': 1}
+        assert aggregator.pending_deltas() == {}
+
+    def test_empty_flush_skips_write(self):
+        sink = _Sink()
+        aggregator = TelemetryAggregator(sink, flush_interval=60)
+        assert aggregator.flush()
+        assert sink.calls == []
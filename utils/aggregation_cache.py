@@ -1,54 +1,44 @@
 """
 Pre-computed Aggregation Cache for Ultra-Fast Lookups
-Maintains running totals and category breakdowns for instant reporting
+Maintains running totals and category breakdowns for instant reporting, in the
+bounded "aggregations" cache namespace (invalidated when the user's data changes)
 """
 
 import logging
+import os
 from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+
+from utils import cache
 
 logger = logging.getLogger(__name__)
 
-# Global aggregation cache
-_AGGREGATION_CACHE = {}
+AGGREGATION_CACHE_MAX_ENTRIES = int(os.getenv("AGGREGATION_CACHE_MAX_ENTRIES", "2000"))
+
 
 class AggregationCache:
     """Lightning-fast pre-computed aggregations"""
     
     def __init__(self):
         self.cache_timeout_minutes = 15  # Refresh every 15 minutes
+        self.cache = cache.namespace("aggregations", ttl_seconds=self.cache_timeout_minutes * 60,
+                                     max_entries=AGGREGATION_CACHE_MAX_ENTRIES, versioned=True)
     
     def get_user_aggregations(self, user_id: str, days_window: int) -> dict | None:
         """Get pre-computed aggregations for user"""
-        cache_key = f"{user_id}:{days_window}"
-        
-        if cache_key in _AGGREGATION_CACHE:
-            cached_data = _AGGREGATION_CACHE[cache_key]
-            
-            # Check if cache is still fresh
-            if cached_data["expires_at"] > datetime.now():
-                logger.debug(f"Aggregation cache HIT for user {user_id[:8]}...")
-                return cached_data["data"]
-            else:
-                # Expired
-                del _AGGREGATION_CACHE[cache_key]
-        
-        return None
+        cached = self.cache.get(f"{user_id}:{days_window}")
+        if cached is not None:
+            logger.debug(f"Aggregation cache HIT for user {user_id[:8]}...")
+        return cached
     
-    def update_user_aggregations(self, user_id: str, days_window: int, expenses) -> dict:
-        """Compute and cache aggregations"""
+    def update_user_aggregations(self, user_id: str, days_window: int, expenses,
+                                 version: int | None = None) -> dict:
+        """Compute and cache aggregations; version is the user's data version read before loading expenses"""
         try:
             # Compute aggregations in single pass
             aggregations = self._compute_aggregations(expenses)
             
-            # Cache with TTL
-            cache_key = f"{user_id}:{days_window}"
-            _AGGREGATION_CACHE[cache_key] = {
-                "data": aggregations,
-                "created_at": datetime.now(),
-                "expires_at": datetime.now() + timedelta(minutes=self.cache_timeout_minutes)
-            }
+            # Cache with TTL, dropped early if the user's expenses change after they were loaded
+            self.cache.set(f"{user_id}:{days_window}", aggregations, user=user_id, version=version)
             
             logger.debug(f"Updated aggregation cache for user {user_id[:8]}...")
             return aggregations
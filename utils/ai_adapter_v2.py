@@ -11,6 +11,7 @@ from typing import Any, Dict
 import requests
 
 from .ai_contamination_monitor import ai_contamination_monitor
+from .ai_transport import ai_transport
 
 logger = logging.getLogger(__name__)
 
@@ -51,26 +52,13 @@ class ProductionAIAdapter:
     def __init__(self):
         self.enabled = AI_ENABLED
         self.provider = AI_PROVIDER
-        # CRITICAL: Use per-request sessions to prevent cross-contamination
-        # DO NOT share session objects between users - this caused financial data mixing
-        self._session_template = {
-            "timeout": AI_TIMEOUT,
-            "headers": {}
-        }
-        
-        # Keep backwards compatibility session for health checks (DO NOT use for user requests)
-        self.session = requests.Session()
-        
-        # Setup provider-specific configuration template
+        # CRITICAL: No per-user state may be shared between requests - a shared session once mixed
+        # users' financial data. The pooled transport has no cookie jar, and headers are frozen here
+        self.transport = ai_transport
+        headers = {"Content-Type": "application/json"}
         if self.provider == "openai" and OPENAI_API_KEY:
-            self._session_template["headers"].update({
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
-                "Content-Type": "application/json"
-            })
-        elif self.provider == "gemini" and GEMINI_API_KEY:
-            self._session_template["headers"].update({
-                "Content-Type": "application/json"
-            })
+            headers["Authorization"] = f"Bearer {OPENAI_API_KEY}"
+        self._headers = ai_transport.freeze_headers(headers)
         
         logger.info(f"Production AI Adapter initialized: enabled={self.enabled}, provider={self.provider} [USER_ISOLATED]")
     
@@ -111,10 +99,6 @@ class ProductionAIAdapter:
             expenses = expenses_data.get('expenses', [])
             timeframe = expenses_data.get('timeframe', 'this month')
             
-            # CRITICAL: Create isolated session per request to prevent cross-contamination
-            isolated_session = requests.Session()
-            isolated_session.headers.update(self._session_template["headers"])
-            
             # Build expense breakdown text
             expense_breakdown = ""
             if expenses:
@@ -200,11 +184,8 @@ Make insights:
             with AI_TIMEOUT_LOCK:
                 AI_REQUEST_COUNTER += 1
             
-            # Make request with isolated session - CRITICAL FOR USER ISOLATION
-            response = isolated_session.post(url, json=payload, timeout=AI_TIMEOUT)
-            
-            # CRITICAL: Close session immediately to prevent data leakage
-            isolated_session.close()
+            # Shared connection pool, nothing per-user carried over - CRITICAL FOR USER ISOLATION
+            response = self.transport.post(url, json=payload, headers=self._headers, timeout=AI_TIMEOUT)
             
             if response.status_code != 200:
                 logger.warning(f"Gemini insights API error: {response.status_code}")
@@ -510,9 +491,10 @@ Multi-Currency: Recognize BDT (৳), $, €, £, ₹"""
             # Make API call with retry logic
             for attempt in range(AI_MAX_RETRIES + 1):
                 try:
-                    response = self.session.post(
+                    response = self.transport.post(
                         "https://api.openai.com/v1/chat/completions",
                         json=payload,
+                        headers=self._headers,
                         timeout=AI_TIMEOUT
                     )
                     
@@ -617,9 +599,10 @@ Guardrails:
             # Make API call with retry logic
             for attempt in range(AI_MAX_RETRIES + 1):
                 try:
-                    response = self.session.post(
+                    response = self.transport.post(
                         f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent?key={GEMINI_API_KEY}",
                         json=payload,
+                        headers=self._headers,
                         timeout=AI_TIMEOUT
                     )
                     
@@ -908,6 +891,7 @@ ALWAYS: ui_note ≤140 chars, source_text verbatim, confidence 0.0-1.0"""
             "provider": self.provider,
             "timeout_s": AI_TIMEOUT,
             "max_retries": AI_MAX_RETRIES,
+            "transport": self.transport.get_stats(),
             "has_api_key": bool(OPENAI_API_KEY) if self.provider == "openai" else bool(GEMINI_API_KEY) if self.provider == "gemini" else None
         }
 
@@ -924,8 +908,7 @@ def get_ai_timeout_metrics():
     
     def cleanup(self):
         """Cleanup resources"""
-        if self.session:
-            self.session.close()
+        self.transport.close()
     
     def get_completion(self, prompt: str, **kwargs) -> str:
         """
@@ -10,6 +10,8 @@ from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
+from utils import redis_pool
+
 logger = logging.getLogger(__name__)
 
 # Configuration from centralized config
@@ -70,16 +72,12 @@ class AdvancedAILimiter:
     
     def _init_redis(self):
         """Initialize Redis client (optional upgrade)"""
-        try:
-            import redis
-            redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379")
-            self.redis_client = redis.from_url(redis_url, decode_responses=True)
-            self.redis_client.ping()  # Test connection
+        self.redis_client = redis_pool.get_client(decode_responses=True)
+        if self.redis_client is not None:
             logger.info("Redis backend initialized for AI rate limiting")
-        except Exception as e:
-            logger.warning(f"Redis initialization failed, falling back to in-memory: {e}")
+        else:
+            logger.warning("Redis unavailable, falling back to in-memory AI rate limiting")
             self.use_redis = False
-            self.redis_client = None
     
     def check_rate_limit(self, psid_hash: str) -> RateLimitResult:
         """
@@ -166,9 +164,10 @@ class AdvancedAILimiter:
             psid_key = f"ai:psid:{psid_hash}:{current_minute}"
             global_key = f"ai:global:{current_minute}"
             
-            # Get current counts
-            psid_calls = int((self.redis_client.get(psid_key) if self.redis_client else None) or 0)
-            global_calls = int((self.redis_client.get(global_key) if self.redis_client else None) or 0)
+            # Get current counts in one MGET
+            counts = redis_pool.get_many(self.redis_client, [psid_key, global_key]) if self.redis_client else {}
+            psid_calls = int(counts.get(psid_key) or 0)
+            global_calls = int(counts.get(global_key) or 0)
             
             # Check per-PSID limit
             if psid_calls >= AI_MAX_CALLS_PER_MIN_PER_PSID:
@@ -0,0 +1,184 @@
+"""
+Shared HTTP transport for AI provider calls
+One keep-alive connection pool for every user, with nothing per-user in it:
+no session, no cookie jar, and headers frozen per request
+"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+AI_HTTP_POOL_CONNECTIONS = int(os.getenv("AI_HTTP_POOL_CONNECTIONS", "4"))  # host pools kept
+AI_HTTP_POOL_MAXSIZE = int(os.getenv("AI_HTTP_POOL_MAXSIZE", "16"))  # idle connections per host
+AI_HTTP_KEEPALIVE = os.getenv("AI_HTTP_KEEPALIVE", "true").lower() == "true"
+AI_HTTP2 = os.getenv("AI_HTTP2", "false").lower() == "true"
+AI_HTTP_WARM_CONNECTIONS = int(os.getenv("AI_HTTP_WARM_CONNECTIONS", "4"))  # opened at boot warm-up
+
+
+class TransportStats:
+    """Request, connection and handshake counters for one transport"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.handshake_ms_total = 0.0
+        self.handshake_ms_max = 0.0
+
+    def record_connect(self, duration_ms: float) -> None:
+        with self._lock:
+            self.connections_opened += 1
+            self.handshake_ms_total += duration_ms
+            self.handshake_ms_max = max(self.handshake_ms_max, duration_ms)
+
+    def record_request(self, ok: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            reused = max(0, self.requests - self.connections_opened)
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "connections_opened": self.connections_opened,
+                "connections_reused": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+                "handshake_ms_avg": round(self.handshake_ms_total / self.connections_opened, 2)
+                if self.connections_opened else 0.0,
+                "handshake_ms_max": round(self.handshake_ms_max, 2),
+            }
+
+
+def _https_connection_base() -> type:
+    """urllib3's HTTP/2 connection when enabled and installed (urllib3>=2.3 with h2), else HTTPS"""
+    if not AI_HTTP2:
+        return HTTPSConnection
+    try:
+        from urllib3.http2.connection import HTTP2Connection
+        return HTTP2Connection
+    except ImportError:
+        logger.info("AI transport: HTTP/2 unavailable (needs urllib3>=2.3 and h2), using HTTP/1.1")
+        return HTTPSConnection
+
+
+def _timed_pool(pool_cls: type, connection_base: type, stats: TransportStats) -> type:
+    """Pool class whose new connections report their TCP/TLS setup time to stats"""
+
+    class TimedConnection(connection_base):
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            stats.record_connect((time.perf_counter() - start) * 1000)
+
+    return type(f"Timed{pool_cls.__name__}", (pool_cls,), {"ConnectionCls": TimedConnection})
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools use the timed connection classes"""
+
+    def __init__(self, stats: TransportStats, **kwargs):
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _timed_pool(HTTPConnectionPool, HTTPConnection, self._stats),
+            "https": _timed_pool(HTTPSConnectionPool, _https_connection_base(), self._stats),
+        }
+
+
+class AITransport:
+    """
+    Keep-alive connection pool shared across users
+
+    Requests are prepared standalone and sent straight through the adapter, so
+    there is no requests.Session: no cookie jar picks up Set-Cookie from one
+    user's response, and no default headers can be mutated between calls.
+    """
+
+    def __init__(self, pool_connections: int = AI_HTTP_POOL_CONNECTIONS,
+                 pool_maxsize: int = AI_HTTP_POOL_MAXSIZE, keepalive: bool = AI_HTTP_KEEPALIVE):
+        self.keepalive = keepalive
+        self.stats = TransportStats()
+        self._pool_maxsize = pool_maxsize
+        self._adapter = _PooledAdapter(
+            self.stats, pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0
+        )
+
+    @staticmethod
+    def freeze_headers(headers: Mapping[str, str]) -> Mapping[str, str]:
+        """Read-only header set, safe to share between requests"""
+        return MappingProxyType(dict(headers))
+
+    def post(self, url: str, json: Any = None, headers: Mapping[str, str] | None = None,
+             timeout: float | None = None) -> requests.Response:
+        """POST through the shared pool; raises the usual requests exceptions"""
+        return self._send("POST", url, json=json, headers=headers, timeout=timeout)
+
+    def warm(self, url: str, connections: int = AI_HTTP_WARM_CONNECTIONS,
+             timeout: float | None = None) -> requests.Response:
+        """
+        Open up to `connections` pooled connections to url's host with concurrent HEADs
+
+        Returns the first response; raises the first error if every request failed.
+        """
+        connections = max(1, min(connections, self._pool_maxsize))
+        results: list[Any] = [None] * connections
+
+        def head(index: int) -> None:
+            try:
+                results[index] = self._send("HEAD", url, timeout=timeout)
+            except requests.RequestException as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=head, args=(i,), daemon=True) for i in range(connections)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for result in results:
+            if isinstance(result, requests.Response):
+                return result
+        raise results[0]
+
+    def _send(self, method: str, url: str, json: Any = None, headers: Mapping[str, str] | None = None,
+              timeout: float | None = None) -> requests.Response:
+        request_headers = dict(headers or {})
+        if not self.keepalive:
+            request_headers["Connection"] = "close"
+        prepared = requests.Request(method, url, json=json, headers=request_headers).prepare()
+
+        try:
+            response = self._adapter.send(prepared, timeout=timeout)
+            response.content  # Read the body now so the connection goes back to the pool
+        except requests.RequestException:
+            self.stats.record_request(ok=False)
+            raise
+        self.stats.record_request(ok=True)
+        return response
+
+    def get_stats(self) -> dict[str, Any]:
+        return dict(self.stats.snapshot(), keepalive=self.keepalive, http2_requested=AI_HTTP2)
+
+    def close(self) -> None:
+        self._adapter.close()
+
+
+# Shared by every ProductionAIAdapter call
+ai_transport = AITransport()
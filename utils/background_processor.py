@@ -2,20 +2,24 @@
 Safe background execution with thread pool and AI adapter support
 Includes RL-2 graceful non-AI fallback system
 """
+import contextvars
 import json
 import logging
 import os
 import time
 from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
 from datetime import datetime
 from queue import Queue
 from typing import Any, Dict, Optional, Tuple
 
+from nlp.analyzed_message import message_scope
 from utils.production_router import production_router
 
 # from .facebook_handler import send_facebook_message  # QUARANTINED: Web-only mode
 from .identity import psid_hash
+from .keyed_executor import ExecutorSaturated, KeyedExecutor
 from .logger import log_webhook_success
 from .policy_guard import is_within_24_hour_window, update_user_message_timestamp
 from .user_manager import resolve_user_id
@@ -25,7 +29,7 @@ logger = logging.getLogger(__name__)
 # Phase C: Import job queue components
 try:
     from .job_processor import job_processor
-    from .job_queue import job_queue
+    from .job_queue import JobConsumerPool, job_queue
     JOB_QUEUE_ENABLED = True
     logger.info("Job queue integration enabled")
 except ImportError as e:
@@ -46,11 +50,21 @@ class MessageJob:
 class BackgroundProcessor:
     """Thread pool-based background message processor with RL-2 support and Redis job queue"""
     
-    def __init__(self, max_workers: int = 3):
-        self.max_workers = max_workers
-        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bg-msg-")
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers or int(os.getenv("BG_MAX_WORKERS", "3"))
+        
+        # Messages are keyed by user hash: one user's messages run in order on one
+        # shard, different users run in parallel, and a full shard sheds instead of queueing
+        self.message_executor = KeyedExecutor(
+            num_shards=self.max_workers,
+            max_queue_per_shard=int(os.getenv("BG_SHARD_QUEUE_SIZE", "100")),
+            enqueue_timeout=float(os.getenv("BG_ENQUEUE_TIMEOUT_SEC", "0.05")),
+            thread_name_prefix="bg-msg-"
+        )
+        # Routing runs here so the shard can give up on it at processing_timeout
+        self.route_executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bg-route-")
         self.job_queue = Queue()  # Legacy message queue
-        self.processing_timeout = 5.0
+        self.processing_timeout = float(os.getenv("BG_PROCESSING_TIMEOUT_SEC", "5.0"))
         self.fallback_reply = "Got it. I'll track that for you."
         
         # Import AI adapter from dedicated module
@@ -63,22 +77,23 @@ class BackgroundProcessor:
         
         # Phase C: Redis job queue integration
         self.job_queue_enabled = JOB_QUEUE_ENABLED
-        self.job_polling_active = False
+        self.job_consumers = None
         
         # Redis job queue control - can be disabled via environment variable for safety
         disable_job_queue = os.getenv("DISABLE_JOB_QUEUE", "false").lower() == "true"
         if disable_job_queue:
             logger.info("Job queue temporarily disabled to avoid Redis issues")
         elif self.job_queue_enabled and job_queue and hasattr(job_queue, 'redis_available') and job_queue.redis_available:
-            # Start job queue polling worker only if Redis is actually available
-            self.executor.submit(self._job_queue_worker)
-            logger.info("Redis job queue worker started")
+            # Dedicated consumer threads block on Redis, so they never take a message worker
+            self.job_consumers = JobConsumerPool(job_queue, self._process_redis_job_in_order)
+            self.job_consumers.start()
+            logger.info("Redis job queue consumers started")
         else:
             logger.info("Redis job queue not available, using in-memory processing only")
         
         # Context-driven processing now handled by production router
         
-        logger.info(f"Background processor initialized with {max_workers} workers")
+        logger.info(f"Background processor initialized with {self.max_workers} workers")
     
     def enqueue_message(self, rid: str, psid: str, mid: str, text: str) -> bool:
         """Enqueue message for background processing"""
@@ -91,14 +106,16 @@ class BackgroundProcessor:
                 timestamp=time.time()
             )
             
-            future = self.executor.submit(self._process_job_safe, job)
-            
             psid_hash = resolve_user_id(psid=psid)
+            self.message_executor.submit(psid_hash, self._process_job_safe, job)
             log_webhook_success(psid_hash, mid, "queued", None, None, 0)
             
             logger.info(f"Request {rid}: Message queued for background processing")
             return True
             
+        except ExecutorSaturated as e:
+            logger.warning(f"Request {rid}: Message shed, background queue saturated: {str(e)}")
+            return False
         except Exception as e:
             logger.error(f"Request {rid}: Failed to enqueue message: {str(e)}")
             return False
@@ -108,14 +125,23 @@ class BackgroundProcessor:
         job = {"rid": rid, "user_hash": user_hash, "text": text, "channel": "web"}
         
         try:
-            future = self.executor.submit(self._process_job_safe, job)
+            self.message_executor.submit(user_hash, self._process_job_safe, job)
             logger.info(f"Request {rid}: Web message queued for background processing")
             return {"ok": True, "rid": rid}
+        except ExecutorSaturated as e:
+            logger.warning(f"Request {rid}: Web message shed, background queue saturated: {str(e)}")
+            return {"ok": False, "error": "overloaded", "retry_after": 1}
         except Exception as e:
             logger.error(f"Request {rid}: Failed to enqueue web message: {str(e)}")
             return {"ok": False, "error": str(e)}
     
     def _process_job_safe(self, job: MessageJob) -> None:
+        """Process job with one AnalyzedMessage shared by PCA, router and parser"""
+        job_text = job.get("text") if isinstance(job, dict) else job.text
+        with message_scope(job_text):
+            self._process_job(job)
+
+    def _process_job(self, job: MessageJob) -> None:
         """Process job with timeout protection and RL-2 support"""
         start_time = time.time()
         
@@ -130,6 +156,7 @@ class BackgroundProcessor:
         category = None
         amount = None
         response_sent = False
+        late_route = None
         
         try:
             from app import app
@@ -184,17 +211,21 @@ class BackgroundProcessor:
                     job_channel = job.get("channel", "messenger") if isinstance(job, dict) else "messenger"
                     
                     # CRITICAL: router needs user_id_hash for data processing, but we preserve original PSID for messaging
-                    response_text, intent, category, amount = production_router.route_message(
-                        job_text, user_hash, job_rid, channel="messenger"
+                    # Routing is bounded by what is left of processing_timeout; on overrun the
+                    # fallback reply goes out now and the shard waits for the late route below
+                    route_future = self.route_executor.submit(
+                        contextvars.copy_context().run,
+                        self._route_in_app_context, app, job_text, user_hash, job_rid
                     )
-                    
-                    # Send response within timeout
-                    processing_time = time.time() - start_time
-                    if processing_time > self.processing_timeout:
+                    remaining = max(0.0, self.processing_timeout - (time.time() - start_time))
+                    try:
+                        response_text, intent, category, amount = route_future.result(timeout=remaining)
+                    except FutureTimeoutError:
+                        late_route = route_future
                         response_text = self.fallback_reply
                         intent = "timeout"
                         log_webhook_success(psid_hash, job.mid, intent, category, amount,
-                                          processing_time * 1000)
+                                          (time.time() - start_time) * 1000)
                     
                     # Send response with clear error handling + debug echo for 24h
                     # Only send Facebook messages for Messenger channel, skip for web
@@ -262,6 +293,19 @@ class BackgroundProcessor:
             
             if not response_sent and intent != "24h_policy_block":
                 logger.warning(f"Request {job.rid}: No response sent for message {job.mid}")
+            
+            # Hold this user's shard until a timed-out route finishes so the next
+            # message never races it on corrections, undo or idempotency
+            if late_route is not None:
+                try:
+                    late_route.result()
+                except Exception as late_error:
+                    logger.error(f"Request {job.rid}: Timed-out route failed: {str(late_error)}")
+    
+    def _route_in_app_context(self, app, text: str, user_hash: str, rid: str) -> tuple:
+        """Run the production router on a route worker thread"""
+        with app.app_context():
+            return production_router.route_message(text, user_hash, rid, channel="messenger")
     
     def _regex_fallback_with_disclaimer(self, text: str, psid: str, is_rate_limited: bool = False) -> tuple[str, str, str | None, float | None]:
         """
@@ -371,6 +415,10 @@ class BackgroundProcessor:
             logger.error(f"Failed to send fallback reply: {str(e)}")
             return False
     
+    def is_overloaded(self) -> bool:
+        """Load-shedding signal: some user shard is close to full"""
+        return self.message_executor.is_overloaded()
+    
     def get_stats(self) -> dict[str, Any]:
         """Get background processor statistics"""
         ai_status = self.ai_adapter.get_status() if hasattr(self.ai_adapter, 'get_status') else {"enabled": False}
@@ -378,10 +426,19 @@ class BackgroundProcessor:
             "max_workers": self.max_workers,
             "ai_enabled": ai_status.get("enabled", False),
             "processing_timeout": self.processing_timeout,
-            "message_queue_size": self.job_queue.qsize() if hasattr(self.job_queue, 'qsize') else 0,
+            "message_queue_size": self.message_executor.queue_depth(),
+            "message_executor": self.message_executor.get_stats(),
             "job_queue_enabled": self.job_queue_enabled,
             "job_polling_active": self.job_polling_active
         }
+        if self.job_consumers is not None:
+            stats["job_consumers"] = self.job_consumers.get_stats()
+        
+        try:
+            from .webhook_processor import get_dedup_stats
+            stats["message_dedup"] = get_dedup_stats()
+        except Exception as e:
+            logger.debug(f"Dedup stats unavailable: {str(e)}")
         
         # Add Redis job queue stats if available
         if self.job_queue_enabled and job_queue is not None:
@@ -390,6 +447,7 @@ class BackgroundProcessor:
                 if queue_stats:
                     stats.update({
                         "redis_jobs_queued": queue_stats.get("queued", 0),
+                        "redis_jobs_in_flight": queue_stats.get("in_flight", 0),
                         "redis_jobs_retry": queue_stats.get("retry", 0),
                         "redis_jobs_dlq": queue_stats.get("dlq", 0)
                     })
@@ -409,34 +467,21 @@ class BackgroundProcessor:
             logger.debug("Reminder system disabled for policy compliance")
             self._last_reminder_check = now
 
-    def _job_queue_worker(self) -> None:
-        """Worker thread for processing Redis job queue"""
-        self.job_polling_active = True
-        logger.info("Job queue worker started")
-        
-        while True:
-            try:
-                # Process retry queue first
-                if self.job_queue_enabled and job_queue is not None:
-                    retry_jobs = job_queue.process_retry_queue()
-                    if retry_jobs:
-                        logger.info(f"Moved {len(retry_jobs)} jobs from retry to main queue")
-                
-                # Dequeue and process next job
-                if self.job_queue_enabled and job_queue is not None:
-                    job = job_queue.dequeue()
-                    if job:
-                        # Process job in dedicated thread to avoid blocking
-                        self.executor.submit(self._process_redis_job, job)
-                
-                # Small sleep to prevent busy waiting
-                time.sleep(0.1)
-                
-            except Exception as e:
-                logger.error(f"Job queue worker error: {e}")
-                time.sleep(1)  # Backoff on error
+    @property
+    def job_polling_active(self) -> bool:
+        return self.job_consumers is not None and self.job_consumers.running
+    
+    def _process_redis_job_in_order(self, job) -> bool:
+        """Run a Redis job on its user's message shard, keeping per-user ordering with chat messages"""
+        try:
+            future = self.message_executor.submit(job.user_id, self._process_redis_job, job)
+        except ExecutorSaturated as e:
+            logger.warning(f"Redis job {job.job_id} deferred, background queue saturated: {str(e)}")
+            job_queue.release_job(job.job_id)  # shed, not failed: keeps its attempts
+            return False
+        return future.result()
     
-    def _process_redis_job(self, job) -> None:
+    def _process_redis_job(self, job) -> bool:
         """Process a single Redis job"""
         try:
             from app import app
@@ -447,17 +492,21 @@ class BackgroundProcessor:
                         logger.info(f"Redis job {job.job_id} processed successfully")
                     else:
                         logger.warning(f"Redis job {job.job_id} processing failed")
+                    return success
                 else:
                     logger.error("Job processor not available")
         except Exception as e:
             job_id = getattr(job, 'job_id', 'unknown')
             logger.error(f"Redis job {job_id} processing exception: {e}")
+        return False
 
     def shutdown(self) -> None:
         """Gracefully shutdown the background processor"""
         logger.info("Shutting down background processor...")
-        self.job_polling_active = False
-        self.executor.shutdown(wait=True)
+        if self.job_consumers is not None:
+            self.job_consumers.stop()
+        self.message_executor.shutdown(wait=True)
+        self.route_executor.shutdown(wait=True)
         if hasattr(self.ai_adapter, 'cleanup'):
             self.ai_adapter.cleanup()
 
@@ -0,0 +1,490 @@
+"""
+Unified two-tier cache
+Named namespaces over a bounded in-process LRU+TTL (L1) and, when enabled and
+reachable, a Redis tier (L2) shared by every worker. Loads are single-flight,
+entries can be invalidated by user or tag, and namespaces marked versioned
+drop a user's entries as soon as their data version (utils.data_versions) moves.
+L2 entries are JSON, so values that don't serialize stay in L1 only.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CACHE_L2_BACKEND = os.getenv("CACHE_L2_BACKEND", "auto").lower()  # auto | off
+CACHE_L1_TTL_SEC = int(os.getenv("CACHE_L1_TTL_SEC", "60"))  # Longest L1 serves an L2-backed entry unchecked
+CACHE_LOAD_TIMEOUT_SEC = float(os.getenv("CACHE_LOAD_TIMEOUT_SEC", "30"))
+CACHE_KEY_PREFIX = "cache:"
+
+_MISSING = object()
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'user', 'tags', 'version')
+
+    def __init__(self, value, expires_at: float, user: str | None, tags: tuple, version: int | None):
+        self.value = value
+        self.expires_at = expires_at
+        self.user = user
+        self.tags = tags
+        self.version = version
+
+
+class _Flight:
+    """One in-progress load that concurrent callers for the same key wait on"""
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: BaseException | None = None
+
+
+class CacheNamespace:
+    """
+    One named cache: bounded L1, optional L2, single-flight loads
+
+    Also behaves as a mapping over its L1 entries (in LRU order, oldest first),
+    which keeps older call sites that used a plain dict working.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float = 300, max_entries: int = 1000,
+                 l2: bool = False, versioned: bool = False, l1_ttl_seconds: float | None = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.l2_enabled = l2
+        self.versioned = versioned
+        self.l1_ttl_seconds = l1_ttl_seconds if l1_ttl_seconds is not None else (
+            min(ttl_seconds, CACHE_L1_TTL_SEC) if l2 else ttl_seconds)
+        self._clock = clock
+        self._max_entries = max_entries
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._by_user: dict[str, set] = {}
+        self._by_tag: dict[str, set] = {}
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.RLock()
+
+        self.stats = {
+            'hits': 0,
+            'l2_hits': 0,
+            'misses': 0,
+            'loads': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'stale': 0,
+            'invalidations': 0,
+            'l2_errors': 0,
+        }
+
+    # Public API
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries
+
+    @max_entries.setter
+    def max_entries(self, value: int) -> None:
+        with self._lock:
+            self._max_entries = value
+            self._evict_overflow()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Cached value from L1, then L2; default on a miss"""
+        with self._lock:
+            entry = self._l1_get(key)
+        # Checked outside the lock: the version lookup may be a Redis or database round trip
+        if entry is not None and self._is_stale(entry):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._l1_pop(key)
+                    self.stats['stale'] += 1
+            entry = None
+        if entry is not None:
+            with self._lock:
+                self.stats['hits'] += 1
+            return entry.value
+
+        entry = self._l2_get(key)
+        if entry is not None:
+            with self._lock:
+                self.stats['l2_hits'] += 1
+                self._l1_put(key, entry, min(self.l1_ttl_seconds, max(0.0, entry.expires_at - time.time())))
+            return entry.value
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return default
+
+    def current_version(self, user: str | None) -> int | None:
+        """User's data version for set(version=...); read it before building the value"""
+        return self._current_version(user) if self.versioned and user else None
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None, user: str | None = None,
+            tags: Iterable[str] = (), version: int | None = None) -> None:
+        """
+        Store in L1 (and L2); user and tags are what invalidate_user/invalidate_tag match
+
+        Versioned namespaces should get the version read before the value was
+        built, so a write landing mid-build leaves the entry stale instead of
+        stamping old data with the new version. Without one it is read now.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if version is None:
+            version = self.current_version(user)
+        entry = _Entry(value, time.time() + ttl, user, tuple(tags), version)
+        with self._lock:
+            self._l1_put(key, entry, min(ttl, self.l1_ttl_seconds) if self.l2_enabled else ttl)
+        self._l2_set(key, entry, ttl)
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], ttl_seconds: float | None = None,
+                    user: str | None = None, tags: Iterable[str] = ()) -> Any:
+        """Cached value, or the loader's result with one loader call per key at a time"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            if flight.done.wait(CACHE_LOAD_TIMEOUT_SEC):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            logger.warning(f"Cache {self.name}: load of {key} still running after {CACHE_LOAD_TIMEOUT_SEC}s")
+            return loader()
+
+        try:
+            with self._lock:
+                self.stats['loads'] += 1
+            version = self.current_version(user)
+            flight.value = loader()
+            self.set(key, flight.value, ttl_seconds, user, tags, version=version)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def incr(self, key: str, delta: int = 1, ttl_seconds: float | None = None) -> int:
+        """Add to an L1 counter; ttl_seconds restarts its expiry, otherwise it keeps the one it has"""
+        with self._lock:
+            entry = self._l1_get(key)
+            value = (entry.value if entry is not None else 0) + delta
+            if ttl_seconds or entry is None:
+                ttl = ttl_seconds or self.ttl_seconds
+            else:
+                ttl = entry.expires_at - self._clock()
+            self._l1_put(key, _Entry(value, 0.0, None, (), None), ttl)
+            return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._l1_pop(key)
+        client = self._l2_client()
+        if client is not None:
+            try:
+                client.delete(self._l2_key(key))
+            except Exception as e:
+                self._l2_failed(e)
+
+    def invalidate_user(self, user: str) -> int:
+        """Drop every entry stored for user; returns L1 entries removed"""
+        return self._invalidate('u', user, self._by_user)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry stored with tag; returns L1 entries removed"""
+        return self._invalidate('t', tag, self._by_tag)
+
+    def user_keys(self, user: str) -> list[str]:
+        """Live L1 keys stored for user"""
+        with self._lock:
+            return [key for key in list(self._by_user.get(user, ())) if self._l1_get(key, touch=False) is not None]
+
+    def purge_expired(self) -> int:
+        """Drop expired L1 entries now instead of on their next lookup; returns entries removed"""
+        with self._lock:
+            now = self._clock()
+            expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+            for key in expired:
+                self._l1_pop(key)
+            self.stats['expirations'] += len(expired)
+            return len(expired)
+
+    def clear(self) -> None:
+        """Empty L1 (L2 entries age out on their TTL)"""
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self._by_tag.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['l2_hits'] + self.stats['misses']
+            return dict(
+                self.stats,
+                size=len(self._entries),
+                max_entries=self._max_entries,
+                hit_rate_percent=round((self.stats['hits'] + self.stats['l2_hits']) / lookups * 100, 1)
+                if lookups else 0.0,
+                l2=self._l2_client() is not None,
+                versioned=self.versioned,
+            )
+
+    # Mapping protocol over L1
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.delete(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return isinstance(key, str) and self._l1_get(key, touch=False) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    # L1
+
+    def _l1_get(self, key: str, touch: bool = True) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self._clock():
+            self._l1_pop(key)
+            self.stats['expirations'] += 1
+            return None
+        if touch:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _l1_put(self, key: str, entry: _Entry, ttl: float) -> None:
+        self._l1_pop(key)
+        local = _Entry(entry.value, self._clock() + ttl, entry.user, entry.tags, entry.version)
+        self._entries[key] = local
+        if entry.user:
+            self._by_user.setdefault(entry.user, set()).add(key)
+        for tag in entry.tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+        self._evict_overflow()
+
+    def _l1_pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if entry.user:
+            self._unindex(self._by_user, entry.user, key)
+        for tag in entry.tags:
+            self._unindex(self._by_tag, tag, key)
+
+    def _evict_overflow(self) -> None:
+        while len(self._entries) > self._max_entries:
+            oldest = next(iter(self._entries))
+            self._l1_pop(oldest)
+            self.stats['evictions'] += 1
+
+    @staticmethod
+    def _unindex(index: dict, name: str, key: str) -> None:
+        keys = index.get(name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[name]
+
+    def _invalidate(self, kind: str, name: str, index: dict) -> int:
+        with self._lock:
+            keys = list(index.get(name, ()))
+            for key in keys:
+                self._l1_pop(key)
+            if keys:
+                self.stats['invalidations'] += 1
+
+        client = self._l2_client()
+        if client is not None:
+            try:
+                index_key = f"{CACHE_KEY_PREFIX}{self.name}:{kind}:{name}"
+                members = client.smembers(index_key)
+                pipe = client.pipeline()
+                for member in members:
+                    pipe.delete(member)
+                pipe.delete(index_key)
+                pipe.execute()
+            except Exception as e:
+                self._l2_failed(e)
+        return len(keys)
+
+    # L2
+
+    def _l2_client(self):
+        return get_l2_client() if self.l2_enabled else None
+
+    def _l2_key(self, key: str) -> str:
+        return f"{CACHE_KEY_PREFIX}{self.name}:{key}"
+
+    def _l2_get(self, key: str) -> _Entry | None:
+        client = self._l2_client()
+        if client is None:
+            return None
+        try:
+            raw = client.get(self._l2_key(key))
+        except Exception as e:
+            self._l2_failed(e)
+            return None
+        if raw is None:
+            return None
+        try:
+            payload = json.loads(raw)
+            entry = _Entry(payload['value'], payload['expires_at'], payload['user'], tuple(payload['tags']),
+                           payload['version'])
+        except (ValueError, TypeError, KeyError):
+            return None
+        if self._is_stale(entry):
+            with self._lock:
+                self.stats['stale'] += 1
+            return None
+        return entry
+
+    def _l2_set(self, key: str, entry: _Entry, ttl: float) -> None:
+        client = self._l2_client()
+        if client is None:
+            return
+        try:
+            payload = json.dumps({'value': entry.value, 'expires_at': entry.expires_at, 'user': entry.user,
+                                  'tags': list(entry.tags), 'version': entry.version})
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Cache {self.name}: {key} kept out of L2, not JSON-serializable: {e}")
+            return
+        try:
+            l2_key = self._l2_key(key)
+            pipe = client.pipeline()
+            pipe.set(l2_key, payload, ex=max(1, int(ttl)))
+            indexes = ([f"u:{entry.user}"] if entry.user else []) + [f"t:{tag}" for tag in entry.tags]
+            for index in indexes:
+                index_key = f"{CACHE_KEY_PREFIX}{self.name}:{index}"
+                pipe.sadd(index_key, l2_key)
+                pipe.expire(index_key, max(1, int(ttl)))
+            pipe.execute()
+        except Exception as e:
+            self._l2_failed(e)
+
+    def _l2_failed(self, error: Exception) -> None:
+        from utils import redis_pool
+        with self._lock:
+            self.stats['l2_errors'] += 1
+        logger.debug(f"Cache {self.name}: L2 error: {error}")
+        redis_pool.report_failure(error)
+
+    def _is_stale(self, entry: _Entry) -> bool:
+        """True when a versioned entry was stored under an older data version of its user"""
+        if not (self.versioned and entry.user and entry.version is not None):
+            return False
+        return self._current_version(entry.user) != entry.version
+
+    @staticmethod
+    def _current_version(user: str) -> int | None:
+        try:
+            from utils.data_versions import get_data_version
+            return get_data_version(user)
+        except Exception as e:
+            logger.debug(f"Data version unavailable for cache validation: {e}")
+            return None
+
+
+_namespaces: dict[str, CacheNamespace] = {}
+_namespaces_lock = threading.Lock()
+
+
+def get_l2_client():
+    """Shared-pool Redis client for L2, or None (CACHE_L2_BACKEND=off or Redis unreachable)"""
+    if CACHE_L2_BACKEND == "off":
+        return None
+    from utils import redis_pool
+    return redis_pool.get_client()
+
+
+def namespace(name: str, **config) -> CacheNamespace:
+    """Shared namespace by name; config applies when it is first created"""
+    with _namespaces_lock:
+        existing = _namespaces.get(name)
+        if existing is None:
+            existing = _namespaces[name] = CacheNamespace(name, **config)
+        return existing
+
+
+def register(cache: CacheNamespace) -> CacheNamespace:
+    """Add a namespace built elsewhere to the registry (metrics and user invalidation)"""
+    with _namespaces_lock:
+        _namespaces[cache.name] = cache
+    return cache
+
+
+def invalidate_user(user: str) -> int:
+    """Drop a user's entries from every namespace"""
+    with _namespaces_lock:
+        caches = list(_namespaces.values())
+    return sum(cache.invalidate_user(user) for cache in caches)
+
+
+def get_cache_stats() -> dict[str, dict[str, Any]]:
+    with _namespaces_lock:
+        caches = list(_namespaces.values())
+    return {cache.name: cache.get_stats() for cache in caches}
+
+
+def to_prometheus() -> str:
+    """Per-namespace cache counters and sizes for this process in Prometheus text format"""
+    stats = sorted(get_cache_stats().items())
+    pid = os.getpid()
+    lines = [
+        "# HELP finbrain_cache_events_total Cache lookups, loads and removals by namespace",
+        "# TYPE finbrain_cache_events_total counter",
+    ]
+    for name, values in stats:
+        for event in ('hits', 'l2_hits', 'misses', 'loads', 'coalesced', 'evictions',
+                      'expirations', 'stale', 'invalidations', 'l2_errors'):
+            lines.append(f'finbrain_cache_events_total{{namespace="{name}",event="{event}",pid="{pid}"}} '
+                         f'{values[event]}')
+    lines += [
+        "# HELP finbrain_cache_entries L1 entries held by namespace",
+        "# TYPE finbrain_cache_entries gauge",
+    ]
+    for name, values in stats:
+        lines.append(f'finbrain_cache_entries{{namespace="{name}",pid="{pid}"}} {values["size"]}')
+    lines += [
+        "# HELP finbrain_cache_entries_max L1 entry limit by namespace",
+        "# TYPE finbrain_cache_entries_max gauge",
+    ]
+    for name, values in stats:
+        lines.append(f'finbrain_cache_entries_max{{namespace="{name}",pid="{pid}"}} {values["max_entries"]}')
+    return "\n".join(lines) + "\n"
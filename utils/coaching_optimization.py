@@ -10,6 +10,8 @@ from collections import OrderedDict
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
+from utils import cache
+
 logger = logging.getLogger(__name__)
 
 class CoachingCache:
@@ -23,16 +25,13 @@ class CoachingCache:
         self.max_cache_size = int(os.getenv('COACH_CACHE_MAX_SIZE', '1000'))
         self.cache_ttl_seconds = int(os.getenv('COACH_CACHE_TTL_SEC', '300'))  # 5 minutes
         
-        # LRU cache for topic suggestions and templates
-        self.topic_cache = OrderedDict()
-        self.template_cache = OrderedDict()
-        self.user_context_cache = OrderedDict()
+        # Bounded LRU+TTL namespaces for topic suggestions, templates and user context
+        config = {'ttl_seconds': self.cache_ttl_seconds, 'max_entries': self.max_cache_size}
+        self.topic_cache = cache.namespace('coaching_topics', **config)
+        self.template_cache = cache.namespace('coaching_templates', **config)
+        self.user_context_cache = cache.namespace('coaching_user_context', **config)
         
-        # Performance tracking
         self.cache_stats = {
-            'hits': 0,
-            'misses': 0,
-            'evictions': 0,
             'last_cleanup': time.time()
         }
     
@@ -42,21 +41,7 @@ class CoachingCache:
             return None
         
         try:
-            cache_entry = self.topic_cache.get(context_key)
-            if cache_entry:
-                # Check TTL
-                if time.time() - cache_entry['timestamp'] < self.cache_ttl_seconds:
-                    # Move to end (LRU)
-                    self.topic_cache.move_to_end(context_key)
-                    self.cache_stats['hits'] += 1
-                    return cache_entry['suggestions']
-                else:
-                    # Expired
-                    del self.topic_cache[context_key]
-            
-            self.cache_stats['misses'] += 1
-            return None
-            
+            return self.topic_cache.get(context_key)
         except Exception as e:
             logger.error(f"Topic cache error: {e}")
             return None
@@ -67,17 +52,7 @@ class CoachingCache:
             return
         
         try:
-            # Cleanup if cache is full
-            if len(self.topic_cache) >= self.max_cache_size:
-                # Remove oldest entry
-                self.topic_cache.popitem(last=False)
-                self.cache_stats['evictions'] += 1
-            
-            self.topic_cache[context_key] = {
-                'suggestions': suggestions.copy(),
-                'timestamp': time.time()
-            }
-            
+            self.topic_cache.set(context_key, suggestions.copy())
         except Exception as e:
             logger.error(f"Topic cache store error: {e}")
     
@@ -87,18 +62,7 @@ class CoachingCache:
             return None
         
         try:
-            cache_entry = self.user_context_cache.get(psid_hash)
-            if cache_entry:
-                if time.time() - cache_entry['timestamp'] < self.cache_ttl_seconds:
-                    self.user_context_cache.move_to_end(psid_hash)
-                    self.cache_stats['hits'] += 1
-                    return cache_entry['context']
-                else:
-                    del self.user_context_cache[psid_hash]
-            
-            self.cache_stats['misses'] += 1
-            return None
-            
+            return self.user_context_cache.get(psid_hash)
         except Exception as e:
             logger.error(f"User context cache error: {e}")
             return None
@@ -109,22 +73,17 @@ class CoachingCache:
             return
         
         try:
-            if len(self.user_context_cache) >= self.max_cache_size:
-                self.user_context_cache.popitem(last=False)
-                self.cache_stats['evictions'] += 1
-            
-            self.user_context_cache[psid_hash] = {
-                'context': context.copy(),
-                'timestamp': time.time()
-            }
-            
+            self.user_context_cache.set(psid_hash, context.copy(), user=psid_hash)
         except Exception as e:
             logger.error(f"User context cache store error: {e}")
     
     def get_cache_stats(self) -> dict[str, Any]:
         """Get cache performance statistics"""
-        total_requests = self.cache_stats['hits'] + self.cache_stats['misses']
-        hit_rate = (self.cache_stats['hits'] / total_requests * 100) if total_requests > 0 else 0
+        namespaces = (self.topic_cache, self.template_cache, self.user_context_cache)
+        stats = [ns.get_stats() for ns in namespaces]
+        hits = sum(s['hits'] for s in stats)
+        total_requests = hits + sum(s['misses'] for s in stats)
+        hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
         
         return {
             'enabled': self.cache_enabled,
@@ -135,7 +94,7 @@ class CoachingCache:
                 'templates': len(self.template_cache),
                 'user_contexts': len(self.user_context_cache)
             },
-            'evictions': self.cache_stats['evictions'],
+            'evictions': sum(s['evictions'] for s in stats),
             'max_size': self.max_cache_size,
             'ttl_seconds': self.cache_ttl_seconds
         }
@@ -149,22 +108,8 @@ class CoachingCache:
             if current_time - self.cache_stats['last_cleanup'] < 60:  # 1 minute
                 return
             
-            expired_count = 0
-            
-            # Clean topic cache
-            expired_keys = [k for k, v in self.topic_cache.items() 
-                           if current_time - v['timestamp'] > self.cache_ttl_seconds]
-            for key in expired_keys:
-                del self.topic_cache[key]
-                expired_count += 1
-            
-            # Clean user context cache
-            expired_keys = [k for k, v in self.user_context_cache.items() 
-                           if current_time - v['timestamp'] > self.cache_ttl_seconds]
-            for key in expired_keys:
-                del self.user_context_cache[key]
-                expired_count += 1
-            
+            expired_count = sum(ns.purge_expired()
+                                for ns in (self.topic_cache, self.template_cache, self.user_context_cache))
             self.cache_stats['last_cleanup'] = current_time
             
             if expired_count > 0:
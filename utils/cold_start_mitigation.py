@@ -75,13 +75,13 @@ class ColdStartMitigation:
             }
         
         try:
-            from utils.ai_adapter_v2 import production_ai_adapter as ai_adapter
-            session = ai_adapter.session
+            from utils.ai_transport import ai_transport
             
             start_time = time.time()
             
-            # Send HEAD request to status endpoint for minimal warm-up
-            response = session.head(self.ai_status_endpoint, timeout=5)
+            # HEAD the status endpoint through the shared transport, leaving
+            # warm keep-alive connections in its pool for the first AI calls
+            response = ai_transport.warm(self.ai_status_endpoint, timeout=5)
             response_time_ms = (time.time() - start_time) * 1000
             
             if response.status_code in [200, 404, 405]:  # 405 = Method Not Allowed is acceptable
@@ -90,7 +90,8 @@ class ColdStartMitigation:
                     "status": "warmed",
                     "status_code": response.status_code,
                     "response_time_ms": response_time_ms,
-                    "endpoint": self.ai_status_endpoint
+                    "endpoint": self.ai_status_endpoint,
+                    "connections_opened": ai_transport.get_stats()["connections_opened"]
                 }
             else:
                 logger.warning(f"AI provider warm-up unexpected status: {response.status_code}")
@@ -0,0 +1,124 @@
+"""
+Per-user data versions
+A monotonically increasing counter per user (all-time and per month) that is
+bumped in the same transaction as every ORM write to expenses, so "has this
+user's data changed?" is one primary-key lookup instead of a scan over their
+expenses. Month counters cover both the month an expense is dated in and the
+month it was recorded in (created_at), which is what analysis windows used to
+be fingerprinted on, so backdated entries still move the current month.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session, object_session
+
+logger = logging.getLogger(__name__)
+
+ALL_TIME = "all"  # Period key for the user's whole ledger; months use 'YYYY-MM'
+
+_BUMP_SQL = text("""
+    INSERT INTO user_data_versions (user_id_hash, period, version, updated_at)
+    VALUES (:user_hash, :period, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (user_id_hash, period) DO UPDATE SET
+        version = user_data_versions.version + 1,
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING version
+""")
+
+_READ_SQL = text("""
+    SELECT version FROM user_data_versions WHERE user_id_hash = :user_hash AND period = :period
+""")
+
+_PENDING_KEY = 'data_version_bumps'
+
+
+def period_for(day: date | datetime | None) -> str:
+    return day.strftime('%Y-%m') if day else ALL_TIME
+
+
+def window_period(window_start: datetime, window_end: datetime) -> str:
+    """The month a [start, end) window falls in, or ALL_TIME if it spans months"""
+    start = period_for(window_start)
+    return start if start == period_for(window_end - timedelta(microseconds=1)) else ALL_TIME
+
+
+def _periods(target) -> set[str]:
+    """Months an expense row counts towards: its own date and when it was recorded"""
+    return {period_for(target.date), period_for(target.created_at)}
+
+
+def _bump(connection, target, user_hash: str | None, periods: set[str]) -> None:
+    if not user_hash:
+        return
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(user_hash)
+    for period in sorted(periods | {ALL_TIME}):
+        connection.execute(_BUMP_SQL, {'user_hash': user_hash, 'period': period})
+
+
+def _after_insert(mapper, connection, target) -> None:
+    _bump(connection, target, target.user_id_hash, _periods(target))
+
+
+def _before_update(mapper, connection, target) -> None:
+    state = inspect(target)
+    if not any(attr.history.has_changes() for attr in state.attrs):
+        return
+    periods = _periods(target)
+    users = {target.user_id_hash}
+    if state.attrs.date.history.has_changes() or state.attrs.user_id_hash.history.has_changes():
+        # The old values may have been expired, so read what the row holds now
+        table = mapper.local_table
+        old = connection.execute(
+            select(table.c.user_id_hash, table.c.date).where(table.c.id == target.id)
+        ).first()
+        if old is not None:
+            users.add(old[0])
+            periods.add(period_for(old[1]))
+    for user_hash in users:
+        _bump(connection, target, user_hash, periods)
+
+
+def _after_delete(mapper, connection, target) -> None:
+    _bump(connection, target, target.user_id_hash, _periods(target))
+
+
+def _after_commit(session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    # Versioned namespaces catch the change on their own; this also frees the memory now
+    from utils import cache
+    for user_hash in pending:
+        cache.invalidate_user(user_hash)
+
+
+def _after_rollback(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_data_version_listeners(expense_model) -> None:
+    """Bump user_data_versions on every ORM write to the Expense mapper"""
+    if event.contains(expense_model, 'after_insert', _after_insert):
+        return
+    event.listen(expense_model, 'after_insert', _after_insert)
+    event.listen(expense_model, 'before_update', _before_update)
+    event.listen(expense_model, 'after_delete', _after_delete)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
+
+
+def get_data_version(user_hash: str, period: str = ALL_TIME) -> int:
+    """
+    Current version (0 if the user has never written)
+
+    Always read from the database: the counter commits with the write itself,
+    so a primary-key lookup can't go stale the way a separate mirror could.
+    """
+    from db_base import db
+
+    row = db.session.execute(_READ_SQL, {'user_hash': user_hash, 'period': period}).first()
+    return int(row[0]) if row else 0
@@ -1,22 +1,227 @@
 """
 Database Backup and Restore System - Clean Version
 100% safe implementation with proper Flask context handling
+
+Backups are newline-delimited JSON, optionally gzip-compressed:
+
+    {"type": "metadata", ...}
+    {"type": "row", "table": "users", "data": {...}}
+    {"type": "table_end", "table": "users", "count": N, "sha256": "..."}
+    ...
+    {"type": "end"}
+
+Rows are read with server-side cursors and written one line at a time, and
+each table's sha256 covers its row lines exactly as written, so backup,
+verify and restore all run in constant memory.
 """
 
+import gzip
+import hashlib
 import json
 import logging
 import os
-from datetime import datetime
+from datetime import date, datetime, time
+from decimal import Decimal
 from typing import Any, Dict, List
 
 logger = logging.getLogger(__name__)
 
+BACKUP_FORMAT_VERSION = '2.0'
+BACKUP_EXTENSIONS = ('.json', '.ndjson', '.ndjson.gz')
+
+
+def _backup_models() -> dict[str, Any]:
+    """Backed-up tables in restore order"""
+    from models import Expense, MonthlySummary, User
+    return {'users': User, 'expenses': Expense, 'monthly_summaries': MonthlySummary}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, default=_json_default, ensure_ascii=False,
+                      sort_keys=True, separators=(',', ':'))
+
+
+def _open_backup(path: str, mode: str, compress: bool):
+    if compress:
+        return _BackupFile(gzip.open(path, mode + 't', encoding='utf-8'))
+    return _BackupFile(open(path, mode, encoding='utf-8'))
+
+
+class _BackupFile:
+    """Text file wrapper that carries the verification summary of a read"""
+
+    def __init__(self, f):
+        self._f = f
+        self.summary = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+    def __iter__(self):
+        return iter(self._f)
+
+    def write(self, text: str) -> None:
+        self._f.write(text)
+
+
+class _BackupWriter:
+    """Writes backup lines and keeps per-table counts and checksums"""
+
+    def __init__(self, f, metadata: dict):
+        self._f = f
+        self._table = None
+        self._hash = None
+        self._count = 0
+        self.counts = {}
+        self.checksums = {}
+        self._f.write(_dumps(metadata) + '\n')
+
+    def begin_table(self, table: str) -> None:
+        self._table = table
+        self._hash = hashlib.sha256()
+        self._count = 0
+
+    def write_row(self, row: dict) -> None:
+        line = _dumps({'type': 'row', 'table': self._table, 'data': row}) + '\n'
+        self._hash.update(line.encode('utf-8'))
+        self._count += 1
+        self._f.write(line)
+
+    def end_table(self) -> None:
+        digest = self._hash.hexdigest()
+        self.counts[self._table] = self._count
+        self.checksums[self._table] = digest
+        self._f.write(_dumps({'type': 'table_end', 'table': self._table,
+                              'count': self._count, 'sha256': digest}) + '\n')
+
+    def close(self) -> None:
+        self._f.write(_dumps({'type': 'end'}) + '\n')
+
+
+def iter_backup_rows(f: _BackupFile):
+    """
+    Yield (table, row) from a backup while checking its structure and checksums
+    
+    Raises ValueError on the first inconsistency. Once the generator is
+    exhausted, f.summary holds (metadata, record_counts, checksums).
+    """
+    lines = iter(f)
+    first = next(lines, None)
+    metadata = json.loads(first) if first else {}
+    if metadata.get('type') != 'metadata':
+        raise ValueError('Missing metadata header')
+    
+    expected = metadata.get('tables', [])
+    counts, checksums = {}, {}
+    table, digest, count = None, None, 0
+    ended = False
+    
+    for line in lines:
+        if ended:
+            raise ValueError('Data after end marker')
+        record = json.loads(line)
+        kind = record.get('type')
+        
+        if kind == 'row':
+            if record['table'] != table:
+                if table is not None:
+                    raise ValueError(f'Table {table} has no end marker')
+                if record['table'] in counts:
+                    raise ValueError(f'Table {record["table"]} appears twice')
+                table, digest, count = record['table'], hashlib.sha256(), 0
+            digest.update(line.encode('utf-8'))
+            count += 1
+            yield table, record['data']
+        
+        elif kind == 'table_end':
+            name = record['table']
+            if table is None:
+                table, digest, count = name, hashlib.sha256(), 0
+            if name != table:
+                raise ValueError(f'Unexpected end marker for table {name}')
+            if record.get('count') != count:
+                raise ValueError(f'Row count mismatch for table {name}')
+            if record.get('sha256') != digest.hexdigest():
+                raise ValueError(f'Checksum mismatch for table {name}')
+            counts[name], checksums[name] = count, record['sha256']
+            table = None
+        
+        elif kind == 'end':
+            ended = True
+        else:
+            raise ValueError(f'Unknown record type: {kind}')
+    
+    if table is not None or not ended:
+        raise ValueError('Backup is truncated')
+    for name in expected:
+        if name not in counts:
+            raise ValueError(f'Missing table: {name}')
+    
+    f.summary = (metadata, counts, checksums)
+
+
+def _stream_rows(db, model, batch_size: int):
+    """Yield table rows as plain dicts through a server-side cursor"""
+    from sqlalchemy import select
+    
+    table = model.__table__
+    stmt = select(table).order_by(*table.primary_key.columns)
+    result = db.session.execute(stmt, execution_options={'yield_per': batch_size})
+    for row in result.mappings():
+        yield dict(row)
+
+
+def _decode_row(model, row: dict) -> dict:
+    """Convert a backup row back to column values for insertion"""
+    from sqlalchemy import Date, DateTime, Time
+    
+    decoded = {}
+    for column in model.__table__.columns:
+        if column.name not in row:
+            continue
+        value = row[column.name]
+        if isinstance(value, str):
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column.type, Date):
+                value = date.fromisoformat(value)
+            elif isinstance(column.type, Time):
+                value = time.fromisoformat(value)
+        decoded[column.name] = value
+    return decoded
+
+
+def _reset_sequences(db, models: dict) -> None:
+    """Move Postgres id sequences past restored primary keys"""
+    from sqlalchemy import text
+    
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for table_name in models:
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table_name}), 1))"
+        ))
+
 class DatabaseBackupSystem:
     """Safe database backup system using existing models"""
     
     def __init__(self):
         self.backup_dir = "/tmp/finbrain_backups"
         self.enabled = os.getenv('ENABLE_BACKUPS', 'true').lower() == 'true'
+        self.compress = os.getenv('BACKUP_COMPRESS', 'true').lower() == 'true'
+        self.batch_size = int(os.getenv('BACKUP_BATCH_SIZE', '1000'))
         
         # Ensure backup directory exists
         try:
@@ -24,182 +229,171 @@ class DatabaseBackupSystem:
         except Exception as e:
             logger.warning(f"Could not create backup directory: {e}")
     
-    def create_backup(self) -> dict[str, Any]:
-        """Create complete database backup in JSON format"""
+    def create_backup(self, compress: bool | None = None) -> dict[str, Any]:
+        """Stream every backed-up table to a newline-delimited JSON file"""
         if not self.enabled:
             return {'status': 'disabled', 'message': 'Backups disabled via ENABLE_BACKUPS=false'}
         
+        compress = self.compress if compress is None else compress
+        timestamp = datetime.utcnow()
+        extension = '.ndjson.gz' if compress else '.ndjson'
+        backup_filename = f"finbrain_backup_{timestamp.strftime('%Y%m%d_%H%M%S')}{extension}"
+        backup_path = os.path.join(self.backup_dir, backup_filename)
+        partial_path = backup_path + '.partial'
+        
         try:
-            from db_base import app
-            from models import Expense, MonthlySummary, User
+            from app import app
+            from db_base import db
             
             # Ensure we have Flask application context
             with app.app_context():
-                
-                # Initialize backup structure
-                backup_data = {
-                    'metadata': {
-                        'backup_timestamp': datetime.utcnow().isoformat(),
-                        'backup_version': '1.0',
-                        'system': 'finbrain',
-                        'tables': ['users', 'expenses', 'monthly_summaries']
-                    },
-                    'data': {}
+                models = _backup_models()
+                metadata = {
+                    'type': 'metadata',
+                    'backup_timestamp': timestamp.isoformat(),
+                    'backup_version': BACKUP_FORMAT_VERSION,
+                    'system': 'finbrain',
+                    'tables': list(models)
                 }
                 
-                # Backup Users table
-                users = User.query.all()
-                backup_data['data']['users'] = []
+                with _open_backup(partial_path, 'w', compress) as f:
+                    writer = _BackupWriter(f, metadata)
+                    for table_name, model in models.items():
+                        writer.begin_table(table_name)
+                        for row in _stream_rows(db, model, self.batch_size):
+                            writer.write_row(row)
+                        writer.end_table()
+                    writer.close()
                 
-                for user in users:
-                    user_data = {
-                        'id': user.id,
-                        'user_id_hash': user.user_id_hash,
-                        'platform': user.platform,
-                        'total_expenses': float(user.total_expenses) if user.total_expenses else 0.0,
-                        'expense_count': user.expense_count,
-                        'created_at': user.created_at.isoformat() if user.created_at else None,
-                        'last_interaction': user.last_interaction.isoformat() if user.last_interaction else None,
-                        'last_user_message_at': user.last_user_message_at.isoformat() if user.last_user_message_at else None,
-                        'daily_message_count': user.daily_message_count,
-                        'hourly_message_count': user.hourly_message_count,
-                        'last_daily_reset': user.last_daily_reset.isoformat() if user.last_daily_reset else None,
-                        'last_hourly_reset': user.last_hourly_reset.isoformat() if user.last_hourly_reset else None,
-                        'is_new': user.is_new,
-                        'has_completed_onboarding': user.has_completed_onboarding,
-                        'onboarding_step': user.onboarding_step,
-                        'interaction_count': user.interaction_count,
-                        'first_name': user.first_name,
-                        'income_range': user.income_range,
-                        'spending_categories': user.spending_categories,
-                        'primary_category': user.primary_category,
-                        'focus_area': user.focus_area,
-                        'additional_info': user.additional_info,
-                        'preferences': user.preferences,
-                        'reminder_scheduled_for': user.reminder_scheduled_for.isoformat() if user.reminder_scheduled_for else None,
-                        'reminder_preference': user.reminder_preference,
-                        'last_reminder_sent': user.last_reminder_sent.isoformat() if user.last_reminder_sent else None,
-                        'privacy_consent_given': user.privacy_consent_given,
-                        'privacy_consent_at': user.privacy_consent_at.isoformat() if user.privacy_consent_at else None,
-                        'terms_accepted': user.terms_accepted,
-                        'terms_accepted_at': user.terms_accepted_at.isoformat() if user.terms_accepted_at else None
-                    }
-                    backup_data['data']['users'].append(user_data)
+                os.replace(partial_path, backup_path)
                 
-                # Backup Expenses table
-                expenses = Expense.query.all()
-                backup_data['data']['expenses'] = []
-                
-                for expense in expenses:
-                    expense_data = {
-                        'id': expense.id,
-                        'user_id': expense.user_id,
-                        'description': expense.description,
-                        'amount': float(expense.amount) if expense.amount else 0.0,
-                        'category': expense.category,
-                        'currency': expense.currency,
-                        'date': expense.date.isoformat() if expense.date else None,
-                        'time': expense.time.isoformat() if expense.time else None,
-                        'month': expense.month,
-                        'unique_id': expense.unique_id,
-                        'created_at': expense.created_at.isoformat() if expense.created_at else None,
-                        'platform': expense.platform,
-                        'original_message': expense.original_message,
-                        'ai_insights': expense.ai_insights,
-                        'mid': expense.mid,
-                        'superseded_by': expense.superseded_by,
-                        'corrected_at': expense.corrected_at.isoformat() if expense.corrected_at else None,
-                        'corrected_reason': expense.corrected_reason
-                    }
-                    backup_data['data']['expenses'].append(expense_data)
-                
-                # Backup Monthly Summaries table
-                summaries = MonthlySummary.query.all()
-                backup_data['data']['monthly_summaries'] = []
-                
-                for summary in summaries:
-                    summary_data = {
-                        'id': summary.id,
-                        'user_id_hash': summary.user_id_hash,
-                        'month': summary.month,
-                        'total_amount': float(summary.total_amount) if summary.total_amount else 0.0,
-                        'expense_count': summary.expense_count,
-                        'categories': summary.categories,
-                        'created_at': summary.created_at.isoformat() if summary.created_at else None,
-                        'updated_at': summary.updated_at.isoformat() if summary.updated_at else None
-                    }
-                    backup_data['data']['monthly_summaries'].append(summary_data)
-                
-                # Save backup to file
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                backup_filename = f"finbrain_backup_{timestamp}.json"
-                backup_path = os.path.join(self.backup_dir, backup_filename)
-                
-                with open(backup_path, 'w') as f:
-                    json.dump(backup_data, f, indent=2, ensure_ascii=False)
+                result = {
+                    'status': 'success',
+                    'backup_file': backup_path,
+                    'timestamp': metadata['backup_timestamp'],
+                    'tables_backed_up': len(writer.counts),
+                    'records': dict(writer.counts),
+                    'checksums': dict(writer.checksums),
+                    'file_size_bytes': os.path.getsize(backup_path)
+                }
                 
-                # Verify backup file was created
-                if os.path.exists(backup_path):
-                    file_size = os.path.getsize(backup_path)
-                    
-                    result = {
-                        'status': 'success',
-                        'backup_file': backup_path,
-                        'timestamp': backup_data['metadata']['backup_timestamp'],
-                        'tables_backed_up': len(backup_data['data']),
-                        'records': {
-                            'users': len(backup_data['data']['users']),
-                            'expenses': len(backup_data['data']['expenses']),
-                            'monthly_summaries': len(backup_data['data']['monthly_summaries'])
-                        },
-                        'file_size_bytes': file_size
-                    }
-                    
-                    logger.info(f"Database backup created successfully: {backup_filename}")
-                    return result
-                else:
-                    return {'status': 'error', 'message': 'Backup file was not created'}
+                logger.info(f"Database backup created successfully: {backup_filename}")
+                return result
                     
         except Exception as e:
             logger.error(f"Database backup failed: {e}")
+            try:
+                os.remove(partial_path)
+            except OSError:
+                pass
             return {'status': 'error', 'message': str(e)}
     
     def verify_backup(self, backup_path: str) -> dict[str, Any]:
-        """Verify backup file integrity and structure"""
+        """Verify backup file integrity and structure in a single streaming pass"""
         try:
             if not os.path.exists(backup_path):
                 return {'status': 'error', 'message': 'Backup file not found'}
             
-            with open(backup_path) as f:
-                backup_data = json.load(f)
-            
-            # Verify structure
-            required_keys = ['metadata', 'data']
-            for key in required_keys:
-                if key not in backup_data:
-                    return {'status': 'error', 'message': f'Missing required key: {key}'}
+            if backup_path.endswith('.json'):
+                return self._verify_legacy_backup(backup_path)
             
-            required_tables = ['users', 'expenses', 'monthly_summaries']
-            for table in required_tables:
-                if table not in backup_data['data']:
-                    return {'status': 'error', 'message': f'Missing table: {table}'}
-            
-            # Count records
-            record_counts = {
-                table: len(backup_data['data'][table]) 
-                for table in required_tables
-            }
+            with _open_backup(backup_path, 'r', backup_path.endswith('.gz')) as f:
+                for _ in iter_backup_rows(f):
+                    pass
+                metadata, record_counts, checksums = f.summary
             
             return {
                 'status': 'valid',
-                'backup_timestamp': backup_data['metadata'].get('backup_timestamp'),
+                'backup_timestamp': metadata.get('backup_timestamp'),
                 'record_counts': record_counts,
+                'checksums': checksums,
                 'file_size_bytes': os.path.getsize(backup_path)
             }
             
         except Exception as e:
             return {'status': 'error', 'message': f'Backup verification failed: {e}'}
     
+    def _verify_legacy_backup(self, backup_path: str) -> dict[str, Any]:
+        """Verify a version 1.0 single-document JSON backup"""
+        with open(backup_path) as f:
+            backup_data = json.load(f)
+        
+        # Verify structure
+        required_keys = ['metadata', 'data']
+        for key in required_keys:
+            if key not in backup_data:
+                return {'status': 'error', 'message': f'Missing required key: {key}'}
+        
+        required_tables = ['users', 'expenses', 'monthly_summaries']
+        for table in required_tables:
+            if table not in backup_data['data']:
+                return {'status': 'error', 'message': f'Missing table: {table}'}
+        
+        # Count records
+        record_counts = {
+            table: len(backup_data['data'][table]) 
+            for table in required_tables
+        }
+        
+        return {
+            'status': 'valid',
+            'backup_timestamp': backup_data['metadata'].get('backup_timestamp'),
+            'record_counts': record_counts,
+            'file_size_bytes': os.path.getsize(backup_path)
+        }
+    
+    def restore_backup(self, backup_path: str) -> dict[str, Any]:
+        """
+        Stream a verified backup back into the database in batches
+        
+        Rows are inserted with their original primary keys, so the target
+        tables are expected to be empty. Everything runs in one transaction.
+        """
+        verification = self.verify_backup(backup_path)
+        if verification.get('status') != 'valid':
+            return {'status': 'error', 'message': verification.get('message', 'Backup is not valid')}
+        if 'checksums' not in verification:
+            return {'status': 'error', 'message': 'Legacy JSON backups cannot be restored'}
+        
+        try:
+            from app import app
+            from db_base import db
+            
+            with app.app_context():
+                models = _backup_models()
+                restored = dict.fromkeys(models, 0)
+                batch_table, batch = None, []
+                
+                def flush():
+                    if batch:
+                        db.session.execute(models[batch_table].__table__.insert(), batch)
+                        restored[batch_table] += len(batch)
+                        batch.clear()
+                
+                try:
+                    with _open_backup(backup_path, 'r', backup_path.endswith('.gz')) as f:
+                        for table_name, row in iter_backup_rows(f):
+                            if table_name not in models:
+                                continue
+                            if table_name != batch_table or len(batch) >= self.batch_size:
+                                flush()
+                                batch_table = table_name
+                            batch.append(_decode_row(models[table_name], row))
+                        flush()
+                    
+                    _reset_sequences(db, models)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+                
+                logger.info(f"Database restored from backup: {os.path.basename(backup_path)}")
+                return {'status': 'success', 'backup_file': backup_path, 'records': restored}
+        
+        except Exception as e:
+            logger.error(f"Database restore failed: {e}")
+            return {'status': 'error', 'message': str(e)}
+    
     def list_backups(self) -> list[dict[str, Any]]:
         """List all available backup files"""
         try:
@@ -208,7 +402,7 @@ class DatabaseBackupSystem:
             
             backups = []
             for filename in os.listdir(self.backup_dir):
-                if filename.startswith('finbrain_backup_') and filename.endswith('.json'):
+                if filename.startswith('finbrain_backup_') and filename.endswith(BACKUP_EXTENSIONS):
                     backup_path = os.path.join(self.backup_dir, filename)
                     verification = self.verify_backup(backup_path)
                     
@@ -256,6 +450,10 @@ def verify_backup_file(backup_path: str) -> dict[str, Any]:
     """Verify a specific backup file"""
     return backup_system.verify_backup(backup_path)
 
+def restore_database_backup(backup_path: str) -> dict[str, Any]:
+    """Restore a streaming backup into empty tables"""
+    return backup_system.restore_backup(backup_path)
+
 def list_available_backups() -> list[dict[str, Any]]:
     """List all available backup files"""
     return backup_system.list_backups()
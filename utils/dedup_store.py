@@ -0,0 +1,180 @@
+"""
+Message dedup store shared by webhook workers
+Redis SET NX EX when available, otherwise an in-process ring of time buckets
+where expiry drops a whole bucket at once
+"""
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+from utils import redis_pool
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter (no false negatives, ~error_rate false positives)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class BucketedDedupStore:
+    """
+    In-process dedup over a ring of time buckets
+
+    Each bucket holds the keys first seen during bucket_seconds. A bucket is
+    dropped whole once all of its keys are older than ttl_seconds, and the
+    oldest bucket is dropped early when max_entries is exceeded, so memory
+    stays bounded without scanning keys. The optional Bloom prefilter answers
+    most first-time keys without probing every live bucket; it starts a new
+    generation every ttl_seconds and keeps older ones until every key they
+    hold has expired, so a live key is never missing from it.
+    """
+
+    def __init__(self, ttl_seconds: int = 3600, bucket_seconds: int = 60,
+                 max_entries: int = 100000, use_bloom: bool = True,
+                 clock: Callable[[], float] = time.time):
+        self.ttl_seconds = max(1, ttl_seconds)
+        self.bucket_seconds = max(1, min(bucket_seconds, self.ttl_seconds))
+        self.max_entries = max(1, max_entries)
+        self.use_bloom = use_bloom
+        self._clock = clock
+        self._buckets = deque()  # (bucket_id, set of keys), oldest first
+        self._size = 0
+        self._lock = threading.Lock()
+        self._blooms = deque()  # (generation start, BloomFilter), oldest first
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired_buckets': 0, 'bloom_skips': 0}
+
+    def check_and_mark(self, key: str) -> bool:
+        """True if key was seen within the TTL; otherwise record it and return False"""
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            if self._contains(key):
+                self.stats['hits'] += 1
+                return True
+            self._add(key, now)
+            self.stats['misses'] += 1
+            return False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, backend='memory', entries=self._size, buckets=len(self._buckets),
+                        max_entries=self.max_entries, ttl_seconds=self.ttl_seconds)
+
+    def _expire(self, now: float) -> None:
+        # A bucket goes once its newest possible key is older than the TTL
+        horizon = now - self.ttl_seconds
+        while self._buckets and (self._buckets[0][0] + 1) * self.bucket_seconds <= horizon:
+            _, keys = self._buckets.popleft()
+            self._size -= len(keys)
+            self.stats['expired_buckets'] += 1
+        while self._blooms and self._blooms[0][0] + 2 * self.ttl_seconds + self.bucket_seconds <= now:
+            self._blooms.popleft()
+
+    def _contains(self, key: str) -> bool:
+        if self.use_bloom and not any(key in bloom for _, bloom in self._blooms):
+            self.stats['bloom_skips'] += 1
+            return False
+        return any(key in keys for _, keys in reversed(self._buckets))
+
+    def _add(self, key: str, now: float) -> None:
+        bucket_id = int(now // self.bucket_seconds)
+        if not self._buckets or self._buckets[-1][0] != bucket_id:
+            self._buckets.append((bucket_id, set()))
+        self._buckets[-1][1].add(key)
+        self._size += 1
+
+        while self._size > self.max_entries and len(self._buckets) > 1:
+            _, keys = self._buckets.popleft()
+            self._size -= len(keys)
+            self.stats['evictions'] += len(keys)
+
+        if self.use_bloom:
+            if not self._blooms or self._blooms[-1][0] + self.ttl_seconds <= now:
+                self._blooms.append((now, BloomFilter(self.max_entries)))
+            self._blooms[-1][1].add(key)
+
+
+class RedisDedupStore:
+    """Dedup shared by every worker and node: one SET NX EX per key"""
+
+    def __init__(self, client, ttl_seconds: int = 3600, prefix: str = "dedup:mid:",
+                 fallback: BucketedDedupStore | None = None):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.fallback = fallback or BucketedDedupStore(ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'errors': 0}
+
+    def check_and_mark(self, key: str) -> bool:
+        """True if any worker recorded key within the TTL; otherwise record it"""
+        try:
+            created = self.client.set(f"{self.prefix}{key}", 1, nx=True, ex=self.ttl_seconds)
+        except Exception as e:
+            # Keep deduplicating per process while Redis is unreachable
+            logger.warning(f"Dedup store: Redis unavailable ({e}), using in-process fallback")
+            with self._lock:
+                self.stats['errors'] += 1
+            return self.fallback.check_and_mark(key)
+
+        with self._lock:
+            self.stats['misses' if created else 'hits'] += 1
+        return not created
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats, backend='redis', ttl_seconds=self.ttl_seconds)
+        stats['fallback'] = self.fallback.get_stats()
+        return stats
+
+
+def get_dedup_store(ttl_seconds: int | None = None):
+    """
+    Build the dedup store from env - Redis when DEDUP_BACKEND allows it and
+    REDIS_URL is reachable, otherwise the in-process bucket ring
+    """
+    ttl = ttl_seconds or int(os.getenv("DEDUP_TTL_SEC", "3600"))
+    local = BucketedDedupStore(
+        ttl_seconds=ttl,
+        bucket_seconds=int(os.getenv("DEDUP_BUCKET_SEC", "60")),
+        max_entries=int(os.getenv("DEDUP_MAX_ENTRIES", "100000")),
+        use_bloom=os.getenv("DEDUP_BLOOM_ENABLED", "true").lower() == "true",
+    )
+
+    backend = os.getenv("DEDUP_BACKEND", "auto").lower()
+    client = redis_pool.get_client() if backend != "memory" else None
+    if client is None:
+        logger.info("Dedup store: Using in-process bucket ring")
+        return local
+
+    logger.info("Dedup store: Using Redis backend")
+    return RedisDedupStore(client, ttl_seconds=ttl, fallback=local)
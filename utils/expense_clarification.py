@@ -4,43 +4,43 @@ Handles natural conversation flow for ambiguous expense categorization
 """
 
 import logging
+import os
 import time
 from datetime import UTC, datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
+from utils import cache
 from utils.brand_normalizer import normalize
 from utils.expense_ambiguity import ambiguity_detector
 from utils.expense_learning import user_learning_system
 
 logger = logging.getLogger(__name__)
 
-# In-memory storage for web clarifications (10-min TTL)
-_pending_clarifications: dict[str, dict] = {}
+# In-memory storage for web clarifications (10-min TTL, bounded per worker)
+CLARIFICATION_TTL_SEC = 600
+_pending_clarifications = cache.namespace("clarifications", ttl_seconds=CLARIFICATION_TTL_SEC,
+                                          max_entries=int(os.getenv("CLARIFICATION_CACHE_MAX_ENTRIES", "5000")))
 
 def _store_pending_clarification(clarification_id: str, data: dict):
     """Store clarification in memory with TTL"""
-    data['expires_at'] = time.time() + 600  # 10 minutes
-    _pending_clarifications[clarification_id] = data
+    data['expires_at'] = time.time() + CLARIFICATION_TTL_SEC
+    _pending_clarifications.set(clarification_id, data, user=data.get('user_hash'))
     logger.info(f"Stored pending clarification: {clarification_id}")
 
 def _get_pending_clarification(clarification_id: str) -> dict | None:
-    """Get clarification from memory, cleanup expired"""
-    _cleanup_expired_clarifications()
+    """Get clarification from memory; expired entries are dropped on lookup"""
     return _pending_clarifications.get(clarification_id)
 
 def _cleanup_expired_clarifications():
     """Remove expired clarifications"""
-    current_time = time.time()
-    expired_keys = [k for k, v in _pending_clarifications.items() 
-                   if v.get('expires_at', 0) < current_time]
-    for key in expired_keys:
-        del _pending_clarifications[key]
-        logger.debug(f"Cleaned up expired clarification: {key}")
+    expired = _pending_clarifications.purge_expired()
+    if expired:
+        logger.debug(f"Cleaned up {expired} expired clarifications")
 
 def _remove_pending_clarification(clarification_id: str):
     """Remove a specific clarification from memory"""
     if clarification_id in _pending_clarifications:
-        del _pending_clarifications[clarification_id]
+        _pending_clarifications.delete(clarification_id)
         logger.info(f"Removed pending clarification: {clarification_id}")
 
 def _get_pending_clarifications_count() -> int:
@@ -364,12 +364,10 @@ Just reply with the number or tell me what it was!"""
     def _find_pending_clarification_memory(self, user_hash: str) -> dict[str, Any] | None:
         """Find pending clarification for user using in-memory storage"""
         try:
-            # Cleanup expired entries
-            _cleanup_expired_clarifications()
-            
-            # Search through all pending clarifications for this user
-            for clarification_id, data in _pending_clarifications.items():
-                if data.get('user_hash') == user_hash:
+            # Entries are indexed by user, so no scan over everyone's clarifications
+            for clarification_id in _pending_clarifications.user_keys(user_hash):
+                data = _pending_clarifications.get(clarification_id)
+                if data is not None:
                     return {
                         'clarification_id': clarification_id,
                         'data': data
@@ -0,0 +1,140 @@
+"""
+Streaming expense export
+Rows are read in fixed-size batches from a server-side cursor and written out
+chunk by chunk, so export memory does not grow with the user's history
+"""
+
+import csv
+import json
+import logging
+import os
+import zlib
+from collections.abc import Iterable, Iterator
+from io import StringIO
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+
+CSV_HEADER = ['Date', 'Amount (৳)', 'Category', 'Description', 'Created At', 'Expense ID']
+
+
+def sanitize_csv_cell(value) -> str:
+    """Prevent CSV formula injection by escaping dangerous characters"""
+    if not value:
+        return ''
+    value_str = str(value)
+    # Check first non-whitespace character for formula injection risk
+    stripped = value_str.lstrip(" \t\r\n")
+    if stripped and stripped[0] in ('=', '+', '-', '@'):
+        # Only add prefix if not already present
+        if not value_str.startswith("'"):
+            return "'" + value_str
+    return value_str
+
+
+def export_high_water_mark(user_id_hash: str) -> int:
+    """Highest expense id for the user; bounds one export and becomes the next since cursor"""
+    from sqlalchemy import func
+
+    from db_base import db
+    from models import Expense
+
+    return db.session.query(func.max(Expense.id)).filter(Expense.user_id_hash == user_id_hash).scalar() or 0
+
+
+def iter_export_rows(user_id_hash: str, since_id: int = 0, until_id: int | None = None,
+                     batch_size: int = EXPORT_BATCH_SIZE) -> Iterator:
+    """
+    Yield (date, amount, category, description, created_at, id) rows newest first
+
+    Only the exported columns are selected, and yield_per streams them from a
+    server-side cursor in batch_size rows instead of loading the whole result.
+    """
+    from db_base import db
+    from models import Expense
+
+    query = db.session.query(
+        Expense.date, Expense.amount, Expense.category, Expense.description,
+        Expense.created_at, Expense.id
+    ).filter(
+        Expense.user_id_hash == user_id_hash,
+        Expense.deleted_at.is_(None),  # Exclude soft-deleted expenses
+        Expense.id > since_id
+    )
+    if until_id is not None:
+        query = query.filter(Expense.id <= until_id)
+
+    yield from query.order_by(Expense.date.desc(), Expense.id.desc()).yield_per(batch_size)
+
+
+def iter_csv(rows: Iterable, flush_every: int = 500) -> Iterator[str]:
+    """CSV text chunks: the header straight away, then one chunk per flush_every rows"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    yield _drain(buffer)
+
+    pending = 0
+    for expense_date, amount, category, description, created_at, expense_id in rows:
+        writer.writerow([
+            expense_date.strftime('%Y-%m-%d') if expense_date else '',
+            f"{amount:.2f}",
+            sanitize_csv_cell(category or ''),
+            sanitize_csv_cell(description or ''),
+            created_at.strftime('%Y-%m-%d %H:%M:%S') if created_at else '',
+            str(expense_id)
+        ])
+        pending += 1
+        if pending >= flush_every:
+            yield _drain(buffer)
+            pending = 0
+    if pending:
+        yield _drain(buffer)
+
+
+def iter_ndjson(rows: Iterable, flush_every: int = 500) -> Iterator[str]:
+    """One JSON object per line; the first row goes out alone, then every flush_every rows"""
+    lines = []
+    flush_at = 1
+    for expense_date, amount, category, description, created_at, expense_id in rows:
+        lines.append(json.dumps({
+            'date': expense_date.isoformat() if expense_date else None,
+            'amount': f"{amount:.2f}",
+            'category': category or '',
+            'description': description or '',
+            'created_at': created_at.isoformat() if created_at else None,
+            'expense_id': expense_id
+        }, ensure_ascii=False))
+        if len(lines) >= flush_at:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+            flush_at = flush_every
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Compress text chunks into a single gzip stream without buffering it"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if first:
+            # Push the gzip header and first chunk out now instead of at the first full block
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _drain(buffer: StringIO) -> str:
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return text
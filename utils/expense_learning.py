@@ -4,9 +4,15 @@ Stores and retrieves user-specific category preferences and patterns
 """
 
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
+from sqlalchemy.orm.attributes import flag_modified
+
 from db_base import db
 from models import User
 
@@ -17,6 +23,14 @@ class UserLearningSystem:
     
     def __init__(self):
         self.logger = logging.getLogger(f"{__name__}.UserLearningSystem")
+        
+        # Per-process LRU of user_hash -> category_mappings snapshot, so category
+        # inference reads the users row once per message instead of once per n-gram
+        self.max_cached_users = int(os.getenv('LEARNING_CACHE_MAX_USERS', '1000'))
+        self.cache_ttl_seconds = int(os.getenv('LEARNING_CACHE_TTL_SEC', '300'))  # 5 minutes
+        self._mappings_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
     
     def learn_user_preference(self, user_hash: str, item: str, chosen_category: str, 
                             context: dict[str, Any] = None) -> bool:
@@ -58,9 +72,11 @@ class UserLearningSystem:
             preferences['learning_stats'][f"{item_key}_corrections"] = \
                 preferences['learning_stats'].get(f"{item_key}_corrections", 0) + 1
             
-            # Save to database
+            # Save to database (JSON column is mutated in place, so flag it)
             user.preferences = preferences
+            flag_modified(user, 'preferences')
             db.session.commit()
+            self.invalidate_user_cache(user_hash)
             
             self.logger.info(f"Learned preference: {item} → {chosen_category} for user {user_hash[:8]}...")
             return True
@@ -82,14 +98,7 @@ class UserLearningSystem:
             User's preference dict or None if not found
         """
         try:
-            user = db.session.query(User).filter_by(user_id_hash=user_hash).first()
-            
-            if not user or not user.preferences:
-                return None
-            
-            preferences = user.preferences
-            category_mappings = preferences.get('category_mappings', {})
-            
+            category_mappings = self.get_category_mappings(user_hash)
             item_key = item.lower().strip()
             return category_mappings.get(item_key)
             
@@ -97,6 +106,72 @@ class UserLearningSystem:
             self.logger.error(f"Failed to get user preference: {e}")
             return None
     
+    def get_user_preferences_bulk(self, user_hash: str, items: list[str]) -> dict[str, dict[str, Any]]:
+        """
+        Look up learned preferences for several candidate items in one call
+        
+        Args:
+            user_hash: User's PSID hash
+            items: Candidate items/n-grams (e.g. ["rc", "cola", "rc cola"])
+            
+        Returns:
+            Dict of item -> preference for the items that have one, in input order
+        """
+        try:
+            category_mappings = self.get_category_mappings(user_hash)
+            if not category_mappings:
+                return {}
+            
+            matches = {}
+            for item in items:
+                preference = category_mappings.get(item.lower().strip())
+                if preference:
+                    matches[item] = preference
+            return matches
+            
+        except Exception as e:
+            self.logger.error(f"Failed to get user preferences: {e}")
+            return {}
+    
+    def get_category_mappings(self, user_hash: str) -> dict[str, Any]:
+        """
+        Get the user's learned item -> category mappings, served from the
+        per-process snapshot cache when fresh
+        
+        Args:
+            user_hash: User's PSID hash
+            
+        Returns:
+            Mapping of item key to preference dict (empty if none learned)
+        """
+        now = time.time()
+        with self._cache_lock:
+            cache_entry = self._mappings_cache.get(user_hash)
+            if cache_entry and now - cache_entry['timestamp'] < self.cache_ttl_seconds:
+                self._mappings_cache.move_to_end(user_hash)
+                self.cache_stats['hits'] += 1
+                return cache_entry['mappings']
+            self.cache_stats['misses'] += 1
+        
+        user = db.session.query(User).filter_by(user_id_hash=user_hash).first()
+        preferences = (user.preferences or {}) if user else {}
+        mappings = dict(preferences.get('category_mappings') or {})
+        
+        with self._cache_lock:
+            self._mappings_cache[user_hash] = {'mappings': mappings, 'timestamp': now}
+            self._mappings_cache.move_to_end(user_hash)
+            while len(self._mappings_cache) > self.max_cached_users:
+                self._mappings_cache.popitem(last=False)
+                self.cache_stats['evictions'] += 1
+        
+        return mappings
+    
+    def invalidate_user_cache(self, user_hash: str) -> None:
+        """Drop the cached mappings snapshot for a user after their preferences change"""
+        with self._cache_lock:
+            if self._mappings_cache.pop(user_hash, None) is not None:
+                self.cache_stats['invalidations'] += 1
+    
     def get_user_patterns(self, user_hash: str) -> dict[str, Any]:
         """
         Get user's spending patterns to help with categorization
@@ -0,0 +1,162 @@
+"""
+Per-user daily expense rollups
+Keeps expense_daily_rollups (user, day, category -> sum, count) in step with
+expenses so period totals read a handful of rollup rows instead of every
+expense the user has logged
+"""
+
+import logging
+from typing import Any
+
+from sqlalchemy import event, inspect, text
+
+logger = logging.getLogger(__name__)
+
+# Columns that decide which rollup row an expense belongs to and what it adds
+TRACKED_COLUMNS = ('user_id_hash', 'date', 'category', 'amount_minor')
+
+_APPLY_SQL = text("""
+    INSERT INTO expense_daily_rollups (user_id_hash, day, category, total_minor, expense_count)
+    VALUES (:user_hash, :day, :category, :total_minor, :expense_count)
+    ON CONFLICT (user_id_hash, day, category) DO UPDATE SET
+        total_minor = expense_daily_rollups.total_minor + excluded.total_minor,
+        expense_count = expense_daily_rollups.expense_count + excluded.expense_count
+""")
+
+_PRUNE_SQL = text("""
+    DELETE FROM expense_daily_rollups
+    WHERE user_id_hash = :user_hash AND day = :day AND category = :category
+    AND expense_count <= 0
+""")
+
+_OLD_ROW_SQL = text("""
+    SELECT user_id_hash, date, category, amount_minor FROM expenses WHERE id = :id
+""")
+
+_AGGREGATE_SQL = """
+    SELECT user_id_hash, date, COALESCE(category, 'other'), SUM(amount_minor), COUNT(*)
+    FROM expenses
+    {where}
+    GROUP BY user_id_hash, date, COALESCE(category, 'other')
+"""
+
+
+def _apply(connection, user_hash, day, category, total_minor: int, expense_count: int) -> None:
+    params = {
+        'user_hash': user_hash,
+        'day': day,
+        'category': category or 'other',
+        'total_minor': int(total_minor or 0),
+        'expense_count': expense_count
+    }
+    connection.execute(_APPLY_SQL, params)
+    if expense_count < 0:
+        connection.execute(_PRUNE_SQL, params)
+
+
+def _after_insert(mapper, connection, target) -> None:
+    _apply(connection, target.user_id_hash, target.date, target.category, target.amount_minor, 1)
+
+
+def _stored_row(connection, target):
+    """Values the rollup currently counts for target, reading the row if it has unflushed edits"""
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in TRACKED_COLUMNS):
+        return None, False
+    return connection.execute(_OLD_ROW_SQL, {'id': target.id}).first(), True
+
+
+def _before_delete(mapper, connection, target) -> None:
+    old, changed = _stored_row(connection, target)
+    if changed:
+        if old is not None:
+            _apply(connection, old[0], old[1], old[2], -(old[3] or 0), -1)
+        return
+    _apply(connection, target.user_id_hash, target.date, target.category, -(target.amount_minor or 0), -1)
+
+
+def _before_update(mapper, connection, target) -> None:
+    old, changed = _stored_row(connection, target)
+    if not changed:
+        return
+    if old is not None:
+        _apply(connection, old[0], old[1], old[2], -(old[3] or 0), -1)
+    _apply(connection, target.user_id_hash, target.date, target.category, target.amount_minor, 1)
+
+
+def register_rollup_listeners(expense_model) -> None:
+    """Attach the rollup maintenance hooks to the Expense mapper"""
+    if event.contains(expense_model, 'after_insert', _after_insert):
+        return
+    event.listen(expense_model, 'after_insert', _after_insert)
+    event.listen(expense_model, 'before_delete', _before_delete)
+    event.listen(expense_model, 'before_update', _before_update)
+
+
+def get_category_totals(user_hash: str, start_day) -> list[tuple[str, int, int]]:
+    """Return [(category, total_minor, count)] from start_day onwards, largest first"""
+    from db_base import db
+
+    rows = db.session.execute(text("""
+        SELECT category, SUM(total_minor) AS total_minor, SUM(expense_count) AS expense_count
+        FROM expense_daily_rollups
+        WHERE user_id_hash = :user_hash
+        AND day >= :start_day
+        GROUP BY category
+        HAVING SUM(expense_count) > 0
+        ORDER BY total_minor DESC, category
+    """), {"user_hash": user_hash, "start_day": start_day}).fetchall()
+    return [(row[0], int(row[1] or 0), int(row[2] or 0)) for row in rows]
+
+
+def rebuild_expense_rollups(user_hash: str | None = None) -> int:
+    """Recompute rollups from expenses for one user or everyone, returns rows written"""
+    from db_base import db
+
+    where = "WHERE user_id_hash = :user_hash" if user_hash else ""
+    params = {"user_hash": user_hash} if user_hash else {}
+
+    try:
+        db.session.execute(text(f"DELETE FROM expense_daily_rollups {where}"), params)
+        result = db.session.execute(text(
+            "INSERT INTO expense_daily_rollups (user_id_hash, day, category, total_minor, expense_count) "
+            + _AGGREGATE_SQL.format(where=where)
+        ), params)
+        db.session.commit()
+        logger.info(f"Expense rollups rebuilt: {result.rowcount} rows")
+        return result.rowcount
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def check_rollup_consistency(limit: int = 100) -> dict[str, Any]:
+    """
+    Compare rollups with aggregates over raw expenses
+
+    Returns:
+        {"consistent": bool, "missing_or_stale": [...], "unexpected": [...]}
+        where each entry is (user_id_hash, day, category, total_minor, count)
+    """
+    from db_base import db
+
+    rollup_sql = """
+        SELECT user_id_hash, day, category, total_minor, expense_count
+        FROM expense_daily_rollups
+        WHERE expense_count > 0
+    """
+    expected = _AGGREGATE_SQL.format(where="")
+
+    # Aggregates the rollup does not match, and rollup rows with no matching aggregate
+    missing = db.session.execute(text(
+        f"SELECT * FROM ({expected} EXCEPT {rollup_sql}) AS d LIMIT :limit"
+    ), {"limit": limit}).fetchall()
+    unexpected = db.session.execute(text(
+        f"SELECT * FROM ({rollup_sql} EXCEPT {expected}) AS d LIMIT :limit"
+    ), {"limit": limit}).fetchall()
+
+    return {
+        "consistent": not missing and not unexpected,
+        "missing_or_stale": [tuple(row) for row in missing],
+        "unexpected": [tuple(row) for row in unexpected]
+    }
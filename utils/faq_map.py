@@ -118,7 +118,111 @@ _NORMALIZE_RE = re.compile(r"[^a-z0-9\s]")
 def normalize(text: str) -> str:
     return _NORMALIZE_RE.sub("", text.lower().strip())
 
+def _response_for(intent: str) -> str | None:
+    if intent in FAQ_JSON["faq"]:
+        return FAQ_JSON["faq"][intent]
+    if intent in FAQ_JSON["smalltalk"]:
+        return FAQ_JSON["smalltalk"][intent]
+    return None
+
+
+class _KeywordIndex:
+    """
+    Single-pass matcher over INTENT_KEYWORDS, built once at import.
+
+    Single-word keywords go into a word -> intent rank hash (exact word match),
+    multi-word keywords into an Aho-Corasick automaton (substring match over the
+    normalized text). The answer is the earliest intent in INTENT_KEYWORDS
+    order with any matching keyword, exactly as the linear scan returns.
+    """
+
+    def __init__(self, intent_keywords: dict[str, list[str]]):
+        self._intents: list[str] = []
+        self._words: dict[str, int] = {}
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._best: list[int] = [-1]  # Lowest intent rank ending at each state, incl. via failure links
+
+        for intent, keywords in intent_keywords.items():
+            # Intents without a response never answer, so they never win
+            if _response_for(intent) is None:
+                continue
+            rank = len(self._intents)
+            self._intents.append(intent)
+            for k in keywords:
+                if " " not in k:
+                    self._words.setdefault(k, rank)
+                else:
+                    self._add_phrase(k, rank)
+        self._link()
+
+    def _add_phrase(self, phrase: str, rank: int) -> None:
+        state = 0
+        for ch in phrase:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(-1)
+            state = nxt
+        if self._best[state] < 0 or rank < self._best[state]:
+            self._best[state] = rank
+
+    def _link(self) -> None:
+        """Add failure links, then fold them into a full transition table"""
+        goto, fail, best = self._goto, self._fail, self._best
+        order = list(goto[0].values())
+        for state in order:
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                inherited = best[fail[nxt]]
+                if inherited >= 0 and (best[nxt] < 0 or inherited < best[nxt]):
+                    best[nxt] = inherited
+                order.append(nxt)
+
+        # Deterministic transitions: every state knows its next state for every
+        # phrase character, so matching is one dict lookup per character
+        self._delta: list[dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        for state in order:
+            table = dict(self._delta[fail[state]])
+            table.update(goto[state])
+            self._delta[state] = table
+
+    def match(self, norm: str) -> str | None:
+        best = len(self._intents)
+        for word in norm.split():
+            rank = self._words.get(word)
+            if rank is not None and rank < best:
+                best = rank
+        
+        # Every phrase has a space, so single-token messages skip the automaton
+        if best and " " in norm:
+            delta, found = self._delta, self._best
+            state = 0
+            for ch in norm:
+                state = delta[state].get(ch, 0)
+                rank = found[state]
+                if 0 <= rank < best:
+                    best = rank
+                    if best == 0:
+                        break
+        
+        return self._intents[best] if best < len(self._intents) else None
+
+
+_KEYWORD_INDEX = _KeywordIndex(INTENT_KEYWORDS)
+
 def match_faq_or_smalltalk(user_text: str) -> str | None:
+    intent = _KEYWORD_INDEX.match(normalize(user_text))
+    return _response_for(intent) if intent else None
+
+def _match_faq_or_smalltalk_linear(user_text: str) -> str | None:
+    """Reference per-keyword scan; kept for parity tests and the matcher benchmark"""
     norm = normalize(user_text)
     # Use word boundary matching to avoid false positives like "hi" in "this"
     words = norm.split()
@@ -4,6 +4,8 @@ Redis-backed job queue for FinBrain with idempotency and DLQ support
 import json
 import logging
 import os
+import socket
+import threading
 import time
 import uuid
 from typing import TYPE_CHECKING, Any, Dict, List, Optional
@@ -12,15 +14,96 @@ if TYPE_CHECKING:
     from redis import Redis
 from dataclasses import asdict, dataclass
 
-try:
-    import redis
-    from redis import Redis
-except ImportError:
-    redis = None
-    Redis = None
+from utils import redis_pool
 
 logger = logging.getLogger(__name__)
 
+# Shared queue for job types without a dedicated consumer group
+DEFAULT_QUEUE_KEY = "jobs:queue"
+RETRY_KEY = "jobs:retry"
+LEASES_KEY = "jobs:leases"          # zset job_id -> visibility deadline
+LEASE_OWNER_KEY = "jobs:lease_owner"  # hash job_id -> processing list holding it
+ROUTE_KEY = "jobs:route"            # hash job_id -> queue it is (re)delivered to
+CONSUMERS_KEY = "jobs:consumers"    # zset consumer_id -> heartbeat deadline
+
+# Move due retries back to their queues in one round trip
+_PROMOTE_RETRIES_LUA = """
+local ready = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, job_id in ipairs(ready) do
+    local queue = redis.call('HGET', KEYS[2], job_id) or ARGV[3]
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('RPUSH', queue, job_id)
+end
+return ready
+"""
+
+# Return jobs whose visibility deadline passed to the front of their queues
+_RECLAIM_EXPIRED_LUA = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, job_id in ipairs(expired) do
+    local processing = redis.call('HGET', KEYS[2], job_id)
+    if processing then
+        redis.call('LREM', processing, 1, job_id)
+    end
+    redis.call('LPUSH', redis.call('HGET', KEYS[3], job_id) or ARGV[3], job_id)
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('HDEL', KEYS[2], job_id)
+end
+return expired
+"""
+
+# Requeue the jobs in a processing list that have no live lease; leased ones
+# are left for _RECLAIM_EXPIRED_LUA once their deadline passes
+_RECOVER_CONSUMER_LUA = """
+local ids = redis.call('LRANGE', KEYS[1], 0, -1)
+local recovered = 0
+for i = #ids, 1, -1 do
+    local job_id = ids[i]
+    local deadline = redis.call('ZSCORE', KEYS[2], job_id)
+    if not deadline or tonumber(deadline) <= tonumber(ARGV[1]) then
+        redis.call('LREM', KEYS[1], 1, job_id)
+        redis.call('LPUSH', redis.call('HGET', KEYS[4], job_id) or ARGV[2], job_id)
+        redis.call('ZREM', KEYS[2], job_id)
+        redis.call('HDEL', KEYS[3], job_id)
+        recovered = recovered + 1
+    end
+end
+return recovered
+"""
+
+# Claim consumers whose heartbeat lapsed, so exactly one recoverer handles each
+_CLAIM_DEAD_CONSUMERS_LUA = """
+local dead = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, consumer_id in ipairs(dead) do
+    redis.call('ZREM', KEYS[1], consumer_id)
+end
+return dead
+"""
+
+# Drop a finished job from its processing list and the lease index
+_ACK_LUA = """
+local processing = redis.call('HGET', KEYS[2], ARGV[1])
+if processing then
+    redis.call('LREM', processing, 1, ARGV[1])
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+return processing and 1 or 0
+"""
+
+def _parse_concurrency(spec: str) -> dict[str, int]:
+    """Parse "analysis=4,daily_goal_analysis=1" into {type: workers}"""
+    concurrency = {}
+    for part in spec.split(','):
+        if '=' not in part:
+            continue
+        job_type, workers = part.split('=', 1)
+        try:
+            concurrency[job_type.strip()] = max(0, int(workers))
+        except ValueError:
+            logger.warning(f"Ignoring invalid job concurrency entry: {part!r}")
+    return concurrency
+
 @dataclass
 class Job:
     """Job definition for queue processing"""
@@ -49,6 +132,15 @@ class JobQueue:
         self.dlq_ttl = 7 * 24 * 60 * 60  # 7 days
         self.max_attempts = 3
         self.retry_delays = [1, 5, 30]  # seconds
+        self.visibility_timeout = int(os.getenv('JOB_VISIBILITY_TIMEOUT_SEC', '300'))
+        self.consumer_ttl = int(os.getenv('JOB_CONSUMER_TTL_SEC', '30'))  # heartbeat lapse that marks a consumer dead
+        self.maintenance_batch = 500  # retries promoted / leases reclaimed per script call
+        
+        # Job types with their own queue and consumer count; everything else shares
+        # DEFAULT_QUEUE_KEY and JOB_DEFAULT_CONCURRENCY consumers
+        self.type_concurrency = _parse_concurrency(os.getenv('JOB_TYPE_CONCURRENCY', ''))
+        self.default_concurrency = int(os.getenv('JOB_DEFAULT_CONCURRENCY', '2'))
+        self._scripts = {}
         
         # Try to initialize Redis, but don't fail if unavailable
         try:
@@ -58,44 +150,17 @@ class JobQueue:
             self.redis_available = False
         
     def _init_redis(self):
-        """Initialize Redis connection"""
-        import redis
-        redis_url = os.getenv('REDIS_URL')
-        if not redis_url:
+        """Attach to the shared Redis pool (consumers' blocking BLMOVEs each hold a pool connection)"""
+        if not os.getenv('REDIS_URL'):
             raise ValueError("REDIS_URL environment variable required")
         
-        # Debug: Log original URL format
-        logger.debug(f"Raw REDIS_URL: {redis_url[:50]}...")
-        
-        # Fix environment variable format issues (Replit sometimes includes var name)
-        if redis_url.startswith('REDIS_URL='):
-            redis_url = redis_url.split('=', 1)[1]
-            logger.warning("Fixed REDIS_URL format: removed variable name prefix")
-        
-        # Remove quotes if present
-        if redis_url.startswith('"') and redis_url.endswith('"'):
-            redis_url = redis_url[1:-1]
-            logger.warning("Fixed REDIS_URL format: removed quotes")
-        
-        # Fix malformed Redis URLs
-        if redis_url == "rediss:6379":
-            logger.warning("Fixing malformed REDIS_URL: rediss:6379 -> redis://localhost:6379")
-            redis_url = "redis://localhost:6379"
-        elif redis_url.startswith("rediss:") and "://" not in redis_url:
-            # Fix incomplete rediss URLs
-            redis_url = redis_url.replace("rediss:", "redis://localhost:")
-        elif not redis_url.startswith(('redis://', 'rediss://', 'unix://')):
-            # Assume it's a plain connection string, prepend redis://
-            redis_url = f"redis://{redis_url}"
-        
-        try:
-            self.redis_client = redis.from_url(redis_url, decode_responses=True, socket_connect_timeout=5)
-            self.redis_client.ping()
-            self.redis_available = True
-            logger.info(f"Job queue initialized with Redis backend at {redis_url.split('@')[-1]}")
-        except Exception as e:
-            logger.error(f"Failed to connect to Redis at {redis_url}: {e}")
-            raise
+        client = redis_pool.get_client(decode_responses=True)
+        if client is None:
+            raise ConnectionError("Redis unreachable for job queue")
+        client.ping()
+        self.redis_client = client
+        self.redis_available = True
+        logger.info("Job queue initialized with Redis backend")
     
     def enqueue(self, job_type: str, payload: dict[str, Any], user_id: str, 
                 idempotency_key: str) -> str:
@@ -132,47 +197,162 @@ class JobQueue:
         
         # Store job metadata and add to queue
         self._store_job(job)
-        self._add_to_queue(job_id)
+        self._add_to_queue(job_id, self.queue_key(job_type))
         self._store_idempotency_key(idempotency_key, job_id)
         
         logger.info(f"Job {job_id} enqueued for user {user_id} with type {job_type}")
         return job_id
     
-    def dequeue(self) -> Job | None:
+    def queue_key(self, job_type: str | None) -> str:
+        """Redis list a job type is delivered from"""
+        if job_type and job_type in self.type_concurrency:
+            return f"{DEFAULT_QUEUE_KEY}:{job_type}"
+        return DEFAULT_QUEUE_KEY
+    
+    def dequeue(self, job_type: str | None = None, consumer_id: str = "default",
+                timeout: float = 1.0) -> Job | None:
         """
         Dequeue next job for processing
         
         Returns:
             Job or None if queue is empty
         """
+        jobs = self.dequeue_batch(job_type, consumer_id, max_jobs=1, timeout=timeout)
+        return jobs[0] if jobs else None
+    
+    def dequeue_batch(self, job_type: str | None, consumer_id: str, max_jobs: int = 1,
+                      timeout: float = 1.0) -> list[Job]:
+        """
+        Claim up to max_jobs jobs for a consumer
+        
+        Blocks up to timeout seconds for the first job with BLMOVE, then takes
+        whatever else is ready without blocking. Each job moves atomically into
+        the consumer's processing list and gets a visibility lease; a job that is
+        not completed (or re-leased) before the lease expires is reclaimed and
+        delivered again, so a crash mid-job does not lose it.
+        """
         if not self.redis_client:
-            return None
-            
+            return []
+        
+        queue = self.queue_key(job_type)
+        processing = self.processing_key(consumer_id)
+        
         try:
-            # Block for up to 1 second waiting for jobs
-            result = self.redis_client.blpop("jobs:queue", timeout=1)
-            if not result:
-                return None
+            job_ids = []
+            job_id = self.redis_client.blmove(queue, processing, timeout, "LEFT", "RIGHT")
+            while job_id:
+                job_ids.append(job_id)
+                if len(job_ids) >= max_jobs:
+                    break
+                job_id = self.redis_client.lmove(queue, processing, "LEFT", "RIGHT")
+            if not job_ids:
+                return []
             
-            _, job_id = result
+            deadline = time.time() + self.visibility_timeout
+            pipe = self.redis_client.pipeline()
+            pipe.zadd(LEASES_KEY, {jid: deadline for jid in job_ids})
+            pipe.hset(LEASE_OWNER_KEY, mapping={jid: processing for jid in job_ids})
+            pipe.execute()
+            
+        except Exception as e:
+            logger.error(f"Failed to dequeue job: {e}")
+            return []
+        
+        jobs = []
+        for job_id in job_ids:
             job = self._get_job(job_id)
             
             if not job:
                 logger.warning(f"Job {job_id} not found in metadata")
-                return None
+                self._ack(job_id)
+                continue
             
             # Update job status to running
             job.status = "running"
             job.attempts += 1
             job.updated_at = time.time()
-            self._store_job(job)
             
-            logger.info(f"Job {job_id} dequeued (attempt {job.attempts})")
-            return job
+            # Reclaimed too often (e.g. it crashes its worker): stop redelivering
+            if job.attempts > self.max_attempts:
+                job.status = "failed"
+                job.error = job.error or "Visibility timeout exceeded too many times"
+                self._send_to_dlq(job)
+                self._store_job(job)
+                self._ack(job_id)
+                self._clear_route(job_id)
+                logger.warning(f"Job {job_id} sent to DLQ after {job.attempts - 1} deliveries")
+                continue
             
-        except Exception as e:
-            logger.error(f"Failed to dequeue job: {e}")
-            return None
+            self._store_job(job)
+            logger.info(f"Job {job_id} dequeued (attempt {job.attempts})")
+            jobs.append(job)
+        
+        return jobs
+    
+    def processing_key(self, consumer_id: str) -> str:
+        """Per-consumer list holding the jobs it has claimed"""
+        return f"jobs:processing:{consumer_id}"
+    
+    def extend_leases(self, job_ids: list[str]) -> None:
+        """Push back the visibility deadline of jobs still being worked on"""
+        if not self.redis_client or not job_ids:
+            return
+        deadline = time.time() + self.visibility_timeout
+        self.redis_client.zadd(LEASES_KEY, {job_id: deadline for job_id in job_ids}, xx=True)
+    
+    def reclaim_expired(self) -> list[str]:
+        """Redeliver jobs whose consumer stopped renewing their lease"""
+        if not self.redis_client:
+            return []
+        reclaimed = self._script('reclaim', _RECLAIM_EXPIRED_LUA)(
+            keys=[LEASES_KEY, LEASE_OWNER_KEY, ROUTE_KEY],
+            args=[time.time(), self.maintenance_batch, DEFAULT_QUEUE_KEY]
+        )
+        for job_id in reclaimed:
+            logger.warning(f"Job {job_id} visibility timeout expired, redelivering")
+        return reclaimed
+    
+    def recover_consumer(self, consumer_id: str) -> int:
+        """
+        Requeue the unleased jobs left in a dead consumer's processing list
+        
+        Jobs claimed but not yet leased when its process died go back to the
+        front of their queues. Jobs with a live lease may still be running
+        somewhere, so they stay put until reclaim_expired() sees the lease lapse.
+        """
+        if not self.redis_client:
+            return 0
+        recovered = self._script('recover', _RECOVER_CONSUMER_LUA)(
+            keys=[self.processing_key(consumer_id), LEASES_KEY, LEASE_OWNER_KEY, ROUTE_KEY],
+            args=[time.time(), DEFAULT_QUEUE_KEY]
+        )
+        if recovered:
+            logger.warning(f"Recovered {recovered} jobs from consumer {consumer_id}")
+        return int(recovered)
+    
+    def heartbeat(self, consumer_ids: list[str]) -> None:
+        """Mark consumers alive for another consumer_ttl seconds"""
+        if not self.redis_client or not consumer_ids:
+            return
+        deadline = time.time() + self.consumer_ttl
+        self.redis_client.zadd(CONSUMERS_KEY, {consumer_id: deadline for consumer_id in consumer_ids})
+    
+    def retire_consumers(self, consumer_ids: list[str]) -> None:
+        """Deregister stopped consumers and requeue their unleased leftovers"""
+        if not self.redis_client or not consumer_ids:
+            return
+        self.redis_client.zrem(CONSUMERS_KEY, *consumer_ids)
+        for consumer_id in consumer_ids:
+            self.recover_consumer(consumer_id)
+    
+    def recover_dead_consumers(self) -> int:
+        """Recover the processing lists of consumers (in any process) whose heartbeat lapsed"""
+        if not self.redis_client:
+            return 0
+        dead = self._script('claim_dead', _CLAIM_DEAD_CONSUMERS_LUA)(
+            keys=[CONSUMERS_KEY], args=[time.time(), self.maintenance_batch]
+        )
+        return sum(self.recover_consumer(consumer_id) for consumer_id in dead)
     
     def complete_job(self, job_id: str, success: bool, result_path: str | None = None, 
                      error: str | None = None) -> None:
@@ -185,6 +365,8 @@ class JobQueue:
             result_path: Path to result file in storage (if success)
             error: Error message (if failure)
         """
+        self._ack(job_id)
+        
         job = self._get_job(job_id)
         if not job:
             logger.warning(f"Job {job_id} not found for completion")
@@ -195,6 +377,7 @@ class JobQueue:
         if success:
             job.status = "succeeded"
             job.result_path = result_path
+            self._clear_route(job_id)
             logger.info(f"Job {job_id} completed successfully")
         else:
             # Check if we should retry or send to DLQ
@@ -213,10 +396,33 @@ class JobQueue:
                 job.status = "failed"
                 job.error = error
                 self._send_to_dlq(job)
+                self._clear_route(job_id)
                 logger.warning(f"Job {job_id} failed permanently after {job.attempts} attempts")
         
         self._store_job(job)
-    
+
+    def release_job(self, job_id: str, delay: int = 1) -> None:
+        """
+        Hand a claimed job back without processing it (e.g. load shedding)
+
+        The delivery is not counted against max_attempts: the job goes back
+        through the retry set after delay seconds with its attempts unchanged.
+        """
+        self._ack(job_id)
+
+        job = self._get_job(job_id)
+        if not job:
+            logger.warning(f"Job {job_id} not found for release")
+            return
+
+        job.attempts = max(0, job.attempts - 1)  # undo the increment made on dequeue
+        job.status = "queued"
+        job.updated_at = time.time()
+        job.next_retry_at = job.updated_at + delay
+        self._store_job(job)
+        self._schedule_retry(job_id, delay)
+        logger.info(f"Job {job_id} released, redelivering in {delay}s")
+
     def get_job_status(self, job_id: str) -> dict[str, Any] | None:
         """Get job status and metadata"""
         job = self._get_job(job_id)
@@ -281,11 +487,33 @@ class JobQueue:
         job_dict = json.loads(str(data))
         return Job(**job_dict)
     
-    def _add_to_queue(self, job_id: str) -> None:
-        """Add job to Redis queue"""
+    def _add_to_queue(self, job_id: str, queue: str = DEFAULT_QUEUE_KEY) -> None:
+        """Add job to Redis queue and remember the queue for retries and reclaims"""
         if not self.redis_client:
             raise RuntimeError("Redis client not available")
-        self.redis_client.rpush("jobs:queue", job_id)
+        pipe = self.redis_client.pipeline()
+        pipe.hset(ROUTE_KEY, job_id, queue)
+        pipe.rpush(queue, job_id)
+        pipe.execute()
+    
+    def _ack(self, job_id: str) -> None:
+        """Release a claimed job from its processing list and lease"""
+        if not self.redis_client:
+            return
+        try:
+            self._script('ack', _ACK_LUA)(keys=[LEASES_KEY, LEASE_OWNER_KEY], args=[job_id])
+        except Exception as e:
+            logger.error(f"Failed to ack job {job_id}: {e}")
+    
+    def _clear_route(self, job_id: str) -> None:
+        if self.redis_client:
+            self.redis_client.hdel(ROUTE_KEY, job_id)
+    
+    def _script(self, name: str, source: str):
+        """Registered Lua script (EVALSHA with automatic reload)"""
+        if name not in self._scripts:
+            self._scripts[name] = self.redis_client.register_script(source)
+        return self._scripts[name]
     
     def _schedule_retry(self, job_id: str, delay: int) -> None:
         """Schedule job retry after delay"""
@@ -295,7 +523,7 @@ class JobQueue:
             
         # Use Redis sorted set for delayed jobs
         retry_time = time.time() + delay
-        self.redis_client.zadd("jobs:retry", {job_id: retry_time})
+        self.redis_client.zadd(RETRY_KEY, {job_id: retry_time})
     
     def _send_to_dlq(self, job: Job) -> None:
         """Send failed job to dead letter queue"""
@@ -340,24 +568,21 @@ class JobQueue:
         """
         Process retry queue and move ready jobs back to main queue
         
+        Due retries are removed and re-pushed by one Lua script, so a job is
+        never promoted twice or dropped between the two steps.
+        
         Returns:
             List of job IDs that were moved to main queue
         """
         if not self.redis_client:
             return []
-            
-        now = time.time()
-        
-        # Get jobs ready for retry
-        ready_jobs = self.redis_client.zrangebyscore("jobs:retry", 0, now)
         
+        ready_jobs = self._script('promote', _PROMOTE_RETRIES_LUA)(
+            keys=[RETRY_KEY, ROUTE_KEY],
+            args=[time.time(), self.maintenance_batch, DEFAULT_QUEUE_KEY]
+        )
         if ready_jobs:
-            # Remove from retry queue and add back to main queue
-            for job_id in ready_jobs:
-                self.redis_client.zrem("jobs:retry", job_id)
-                self._add_to_queue(job_id)
-                logger.info(f"Job {job_id} moved from retry queue to main queue")
-        
+            logger.info(f"Moved {len(ready_jobs)} jobs from retry queue to main queue")
         return ready_jobs
     
     def get_queue_stats(self) -> dict[str, int]:
@@ -370,10 +595,19 @@ class JobQueue:
                 "redis_available": False
             }
             
+        queues = [DEFAULT_QUEUE_KEY] + [self.queue_key(job_type) for job_type in self.type_concurrency]
+        pipe = self.redis_client.pipeline(transaction=False)
+        for queue in queues:
+            pipe.llen(queue)
+        pipe.zcard(LEASES_KEY)
+        pipe.zcard(RETRY_KEY)
+        pipe.llen("jobs:dlq:list")
+        *queued, in_flight, retry, dlq = pipe.execute()
         return {
-            "queued": self.redis_client.llen("jobs:queue"),
-            "retry": self.redis_client.zcard("jobs:retry"),
-            "dlq": self.redis_client.llen("jobs:dlq:list"),
+            "queued": sum(queued),
+            "in_flight": in_flight,
+            "retry": retry,
+            "dlq": dlq,
             "redis_available": True
         }
     
@@ -387,5 +621,125 @@ class JobQueue:
         except Exception:
             return False
 
+class JobConsumerPool:
+    """
+    Dedicated consumer threads for the Redis job queue
+    
+    Each job type in JobQueue.type_concurrency gets that many consumers on its
+    own queue; other types share JobQueue.default_concurrency consumers. Every
+    consumer blocks in BLMOVE (no polling) and owns a processing list under an
+    id unique to this process, and one maintenance thread heartbeats the
+    consumers, renews leases for jobs this pool is running, promotes retries
+    and reclaims jobs from consumers whose heartbeat or lease lapsed.
+    """
+    
+    def __init__(self, queue: JobQueue, handler, batch_size: int | None = None,
+                 maintenance_interval: float = 1.0):
+        self.queue = queue
+        self.handler = handler
+        self.batch_size = batch_size or int(os.getenv('JOB_DEQUEUE_BATCH', '1'))
+        self.maintenance_interval = maintenance_interval
+        self.block_timeout = 1.0
+        self.node_id = os.getenv('JOB_CONSUMER_NODE', socket.gethostname())
+        self._running = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._consumer_ids = []
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self.stats = {'processed': 0, 'failed': 0, 'reclaimed': 0, 'promoted': 0, 'recovered': 0}
+    
+    def consumer_plan(self) -> list[tuple[str | None, int]]:
+        """(job_type, consumers) pairs; None is the shared default queue"""
+        plan = [(job_type, workers) for job_type, workers in self.queue.type_concurrency.items() if workers > 0]
+        if self.queue.default_concurrency > 0:
+            plan.append((None, self.queue.default_concurrency))
+        return plan
+    
+    def start(self) -> None:
+        """Recover leftovers of dead consumers, then start consumers and maintenance"""
+        if self._running.is_set():
+            return
+        self._running.set()
+        self._stopped.clear()
+        # Every gunicorn worker runs its own pool, so ids carry the pid and a
+        # per-start suffix; a sibling's lists are only touched once it stops heartbeating
+        instance = f"{self.node_id}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        plan = [(job_type, f"{instance}:{job_type or 'default'}:{index}", index)
+                for job_type, workers in self.consumer_plan() for index in range(workers)]
+        self._consumer_ids = [consumer_id for _, consumer_id, _ in plan]
+        self.queue.heartbeat(self._consumer_ids)
+        self.stats['recovered'] += self.queue.recover_dead_consumers()
+        for job_type, consumer_id, index in plan:
+            self._spawn(self._consume, job_type, consumer_id, name=f"job-{job_type or 'default'}-{index}")
+        self._spawn(self._maintain, name="job-maintenance")
+        logger.info(f"Job consumer pool started: {self.consumer_plan()}")
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop consuming; each consumer exits after its current batch and block timeout"""
+        self._running.clear()
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        try:
+            self.queue.retire_consumers(self._consumer_ids)
+        except Exception as e:
+            logger.warning(f"Failed to retire job consumers: {e}")
+    
+    @property
+    def running(self) -> bool:
+        return self._running.is_set()
+    
+    def _spawn(self, target, *args, name: str) -> None:
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+    
+    def _consume(self, job_type: str | None, consumer_id: str) -> None:
+        while self._running.is_set():
+            try:
+                jobs = self.queue.dequeue_batch(job_type, consumer_id, self.batch_size, self.block_timeout)
+            except Exception as e:
+                logger.error(f"Job consumer {consumer_id} dequeue error: {e}")
+                time.sleep(1)  # Backoff on error
+                continue
+            
+            with self._lock:
+                self._in_flight.update(job.job_id for job in jobs)
+            for job in jobs:
+                try:
+                    success = self.handler(job)
+                except Exception as e:
+                    logger.error(f"Job {job.job_id} handler exception: {e}")
+                    self.queue.complete_job(job.job_id, False, error=str(e))
+                    success = False
+                with self._lock:
+                    self._in_flight.discard(job.job_id)
+                    self.stats['processed' if success else 'failed'] += 1
+    
+    def _maintain(self) -> None:
+        while self._running.is_set():
+            try:
+                with self._lock:
+                    in_flight = list(self._in_flight)
+                self.queue.heartbeat(self._consumer_ids)
+                self.queue.extend_leases(in_flight)
+                promoted = self.queue.process_retry_queue()
+                reclaimed = self.queue.reclaim_expired()
+                recovered = self.queue.recover_dead_consumers()
+                with self._lock:
+                    self.stats['promoted'] += len(promoted)
+                    self.stats['reclaimed'] += len(reclaimed)
+                    self.stats['recovered'] += recovered
+            except Exception as e:
+                logger.error(f"Job queue maintenance error: {e}")
+            self._stopped.wait(self.maintenance_interval)
+    
+    def get_stats(self) -> dict[str, Any]:
+        """Processed/failed counters, reclaims, retry promotions and in-flight jobs"""
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._in_flight), consumers=len(self._threads) - 1 if self._threads else 0)
+
 # Global job queue instance
 job_queue = JobQueue()
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Per-key ordered executor
+Jobs with the same key run one at a time in submit order on a single shard;
+different keys spread across shards and run in parallel
+"""
+
+import logging
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from queue import Full, Queue
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a shard queue is full and the job was shed"""
+
+
+class KeyedExecutor:
+    """Fixed set of single-threaded shards, each with a bounded FIFO queue"""
+
+    def __init__(self, num_shards: int = 3, max_queue_per_shard: int = 100,
+                 enqueue_timeout: float = 0.0, shed_threshold: float = 0.8,
+                 thread_name_prefix: str = "keyed-"):
+        self.num_shards = max(1, num_shards)
+        self.max_queue_per_shard = max(1, max_queue_per_shard)
+        self.enqueue_timeout = enqueue_timeout
+        self.shed_threshold = shed_threshold
+        self._queues = [Queue(maxsize=self.max_queue_per_shard) for _ in range(self.num_shards)]
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._shard_stats = [
+            {'submitted': 0, 'completed': 0, 'failed': 0, 'shed': 0, 'busy': False, 'max_depth': 0}
+            for _ in range(self.num_shards)
+        ]
+        self._threads = []
+        for shard in range(self.num_shards):
+            thread = threading.Thread(
+                target=self._worker, args=(shard,),
+                name=f"{thread_name_prefix}{shard}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def shard_for(self, key: str) -> int:
+        """Stable shard index for a key (same across processes and restarts)"""
+        return zlib.crc32(str(key).encode('utf-8')) % self.num_shards
+
+    def submit(self, key: str, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Queue fn(*args, **kwargs) behind any earlier jobs for the same key
+
+        Waits up to enqueue_timeout seconds for space on the shard, then sheds
+        the job by raising ExecutorSaturated.
+        """
+        if self._shutdown:
+            raise RuntimeError("KeyedExecutor is shut down")
+
+        shard = self.shard_for(key)
+        future = Future()
+        try:
+            if self.enqueue_timeout > 0:
+                self._queues[shard].put((future, fn, args, kwargs), timeout=self.enqueue_timeout)
+            else:
+                self._queues[shard].put_nowait((future, fn, args, kwargs))
+        except Full:
+            with self._lock:
+                self._shard_stats[shard]['shed'] += 1
+            raise ExecutorSaturated(f"shard {shard} queue full ({self.max_queue_per_shard})")
+
+        with self._lock:
+            stats = self._shard_stats[shard]
+            stats['submitted'] += 1
+            stats['max_depth'] = max(stats['max_depth'], self._queues[shard].qsize())
+        return future
+
+    def is_overloaded(self, key: str | None = None) -> bool:
+        """True when the key's shard (or any shard) is past the shed threshold"""
+        limit = self.max_queue_per_shard * self.shed_threshold
+        if key is not None:
+            return self._queues[self.shard_for(key)].qsize() >= limit
+        return any(q.qsize() >= limit for q in self._queues)
+
+    def queue_depth(self) -> int:
+        """Jobs waiting across all shards (excludes the ones running)"""
+        return sum(q.qsize() for q in self._queues)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Executor-wide and per-shard queue depth and throughput counters"""
+        with self._lock:
+            shards = [
+                dict(stats, shard=shard, depth=self._queues[shard].qsize())
+                for shard, stats in enumerate(self._shard_stats)
+            ]
+        return {
+            'num_shards': self.num_shards,
+            'max_queue_per_shard': self.max_queue_per_shard,
+            'queue_depth': sum(s['depth'] for s in shards),
+            'busy_shards': sum(1 for s in shards if s['busy']),
+            'shed_total': sum(s['shed'] for s in shards),
+            'overloaded': self.is_overloaded(),
+            'shards': shards
+        }
+
+    def _worker(self, shard: int) -> None:
+        queue = self._queues[shard]
+        stats = self._shard_stats[shard]
+        while True:
+            item = queue.get()
+            if item is _STOP:
+                return
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            with self._lock:
+                stats['busy'] = True
+            result, error = None, None
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                logger.error(f"Shard {shard} job failed: {e}")
+                error = e
+            with self._lock:
+                stats['busy'] = False
+                stats['failed' if error is not None else 'completed'] += 1
+
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def shutdown(self, wait: bool = True, timeout: float | None = None) -> None:
+        """Stop accepting work; queued jobs still run before the shards exit"""
+        self._shutdown = True
+        for queue in self._queues:
+            queue.put(_STOP)
+        if wait:
+            deadline = None if timeout is None else time.time() + timeout
+            for thread in self._threads:
+                remaining = None if deadline is None else max(0.0, deadline - time.time())
+                thread.join(remaining)
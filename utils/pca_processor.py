@@ -4,17 +4,30 @@ Phase 1: CC Snapshot Logging and Basic Processing
 """
 
 import logging
+import re
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-from sqlalchemy.exc import IntegrityError
+from nlp.analyzed_message import analyze
 
 logger = logging.getLogger("finbrain.pca_processor")
 
+# Enhanced expense detection patterns for DRYRUN mode, matched against the raw text
+DRYRUN_EXPENSE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'৳\s*(\d+(?:,\d{3})*(?:\.\d{2})?)',  # ৳500, ৳1,500.50
+    r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*(?:taka|৳|tk|BDT)',  # 500 taka, 1500৳, 200 tk
+    r'(?:spent|cost|paid|bought|expense|khoroch|খরচ)\s*৳?\s*(\d+)',  # spent ৳500, খরচ 200
+    r'(?:kinlam|kিনলাম|dilam|দিলাম)\s*৳?\s*(\d+)',  # Bengali expense verbs
+    r'(\d+)\s*(?:টাকা|taka)',  # 500 টাকা
+)]
+
 def log_cc_snapshot(cc_dict: dict[str, Any], processing_time_ms: int | None = None, 
                    applied: bool = False, error_message: str | None = None) -> bool:
     """
-    Log Canonical Command snapshot to inference_snapshots table
+    Queue Canonical Command snapshot for the inference_snapshots table
+    
+    The row is written by the write-behind snapshot_writer in a batched
+    INSERT ... ON CONFLICT (cc_id) DO NOTHING, off the message path.
     
     Args:
         cc_dict: Complete CC dictionary from CanonicalCommand.to_dict()
@@ -23,69 +36,45 @@ def log_cc_snapshot(cc_dict: dict[str, Any], processing_time_ms: int | None = No
         error_message: Any error that occurred during processing
         
     Returns:
-        True if logged successfully, False otherwise
+        True if queued, False if the snapshot was dropped
     """
     try:
-        from db_base import (
-            app,  # type: ignore[attr-defined]
-            db,
-        )
-        from models_pca import InferenceSnapshot
         from utils.pca_flags import pca_flags
+        from utils.snapshot_writer import snapshot_writer
         
-        # Extract CC components
         cc_id = cc_dict.get('cc_id', '')
-        user_id = cc_dict.get('user_id', '')
         intent = cc_dict.get('intent', '')
-        slots = cc_dict.get('slots', {})
         confidence = cc_dict.get('confidence', 0.0)
-        decision = cc_dict.get('decision', '')
         clarifier = cc_dict.get('clarifier', {})
-        model_version = cc_dict.get('model_version', 'unknown')
-        source_text = cc_dict.get('source_text', '')
-        ui_note = cc_dict.get('ui_note', '')
-        
-        # Create snapshot record
-        snapshot = InferenceSnapshot()
-        snapshot.cc_id = cc_id
-        snapshot.user_id = user_id
-        snapshot.intent = intent
-        snapshot.slots_json = slots
-        snapshot.confidence = confidence
-        snapshot.decision = decision
-        snapshot.clarifier_json = clarifier if clarifier and clarifier.get('type') != 'none' else None
-        snapshot.model_version = model_version
-        snapshot.processing_time_ms = processing_time_ms
-        snapshot.source_text = source_text
-        snapshot.ui_note = ui_note
-        snapshot.pca_mode = pca_flags.mode.value
-        snapshot.applied = applied
-        snapshot.error_message = error_message
-        
-        # Insert into database with app context
-        with app.app_context():
-            db.session.add(snapshot)
-            db.session.commit()
         
-        logger.debug(f"CC snapshot logged: {cc_id} intent={intent} conf={confidence:.2f} applied={applied}")
-        return True
+        # Snapshot row, stamped now rather than when the batch is flushed
+        row = {
+            'cc_id': cc_id,
+            'user_id': cc_dict.get('user_id', ''),
+            'intent': intent,
+            'slots_json': cc_dict.get('slots', {}),
+            'confidence': confidence,
+            'decision': cc_dict.get('decision', ''),
+            'clarifier_json': clarifier if clarifier and clarifier.get('type') != 'none' else None,
+            'model_version': cc_dict.get('model_version', 'unknown'),
+            'processing_time_ms': processing_time_ms,
+            'source_text': cc_dict.get('source_text', ''),
+            'ui_note': cc_dict.get('ui_note', ''),
+            'created_at': datetime.utcnow(),
+            'pca_mode': pca_flags.mode.value,
+            'applied': applied,
+            'error_message': error_message,
+        }
         
-    except IntegrityError:
-        logger.warning(f"CC snapshot already exists: {cc_dict.get('cc_id', 'unknown')}")
-        try:
-            from db_base import db
-            db.session.rollback()
-        except Exception:
-            pass
-        return False
+        if not snapshot_writer.submit(row):
+            logger.warning(f"CC snapshot dropped, write buffer full: {cc_id}")
+            return False
+        
+        logger.debug(f"CC snapshot queued: {cc_id} intent={intent} conf={confidence:.2f} applied={applied}")
+        return True
         
     except Exception as e:
         logger.error(f"Failed to log CC snapshot {cc_dict.get('cc_id', 'unknown')}: {e}")
-        try:
-            from db_base import db
-            db.session.rollback()
-        except Exception:
-            pass
         return False
 
 def process_message_with_pca(user_id: str, message_text: str, message_id: str, timestamp: datetime) -> dict[str, Any]:
@@ -230,7 +219,6 @@ def process_dryrun_mode(user_id: str, message_text: str, message_id: str, cc_id:
     - Performance monitoring
     - Zero impact on user experience
     """
-    import re
     import time as time_module
     
     processing_start = time_module.time()
@@ -244,21 +232,13 @@ def process_dryrun_mode(user_id: str, message_text: str, message_id: str, cc_id:
             create_help_cc,
         )
         
-        # Enhanced expense detection patterns
-        expense_patterns = [
-            r'৳\s*(\d+(?:,\d{3})*(?:\.\d{2})?)',  # ৳500, ৳1,500.50
-            r'(\d+(?:,\d{3})*(?:\.\d{2})?)\s*(?:taka|৳|tk|BDT)',  # 500 taka, 1500৳, 200 tk
-            r'(?:spent|cost|paid|bought|expense|khoroch|খরচ)\s*৳?\s*(\d+)',  # spent ৳500, খরচ 200
-            r'(?:kinlam|kিনলাম|dilam|দিলাম)\s*৳?\s*(\d+)',  # Bengali expense verbs
-            r'(\d+)\s*(?:টাকা|taka)',  # 500 টাকা
-        ]
-        
         # Check for expense patterns
         expense_detected = False
         amount_value = None
         
-        for pattern in expense_patterns:
-            match = re.search(pattern, message_text, re.IGNORECASE)
+        message = analyze(message_text)
+        for pattern in DRYRUN_EXPENSE_PATTERNS:
+            match = pattern.search(message_text)
             if match:
                 expense_detected = True
                 try:
@@ -298,12 +278,12 @@ def process_dryrun_mode(user_id: str, message_text: str, message_id: str, cc_id:
             query_keywords = ['help', 'summary', 'total', 'report', 'balance', 'show', 'আমার', 'দেখাও']
             greeting_keywords = ['hello', 'hi', 'hey', 'assalam', 'নমস্কার', 'হাই']
             
-            if any(word in message_text.lower() for word in query_keywords):
+            if any(word in message.normalized for word in query_keywords):
                 cc = create_help_cc(user_id, cc_id, message_text, "Query or help request detected")
                 intent_result = "HELP"
                 confidence_result = 0.75
                 
-            elif any(word in message_text.lower() for word in greeting_keywords):
+            elif any(word in message.normalized for word in greeting_keywords):
                 cc = CanonicalCommand(
                     cc_id=cc_id,
                     user_id=user_id,
@@ -388,7 +368,6 @@ def process_production_mode(user_id: str, message_text: str, message_id: str, cc
     """
     PHASE 4: Production mode with actual transaction creation
     """
-    import re
     import time as time_module
     
     processing_start = time_module.time()
@@ -552,6 +531,8 @@ def get_pca_health_status() -> dict[str, Any]:
             UserRule,
         )
         
+        from utils.snapshot_writer import snapshot_writer
+        
         # Check table accessibility and basic counts
         tx_count = db.session.query(TransactionEffective).count()
         corr_count = db.session.query(UserCorrection).count()  
@@ -576,6 +557,7 @@ def get_pca_health_status() -> dict[str, Any]:
             'recent_activity': {
                 'snapshots_24h': recent_snapshots
             },
+            'snapshot_writer': snapshot_writer.get_stats(),
             'timestamp': datetime.utcnow().isoformat()
         }
         
@@ -1,134 +1,69 @@
 """
 High-Performance Caching System for Report Generation
-Implements intelligent caching with TTL and memory optimization
+Reports live in the shared "reports" cache namespace: bounded per worker,
+shared across workers through Redis, and dropped when the user's data changes
 """
 
-import hashlib
 import logging
-from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any
+
+from utils import cache
 
 logger = logging.getLogger(__name__)
 
-# Global cache storage with TTL support
-_PERFORMANCE_CACHE = {}
-_CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0}
 
 class PerformanceCache:
     """Ultra-fast caching system for report generation"""
-    
+
     def __init__(self, default_ttl_minutes: int = 5, max_size: int = 100):
         self.default_ttl_minutes = default_ttl_minutes
         self.max_size = max_size
-        
+        self.cache = cache.namespace("reports", ttl_seconds=default_ttl_minutes * 60, max_entries=max_size,
+                                     l2=True, versioned=True)
+
     def _generate_cache_key(self, user_id: str, days_window: int, cache_type: str = "report") -> str:
-        """Generate optimized cache key"""
-        # Include current hour to ensure data freshness
-        current_hour = datetime.now().strftime("%Y%m%d%H")
-        key_data = f"{cache_type}:{user_id}:{days_window}:{current_hour}"
-        return hashlib.md5(key_data.encode()).hexdigest()[:16]  # Short hash for speed
-    
+        """Cache key; freshness comes from the user's data version, not the key"""
+        return f"{cache_type}:{user_id}:{days_window}"
+
     def get_report(self, user_id: str, days_window: int) -> str | None:
         """Get cached report if available and fresh"""
         try:
-            cache_key = self._generate_cache_key(user_id, days_window, "report")
-            
-            if cache_key in _PERFORMANCE_CACHE:
-                cached_item = _PERFORMANCE_CACHE[cache_key]
-                
-                # Check TTL
-                if cached_item["expires_at"] > datetime.now():
-                    _CACHE_STATS["hits"] += 1
-                    logger.debug(f"Cache HIT for user {user_id[:8]}... (key: {cache_key})")
-                    return cached_item["data"]
-                else:
-                    # Expired - remove
-                    del _PERFORMANCE_CACHE[cache_key]
-                    _CACHE_STATS["evictions"] += 1
-            
-            _CACHE_STATS["misses"] += 1
-            logger.debug(f"Cache MISS for user {user_id[:8]}... (key: {cache_key})")
-            return None
-            
+            cached = self.cache.get(self._generate_cache_key(user_id, days_window))
+            logger.debug(f"Cache {'HIT' if cached is not None else 'MISS'} for user {user_id[:8]}...")
+            return cached
         except Exception as e:
             logger.warning(f"Cache get error: {e}")
             return None
-    
-    def set_report(self, user_id: str, days_window: int, report_data: str) -> bool:
-        """Cache report with intelligent TTL"""
+
+    def data_version(self, user_id: str) -> int | None:
+        """User's data version; read it before building a report and pass it to set_report"""
+        return self.cache.current_version(user_id)
+
+    def set_report(self, user_id: str, days_window: int, report_data: str, version: int | None = None) -> bool:
+        """Cache report until its TTL passes or the user's data changes after `version`"""
         try:
-            cache_key = self._generate_cache_key(user_id, days_window, "report")
-            
-            # Clean cache if at max size
-            if len(_PERFORMANCE_CACHE) >= self.max_size:
-                self._cleanup_expired_entries()
-                
-                # If still at max, remove oldest entries
-                if len(_PERFORMANCE_CACHE) >= self.max_size:
-                    self._remove_oldest_entries(10)  # Remove 10% of entries
-            
-            # Store with TTL
-            expires_at = datetime.now() + timedelta(minutes=self.default_ttl_minutes)
-            _PERFORMANCE_CACHE[cache_key] = {
-                "data": report_data,
-                "created_at": datetime.now(),
-                "expires_at": expires_at
-            }
-            
-            logger.debug(f"Cached report for user {user_id[:8]}... (key: {cache_key}, TTL: {self.default_ttl_minutes}min)")
+            self.cache.set(self._generate_cache_key(user_id, days_window), report_data, user=user_id,
+                           version=version)
+            logger.debug(f"Cached report for user {user_id[:8]}... (TTL: {self.default_ttl_minutes}min)")
             return True
-            
         except Exception as e:
             logger.error(f"Cache set error: {e}")
             return False
-    
-    def _cleanup_expired_entries(self):
-        """Remove expired entries from cache"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, value in _PERFORMANCE_CACHE.items()
-            if value["expires_at"] <= now
-        ]
-        
-        for key in expired_keys:
-            del _PERFORMANCE_CACHE[key]
-            _CACHE_STATS["evictions"] += 1
-        
-        if expired_keys:
-            logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
-    
-    def _remove_oldest_entries(self, count: int):
-        """Remove oldest entries when cache is full"""
-        if not _PERFORMANCE_CACHE:
-            return
-            
-        # Sort by creation time and remove oldest
-        sorted_items = sorted(
-            _PERFORMANCE_CACHE.items(),
-            key=lambda x: x[1]["created_at"]
-        )
-        
-        removal_count = min(count, len(sorted_items))
-        for i in range(removal_count):
-            key = sorted_items[i][0]
-            del _PERFORMANCE_CACHE[key]
-            _CACHE_STATS["evictions"] += 1
-        
-        logger.debug(f"Removed {removal_count} oldest cache entries")
-    
+
     def get_stats(self) -> dict[str, Any]:
         """Get cache performance statistics"""
-        total_requests = _CACHE_STATS["hits"] + _CACHE_STATS["misses"]
-        hit_rate = (_CACHE_STATS["hits"] / total_requests * 100) if total_requests > 0 else 0
-        
+        stats = self.cache.get_stats()
+        hits = stats["hits"] + stats["l2_hits"]
+        total_requests = hits + stats["misses"]
+
         return {
-            "cache_size": len(_PERFORMANCE_CACHE),
-            "hits": _CACHE_STATS["hits"],
-            "misses": _CACHE_STATS["misses"],
-            "evictions": _CACHE_STATS["evictions"],
-            "hit_rate_percent": round(hit_rate, 1),
+            "cache_size": stats["size"],
+            "hits": hits,
+            "misses": stats["misses"],
+            "evictions": stats["evictions"] + stats["expirations"] + stats["stale"],
+            "hit_rate_percent": stats["hit_rate_percent"],
             "total_requests": total_requests
         }
 
 # Global cache instance
-performance_cache = PerformanceCache()
\ No newline at end of file
+performance_cache = PerformanceCache()
@@ -9,6 +9,8 @@ import time
 from functools import lru_cache
 from typing import Any, Dict
 
+from finbrain.ops import perf
+
 logger = logging.getLogger("finbrain.performance")
 
 # Thread-local storage for expensive imports and connections
@@ -99,6 +101,7 @@ class PerformanceTracker:
             'duration_ms': duration_ms,
             'timestamp': time.time()
         })
+        perf.registry.record("pca", operation_name, "ok", duration_ms)
         
         # Flag slow operations (>500ms)
         if duration_ms > 500:
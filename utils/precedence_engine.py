@@ -4,9 +4,14 @@ Implements deterministic resolution order for user-specific views
 """
 
 import logging
+import os
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
 
+from sqlalchemy import event
+
+from utils import cache
+
 logger = logging.getLogger("finbrain.precedence")
 
 @dataclass
@@ -40,7 +45,23 @@ class PrecedenceEngine:
     """
     
     def __init__(self):
-        self.cache = {}  # Simple request-level cache
+        # Bounded LRU of "user_id:tx_id" -> resolved view; entries expire after the
+        # TTL and a user's entries are dropped on any write to their corrections or rules
+        self.cache_ttl_seconds = int(os.getenv('PRECEDENCE_CACHE_TTL_SEC', '300'))  # 5 minutes
+        self.cache = cache.CacheNamespace('precedence', ttl_seconds=self.cache_ttl_seconds,
+                                          max_entries=int(os.getenv('PRECEDENCE_CACHE_MAX_ENTRIES', '5000')))
+    
+    @property
+    def max_entries(self) -> int:
+        return self.cache.max_entries
+    
+    @max_entries.setter
+    def max_entries(self, value: int) -> None:
+        self.cache.max_entries = value
+    
+    @property
+    def cache_stats(self) -> dict[str, int]:
+        return self.cache.stats
         
     def get_effective_view(self, user_id: str, tx_id: str, 
                           raw_expense: dict | None = None) -> PrecedenceResult:
@@ -56,46 +77,121 @@ class PrecedenceEngine:
             PrecedenceResult with resolved values
         """
         cache_key = f"{user_id}:{tx_id}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
             
         try:
             # Check if overlay is enabled
-            import os
             overlay_enabled = os.environ.get('PCA_OVERLAY_ENABLED', 'false').lower() == 'true'
             if not overlay_enabled:
                 return self._raw_fallback(raw_expense)
                 
-            # 1. Check for user corrections (highest priority)
-            correction = self._get_latest_correction(user_id, tx_id)
-            if correction:
-                result = self._apply_correction(correction, raw_expense)
-                self.cache[cache_key] = result
-                return result
-                
-            # 2. Check for matching user rules
-            matching_rule = self._get_matching_rule(user_id, raw_expense)
-            if matching_rule:
-                result = self._apply_rule(matching_rule, raw_expense)
-                self.cache[cache_key] = result
-                return result
-                
-            # 3. Check transaction effective table
-            effective = self._get_transaction_effective(user_id, tx_id)
-            if effective:
-                result = self._from_effective(effective)
-                self.cache[cache_key] = result
-                return result
-                
-            # 4. Fall back to raw data
-            result = self._raw_fallback(raw_expense)
-            self.cache[cache_key] = result
+            result = self._resolve(
+                self._get_latest_correction(user_id, tx_id),
+                lambda: self._get_matching_rule(user_id, raw_expense),
+                lambda: self._get_transaction_effective(user_id, tx_id),
+                raw_expense
+            )
+            self._cache_put(cache_key, result)
             return result
             
         except Exception as e:
             logger.error(f"Precedence resolution failed: {e}")
             return self._raw_fallback(raw_expense)
     
+    def get_effective_views(self, user_id: str, tx_ids: list[str],
+                            raw_expenses: dict[str, dict] | None = None) -> dict[str, PrecedenceResult]:
+        """
+        Get effective views for many transactions of one user
+        
+        Loads corrections, rules and effective rows for every uncached tx_id in
+        one query each, then resolves each transaction in the same order as
+        get_effective_view.
+        
+        Args:
+            user_id: SHA-256 hashed user identifier
+            tx_ids: Canonical transaction IDs
+            raw_expenses: Optional tx_id -> raw expense data (for rules and fallback)
+            
+        Returns:
+            Mapping of tx_id to PrecedenceResult, in input order
+        """
+        raw_expenses = raw_expenses or {}
+        overlay_enabled = os.environ.get('PCA_OVERLAY_ENABLED', 'false').lower() == 'true'
+        if not overlay_enabled:
+            return {tx_id: self._raw_fallback(raw_expenses.get(tx_id)) for tx_id in tx_ids}
+        
+        results = {}
+        pending = []
+        for tx_id in tx_ids:
+            cached = self._cache_get(f"{user_id}:{tx_id}")
+            if cached is not None:
+                results[tx_id] = cached
+            elif tx_id not in pending:
+                pending.append(tx_id)
+        
+        if pending:
+            try:
+                corrections = self._get_latest_corrections(user_id, pending)
+                try:
+                    rules = self._get_active_rules(user_id)
+                except Exception as e:
+                    logger.warning(f"Failed to fetch rules: {e}")
+                    rules = []
+                
+                # Only transactions without a correction or matching rule need effective rows
+                matched_rules = {}
+                for tx_id in pending:
+                    if tx_id not in corrections:
+                        matched_rules[tx_id] = self._select_matching_rule(rules, raw_expenses.get(tx_id))
+                need_effective = [tx_id for tx_id, rule in matched_rules.items() if not rule]
+                effective_rows = self._get_transactions_effective(user_id, need_effective) if need_effective else {}
+                
+                for tx_id in pending:
+                    result = self._resolve(
+                        corrections.get(tx_id),
+                        lambda rule=matched_rules.get(tx_id): rule,
+                        lambda effective=effective_rows.get(tx_id): effective,
+                        raw_expenses.get(tx_id)
+                    )
+                    self._cache_put(f"{user_id}:{tx_id}", result)
+                    results[tx_id] = result
+                    
+            except Exception as e:
+                logger.error(f"Batch precedence resolution failed: {e}")
+                for tx_id in pending:
+                    results[tx_id] = self._raw_fallback(raw_expenses.get(tx_id))
+        
+        return {tx_id: results[tx_id] for tx_id in tx_ids}
+    
+    def _resolve(self, correction: dict | None, get_rule, get_effective,
+                 raw_expense: dict | None) -> PrecedenceResult:
+        """Apply Correction > Rule > Effective > Raw; later tiers are only looked up when needed"""
+        # 1. User corrections (highest priority)
+        if correction:
+            return self._apply_correction(correction, raw_expense)
+            
+        # 2. Matching user rules
+        matching_rule = get_rule()
+        if matching_rule:
+            return self._apply_rule(matching_rule, raw_expense)
+            
+        # 3. Transaction effective table
+        effective = get_effective()
+        if effective:
+            return self._from_effective(effective)
+            
+        # 4. Fall back to raw data
+        return self._raw_fallback(raw_expense)
+    
+    def _cache_get(self, cache_key: str) -> PrecedenceResult | None:
+        return self.cache.get(cache_key)
+    
+    def _cache_put(self, cache_key: str, result: PrecedenceResult) -> None:
+        # Keys are "user_id:tx_id"; the owner is what invalidate_user matches
+        self.cache.set(cache_key, result, user=cache_key.partition(':')[0])
+    
     def _get_latest_correction(self, user_id: str, tx_id: str) -> dict | None:
         """Get the most recent user correction for a transaction"""
         try:
@@ -120,50 +216,80 @@ class PrecedenceEngine:
             logger.warning(f"Failed to fetch correction: {e}")
             return None
     
+    def _get_latest_corrections(self, user_id: str, tx_ids: list[str]) -> dict[str, dict]:
+        """Get the most recent user correction for each of tx_ids in one query"""
+        try:
+            from db_base import db
+            from models_pca import UserCorrection
+            
+            rows = db.session.query(UserCorrection).filter(
+                UserCorrection.user_id == user_id,
+                UserCorrection.tx_id.in_(tx_ids)
+            ).order_by(UserCorrection.created_at.desc()).all()
+            
+        except Exception as e:
+            logger.warning(f"Failed to fetch corrections: {e}")
+            return {}
+        
+        corrections = {}
+        for correction in rows:
+            if correction.tx_id not in corrections:
+                corrections[correction.tx_id] = {
+                    'id': correction.id,
+                    'fields': correction.fields_json,
+                    'reason': correction.reason,
+                    'created_at': correction.created_at
+                }
+        return corrections
+    
     def _get_matching_rule(self, user_id: str, raw_expense: dict | None) -> dict | None:
         """Find the highest priority matching rule for the user"""
         if not raw_expense:
             return None
             
         try:
-            from db_base import db
-            from models_pca import UserRule
-            
-            # Get all user rules
-            rules = db.session.query(UserRule).filter_by(
-                user_id=user_id,
-                active=True
-            ).all()
-            
-            if not rules:
-                return None
-                
-            # Score and sort rules by specificity
-            scored_rules = []
-            for rule in rules:
-                score = self._calculate_rule_specificity(rule.pattern_json, raw_expense)
-                if score > 0:  # Rule matches
-                    scored_rules.append((score, rule))
-                    
-            if not scored_rules:
-                return None
-                
-            # Sort by score (desc) then by recency (desc)
-            scored_rules.sort(key=lambda x: (x[0], x[1].created_at), reverse=True)
-            
-            # Return highest priority rule
-            best_rule = scored_rules[0][1]
-            return {
-                'id': best_rule.id,
-                'pattern': best_rule.pattern_json,
-                'rule_set': best_rule.rule_set_json,
-                'created_at': best_rule.created_at
-            }
-            
+            return self._select_matching_rule(self._get_active_rules(user_id), raw_expense)
         except Exception as e:
             logger.warning(f"Failed to fetch matching rule: {e}")
             return None
     
+    def _get_active_rules(self, user_id: str) -> list:
+        """Load all active rules for the user"""
+        from db_base import db
+        from models_pca import UserRule
+        
+        return db.session.query(UserRule).filter_by(
+            user_id=user_id,
+            is_active=True
+        ).all()
+    
+    def _select_matching_rule(self, rules: list, raw_expense: dict | None) -> dict | None:
+        """Pick the most specific (then most recent) rule matching the expense"""
+        if not rules or not raw_expense:
+            return None
+            
+        # Score and sort rules by specificity
+        scored_rules = []
+        for rule in rules:
+            score = self._calculate_rule_specificity(rule.pattern_json, raw_expense)
+            if score > 0:  # Rule matches
+                scored_rules.append((score, rule))
+                
+        if not scored_rules:
+            return None
+            
+        # Sort by score (desc) then by recency (desc)
+        scored_rules.sort(key=lambda x: (x[0], x[1].created_at), reverse=True)
+        
+        # Return highest priority rule
+        best_rule = scored_rules[0][1]
+        return {
+            'id': best_rule.id,
+            'pattern': best_rule.pattern_json,
+            'rule_set': best_rule.rule_set_json,
+            'created_at': best_rule.created_at
+        }
+    
     def _calculate_rule_specificity(self, pattern: dict, expense: dict) -> int:
         """
         Calculate rule specificity score
@@ -230,6 +356,33 @@ class PrecedenceEngine:
             logger.warning(f"Failed to fetch effective transaction: {e}")
             return None
     
+    def _get_transactions_effective(self, user_id: str, tx_ids: list[str]) -> dict[str, dict]:
+        """Get active effective rows for each of tx_ids in one query"""
+        try:
+            from db_base import db
+            from models_pca import TransactionEffective
+            
+            rows = db.session.query(TransactionEffective).filter(
+                TransactionEffective.user_id == user_id,
+                TransactionEffective.tx_id.in_(tx_ids),
+                TransactionEffective.status == 'active'
+            ).all()
+            
+        except Exception as e:
+            logger.warning(f"Failed to fetch effective transactions: {e}")
+            return {}
+        
+        return {
+            effective.tx_id: {
+                'category': effective.category,
+                'subcategory': effective.subcategory,
+                'amount': float(effective.amount),
+                'merchant_text': effective.merchant_text,
+                'confidence': 0.85  # Default confidence for effective
+            }
+            for effective in rows
+        }
+    
     def _apply_correction(self, correction: dict, raw_expense: dict | None) -> PrecedenceResult:
         """Apply user correction to create precedence result"""
         fields = correction['fields']
@@ -292,9 +445,28 @@ class PrecedenceEngine:
             confidence=raw_expense.get('confidence', 0.5)
         )
     
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop every cached view for a user after their corrections or rules change"""
+        self.cache.invalidate_user(user_id)
+    
     def clear_cache(self):
-        """Clear the request-level cache"""
+        """Clear the view cache"""
         self.cache.clear()
 
 # Global precedence engine instance
-precedence_engine = PrecedenceEngine()
\ No newline at end of file
+precedence_engine = PrecedenceEngine()
+cache.register(precedence_engine.cache)
+
+
+def _invalidate_owner(mapper, connection, target) -> None:
+    if target.user_id:
+        precedence_engine.invalidate_user(target.user_id)
+
+
+def register_overlay_invalidation(*models) -> None:
+    """Invalidate cached views whenever a user's corrections or rules are written"""
+    for model in models:
+        if event.contains(model, 'after_insert', _invalidate_owner):
+            continue
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, _invalidate_owner)
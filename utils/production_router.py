@@ -9,6 +9,7 @@ import os
 import pathlib
 import re
 import time
+from contextlib import nullcontext
 from datetime import UTC, datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -19,41 +20,22 @@ def _H(u): return hashlib.sha256(str(u).encode()).hexdigest()[:8]
 # Money detection and unified parsing (enhanced) - inlined from deprecated router
 from parsers.expense import parse_amount_currency_category
 
-# Money detection patterns - inlined from quarantined code
-CURRENCY_SYMBOL_PATTERN = re.compile(r'[৳$£€₹]\s*\d+(?:[.,]\d{1,2})?', re.IGNORECASE)
-CURRENCY_WORD_PATTERN = re.compile(r'\b\d+(?:[.,]\d{1,2})?\s*(tk|taka|bdt|usd|eur|inr|rs|peso|php)\b|\b(tk|taka|bdt|usd|eur|inr|rs|peso|php)\s*\d+(?:[.,]\d{1,2})?\b', re.IGNORECASE)
-VERB_PATTERN = re.compile(r'\b(spent|paid|bought|blew|burned|used)\b.*?\b\d+(?:[.,]\d{1,2})?\b', re.IGNORECASE)
-SHORTHAND_PATTERN = re.compile(r'\b(coffee|lunch|dinner|uber|taxi|bus|groceries?|fuel|petrol|medicine|pharmacy)\b.*?\b\d+(?:[.,]\d{1,2})?\b', re.IGNORECASE)
+# Money detection patterns and normalization live with the other money patterns
+from nlp.analyzed_message import analyze, message_scope
+from nlp.money_patterns import (  # noqa: F401 - re-exported for existing importers
+    BANGLA_NUMERALS,
+    CURRENCY_SYMBOL_PATTERN,
+    CURRENCY_WORD_PATTERN,
+    SHORTHAND_PATTERN,
+    VERB_PATTERN,
+    normalize_text_money,
+)
+
 CORRECTION_PATTERNS = re.compile(
     r'\b(?:sorry|i meant|meant|actually|replace last|correct that|correction|should be|update to|make it|not\s+\d+|typo)\b',
     re.IGNORECASE
 )
 
-# Bangla numeral mapping for normalization
-BANGLA_NUMERALS = {
-    '০': '0', '১': '1', '২': '2', '৩': '3', '৪': '4',
-    '৫': '5', '৬': '6', '৭': '7', '৮': '8', '৯': '9'
-}
-
-def normalize_text_money(text: str) -> str:
-    """
-    Normalize text for money detection.
-    Converts Bangla numerals, handles OCR artifacts, removes extra spaces.
-    """
-    if not text:
-        return ""
-    
-    # Convert Bangla numerals to ASCII
-    normalized = text
-    for bangla, ascii_num in BANGLA_NUMERALS.items():
-        normalized = normalized.replace(bangla, ascii_num)
-    
-    # Collapse extra spaces and emojis
-    normalized = re.sub(r'\s+', ' ', normalized)
-    normalized = re.sub(r'[^\w\s$£€₹৳.,()-]', ' ', normalized)  # Remove emojis, keep currency symbols
-    
-    return normalized.strip()
-
 # TYPE NORMALIZATION SYSTEM - Fixes 70 LSP errors by ensuring type safety
 def safe_dict_get(obj: Any, key: str, default: Any = None) -> Any:
     """Safely get a value from an object that might be a dict"""
@@ -95,6 +77,7 @@ def contains_money(text: str) -> bool:
     """
     Enhanced money detection with comprehensive pattern matching.
     Ordered from cheapest to richest patterns, stops at first match.
+    Reads the request's AnalyzedMessage, so repeated checks cost nothing.
     
     Args:
         text: Input text to analyze
@@ -104,32 +87,7 @@ def contains_money(text: str) -> bool:
     """
     if not text or not text.strip():
         return False
-    
-    # Normalize text for better pattern matching
-    normalized_text = normalize_text_money(text)
-    
-    # Rule 1: Currency symbols with amounts (highest confidence)
-    if CURRENCY_SYMBOL_PATTERN.search(normalized_text):
-        return True
-    
-    # Rule 2: Amount with currency words
-    if CURRENCY_WORD_PATTERN.search(normalized_text):
-        return True
-    
-    # Rule 3: Action verbs with amounts
-    if VERB_PATTERN.search(normalized_text):
-        return True
-    
-    # Rule 4: Common expense shorthand with amounts
-    if SHORTHAND_PATTERN.search(normalized_text):
-        return True
-    
-    # Rule 5: Handle multipliers like "1.2k" or "1K"
-    multiplier_pattern = re.compile(r'\b\d+(?:\.\d+)?[kK]\b.*?\b(tk|taka|spent|paid|bought|on|for)\b', re.IGNORECASE)
-    if multiplier_pattern.search(normalized_text):
-        return True
-    
-    return False
+    return analyze(text).has_spend_money
 
 def is_correction_message(text: str) -> bool:
     """
@@ -173,7 +131,7 @@ def contains_money_with_correction_fallback(text: str, psid_hash: str) -> bool:
         return False
     
     # Correction-specific fallback patterns (only for correction messages)
-    normalized_text = normalize_text_money(text)
+    normalized_text = analyze(text).money_text
     
     # Pattern 1: Bare numbers (2-7 digits) with optional decimals
     bare_number_pattern = re.compile(r'\b\d{1,7}(?:[.,]\d{1,2})?\b')
@@ -202,6 +160,7 @@ from utils.categories import categorize_expense
 from utils.identity import psid_hash
 from utils.logger import get_request_id
 from utils.parser import parse_expense
+from utils.reply_stream import emit_partial
 from utils.textutil import (
     PANIC_PLAIN_REPLY,
     format_help_response,
@@ -268,6 +227,9 @@ try:
 except ImportError:
     perf = None
 
+# Stage boundaries for the per-stage latency histograms
+_mark_stage = perf.mark_stage if perf else (lambda stage: None)
+
 # AI-path verification logger
 ai_logger = logging.getLogger("finbrain.router")
 
@@ -598,6 +560,16 @@ class ProductionRouter:
         Now accepts either original PSID or user_id_hash for flexible processing
         Returns: (response_text, intent, category, amount)
         """
+        # Every stage below (parser, routing policy, signals) reads one AnalyzedMessage;
+        # the trace times each "Step" of _route_message into the (channel, stage, intent) histograms
+        tracing = perf.stage_trace(route=channel) if perf else nullcontext()
+        with message_scope(text), tracing as trace:
+            result = self._route_message(text, psid_or_hash, rid, channel)
+            if trace:
+                trace.finish(outcome=result[1] or "none")
+            return result
+    
+    def _route_message(self, text: str, psid_or_hash: str, rid: str, channel: str) -> tuple[str, str, str | None, float | None]:
         start_time = time.time()
         
         # OBSERVABILITY: Log router entry for channel parity verification
@@ -645,6 +617,7 @@ class ProductionRouter:
             
             
             # Step 0: DETERMINISTIC EXPENSE EXTRACTION - Always check for expenses first  
+            _mark_stage("expense_extraction")
             try:
                 from parsers.expense import extract_all_expenses
                 from datetime import datetime
@@ -662,6 +635,7 @@ class ProductionRouter:
                         # Ensure Flask app context for database operations
                         with app.app_context():
                             result = handle_multi_expense_logging(user_hash, rid, text, datetime.utcnow())
+                            emit_partial(result['text'])
                         
                         self._emit_structured_telemetry(rid, user_hash, "LOG", "deterministic_multi", {
                             'expenses_count': len(all_expenses),
@@ -708,6 +682,7 @@ class ProductionRouter:
                 logger.error(f"Deterministic expense extraction failed: {e}, continuing to legacy routing")
             
             # Step 1: FAQ/SMALLTALK GUARDRAIL - Deterministic responses with emojis (no AI)
+            _mark_stage("faq_guardrail")
             faq_response = match_faq_or_smalltalk(text)
             if faq_response:
                 self._log_routing_decision(rid, user_hash, "faq_smalltalk", "deterministic")
@@ -715,6 +690,7 @@ class ProductionRouter:
                 return faq_response, "faq", None, None
             
             # Step 0.5: MESSAGING GUARDRAILS - Post-FAQ safety checks (fail-open design)
+            _mark_stage("messaging_guardrails")
             try:
                 guardrail_response = self._check_messaging_guardrails(text, user_hash, rid)
                 if guardrail_response:
@@ -726,6 +702,7 @@ class ProductionRouter:
                 logger.warning(f"Messaging guardrail check failed (user={user_hash[:8]}): {e}")
             
             # Step 0.7: REMINDER INTENT DETECTION - Check for reminder-related messages
+            _mark_stage("reminders")
             try:
                 from handlers.reminders import detect_reminder_intent
                 reminder_response = detect_reminder_intent(user_hash, text)
@@ -738,6 +715,7 @@ class ProductionRouter:
                 logger.warning(f"Reminder detection failed (user={user_hash[:8]}): {e}")
             
             # Step 0.8: PROBLEM REPORTING - Catch issues before they become negative reviews
+            _mark_stage("problem_report")
             # Canary control: can be disabled via ENABLE_PROBLEM_REPORTING=false
             if os.getenv('ENABLE_PROBLEM_REPORTING', 'true').lower() == 'true':
                 try:
@@ -751,6 +729,7 @@ class ProductionRouter:
                     logger.warning(f"Problem reporting failed (user={user_hash[:8]}): {e}")
             
             # Step 1: LEARNING INTENT DETECTION FIRST (before correction)
+            _mark_stage("learning")
             if self._is_learning_intent(text):
                 logger.info(f"[ROUTER] Learning intent detected: '{text[:50]}...'")
                 try:
@@ -762,6 +741,7 @@ class ProductionRouter:
                     logger.warning(f"Learning intent handling failed: {e}")
             
             # Step 1.3: DEDICATED REPORT DETECTION (BEFORE SUMMARY)
+            _mark_stage("report")
             # Handle explicit REPORT commands for Money Story generation
             if self._is_report_command(text):
                 logger.info(f"[ROUTER] REPORT command detected: '{text[:50]}...'")
@@ -795,6 +775,7 @@ class ProductionRouter:
                     return normalize("Your money story is temporarily unavailable. Please try again in a few moments."), "report", None, None
             
             # Step 1.4: SUMMARY/ANALYSIS DETECTION (AFTER REPORT)
+            _mark_stage("summary")
             # Skip summary detection for category-specific queries - let deterministic router handle them  
             if _is_summary_command(text) and not self._is_category_specific_query(text) and not self._is_report_command(text):
                 logger.info(f"[ROUTER] Summary command detected: '{text[:50]}...'")
@@ -808,6 +789,7 @@ class ProductionRouter:
                     # Fall through to other handlers if summary fails
             
             # Step 1.45: INSIGHT/COACHING DETECTION (AFTER SUMMARY)  
+            _mark_stage("insight")
             if _is_insight_command(text):
                 logger.info(f"[ROUTER] Insight/coaching command detected: '{text[:50]}...'")
                 try:
@@ -820,6 +802,7 @@ class ProductionRouter:
                     # Fall through to other handlers if insight fails
             
             # Step 1.5: REPORT FEEDBACK DETECTION (BEFORE DETERMINISTIC ROUTING)
+            _mark_stage("report_feedback")
             # Check for YES/NO responses to Money Story reports
             try:
                 from handlers.feedback import (
@@ -852,6 +835,7 @@ class ProductionRouter:
                 logger.warning(f"Report feedback handler error: {e}, continuing routing")
             
             # Step 1.6: DETERMINISTIC ROUTING (PoR v1.1 - EXPENSE_LOG and CLARIFY_EXPENSE intents)
+            _mark_stage("deterministic_routing")
             try:
                 from utils.routing_policy import deterministic_router
                 
@@ -903,6 +887,7 @@ class ProductionRouter:
                 logger.warning(f"Deterministic routing failed: {e}, falling back to legacy routing")
             
             # Step 2: CORRECTION DETECTION - After learning check
+            _mark_stage("correction")
             if is_correction_message(text):
                 logger.info(f"[ROUTER] Correction detected: user={user_hash[:8]}...")
                 
@@ -950,6 +935,7 @@ class ProductionRouter:
                     # Fall through to regular expense logging as fallback
                     
             # Step 3: DETERMINISTIC EXPENSE ROUTING - Always check for expenses first
+            _mark_stage("expense_routing")
             # Use comprehensive expense extraction for deterministic routing
             try:
                 from parsers.expense import extract_all_expenses
@@ -995,6 +981,7 @@ class ProductionRouter:
                         )
                         
                         response = f"✅ Logged ৳{float(expense_data['amount']):.0f} for {expense_data.get('category', 'expense')}"
+                        emit_partial(response)
                         self._emit_structured_telemetry(rid, user_hash, "LOG", "deterministic_single", {
                             'amount': float(expense_data['amount']),
                             'category': expense_data.get('category')
@@ -1063,6 +1050,7 @@ class ProductionRouter:
                     return response, intent, category, amount
             
             # Step 3: PoR v1.1 Deterministic Routing Layer
+            _mark_stage("routing_policy")
             from utils.routing_policy import deterministic_router
             
             # Extract user signals for deterministic routing
@@ -1099,6 +1087,7 @@ class ProductionRouter:
             from utils.intent_router import is_followup_after_summary_or_log
             
             # Step 3.1: Handle category-specific breakdown queries
+            _mark_stage("category_breakdown")
             if intent == "CATEGORY_BREAKDOWN":
                 try:
                     from handlers.category_breakdown import handle_category_breakdown
@@ -1114,6 +1103,7 @@ class ProductionRouter:
             upgrade_reason = None
             
             # Step 3.1: Check for intent upgrade (SUMMARY/LOG → INSIGHT)
+            _mark_stage("intent_upgrade")
             # This checks if user asks for insights after receiving summary/log response
             previous_intent = self._get_previous_bot_intent(user_hash)  # We'll implement this
             if intent == "INSIGHT" and is_followup_after_summary_or_log(text, previous_intent):
@@ -1124,6 +1114,7 @@ class ProductionRouter:
                 logger.info("[ROUTER] INTENT_UPGRADE: UNKNOWN→INSIGHT reason=ask_keywords")
             
             # Step 3.5: Handle contradiction guard for spending increase requests
+            _mark_stage("contradiction_guard")
             if intent == "CLARIFY_SPENDING_INTENT":
                 response = normalize("🤔 I want to make sure I help you the right way! Are you looking for tips to spend *less* and save more money, or do you actually want to increase your spending? Just want to point my advice in the right direction! 💡")
                 self._emit_structured_telemetry(rid, user_hash, "CLARIFY", "spending_contradiction", {})
@@ -1132,6 +1123,7 @@ class ProductionRouter:
                 return response, "clarify", None, None
             
             # Step 4: Route non-AI intents immediately (bypass rate limits)
+            _mark_stage("non_ai_intents")
             if intent in ["DIAGNOSTIC", "SUMMARY", "INSIGHT", "UNDO", "UNKNOWN", "CATEGORY_BREAKDOWN"]:
                 # Only allow SUMMARY if no money was detected
                 if intent == "SUMMARY" and contains_money(text):
@@ -1194,6 +1186,7 @@ class ProductionRouter:
                 return normal_reply, intent.lower(), None, None
             
             # Step 5: Check for active coaching session first
+            _mark_stage("coaching")
             try:
                 from handlers.coaching import handle_coaching_response
                 coaching_reply = handle_coaching_response(user_hash, text)
@@ -1208,6 +1201,7 @@ class ProductionRouter:
                 # Continue with normal flow
             
             # Step 6: Handle expense logging with new parser
+            _mark_stage("expense_log")
             if intent == "LOG_EXPENSE":
                 from handlers.logger import handle_log
                 result = handle_log(user_hash, text)
@@ -1218,10 +1212,12 @@ class ProductionRouter:
                 return normalize(response), "log", None, None
             
             # Step 6: Evaluate rate limiter for AI paths only
+            _mark_stage("rate_limit")
             rate_limit_result = advanced_ai_limiter.check_rate_limit(user_hash)
 
             if not rate_limit_result.ai_allowed:
                 # Step 5: RL-2 path (rate limited)
+                _mark_stage("rl2")
                 response, intent, category, amount = self._route_rl2(text, original_psid, user_hash, rid, rate_limit_result)
                 self.telemetry['rl2_messages'] += 1
                 self._record_processing_time(time.time() - start_time)
@@ -1230,12 +1226,14 @@ class ProductionRouter:
             # Step 6: Check if AI should be used (for expense messages)
             if AI_ENABLED and self._is_expense_message(text):
                 # Step 7: AI branch with crash protection
+                _mark_stage("ai")
                 response, intent, category, amount = self._route_ai(text, original_psid, user_hash, rid, rate_limit_result)
                 self.telemetry['ai_messages'] += 1
                 self._record_processing_time(time.time() - start_time)
                 return response, intent, category, amount
             
             # Step 8: AI-Enhanced FAQ Detection (NEW)
+            _mark_stage("ai_faq")
             logger.info(f"[ROUTER] Unknown intent detected, checking AI FAQ: '{text[:50]}...'")
             try:
                 from utils.ai_faq_classifier import ai_enhanced_faq_detection
@@ -1253,6 +1251,7 @@ class ProductionRouter:
             # Step 9: Learning intent already checked at Step 1
             
             # Step 10: Check for clarification responses
+            _mark_stage("clarification")
             logger.info(f"[ROUTER] Checking for clarification response: '{text[:50]}...'")
             try:
                 from utils.expense_clarification import expense_clarification_handler
@@ -1290,6 +1289,8 @@ class ProductionRouter:
                 logger.warning(f"Clarification response handling failed: {e}")
             
             # Step 10: Unknown intent - route to AI for natural conversation
+            _mark_stage("ai_conversation")
+            emit_partial("Thinking…", event="status")
             logger.info(f"[ROUTER] No FAQ/clarification match, routing to AI conversation: '{text[:50]}...'")
             try:
                 # Try AI-powered natural conversation (NOT expense parsing)
@@ -1637,6 +1638,7 @@ class ProductionRouter:
             )
             
             reply = f"✅ Logged: ৳{expense['amount']:.0f} for {expense['category'].lower()}"
+            emit_partial(reply)
             mode = "AI"
             
         except Exception:
@@ -2676,6 +2678,9 @@ Do NOT try to parse this as an expense. Just have a natural conversation."""
         if category != 'other':
             response += f" ({category})"
         
+        # Streaming clients see the confirmation before the audit lookup and tip
+        emit_partial(response)
+
         # Check if audit transparency should be shown (with None guards for optional parameters)
         audit_info = None
         if tx_id and psid:
@@ -2851,6 +2856,8 @@ Do NOT try to parse this as an expense. Just have a natural conversation."""
     def _record_processing_time(self, duration: float):
         """Record processing time for telemetry"""
         self.telemetry['processing_times'].append(duration * 1000)  # Convert to ms
+        if perf:
+            perf.registry.record("router", "processing", "ok", duration * 1000)
         # Keep only last 100 measurements
         if len(self.telemetry['processing_times']) > 100:
             self.telemetry['processing_times'].pop(0)
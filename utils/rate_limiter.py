@@ -1,6 +1,10 @@
 """Rate limiting functionality for message processing"""
 import logging
 import os
+import threading
+import time
+import zlib
+from dataclasses import dataclass
 from datetime import date, datetime
 
 from utils.security import hash_user_id as ensure_hashed
@@ -11,94 +15,272 @@ logger = logging.getLogger(__name__)
 DAILY_MESSAGE_LIMIT = int(os.environ.get("DAILY_MESSAGE_LIMIT", "50"))
 HOURLY_MESSAGE_LIMIT = int(os.environ.get("HOURLY_MESSAGE_LIMIT", "10"))
 
-def check_rate_limit(user_identifier, platform):
-    """Check if user has exceeded rate limits"""
+# Counters live in Redis or process memory; rate_limits rows are refreshed
+# at most this often so the ops views keep working
+RATE_LIMIT_FLUSH_SEC = int(os.environ.get("RATE_LIMIT_FLUSH_SEC", "60"))
+RATE_LIMIT_STRIPES = int(os.environ.get("RATE_LIMIT_STRIPES", "64"))
+
+
+@dataclass
+class RateDecision:
+    allowed: bool
+    daily_count: int
+    hourly_count: int
+    reason: str | None = None
+
+
+def _current_windows():
+    """Return (day, hour) window starts for the fixed daily/hourly windows"""
+    return date.today(), datetime.now().replace(minute=0, second=0, microsecond=0)
+
+
+class InProcRateLimitBackend:
+    """Lock-striped in-memory counters, one stripe per hash bucket of user"""
+
+    def __init__(self, stripes: int = RATE_LIMIT_STRIPES):
+        self._stripes = max(1, stripes)
+        self._locks = [threading.Lock() for _ in range(self._stripes)]
+        # {(user_hash, platform): [day, daily_count, hour, hourly_count]}
+        self._buckets = [{} for _ in range(self._stripes)]
+
+    def _stripe(self, key) -> int:
+        return zlib.crc32(f"{key[0]}:{key[1]}".encode()) % self._stripes
+
+    def hit(self, user_hash: str, platform: str, day: date, hour: datetime) -> RateDecision:
+        """Check both windows and count the message if it is allowed"""
+        key = (user_hash, platform)
+        idx = self._stripe(key)
+        with self._locks[idx]:
+            entry = self._buckets[idx].get(key)
+            if entry is None:
+                entry = [day, 0, hour, 0]
+                self._buckets[idx][key] = entry
+            if entry[0] < day:
+                entry[0], entry[1] = day, 0
+            if entry[2] < hour:
+                entry[2], entry[3] = hour, 0
+
+            if entry[1] >= DAILY_MESSAGE_LIMIT:
+                return RateDecision(False, entry[1], entry[3], "daily")
+            if entry[3] >= HOURLY_MESSAGE_LIMIT:
+                return RateDecision(False, entry[1], entry[3], "hourly")
+
+            entry[1] += 1
+            entry[3] += 1
+            return RateDecision(True, entry[1], entry[3])
+
+    def peek(self, user_hash: str, platform: str, day: date, hour: datetime):
+        """Return (daily_count, hourly_count) or None if the user is unknown"""
+        key = (user_hash, platform)
+        idx = self._stripe(key)
+        with self._locks[idx]:
+            entry = self._buckets[idx].get(key)
+            if entry is None:
+                return None
+            daily = entry[1] if entry[0] >= day else 0
+            hourly = entry[3] if entry[2] >= hour else 0
+            return daily, hourly
+
+    def purge(self, day: date) -> None:
+        """Drop users whose daily window has rolled over"""
+        for idx in range(self._stripes):
+            with self._locks[idx]:
+                bucket = self._buckets[idx]
+                for key in [k for k, v in bucket.items() if v[0] < day]:
+                    del bucket[key]
+
+
+# KEYS: daily key, hourly key
+# ARGV: daily limit, hourly limit, daily ttl, hourly ttl
+_HIT_SCRIPT = """
+local d = tonumber(redis.call('GET', KEYS[1]) or '0')
+local h = tonumber(redis.call('GET', KEYS[2]) or '0')
+if d >= tonumber(ARGV[1]) then return {0, d, h, 1} end
+if h >= tonumber(ARGV[2]) then return {0, d, h, 2} end
+d = redis.call('INCR', KEYS[1])
+if d == 1 then redis.call('EXPIRE', KEYS[1], ARGV[3]) end
+h = redis.call('INCR', KEYS[2])
+if h == 1 then redis.call('EXPIRE', KEYS[2], ARGV[4]) end
+return {1, d, h, 0}
+"""
+
+
+class RedisRateLimitBackend:
+    """Redis counters updated atomically by a single Lua script per message"""
+
+    DAILY_TTL = 2 * 86400
+    HOURLY_TTL = 2 * 3600
+
+    def __init__(self, client):
+        self.client = client
+        self._hit = client.register_script(_HIT_SCRIPT)
+
+    @staticmethod
+    def _keys(user_hash: str, platform: str, day: date, hour: datetime):
+        prefix = f"rl:msg:{platform}:{user_hash}"
+        return f"{prefix}:d:{day:%Y%m%d}", f"{prefix}:h:{hour:%Y%m%d%H}"
+
+    def hit(self, user_hash: str, platform: str, day: date, hour: datetime) -> RateDecision:
+        """Check both windows and count the message if it is allowed"""
+        allowed, daily, hourly, code = self._hit(
+            keys=list(self._keys(user_hash, platform, day, hour)),
+            args=[DAILY_MESSAGE_LIMIT, HOURLY_MESSAGE_LIMIT, self.DAILY_TTL, self.HOURLY_TTL],
+        )
+        reason = {1: "daily", 2: "hourly"}.get(int(code))
+        return RateDecision(bool(allowed), int(daily), int(hourly), reason)
+
+    def peek(self, user_hash: str, platform: str, day: date, hour: datetime):
+        """Return (daily_count, hourly_count) or None if the user is unknown"""
+        daily, hourly = self.client.mget(self._keys(user_hash, platform, day, hour))
+        if daily is None and hourly is None:
+            return None
+        return int(daily or 0), int(hourly or 0)
+
+    def purge(self, day: date) -> None:
+        """Redis expires stale windows on its own"""
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+# Latest observed counters awaiting write-back to rate_limits
+_pending = {}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def get_rate_limit_backend():
+    """Get the shared limiter backend - Redis when reachable, in-memory otherwise"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                from utils.ttl_store import RedisTTL, get_store
+
+                store = get_store()
+                if isinstance(store, RedisTTL):
+                    _backend = RedisRateLimitBackend(store.client)
+                else:
+                    _backend = InProcRateLimitBackend()
+                logger.info(f"Message rate limiter using {type(_backend).__name__}")
+    return _backend
+
+
+def set_rate_limit_backend(backend) -> None:
+    """Replace the shared backend (tests and explicit wiring)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+    with _pending_lock:
+        _pending.clear()
+
+
+def _record(user_hash, platform, decision, day, hour):
+    with _pending_lock:
+        _pending[(user_hash, platform)] = (decision.daily_count, decision.hourly_count, day, hour)
+
+
+def _flush_due() -> bool:
+    return time.monotonic() - _last_flush >= RATE_LIMIT_FLUSH_SEC
+
+
+def flush_rate_limits() -> int:
+    """Write pending counters back to the rate_limits table, returns rows written"""
+    global _last_flush
     from db_base import db
     from models import RateLimit
-    
+
+    with _pending_lock:
+        batch = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+
+    if not batch:
+        return 0
+
+    try:
+        hashes = {user_hash for user_hash, _ in batch}
+        rows = {
+            (r.user_id_hash, r.platform): r
+            for r in RateLimit.query.filter(RateLimit.user_id_hash.in_(hashes)).all()
+        }
+        now = datetime.utcnow()
+        for (user_hash, platform), (daily, hourly, day, hour) in batch.items():
+            rate_limit = rows.get((user_hash, platform))
+            if not rate_limit:
+                rate_limit = RateLimit()
+                rate_limit.user_id_hash = user_hash
+                rate_limit.platform = platform
+                db.session.add(rate_limit)
+            rate_limit.daily_count = daily
+            rate_limit.hourly_count = hourly
+            rate_limit.last_daily_reset = day
+            rate_limit.last_hourly_reset = hour
+            rate_limit.updated_at = now
+        db.session.commit()
+        return len(batch)
+
+    except Exception as e:
+        logger.error(f"Error flushing rate limits: {str(e)}")
+        db.session.rollback()
+        # Keep the newest counters for the next attempt
+        with _pending_lock:
+            for key, value in batch.items():
+                _pending.setdefault(key, value)
+        return 0
+
+
+def check_rate_limit(user_identifier, platform):
+    """Check if user has exceeded rate limits"""
     try:
         user_hash = ensure_hashed(user_identifier)
-        current_date = date.today()
-        current_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
-        
-        # Get or create rate limit record
-        rate_limit = RateLimit.query.filter_by(
-            user_id_hash=user_hash,
-            platform=platform
-        ).first()
-        
-        if not rate_limit:
-            rate_limit = RateLimit()
-            rate_limit.user_id_hash = user_hash
-            rate_limit.platform = platform
-            rate_limit.daily_count = 0
-            rate_limit.hourly_count = 0
-            rate_limit.last_daily_reset = current_date
-            rate_limit.last_hourly_reset = current_hour
-            db.session.add(rate_limit)
-        
-        # Reset daily counter if needed
-        if rate_limit.last_daily_reset < current_date:
-            rate_limit.daily_count = 0
-            rate_limit.last_daily_reset = current_date
-        
-        # Reset hourly counter if needed
-        if rate_limit.last_hourly_reset < current_hour:
-            rate_limit.hourly_count = 0
-            rate_limit.last_hourly_reset = current_hour
-        
-        # Check limits
-        if rate_limit.daily_count >= DAILY_MESSAGE_LIMIT:
+        current_date, current_hour = _current_windows()
+
+        backend = get_rate_limit_backend()
+        decision = backend.hit(user_hash, platform, current_date, current_hour)
+        _record(user_hash, platform, decision, current_date, current_hour)
+
+        if _flush_due():
+            backend.purge(current_date)
+            flush_rate_limits()
+
+        if decision.reason == "daily":
             logger.warning(f"Daily rate limit exceeded for user {user_hash}")
-            return False
-        
-        if rate_limit.hourly_count >= HOURLY_MESSAGE_LIMIT:
+        elif decision.reason == "hourly":
             logger.warning(f"Hourly rate limit exceeded for user {user_hash}")
-            return False
-        
-        # Increment counters
-        rate_limit.daily_count += 1
-        rate_limit.hourly_count += 1
-        rate_limit.updated_at = datetime.utcnow()
-        
-        db.session.commit()
-        return True
-        
+        return decision.allowed
+
     except Exception as e:
         logger.error(f"Error checking rate limit: {str(e)}")
-        db.session.rollback()
         # Allow message in case of error
         return True
 
 def get_rate_limit_status(user_identifier, platform):
     """Get current rate limit status for user"""
-    from models import RateLimit
-    
     try:
         user_hash = ensure_hashed(user_identifier)
-        
-        rate_limit = RateLimit.query.filter_by(
-            user_id_hash=user_hash,
-            platform=platform
-        ).first()
-        
-        if not rate_limit:
+        current_date, current_hour = _current_windows()
+
+        counts = get_rate_limit_backend().peek(user_hash, platform, current_date, current_hour)
+
+        if counts is None:
             return {
                 'daily_remaining': DAILY_MESSAGE_LIMIT,
                 'hourly_remaining': HOURLY_MESSAGE_LIMIT,
                 'daily_limit': DAILY_MESSAGE_LIMIT,
                 'hourly_limit': HOURLY_MESSAGE_LIMIT
             }
-        
+
+        daily_count, hourly_count = counts
         return {
-            'daily_remaining': max(0, DAILY_MESSAGE_LIMIT - rate_limit.daily_count),
-            'hourly_remaining': max(0, HOURLY_MESSAGE_LIMIT - rate_limit.hourly_count),
+            'daily_remaining': max(0, DAILY_MESSAGE_LIMIT - daily_count),
+            'hourly_remaining': max(0, HOURLY_MESSAGE_LIMIT - hourly_count),
             'daily_limit': DAILY_MESSAGE_LIMIT,
             'hourly_limit': HOURLY_MESSAGE_LIMIT,
-            'daily_used': rate_limit.daily_count,
-            'hourly_used': rate_limit.hourly_count
+            'daily_used': daily_count,
+            'hourly_used': hourly_count
         }
-        
+
     except Exception as e:
         logger.error(f"Error getting rate limit status: {str(e)}")
         return {
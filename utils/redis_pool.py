@@ -0,0 +1,235 @@
+"""
+Shared Redis connection pool
+One bounded pool per process (per response decoding) behind every Redis user,
+one place for REDIS_URL clean-up, per-command latency in the stage histograms,
+and helpers that turn multi-key work into single round-trips. When Redis is
+unreachable get_client() returns None for a cool-down period so callers fall
+back to their in-memory stand-ins instead of paying a connect timeout each call.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from finbrain.ops import perf
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+REDIS_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_POOL_MAX_CONNECTIONS", "32"))  # Per worker, per pool
+REDIS_POOL_TIMEOUT_SEC = float(os.getenv("REDIS_POOL_TIMEOUT_SEC", "2"))  # Wait for a free connection
+# Must stay above the longest blocking command (job queue BLMOVE blocks for 1s)
+REDIS_SOCKET_TIMEOUT_SEC = float(os.getenv("REDIS_SOCKET_TIMEOUT_SEC", "5"))
+REDIS_CONNECT_TIMEOUT_SEC = float(os.getenv("REDIS_CONNECT_TIMEOUT_SEC", "2"))
+REDIS_HEALTH_CHECK_INTERVAL_SEC = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL_SEC", "30"))
+REDIS_RETRY_AFTER_SEC = float(os.getenv("REDIS_RETRY_AFTER_SEC", "30"))  # Cool-down after a failed connect
+
+# INCR and set the TTL only on first creation, in one round-trip
+_INCR_WITH_TTL_LUA = """
+local value = redis.call('INCR', KEYS[1])
+if tonumber(ARGV[1]) > 0 and redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return value
+"""
+
+
+def normalize_redis_url(url: str | None) -> str | None:
+    """Clean up REDIS_URL values as deployment platforms hand them over"""
+    if not url:
+        return None
+    url = url.strip()
+    # Some environments include the variable name or quotes in the value
+    if url.startswith('REDIS_URL='):
+        url = url.split('=', 1)[1]
+    if len(url) >= 2 and url[0] == url[-1] and url[0] in '"\'':
+        url = url[1:-1]
+    if url == "rediss:6379":
+        return "redis://localhost:6379"
+    if url.startswith("rediss:") and "://" not in url:
+        return url.replace("rediss:", "redis://localhost:", 1)
+    if not url.startswith(('redis://', 'rediss://', 'unix://')):
+        return f"redis://{url}"
+    return url
+
+
+def _record(command: str, started: float, outcome: str) -> None:
+    perf.registry.record("redis", command, outcome, (time.perf_counter() - started) * 1000)
+
+
+if redis is not None:
+    class _TimedPipeline(redis.client.Pipeline):
+        """Pipeline whose execute() is one timed round-trip"""
+
+        def execute(self, raise_on_error: bool = True):
+            started = time.perf_counter()
+            try:
+                result = super().execute(raise_on_error)
+            except Exception:
+                _record("pipeline", started, "error")
+                raise
+            _record("pipeline", started, "ok")
+            return result
+
+    class TimedRedis(redis.Redis):
+        """Redis client on the shared pool that records each command's latency"""
+
+        def execute_command(self, *args, **options):
+            started = time.perf_counter()
+            try:
+                result = super().execute_command(*args, **options)
+            except Exception:
+                _record(str(args[0]).lower(), started, "error")
+                raise
+            _record(str(args[0]).lower(), started, "ok")
+            return result
+
+        def pipeline(self, transaction=True, shard_hint=None):
+            return _TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+_pools: dict[bool, Any] = {}
+_clients: dict[bool, Any] = {}
+_lock = threading.Lock()
+_down_until = 0.0
+_stats = {
+    'connects': 0,
+    'connect_failures': 0,
+    'failovers': 0,
+}
+
+
+def _build_pool(url: str, decode_responses: bool):
+    return redis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=REDIS_POOL_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT_SEC,
+        socket_timeout=REDIS_SOCKET_TIMEOUT_SEC,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT_SEC,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL_SEC,
+        retry_on_timeout=True,
+        decode_responses=decode_responses,
+    )
+
+
+def get_client(decode_responses: bool = False):
+    """
+    Client on the shared pool, or None when Redis is not configured or not reachable
+
+    Cheap to call per request: the pool and client are built once, and after a
+    failed connect the answer stays None until REDIS_RETRY_AFTER_SEC has passed.
+    """
+    global _down_until
+    client = _clients.get(decode_responses)
+    if client is not None:
+        return client
+    if redis is None:
+        return None
+    url = normalize_redis_url(os.getenv("REDIS_URL"))
+    if not url or time.time() < _down_until:
+        return None
+
+    with _lock:
+        client = _clients.get(decode_responses)
+        if client is not None:
+            return client
+        try:
+            pool = _pools.get(decode_responses) or _build_pool(url, decode_responses)
+            client = TimedRedis(connection_pool=pool)
+            client.ping()
+        except Exception as e:
+            _stats['connect_failures'] += 1
+            _down_until = time.time() + REDIS_RETRY_AFTER_SEC
+            logger.warning(f"Redis unavailable at {url.split('@')[-1]} ({e}), retrying in {REDIS_RETRY_AFTER_SEC:.0f}s")
+            return None
+        _pools[decode_responses] = pool
+        _clients[decode_responses] = client
+        _stats['connects'] += 1
+        logger.info(f"Redis pool ready at {url.split('@')[-1]} (max {REDIS_POOL_MAX_CONNECTIONS} connections)")
+        return client
+
+
+def report_failure(error: Exception) -> None:
+    """Callers hit a connection error: hand out None until the cool-down passes"""
+    global _down_until
+    if redis is not None and not isinstance(error, (redis.ConnectionError, redis.TimeoutError)):
+        return
+    with _lock:
+        _clients.clear()  # Pools are kept, so recovery doesn't reconnect from scratch
+        _down_until = time.time() + REDIS_RETRY_AFTER_SEC
+        _stats['failovers'] += 1
+    logger.warning(f"Redis failed ({error}), using in-memory fallbacks for {REDIS_RETRY_AFTER_SEC:.0f}s")
+
+
+def ping() -> bool:
+    """Health check over the shared pool"""
+    client = get_client()
+    if client is None:
+        return False
+    try:
+        return bool(client.ping())
+    except Exception as e:
+        report_failure(e)
+        return False
+
+
+def incr_with_ttl(client, key: str, ttl_seconds: int | None = None) -> int:
+    """INCR that sets ttl_seconds when the key is new, in one round-trip"""
+    if not ttl_seconds:
+        return int(client.incr(key))
+    return int(client.eval(_INCR_WITH_TTL_LUA, 1, key, int(ttl_seconds)))
+
+
+def get_many(client, keys: Iterable[str]) -> dict[str, Any]:
+    """Values for several keys in one MGET; missing keys are left out"""
+    keys = list(keys)
+    if not keys:
+        return {}
+    return {key: value for key, value in zip(keys, client.mget(keys)) if value is not None}
+
+
+def set_many(client, mapping: dict[str, Any], ttl_seconds: int | None = None) -> None:
+    """Write several keys (each with the same TTL) in one pipelined round-trip"""
+    if not mapping:
+        return
+    pipe = client.pipeline(transaction=False)
+    for key, value in mapping.items():
+        pipe.set(key, value, ex=int(ttl_seconds) if ttl_seconds else None)
+    pipe.execute()
+
+
+def delete_many(client, keys: Iterable[str]) -> int:
+    """Delete several keys in one DEL"""
+    keys = list(keys)
+    return int(client.delete(*keys)) if keys else 0
+
+
+def get_stats() -> dict[str, Any]:
+    return dict(
+        _stats,
+        available=bool(_clients),
+        down_for_sec=max(0.0, round(_down_until - time.time(), 1)),
+        pools=len(_pools),
+        max_connections=REDIS_POOL_MAX_CONNECTIONS,
+    )
+
+
+def reset() -> None:
+    """Drop pools and clients (after fork in tests, or to pick up a new REDIS_URL)"""
+    global _down_until
+    with _lock:
+        for pool in _pools.values():
+            try:
+                pool.disconnect()
+            except Exception:
+                pass
+        _pools.clear()
+        _clients.clear()
+        _down_until = 0.0
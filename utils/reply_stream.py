@@ -0,0 +1,125 @@
+"""
+Streaming chat replies over Server-Sent Events
+The chat pipeline runs on a worker thread while the request thread relays what
+it produces: the deterministic acknowledgement ("Logged ৳120 for food") as soon
+as the expense is written, keep-alive comments while AI work is in flight, then
+a final `done` event carrying the same JSON body the non-streaming path returns.
+Clients that don't ask for text/event-stream keep getting plain JSON.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+from collections.abc import Callable, Iterator
+from typing import Any, Optional
+
+from flask import Response, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+SSE_HEARTBEAT_SEC = float(os.getenv("SSE_HEARTBEAT_SEC", "5"))  # Keeps proxies from idling the stream out
+
+_CLOSED = object()
+
+
+class ReplyStream:
+    """Events one request's pipeline has produced so far, in order"""
+
+    def __init__(self):
+        self._events: queue.Queue = queue.Queue()
+
+    def emit(self, event: str, data: dict[str, Any]) -> None:
+        self._events.put((event, data))
+
+    def close(self) -> None:
+        self._events.put(_CLOSED)
+
+    def next(self, timeout: float):
+        """Next (event, data) pair, _CLOSED once the pipeline is done, or None on timeout"""
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+_current_stream: contextvars.ContextVar[Optional[ReplyStream]] = contextvars.ContextVar(
+    "finbrain_reply_stream", default=None
+)
+
+
+def emit_partial(text: str, event: str = "ack") -> None:
+    """Send an early piece of the reply to a streaming client (no-op for JSON requests)"""
+    stream = _current_stream.get()
+    if stream is not None and text:
+        stream.emit(event, {"text": text})
+
+
+def wants_stream(req) -> bool:
+    """Client asked for SSE via the Accept header or ?stream=1"""
+    if req.args.get("stream") == "1":
+        return True
+    return "text/event-stream" in (req.headers.get("Accept") or "")
+
+
+def format_sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _as_payload(result) -> tuple[dict[str, Any], int]:
+    """Normalize a view's return value ((body, status), Response or dict) to (dict, status)"""
+    status = 200
+    if isinstance(result, tuple):
+        result, status = result[0], result[1]
+    if isinstance(result, Response):
+        status = result.status_code if status == 200 else status
+        result = result.get_json(silent=True) or {}
+    return dict(result), int(status)
+
+
+def stream_events(produce: Callable[[], Any]) -> Iterator[str]:
+    """
+    Run produce() on a worker thread and yield its events as SSE frames
+
+    The worker runs in a copy of the caller's context, so the Flask request and
+    app contexts, g, the request id and the stage trace all carry over. The
+    caller is kept waiting until the worker finishes, even if the client goes
+    away, so request teardown never runs under a pipeline still using them.
+    """
+    stream = ReplyStream()
+    context = contextvars.copy_context()
+
+    def run():
+        _current_stream.set(stream)
+        try:
+            body, status = _as_payload(produce())
+            stream.emit("done", dict(body, status=status))
+        except Exception as e:
+            logger.exception("Streaming reply failed")
+            stream.emit("error", {"error": type(e).__name__, "status": 500})
+        finally:
+            stream.close()
+
+    worker = threading.Thread(target=context.run, args=(run,), name="reply-stream", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = stream.next(SSE_HEARTBEAT_SEC)
+            if item is _CLOSED:
+                return
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(*item)
+    finally:
+        worker.join()
+
+
+def sse_response(produce: Callable[[], Any]) -> Response:
+    """text/event-stream response relaying produce()'s reply as it is built"""
+    response = Response(stream_with_context(stream_events(produce)), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx would otherwise hold the acknowledgement back
+    return response
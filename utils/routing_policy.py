@@ -12,6 +12,8 @@ from datetime import datetime
 from enum import Enum
 from typing import List
 
+from nlp.analyzed_message import analyze
+
 logger = logging.getLogger("finbrain.routing_policy")
 
 class RouterMode(Enum):
@@ -181,32 +183,32 @@ class BilingualPatterns:
     
     def has_time_window(self, text: str) -> bool:
         """Check if text contains time window references"""
-        normalized = self.normalize_text(text)
+        normalized = analyze(text).routing_text
         return bool(self.time_window_en.search(normalized) or self.time_window_bn.search(normalized))
     
     def has_explicit_analysis_request(self, text: str) -> bool:
         """Check if text contains explicit analysis request"""
-        normalized = self.normalize_text(text)
+        normalized = analyze(text).routing_text
         return bool(self.explicit_analysis_en.search(normalized) or self.explicit_analysis_bn.search(normalized))
     
     def has_first_person_spent_verb(self, text: str) -> bool:
         """Check if text contains first-person past-tense expense verbs"""
-        normalized = self.normalize_text(text)
+        normalized = analyze(text).routing_text
         return bool(self.expense_verbs_en.search(normalized) or self.expense_verbs_bn.search(normalized))
     
     def has_analysis_terms(self, text: str) -> bool:
         """Check if text contains general analysis terms"""
-        normalized = self.normalize_text(text)
+        normalized = analyze(text).routing_text
         return bool(self.analysis_terms_en.search(normalized) or self.analysis_terms_bn.search(normalized))
     
     def has_coaching_verbs(self, text: str) -> bool:
         """Check if text contains coaching verbs"""
-        normalized = self.normalize_text(text)
+        normalized = analyze(text).routing_text
         return bool(self.coaching_verbs_en.search(normalized) or self.coaching_verbs_bn.search(normalized))
     
     def has_faq_terms(self, text: str) -> bool:
         """Check if text contains FAQ terms"""
-        normalized = self.normalize_text(text)
+        normalized = analyze(text).routing_text
         return bool(self.faq_terms_en.search(normalized) or self.faq_terms_bn.search(normalized))
     
     def is_admin_command(self, text: str) -> bool:
@@ -219,92 +221,29 @@ class DataVersionManager:
     @staticmethod
     def compute_data_version(user_id: str, window_start: datetime, window_end: datetime) -> str:
         """
-        Compute strong data version fingerprint
+        Get the user's data version for a window
+        
+        Reads the write-maintained counter from utils.data_versions: the month's
+        counter when the window sits inside one month, the all-time counter
+        otherwise. Any expense write in that scope changes the result.
         
         Args:
-            user_id: User identifier
+            user_id: User identifier (user_id_hash)
             window_start: Start of time window
             window_end: End of time window
             
         Returns:
-            SHA-256 hex digest of user's expense data in window
-        """
-        try:
-            # Strong fingerprint: ID + amount + category + merchant + timestamp
-            from sqlalchemy import text
-
-            from db_base import db
-            result = db.session.execute(
-                text("""
-                SELECT encode(
-                  digest(
-                    string_agg(
-                      concat_ws(
-                        ':', id, amount, currency, category, 
-                        extract(epoch from updated_at)::bigint
-                      ) ORDER BY updated_at, id
-                    ),
-                    'sha256'
-                  ),
-                  'hex'
-                ) AS data_version
-                FROM expenses
-                WHERE user_id = :uid
-                  AND created_at >= :from_time
-                  AND created_at < :to_time
-                """),
-                {
-                    'uid': user_id,
-                    'from_time': window_start,
-                    'to_time': window_end
-                }
-            ).fetchone()
-            
-            return result[0] if result and result[0] else "empty"
-            
-        except Exception as e:
-            logger.warning(f"Strong fingerprint failed, using lightweight fallback: {e}")
-            return DataVersionManager.compute_lightweight_version(user_id, window_start, window_end)
-    
-    @staticmethod 
-    def compute_lightweight_version(user_id: str, window_start: datetime, window_end: datetime) -> str:
-        """
-        Compute lightweight data version fallback
-        Uses COUNT + SUM + MAX(updated_at) to catch changes efficiently
+            "<period>:v<n>", or "empty" if the user has never written in that scope
         """
         try:
-            from sqlalchemy import text
-
-            from db_base import db
-            result = db.session.execute(
-                text("""
-                SELECT encode(
-                  digest(
-                    concat_ws(':',
-                      count(*),
-                      coalesce(sum(amount),0),
-                      extract(epoch from coalesce(max(updated_at), 'epoch'::timestamptz))::bigint
-                    ),
-                    'sha256'
-                  ),
-                  'hex'
-                ) AS data_version
-                FROM expenses
-                WHERE user_id = :uid
-                  AND created_at >= :from_time
-                  AND created_at < :to_time
-                """),
-                {
-                    'uid': user_id,
-                    'from_time': window_start,
-                    'to_time': window_end
-                }
-            ).fetchone()
+            from utils.data_versions import get_data_version, window_period
             
-            return result[0] if result and result[0] else "empty"
+            period = window_period(window_start, window_end)
+            version = get_data_version(user_id, period)
+            return f"{period}:v{version}" if version else "empty"
             
         except Exception as e:
-            logger.error(f"Lightweight data version computation failed: {e}")
+            logger.error(f"Data version lookup failed: {e}")
             return f"fallback_{int(time.time())}"
 
 class DeterministicRouter:
@@ -477,7 +416,7 @@ class DeterministicRouter:
         smalltalk_patterns_en = r'\b(hello|hi|hey|thanks|thank you|bye|goodbye|good morning|good night|how are you)\b'
         smalltalk_patterns_bn = r'\b(হ্যালো|হাই|ধন্যবাদ|শুভ সকাল|শুভ রাত্রি|কেমন আছেন)\b'
         
-        normalized_text = self.patterns.normalize_text(text)
+        normalized_text = analyze(text).routing_text
         if (re.search(smalltalk_patterns_en, normalized_text, re.IGNORECASE | re.UNICODE) or
             re.search(smalltalk_patterns_bn, normalized_text, re.IGNORECASE | re.UNICODE)):
             reason_codes.append("SMALLTALK_DETECTED")
@@ -491,15 +430,9 @@ class DeterministicRouter:
     def _has_money_pattern(self, text: str) -> bool:
         """Check if text contains money patterns using existing Bengali-aware utilities"""
         try:
-            # Use existing Bengali digit normalization and money detection
-            from nlp.money_patterns import has_money_mention
-            from utils.bn_digits import to_en_digits
-            
-            # Normalize Bengali digits to ASCII first
-            normalized_text = to_en_digits(text)
-            
-            # Use proven money pattern detection
-            return has_money_mention(normalized_text)
+            # Proven money pattern detection over the request's normalized text
+            # (Bengali digits already converted to ASCII)
+            return analyze(text).has_money_mention
             
         except ImportError:
             # Fallback to basic detection if imports fail
@@ -510,7 +443,7 @@ class DeterministicRouter:
     
     def _is_category_breakdown_query(self, text: str) -> bool:
         """Check if text is asking for category-specific breakdown"""
-        text_lower = self.patterns.normalize_text(text)
+        text_lower = analyze(text).routing_text
         
         # Category keywords
         category_keywords = [
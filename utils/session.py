@@ -5,11 +5,12 @@ Supports Redis (preferred) with in-memory fallback and TTL cleanup
 
 import json
 import logging
-import os
 import time
 from datetime import datetime
 from typing import Any, Dict, Optional
 
+from utils import redis_pool
+
 logger = logging.getLogger(__name__)
 
 class SessionManager:
@@ -23,19 +24,12 @@ class SessionManager:
         self.memory_store = {}
         self.last_cleanup = time.time()
         
-        # Try Redis connection
-        try:
-            import redis
-            redis_url = os.getenv('REDIS_URL')
-            if redis_url:
-                self.redis_client = redis.from_url(redis_url, decode_responses=True)
-                self.redis_client.ping()
-                logger.info("Session manager initialized with Redis backend")
-            else:
-                logger.info("No REDIS_URL found, using in-memory session store")
-        except Exception as e:
-            logger.warning(f"Redis connection failed, using in-memory store: {e}")
-            self.redis_client = None
+        # Redis from the shared pool, if configured and reachable
+        self.redis_client = redis_pool.get_client(decode_responses=True)
+        if self.redis_client is not None:
+            logger.info("Session manager initialized with Redis backend")
+        else:
+            logger.info("Redis unavailable, using in-memory session store")
     
     def _cleanup_memory_store(self):
         """Remove expired sessions from memory store"""
@@ -107,9 +101,10 @@ class SessionManager:
         
         try:
             if self.redis_client:
-                count = self.redis_client.incr(key)
-                self.redis_client.expire(key, 86400)  # 24 hours
-                return count
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.incr(key)
+                pipe.expire(key, 86400)  # 24 hours
+                return pipe.execute()[0]
             else:
                 current_count = self.memory_store.get(key, {'count': 0, 'expires_at': time.time() + 86400})
                 current_count['count'] += 1
@@ -4,81 +4,218 @@ Handles reminder scheduling, checking, and sending within Facebook's 24-hour pol
 """
 
 import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Any, Dict
+
+from sqlalchemy import update
 
 from db_base import db
 from models import User
 
 logger = logging.getLogger(__name__)
 
-def check_and_send_reminders() -> dict[str, int]:
+# Dispatcher tuning
+REMINDER_BATCH_SIZE = int(os.environ.get("REMINDER_BATCH_SIZE", "500"))
+REMINDER_MAX_WORKERS = int(os.environ.get("REMINDER_MAX_WORKERS", "16"))
+REMINDER_SEND_TIMEOUT_SEC = float(os.environ.get("REMINDER_SEND_TIMEOUT_SEC", "10"))
+
+
+class ReminderDispatcher:
     """
-    Check for users with scheduled reminders and send them if within the safe window.
-    
-    Returns:
-        Dict with reminder statistics
+    Pages through due reminders by user id and sends each page through a
+    bounded worker pool, committing reminder state once per page
     """
-    stats = {
-        'checked': 0,
-        'sent': 0,
-        'skipped_window': 0,
-        'skipped_too_early': 0,
-        'errors': 0
-    }
     
-    try:
-        now = datetime.utcnow()
+    def __init__(self, send_fn: Callable | None = None, batch_size: int = REMINDER_BATCH_SIZE,
+                 max_workers: int = REMINDER_MAX_WORKERS, send_timeout: float = REMINDER_SEND_TIMEOUT_SEC):
+        self.send_fn = send_fn or _send_reminder_message
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.send_timeout = send_timeout
+    
+    def dispatch(self, now: datetime | None = None) -> dict[str, Any]:
+        """Send every due reminder, returns reminder statistics and send metrics"""
+        now = now or datetime.utcnow()
+        stats = {
+            'checked': 0,
+            'sent': 0,
+            'skipped_window': 0,
+            'skipped_too_early': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'batches': 0
+        }
+        latencies = []
+        started = time.monotonic()
+        
+        # Not a context manager: a hung send must not hold up the dispatcher on exit
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="reminder")
+        try:
+            last_id = 0
+            while True:
+                batch = self._next_batch(last_id, now)
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                stats['batches'] += 1
+                stats['checked'] += len(batch)
+                
+                try:
+                    self._process_batch(pool, batch, now, stats, latencies)
+                except Exception as e:
+                    logger.error(f"Error in reminder batch ending at user id {last_id}: {e}")
+                    db.session.rollback()
+                    stats['errors'] += 1
+                
+                if len(batch) < self.batch_size:
+                    break
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
         
-        # Find users with scheduled reminders that are due
-        users_with_reminders = db.session.query(User).filter(
+        elapsed = time.monotonic() - started
+        stats.update(_latency_metrics(latencies, elapsed))
+        
+        if stats['sent'] > 0 or stats['errors'] > 0:
+            logger.info(f"Reminder check complete: {stats}")
+        return stats
+    
+    def _next_batch(self, last_id: int, now: datetime) -> list:
+        """Keyset page of due reminders, only the columns the send path needs"""
+        return db.session.query(
+            User.id,
+            User.user_id_hash,
+            User.first_name,
+            User.last_user_message_at,
+            User.last_reminder_sent
+        ).filter(
+            User.id > last_id,
             User.reminder_scheduled_for.isnot(None),
             User.reminder_scheduled_for <= now,
             User.reminder_preference != 'none'
-        ).all()
+        ).order_by(User.id).limit(self.batch_size).all()
+    
+    def _process_batch(self, pool: ThreadPoolExecutor, batch: list, now: datetime,
+                       stats: dict[str, Any], latencies: list[float]) -> None:
+        sent_ids, cleared_ids = [], []
+        futures = {}
+        
+        for user in batch:
+            if _should_send_reminder(user, now):
+                futures[pool.submit(_timed_send, self.send_fn, user, now)] = user
+            else:
+                stats['skipped_window'] += 1
+                # Clear expired reminder to avoid repeated checking
+                cleared_ids.append(user.id)
         
-        stats['checked'] = len(users_with_reminders)
+        # Queued sends wait for a free worker, so the page gets one timeout per wave
+        waves = -(-len(futures) // self.max_workers) if futures else 0
+        done, not_done = wait(futures, timeout=self.send_timeout * waves)
         
-        for user in users_with_reminders:
+        for future in done:
+            user = futures[future]
             try:
-                if _should_send_reminder(user, now):
-                    success = _send_reminder_message(user, now)
-                    if success:
-                        stats['sent'] += 1
-                        # Clear the scheduled reminder
-                        user.reminder_scheduled_for = None
-                        user.last_reminder_sent = now
-                    else:
-                        stats['errors'] += 1
-                else:
-                    stats['skipped_window'] += 1
-                    # Clear expired reminder to avoid repeated checking
-                    user.reminder_scheduled_for = None
-                    
+                success, latency = future.result()
+                latencies.append(latency)
             except Exception as e:
                 logger.error(f"Error processing reminder for user {user.user_id_hash[:8]}...: {e}")
+                success = False
+            if success:
+                stats['sent'] += 1
+                sent_ids.append(user.id)
+            else:
                 stats['errors'] += 1
         
-        # Commit all updates
-        db.session.commit()
-        
-        if stats['sent'] > 0 or stats['errors'] > 0:
-            logger.info(f"Reminder check complete: {stats}")
-        
-        return stats
+        for future in not_done:
+            future.cancel()
+            user = futures[future]
+            stats['timeouts'] += 1
+            # A slow send may still land; clearing avoids sending it twice
+            cleared_ids.append(user.id)
+            logger.warning(f"Reminder send timed out for user {user.user_id_hash[:8]}...")
         
+        if sent_ids:
+            db.session.execute(
+                update(User).where(User.id.in_(sent_ids))
+                .values(reminder_scheduled_for=None, last_reminder_sent=now)
+            )
+        if cleared_ids:
+            db.session.execute(
+                update(User).where(User.id.in_(cleared_ids))
+                .values(reminder_scheduled_for=None)
+            )
+        db.session.commit()
+
+
+def _timed_send(send_fn: Callable, user, now: datetime) -> tuple[bool, float]:
+    start = time.monotonic()
+    success = bool(send_fn(user, now))
+    return success, (time.monotonic() - start) * 1000
+
+
+def _latency_metrics(latencies: list[float], elapsed: float) -> dict[str, float]:
+    ordered = sorted(latencies)
+    
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2) if ordered else 0.0
+    
+    return {
+        'duration_ms': round(elapsed * 1000, 2),
+        'sends_per_sec': round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0,
+        'send_p50_ms': pct(0.50),
+        'send_p95_ms': pct(0.95),
+        'send_max_ms': round(ordered[-1], 2) if ordered else 0.0
+    }
+
+
+def check_and_send_reminders() -> dict[str, Any]:
+    """
+    Check for users with scheduled reminders and send them if within the safe window.
+    
+    Returns:
+        Dict with reminder statistics
+    """
+    try:
+        return ReminderDispatcher().dispatch()
     except Exception as e:
         logger.error(f"Error in reminder check: {e}")
         db.session.rollback()
-        stats['errors'] += 1
-        return stats
+        return {'checked': 0, 'sent': 0, 'skipped_window': 0, 'skipped_too_early': 0, 'errors': 1}
+
+
+_dispatch_lock = threading.Lock()
+
+
+def dispatch_reminders_async() -> bool:
+    """
+    Run check_and_send_reminders on a background thread so a scheduler tick
+    returns immediately. Returns False if the previous run is still going.
+    """
+    if not _dispatch_lock.acquire(blocking=False):
+        logger.info("Reminder dispatch still running, skipping this tick")
+        return False
+    
+    def run():
+        try:
+            from app import app
+            with app.app_context():
+                check_and_send_reminders()
+        finally:
+            _dispatch_lock.release()
+    
+    threading.Thread(target=run, name="reminder-dispatch", daemon=True).start()
+    return True
 
 def _should_send_reminder(user: User, now: datetime) -> bool:
     """
     Check if we should send a reminder to this user based on 24-hour policy.
     
     Args:
-        user: User object
+        user: User object or due-reminder row
         now: Current timestamp
         
     Returns:
@@ -109,7 +246,7 @@ def _send_reminder_message(user: User, now: datetime) -> bool:
     Send a reminder message to the user.
     
     Args:
-        user: User object
+        user: User object or due-reminder row
         now: Current timestamp
         
     Returns:
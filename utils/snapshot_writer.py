@@ -0,0 +1,124 @@
+"""
+Write-behind batch writer for PCA inference snapshots
+Snapshots are buffered in memory and inserted by a background thread in
+multi-row batches, so logging a snapshot never costs the message path a commit
+"""
+
+import logging
+import os
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from utils.write_behind import WriteBehindBuffer
+
+logger = logging.getLogger("finbrain.snapshot_writer")
+
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "200"))  # rows per INSERT
+SNAPSHOT_FLUSH_INTERVAL_SEC = float(os.getenv("SNAPSHOT_FLUSH_INTERVAL_SEC", "2.0"))
+SNAPSHOT_BUFFER_MAX = int(os.getenv("SNAPSHOT_BUFFER_MAX", "10000"))  # rows held before dropping
+SNAPSHOT_DRAIN_TIMEOUT_SEC = float(os.getenv("SNAPSHOT_DRAIN_TIMEOUT_SEC", "10.0"))
+
+
+def snapshot_insert(table, rows: list[dict[str, Any]], dialect_name: str):
+    """Multi-row INSERT that skips rows whose cc_id already exists"""
+    if dialect_name == "sqlite":  # Local development databases
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(table).values(rows).on_conflict_do_nothing(index_elements=["cc_id"])
+
+
+def insert_snapshots(rows: list[dict[str, Any]]) -> int:
+    """Write one batch in a single transaction; returns rows actually inserted"""
+    from app import app
+    from db_base import db
+    from models_pca import InferenceSnapshot
+
+    with app.app_context():
+        try:
+            statement = snapshot_insert(InferenceSnapshot.__table__, rows, db.engine.dialect.name)
+            result = db.session.execute(statement)
+            db.session.commit()
+            return result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(rows)
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+class SnapshotBatchWriter(WriteBehindBuffer):
+    """
+    Bounded buffer flushed by size or time on a background thread
+
+    submit() only appends under a lock. A batch is written when batch_size rows
+    are waiting or flush_interval seconds have passed; when the buffer is full,
+    new snapshots are dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(self, flush_fn: Callable[[list[dict[str, Any]]], int] = insert_snapshots,
+                 batch_size: int = SNAPSHOT_BATCH_SIZE, flush_interval: float = SNAPSHOT_FLUSH_INTERVAL_SEC,
+                 max_buffer: int = SNAPSHOT_BUFFER_MAX):
+        super().__init__("snapshot-writer", flush_interval, SNAPSHOT_DRAIN_TIMEOUT_SEC)
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+
+        self._buffer: deque = deque()
+
+        self.stats = {
+            'submitted': 0,
+            'inserted': 0,
+            'duplicates': 0,
+            'dropped_overflow': 0,
+            'failed': 0,
+            'batches': 0,
+        }
+
+    def submit(self, row: dict[str, Any]) -> bool:
+        """Queue one snapshot row; False if the buffer is full or the writer is closed"""
+        self._ensure_thread()
+        with self._lock:
+            if self._stopping or len(self._buffer) >= self.max_buffer:
+                self.stats['dropped_overflow'] += 1
+                return False
+            self._buffer.append(row)
+            self.stats['submitted'] += 1
+            pending = len(self._buffer)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """Write everything buffered right now; returns rows inserted"""
+        inserted = 0
+        while True:
+            with self._lock:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return inserted
+            inserted += self._write(batch)
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, buffered=len(self._buffer), max_buffer=self.max_buffer,
+                        batch_size=self.batch_size, flush_interval_sec=self.flush_interval)
+
+    def _write(self, batch: list[dict[str, Any]]) -> int:
+        with self._flush_lock:
+            try:
+                inserted = self.flush_fn(batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} CC snapshots: {e}")
+                with self._lock:
+                    self.stats['failed'] += len(batch)
+                return 0
+        with self._lock:
+            self.stats['batches'] += 1
+            self.stats['inserted'] += inserted
+            self.stats['duplicates'] += len(batch) - inserted
+        logger.debug(f"CC snapshots flushed: {inserted}/{len(batch)} inserted")
+        return inserted
+
+
+# Shared by every log_cc_snapshot call in this process
+snapshot_writer = SnapshotBatchWriter()
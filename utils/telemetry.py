@@ -7,12 +7,23 @@ import logging
 from datetime import UTC, datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import func, text
+from sqlalchemy import case, func, select, text, update
 
 from db_base import db
+from utils.telemetry_aggregator import TELEMETRY_AGGREGATE, telemetry_aggregator
 
 logger = logging.getLogger(__name__)
 
+# Retention is tracked for days 0..RETENTION_MAX_DAY after a user's first expense
+RETENTION_MAX_DAY = 30
+
+# Events that bump a running counter
+COUNTER_MAPPING = {
+    "expense_logged": "total_expenses",
+    "report_requested": "total_reports",
+    # "challenge_started": "challenges_started"  # Future feature
+}
+
 class TelemetryTracker:
     """Central telemetry tracking system for growth metrics"""
     
@@ -21,6 +32,10 @@ class TelemetryTracker:
         """
         Track a telemetry event
         
+        The event row and its counter increment are buffered by the per-process
+        telemetry_aggregator and written in batches, together with the
+        retention rollup update for expense_logged events.
+        
         Args:
             event_type: Type of event ('expense_logged', 'expense_edited', etc.)
             user_id_hash: Hashed user identifier
@@ -30,20 +45,20 @@ class TelemetryTracker:
             bool: True if event was successfully tracked
         """
         try:
-            from models import TelemetryEvent
-            
-            event = TelemetryEvent(
-                event_type=event_type,
-                user_id_hash=user_id_hash,
-                event_data=event_data or {},
-                timestamp=datetime.now(UTC)
-            )
-            
-            db.session.add(event)
-            db.session.commit()
+            timestamp = datetime.now(UTC)
+            if not telemetry_aggregator.add_event({
+                'event_type': event_type,
+                'user_id_hash': user_id_hash,
+                'event_data': event_data or {},
+                'timestamp': timestamp
+            }):
+                logger.warning(f"Telemetry buffer full, dropped {event_type} event")
+                return False
             
             # Update relevant counters
             TelemetryTracker._update_counter(event_type)
+            if not TELEMETRY_AGGREGATE:
+                telemetry_aggregator.flush()
             
             logger.debug(f"Tracked {event_type} event for user {user_id_hash[:8]}...")
             return True
@@ -92,26 +107,57 @@ class TelemetryTracker:
     
     @staticmethod
     def _update_counter(event_type: str) -> None:
-        """Update running counters based on event type"""
-        try:
-            from models import GrowthCounter
-            
-            counter_mapping = {
-                "expense_logged": "total_expenses",
-                "report_requested": "total_reports",
-                # "challenge_started": "challenges_started"  # Future feature
-            }
-            
-            counter_name = counter_mapping.get(event_type)
-            if counter_name:
-                counter = GrowthCounter.query.filter_by(counter_name=counter_name).first()
-                if counter:
-                    counter.counter_value += 1
-                    counter.last_updated = datetime.now(UTC)
-                    db.session.commit()
-                
-        except Exception as e:
-            logger.error(f"Failed to update counter for {event_type}: {e}")
+        """Merge a running-counter increment into this process's pending deltas"""
+        counter_name = COUNTER_MAPPING.get(event_type)
+        if counter_name:
+            telemetry_aggregator.increment(counter_name)
+    
+
+def apply_first_seen(events: list[dict[str, Any]]) -> None:
+    """
+    Fold a batch's expense_logged events into user_first_seen
+    
+    Runs inside the telemetry batch transaction (the caller commits): known
+    users get the bits for their new active days, and users without a row get
+    one built from their whole event history, so someone who was logging before
+    the rollup existed keeps their real cohort date. Rows are locked, which also
+    waits out a running rebuild_retention_rollup.
+    """
+    from models import UserFirstSeen
+    
+    days_by_user = {}
+    for event in events:
+        if event.get('event_type') == 'expense_logged' and event.get('user_id_hash'):
+            days_by_user.setdefault(event['user_id_hash'], set()).add(_utc_date(event['timestamp']))
+    if not days_by_user:
+        return
+    
+    now = datetime.now(UTC)
+    rows = db.session.query(UserFirstSeen.user_id_hash, UserFirstSeen.first_seen_date, UserFirstSeen.activity_mask) \
+        .filter(UserFirstSeen.user_id_hash.in_(sorted(days_by_user))).with_for_update().all()
+    known = {user_id_hash: (first, mask) for user_id_hash, first, mask in rows}
+    
+    missing = sorted(set(days_by_user) - set(known))
+    if missing:
+        # The batch's own events are already inserted in this transaction
+        history = load_cohort_activity(datetime(1970, 1, 1, tzinfo=UTC), now + timedelta(days=1), users=missing)
+        for user_id_hash in missing:
+            days = days_by_user[user_id_hash]
+            first, mask = history.get(user_id_hash) or (min(days), _day_mask(min(days), days))
+            db.session.add(UserFirstSeen(user_id_hash=user_id_hash, first_seen_date=first,
+                                         activity_mask=mask, updated_at=now))
+    
+    for user_id_hash, days in sorted(days_by_user.items()):
+        if user_id_hash not in known:
+            continue
+        first, mask = known[user_id_hash]
+        bits = _day_mask(first, days)
+        if bits & ~mask:
+            db.session.execute(
+                update(UserFirstSeen)
+                .where(UserFirstSeen.user_id_hash == user_id_hash)
+                .values(activity_mask=UserFirstSeen.activity_mask.op('|')(bits), updated_at=now)
+            )
 
 class GrowthMetrics:
     """Calculate growth metrics from telemetry data"""
@@ -161,103 +207,70 @@ class GrowthMetrics:
             return 0
     
     @staticmethod
-    def get_retention_cohorts(days: int = 7) -> list[dict[str, Any]]:
+    def get_retention_cohorts(days: int = 7, retention_days: tuple[int, ...] = (1, 3, 7)) -> list[dict[str, Any]]:
         """
-        Get D1/D3 retention for the last N cohorts
+        Get Dn retention for the last N cohorts
+        
+        Reads the user_first_seen rollup in one grouped query. Its migration
+        backfills it from telemetry_events and telemetry batches keep it
+        current, so it is complete on its own.
         
         Args:
             days: Number of cohorts to analyze (default 7)
+            retention_days: Which Dn to report, each 1..RETENTION_MAX_DAY
             
         Returns:
-            List of cohort data with retention percentages
+            List of cohort data with retention percentages, newest first
         """
         try:
-            from models import TelemetryEvent
+            for n in retention_days:
+                if not 1 <= n <= RETENTION_MAX_DAY:
+                    raise ValueError(f"retention day must be 1..{RETENTION_MAX_DAY}, got {n}")
             
-            cohorts = []
+            today = datetime.now(UTC).date()
+            cohort_dates = [today - timedelta(days=offset) for offset in range(days)]
+            counts = GrowthMetrics._cohort_counts_from_rollup(cohort_dates[-1], today, retention_days)
             
-            for day_offset in range(days):
-                cohort_date = datetime.now(UTC).date() - timedelta(days=day_offset)
-                cohort_start = datetime.combine(cohort_date, datetime.min.time()).replace(tzinfo=UTC)
-                cohort_end = cohort_start + timedelta(days=1)
-                
-                # Get new users in this cohort (first expense_logged event)
-                new_users_query = text("""
-                    SELECT user_id_hash, MIN(timestamp) as first_expense
-                    FROM telemetry_events 
-                    WHERE event_type = 'expense_logged'
-                    GROUP BY user_id_hash
-                    HAVING MIN(timestamp) >= :cohort_start AND MIN(timestamp) < :cohort_end
-                """)
-                
-                new_users_result = db.session.execute(new_users_query, {
-                    'cohort_start': cohort_start,
-                    'cohort_end': cohort_end
-                }).fetchall()
-                
-                d0_users = len(new_users_result)
-                
-                if d0_users == 0:
-                    cohorts.append({
-                        'cohort_date': cohort_date.strftime('%Y-%m-%d'),
-                        'd0_users': 0,
-                        'd1_retention': 0.0,
-                        'd3_retention': 0.0
-                    })
-                    continue
-                
-                user_ids = [row[0] for row in new_users_result]
-                
-                # Calculate D1 retention
-                d1_start = cohort_start + timedelta(days=1)
-                d1_end = d1_start + timedelta(days=1)
-                
-                d1_active = db.session.query(
-                    func.count(func.distinct(TelemetryEvent.user_id_hash))
-                ).filter(
-                    TelemetryEvent.event_type == 'expense_logged',
-                    TelemetryEvent.user_id_hash.in_(user_ids),
-                    TelemetryEvent.timestamp >= d1_start,
-                    TelemetryEvent.timestamp < d1_end
-                ).scalar() or 0
-                
-                # Calculate D3 retention
-                d3_start = cohort_start + timedelta(days=3)
-                d3_end = d3_start + timedelta(days=1)
-                
-                d3_active = db.session.query(
-                    func.count(func.distinct(TelemetryEvent.user_id_hash))
-                ).filter(
-                    TelemetryEvent.event_type == 'expense_logged',
-                    TelemetryEvent.user_id_hash.in_(user_ids),
-                    TelemetryEvent.timestamp >= d3_start,
-                    TelemetryEvent.timestamp < d3_end
-                ).scalar() or 0
-                
-                cohorts.append({
-                    'cohort_date': cohort_date.strftime('%Y-%m-%d'),
-                    'd0_users': d0_users,
-                    'd1_retention': (d1_active / d0_users * 100) if d0_users > 0 else 0.0,
-                    'd3_retention': (d3_active / d0_users * 100) if d0_users > 0 else 0.0
-                })
-            
-            return cohorts
+            return build_cohort_rows(cohort_dates, counts, retention_days)
             
         except Exception as e:
             logger.error(f"Failed to calculate retention cohorts: {e}")
             return []
     
+    @staticmethod
+    def _cohort_counts_from_rollup(first_date, last_date, retention_days) -> dict:
+        """Count cohort users and Dn actives per cohort date in one grouped query"""
+        from models import UserFirstSeen
+        
+        columns = [
+            func.sum(case((UserFirstSeen.activity_mask.op('&')(1 << n) != 0, 1), else_=0))
+            for n in retention_days
+        ]
+        rows = db.session.query(
+            UserFirstSeen.first_seen_date,
+            func.count(UserFirstSeen.user_id_hash),
+            *columns
+        ).filter(
+            UserFirstSeen.first_seen_date >= first_date,
+            UserFirstSeen.first_seen_date <= last_date
+        ).group_by(UserFirstSeen.first_seen_date).all()
+        
+        return {
+            row[0]: (row[1], {n: int(row[2 + i] or 0) for i, n in enumerate(retention_days)})
+            for row in rows
+        }
+    
     @staticmethod
     def get_running_totals() -> dict[str, int]:
-        """Get all running counter totals"""
+        """Get all running counter totals, summing each counter's shard rows"""
         try:
             from models import GrowthCounter
             
-            counters = GrowthCounter.query.all()
-            totals = {}
-            
-            for counter in counters:
-                totals[counter.counter_name] = counter.counter_value
+            rows = db.session.query(
+                GrowthCounter.counter_name,
+                func.sum(GrowthCounter.counter_value)
+            ).group_by(GrowthCounter.counter_name).all()
+            totals = {counter_name: int(total or 0) for counter_name, total in rows}
                 
             # Ensure all expected counters are present
             expected_counters = ['total_expenses', 'total_reports', 'challenges_started']
@@ -318,6 +331,126 @@ class GrowthMetrics:
             logger.error(f"Failed to generate metrics report: {e}")
             return f"Error generating metrics report: {str(e)}"
 
+def _utc_date(timestamp: datetime):
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(UTC)
+    return timestamp.date()
+
+def load_cohort_activity(window_start: datetime, window_end: datetime,
+                         users: list[str] | None = None) -> dict[str, tuple[Any, int]]:
+    """
+    Build {user_id_hash: (first_seen_date, activity_mask)} for every user (of
+    `users`, if given) whose first expense_logged event falls in [window_start, window_end)
+    
+    One query: first-event times are grouped in a subquery and joined back to
+    the same users' events up to RETENTION_MAX_DAY days past the window.
+    """
+    from models import TelemetryEvent
+    
+    conditions = [TelemetryEvent.event_type == 'expense_logged', TelemetryEvent.user_id_hash.isnot(None)]
+    if users is not None:
+        conditions.append(TelemetryEvent.user_id_hash.in_(users))
+    firsts = select(
+        TelemetryEvent.user_id_hash,
+        func.min(TelemetryEvent.timestamp).label('first_ts')
+    ).where(*conditions).group_by(TelemetryEvent.user_id_hash).having(
+        func.min(TelemetryEvent.timestamp) >= window_start
+    ).having(
+        func.min(TelemetryEvent.timestamp) < window_end
+    ).subquery()
+    
+    rows = db.session.execute(
+        select(TelemetryEvent.user_id_hash, TelemetryEvent.timestamp)
+        .join(firsts, firsts.c.user_id_hash == TelemetryEvent.user_id_hash)
+        .where(
+            TelemetryEvent.event_type == 'expense_logged',
+            TelemetryEvent.timestamp < window_end + timedelta(days=RETENTION_MAX_DAY + 1)
+        )
+    )
+    return activity_masks(rows)
+
+def activity_masks(events) -> dict[str, tuple[Any, int]]:
+    """Fold (user_id_hash, timestamp) pairs into (first_seen_date, activity_mask) per user"""
+    days_by_user = {}
+    for user_id_hash, timestamp in events:
+        days_by_user.setdefault(user_id_hash, set()).add(_utc_date(timestamp))
+    
+    result = {}
+    for user_id_hash, days in days_by_user.items():
+        first = min(days)
+        result[user_id_hash] = (first, _day_mask(first, days))
+    return result
+
+def _day_mask(first, days) -> int:
+    """Bit n set for each day n days after first, up to RETENTION_MAX_DAY"""
+    mask = 0
+    for day in days:
+        offset = (day - first).days
+        if 0 <= offset <= RETENTION_MAX_DAY:
+            mask |= 1 << offset
+    return mask
+
+def summarize_cohort_activity(activity, retention_days) -> dict:
+    """Count cohort users and Dn actives per first_seen_date"""
+    counts = {}
+    for first_seen_date, mask in activity:
+        entry = counts.get(first_seen_date)
+        if entry is None:
+            entry = counts[first_seen_date] = [0, dict.fromkeys(retention_days, 0)]
+        entry[0] += 1
+        active = entry[1]
+        for n in retention_days:
+            if mask & (1 << n):
+                active[n] += 1
+    return {day: (d0, active) for day, (d0, active) in counts.items()}
+
+def build_cohort_rows(cohort_dates, counts: dict, retention_days) -> list[dict[str, Any]]:
+    """Turn per-date counts into the cohort rows shown on the dashboards"""
+    cohorts = []
+    for cohort_date in cohort_dates:
+        d0_users, active = counts.get(cohort_date, (0, {}))
+        cohort = {
+            'cohort_date': cohort_date.strftime('%Y-%m-%d'),
+            'd0_users': d0_users
+        }
+        for n in retention_days:
+            cohort[f'd{n}_retention'] = (active.get(n, 0) / d0_users * 100) if d0_users > 0 else 0.0
+        cohorts.append(cohort)
+    return cohorts
+
+def rebuild_retention_rollup() -> int:
+    """
+    Rebuild user_first_seen from telemetry_events, returns users written
+    
+    On PostgreSQL the table is locked against writes first, so telemetry
+    batches wait and then apply their events on top of the rebuilt rows
+    instead of racing the delete and insert.
+    """
+    from models import UserFirstSeen
+    
+    try:
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text('LOCK TABLE user_first_seen IN EXCLUSIVE MODE'))
+        activity = load_cohort_activity(
+            datetime(1970, 1, 1, tzinfo=UTC),
+            datetime.now(UTC) + timedelta(days=1)
+        )
+        now = datetime.now(UTC)
+        
+        db.session.query(UserFirstSeen).delete()
+        db.session.bulk_insert_mappings(UserFirstSeen, [
+            {'user_id_hash': user_id_hash, 'first_seen_date': first, 'activity_mask': mask, 'updated_at': now}
+            for user_id_hash, (first, mask) in activity.items()
+        ])
+        db.session.commit()
+        
+        logger.info(f"Retention rollup rebuilt for {len(activity)} users")
+        return len(activity)
+        
+    except Exception:
+        db.session.rollback()
+        raise
+
 def initialize_growth_counters():
     """Initialize growth counters if they don't exist"""
     try:
@@ -334,6 +467,7 @@ def initialize_growth_counters():
             if not existing:
                 counter = GrowthCounter(
                     counter_name=counter_name,
+                    shard=0,
                     counter_value=initial_value
                 )
                 db.session.add(counter)
@@ -0,0 +1,221 @@
+"""
+Per-process telemetry aggregation
+TelemetryEvent rows are buffered and GrowthCounter increments are merged into
+deltas in memory, then written together by a background thread: one multi-row
+event insert and one UPDATE per counter per flush, on this worker's shard row,
+plus the retention rollup for the users whose expenses the batch logs
+"""
+
+import logging
+import os
+from collections import Counter, deque
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+from utils.write_behind import WriteBehindBuffer
+
+logger = logging.getLogger("finbrain.telemetry_aggregator")
+
+TELEMETRY_AGGREGATE = os.getenv("TELEMETRY_AGGREGATE", "true").lower() == "true"  # false: write per event
+TELEMETRY_FLUSH_INTERVAL_SEC = float(os.getenv("TELEMETRY_FLUSH_INTERVAL_SEC", "5.0"))
+TELEMETRY_BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "500"))  # events that trigger an early flush
+TELEMETRY_BUFFER_MAX = int(os.getenv("TELEMETRY_BUFFER_MAX", "20000"))  # events held before dropping
+GROWTH_COUNTER_SHARDS = int(os.getenv("GROWTH_COUNTER_SHARDS", "8"))
+TELEMETRY_MAX_ATTEMPTS = int(os.getenv("TELEMETRY_MAX_ATTEMPTS", "3"))  # failures before a batch is split
+TELEMETRY_DEAD_LETTER_MAX = int(os.getenv("TELEMETRY_DEAD_LETTER_MAX", "1000"))  # unwritable rows kept
+
+
+def counter_shard() -> int:
+    """Shard row this worker writes; workers rarely share one, so rows are rarely contended"""
+    return os.getpid() % GROWTH_COUNTER_SHARDS
+
+
+def write_telemetry_batch(events: list[dict[str, Any]], deltas: dict[str, int], shard: int) -> None:
+    """Insert events, apply counter deltas and update the retention rollup in one transaction"""
+    from sqlalchemy import insert, update
+
+    from app import app
+    from db_base import db
+    from models import GrowthCounter, TelemetryEvent
+    from utils.telemetry import apply_first_seen
+
+    with app.app_context():
+        try:
+            now = datetime.now(UTC)
+            if events:
+                db.session.execute(insert(TelemetryEvent), events)
+            # Sorted so concurrent flushes lock shard rows in the same order
+            for counter_name, delta in sorted(deltas.items()):
+                result = db.session.execute(
+                    update(GrowthCounter)
+                    .where(GrowthCounter.counter_name == counter_name, GrowthCounter.shard == shard)
+                    .values(counter_value=GrowthCounter.counter_value + delta, last_updated=now)
+                )
+                if result.rowcount == 0:
+                    # First write to this shard; a concurrent insert fails the batch, which is retried
+                    db.session.add(GrowthCounter(counter_name=counter_name, shard=shard,
+                                                 counter_value=delta, last_updated=now))
+            apply_first_seen(events)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+class _Batch:
+    """Events and deltas written together, with the failures counted against them"""
+    __slots__ = ('events', 'deltas', 'attempts')
+
+    def __init__(self, events: list[dict[str, Any]], deltas: dict[str, int], attempts: int = 0):
+        self.events = events
+        self.deltas = deltas
+        self.attempts = attempts
+
+
+class TelemetryAggregator(WriteBehindBuffer):
+    """
+    Buffers events and merges counter increments until the next flush
+
+    A failed batch is retried on its own, ahead of newer events, so delivery is
+    at-least-once without one bad row holding everything else back. Failures
+    only count against a batch when something else in the same flush was
+    written (a database outage fails everything and counts against nothing).
+    After TELEMETRY_MAX_ATTEMPTS the batch is split in half, and a single row
+    that still fails is moved to the dead-letter buffer.
+    """
+
+    def __init__(self, write_fn: Callable[[list[dict[str, Any]], dict[str, int], int], None] = write_telemetry_batch,
+                 flush_interval: float = TELEMETRY_FLUSH_INTERVAL_SEC, batch_size: int = TELEMETRY_BATCH_SIZE,
+                 max_buffer: int = TELEMETRY_BUFFER_MAX, max_attempts: int = TELEMETRY_MAX_ATTEMPTS):
+        super().__init__("telemetry-aggregator", flush_interval, flush_interval + 5)
+        self.write_fn = write_fn
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.max_attempts = max_attempts
+
+        self._events: deque = deque()
+        self._deltas: Counter = Counter()
+        self._retries: deque[_Batch] = deque()
+        self._dead_letters: deque = deque(maxlen=TELEMETRY_DEAD_LETTER_MAX)
+
+        self.stats = {
+            'events_buffered': 0,
+            'events_written': 0,
+            'counter_updates': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'split_batches': 0,
+            'dead_lettered': 0,
+            'dropped_overflow': 0,
+        }
+
+    def add_event(self, event: dict[str, Any]) -> bool:
+        """Buffer one telemetry_events row; False if the buffer is full"""
+        self._ensure_thread()
+        with self._lock:
+            if len(self._events) + self._retry_events() >= self.max_buffer:
+                self.stats['dropped_overflow'] += 1
+                return False
+            self._events.append(event)
+            self.stats['events_buffered'] += 1
+            pending = len(self._events)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def increment(self, counter_name: str, delta: int = 1) -> None:
+        """Add to a growth counter at the next flush"""
+        self._ensure_thread()
+        with self._lock:
+            self._deltas[counter_name] += delta
+
+    def pending_deltas(self) -> dict[str, int]:
+        """Increments not yet written by this process"""
+        with self._lock:
+            return dict(self._deltas)
+
+    def dead_letters(self) -> list[tuple[list[dict[str, Any]], dict[str, int]]]:
+        """(events, deltas) pairs given up on, most recent last"""
+        with self._lock:
+            return list(self._dead_letters)
+
+    def flush(self) -> bool:
+        """Write retried batches, then buffered events and deltas; False if any write failed"""
+        with self._flush_lock:
+            with self._lock:
+                batches = list(self._retries)
+                self._retries.clear()
+                deltas = {name: delta for name, delta in self._deltas.items() if delta}
+                if self._events or deltas:
+                    batches.append(_Batch(list(self._events), deltas))
+                self._events.clear()
+                self._deltas.clear()
+            if not batches:
+                return True
+
+            failed = []
+            for batch in batches:
+                try:
+                    self.write_fn(batch.events, batch.deltas, counter_shard())
+                except Exception as e:
+                    logger.error(f"Telemetry flush failed for {len(batch.events)} events: {e}")
+                    failed.append(batch)
+                    continue
+                with self._lock:
+                    self.stats['flushes'] += 1
+                    self.stats['events_written'] += len(batch.events)
+                    self.stats['counter_updates'] += len(batch.deltas)
+
+            if failed:
+                self._requeue(failed, counts=len(failed) < len(batches))
+            return not failed
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, pending_events=len(self._events), pending_counters=len(self._deltas),
+                        retry_batches=len(self._retries), retry_events=self._retry_events(),
+                        shard=counter_shard(), shards=GROWTH_COUNTER_SHARDS)
+
+    def _requeue(self, failed: list[_Batch], counts: bool) -> None:
+        """Put failed batches back for the next flush, splitting or dead-lettering ones out of attempts"""
+        retry = []
+        for batch in failed:
+            if counts:
+                batch.attempts += 1
+            if batch.attempts < self.max_attempts:
+                retry.append(batch)
+            elif len(batch.events) > 1:
+                half = len(batch.events) // 2
+                retry += [_Batch(batch.events[:half], batch.deltas), _Batch(batch.events[half:], {})]
+                with self._lock:
+                    self.stats['split_batches'] += 1
+            elif batch.events and batch.deltas:
+                retry += [_Batch(batch.events, {}), _Batch([], batch.deltas)]
+                with self._lock:
+                    self.stats['split_batches'] += 1
+            else:
+                logger.error(f"Telemetry batch failed {batch.attempts} times, dead-lettering "
+                             f"{len(batch.events)} events and {len(batch.deltas)} counter deltas")
+                with self._lock:
+                    self._dead_letters.append((batch.events, batch.deltas))
+                    self.stats['dead_lettered'] += len(batch.events) or 1
+
+        with self._lock:
+            self.stats['failed_flushes'] += 1
+            # Retries stay ahead of newer events; past max_buffer the oldest rows are dropped
+            room = max(0, self.max_buffer - len(self._events))
+            for batch in reversed(retry):
+                kept = batch.events[-room:] if room else []
+                self.stats['dropped_overflow'] += len(batch.events) - len(kept)
+                room -= len(kept)
+                if kept or batch.deltas:
+                    batch.events = kept
+                    self._retries.appendleft(batch)
+
+    def _retry_events(self) -> int:
+        return sum(len(batch.events) for batch in self._retries)
+
+
+# Shared by TelemetryTracker in this process
+telemetry_aggregator = TelemetryAggregator()
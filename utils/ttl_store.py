@@ -5,57 +5,39 @@ Handles rate limiting, daily caps, and anti-repeat functionality
 """
 
 import logging
+import math
 import os
-import threading
-import time
 from typing import Optional
 
+from utils import cache, redis_pool
+
 logger = logging.getLogger(__name__)
 
+TTL_STORE_MAX_ENTRIES = int(os.getenv("TTL_STORE_MAX_ENTRIES", "50000"))  # Per-worker bound for the fallback
+
 
 class InProcTTL:
     """Thread-safe in-memory TTL store for fallback when Redis unavailable"""
     
-    def __init__(self):
-        self._d = {}
-        self._lock = threading.Lock()
-
-    def _purge(self):
-        """Remove expired entries"""
-        now = time.time()
-        drop = [k for k, (_, exp) in self._d.items() if exp and exp < now]
-        for k in drop:
-            self._d.pop(k, None)
+    def __init__(self, max_entries: int = TTL_STORE_MAX_ENTRIES):
+        # Bounded LRU+TTL; expired keys are dropped when touched instead of scanned on every call
+        self._d = cache.CacheNamespace("ttl_store", ttl_seconds=math.inf, max_entries=max_entries)
 
     def incr(self, key: str, ttl_seconds: int | None = None) -> int:
         """Increment key by 1, optionally setting TTL"""
-        with self._lock:
-            self._purge()
-            val, exp = self._d.get(key, (0, 0))
-            val += 1
-            if ttl_seconds:
-                exp = time.time() + ttl_seconds
-            self._d[key] = (val, exp)
-            return val
+        return self._d.incr(key, 1, ttl_seconds)
 
     def get(self, key: str) -> int | None:
         """Get value for key"""
-        with self._lock:
-            self._purge()
-            itm = self._d.get(key)
-            return itm[0] if itm else None
+        return self._d.get(key)
 
     def setex(self, key: str, ttl_seconds: int, value: int = 1) -> None:
         """Set key to value with TTL"""
-        with self._lock:
-            self._purge()
-            self._d[key] = (value, time.time() + ttl_seconds)
+        self._d.set(key, value, ttl_seconds)
 
     def exists(self, key: str) -> bool:
         """Check if key exists and not expired"""
-        with self._lock:
-            self._purge()
-            return key in self._d
+        return key in self._d
 
 
 class RedisTTL:
@@ -66,11 +48,7 @@ class RedisTTL:
 
     def incr(self, key: str, ttl_seconds: int | None = None) -> int:
         """Increment key by 1, optionally setting TTL"""
-        p = self.client.pipeline()
-        p.incr(key)
-        if ttl_seconds and (self.client.ttl(key) is None or self.client.ttl(key) < 0):
-            p.expire(key, ttl_seconds)
-        return p.execute()[0]
+        return redis_pool.incr_with_ttl(self.client, key, ttl_seconds)
 
     def get(self, key: str) -> int | None:
         """Get value for key"""
@@ -89,23 +67,11 @@ class RedisTTL:
 def get_store():
     """
     Get TTL store instance - prefers Redis if available, falls back to in-memory
-    Safe Redis import with graceful fallback
+    Redis comes from the shared pool (utils.redis_pool)
     """
-    url = os.getenv("REDIS_URL")
-    if not url:
-        logger.info("TTL Store: Using in-memory fallback (no REDIS_URL)")
-        return InProcTTL()
-    
-    try:
-        import redis
-        client = redis.Redis.from_url(url)
-        # Test connection
-        client.ping()
-        logger.info("TTL Store: Using Redis backend")
-        return RedisTTL(client)
-    except ImportError:
-        logger.warning("TTL Store: Redis package not available, using in-memory fallback")
+    client = redis_pool.get_client()
+    if client is None:
+        logger.info("TTL Store: Using in-memory fallback (Redis not configured or unreachable)")
         return InProcTTL()
-    except Exception as e:
-        logger.warning(f"TTL Store: Redis connection failed ({e}), using in-memory fallback")
-        return InProcTTL()
\ No newline at end of file
+    logger.info("TTL Store: Using Redis backend")
+    return RedisTTL(client)
@@ -3,11 +3,13 @@ import hashlib
 import hmac
 import json
 import logging
+import threading
 import time
 import uuid
 from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict
 
+from . import dedup_store
 from .logger import log_webhook_success
 
 logger = logging.getLogger(__name__)
@@ -15,10 +17,9 @@ logger = logging.getLogger(__name__)
 # Thread pool for async processing (max 10 concurrent tasks)
 executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix="webhook-")
 
-# Message deduplication cache (simple in-memory for MVP)
-processed_messages = {}
-cache_cleanup_interval = 3600  # 1 hour
-last_cleanup = time.time()
+# Message deduplication shared across workers (see utils.dedup_store)
+_dedup_store = None
+_dedup_store_lock = threading.Lock()
 
 def verify_webhook_signature(payload: bytes, signature: str, app_secret: str) -> bool:
     """Verify Facebook webhook signature"""
@@ -39,30 +40,22 @@ def verify_webhook_signature(payload: bytes, signature: str, app_secret: str) ->
         logger.error(f"Signature verification error: {str(e)}")
         return False
 
+def get_dedup_store():
+    """Process-wide dedup store, built from env on first use"""
+    global _dedup_store
+    if _dedup_store is None:
+        with _dedup_store_lock:
+            if _dedup_store is None:
+                _dedup_store = dedup_store.get_dedup_store()
+    return _dedup_store
+
 def is_duplicate_message(message_id: str) -> bool:
-    """Check if message has already been processed"""
-    global processed_messages, last_cleanup
-    
-    # Cleanup old entries periodically
-    current_time = time.time()
-    if current_time - last_cleanup > cache_cleanup_interval:
-        cleanup_old_messages()
-        last_cleanup = current_time
-    
-    if message_id in processed_messages:
-        return True
-    
-    # Mark as processed
-    processed_messages[message_id] = current_time
-    return False
+    """Check if message has already been processed (and mark it processed if not)"""
+    return get_dedup_store().check_and_mark(message_id)
 
-def cleanup_old_messages():
-    """Remove processed messages older than 1 hour"""
-    cutoff_time = time.time() - cache_cleanup_interval
-    to_remove = [mid for mid, timestamp in processed_messages.items() if timestamp < cutoff_time]
-    for mid in to_remove:
-        del processed_messages[mid]
-    logger.debug(f"Cleaned up {len(to_remove)} old message entries")
+def get_dedup_stats() -> dict[str, Any]:
+    """Hit/miss/eviction counters of the message dedup store"""
+    return get_dedup_store().get_stats()
 
 def extract_webhook_events(data: dict[str, Any]) -> list:
     """Extract and validate webhook events using single-source-of-truth identity"""
@@ -0,0 +1,73 @@
+"""
+Background flush thread shared by the write-behind buffers
+Subclasses buffer rows in memory and implement flush(); this runs flush()
+every flush_interval seconds or when woken, and drains once more on close
+"""
+
+import atexit
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger("finbrain.write_behind")
+
+
+class WriteBehindBuffer(ABC):
+    """
+    Lazily started flush thread with wake-up, fork restart and drain on exit
+
+    Subclasses hold their buffers under self._lock, call self._ensure_thread()
+    before buffering and self._wakeup.set() to flush early.
+    """
+
+    def __init__(self, thread_name: str, flush_interval: float, drain_timeout: float):
+        self.thread_name = thread_name
+        self.flush_interval = flush_interval
+        self.drain_timeout = drain_timeout
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one batch in flight at a time
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    @abstractmethod
+    def flush(self):
+        """Write out everything buffered so far"""
+
+    def close(self, timeout: float | None = None) -> None:
+        """Stop the flush thread and drain the buffers (registered with atexit)"""
+        with self._lock:
+            self._stopping = True
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(self.drain_timeout if timeout is None else timeout)
+        self.flush()
+
+    def _ensure_thread(self) -> None:
+        # Started lazily and restarted after a fork, since threads don't survive into workers
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            first_start = self._thread is None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+        if first_start:
+            atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:  # Never let the flush thread die
+                logger.error(f"{self.thread_name} flush loop error: {e}")
+            with self._lock:
+                if self._stopping:
+                    return